@@ -0,0 +1,113 @@
+"""
+Análise offline dos traces gravados pelo RastreamentoMiddleware
+
+Lê os arquivos de spans (logs/rastros.jsonl*) e mostra:
+- por padrão: para cada rota, onde vai o tempo (tempo próprio de cada tipo de
+  span, ou seja, a duração menos a dos filhos). O tempo próprio do span raiz
+  "HTTP ..." é o que fica fora da rota: leitura do formulário, validação e
+  serialização da resposta.
+- --lentos N: os N traces mais lentos;
+- --trace ID: a árvore de spans de um trace.
+
+Exemplos:
+    python analisar_rastros.py logs/rastros.jsonl*
+    python analisar_rastros.py logs/rastros.jsonl --lentos 10
+    python analisar_rastros.py logs/rastros.jsonl --trace 4bf92f3577b34da6a3ce929d0e0e4736
+"""
+
+import argparse
+import json
+import sys
+from collections import defaultdict
+from typing import Dict, List
+
+
+def percentil(valores_ordenados: List[float], p: float) -> float:
+    """Percentil pelo método do posto mais próximo."""
+    if not valores_ordenados:
+        return 0.0
+    indice = max(0, min(len(valores_ordenados) - 1, int(round(p / 100 * len(valores_ordenados))) - 1))
+    return valores_ordenados[indice]
+
+
+def ler_traces(caminhos: List[str]) -> Dict[str, List[Dict]]:
+    traces = defaultdict(list)
+    for caminho in caminhos:
+        with open(caminho, "r", encoding="utf-8") as arquivo:
+            for linha in arquivo:
+                if linha.strip():
+                    span = json.loads(linha)
+                    traces[span["trace_id"]].append(span)
+    return traces
+
+
+def raiz_do_trace(spans: List[Dict]) -> Dict:
+    ids = {span["span_id"] for span in spans}
+    return next(span for span in spans if span["pai_id"] not in ids)
+
+
+def tempo_proprio(spans: List[Dict]) -> Dict[str, float]:
+    filhos = defaultdict(float)
+    for span in spans:
+        filhos[span["pai_id"]] += span["duracao_ms"]
+    return {span["span_id"]: max(span["duracao_ms"] - filhos[span["span_id"]], 0.0) for span in spans}
+
+
+def resumo_por_rota(traces: Dict[str, List[Dict]]):
+    por_rota: Dict[str, Dict[str, List[float]]] = defaultdict(lambda: defaultdict(list))
+    duracoes: Dict[str, List[float]] = defaultdict(list)
+    for spans in traces.values():
+        raiz = raiz_do_trace(spans)
+        duracoes[raiz["nome"]].append(raiz["duracao_ms"])
+        proprios = tempo_proprio(spans)
+        somas = defaultdict(float)
+        for span in spans:
+            somas[span["nome"]] += proprios[span["span_id"]]
+        for nome, total in somas.items():
+            por_rota[raiz["nome"]][nome].append(total)
+
+    for rota, partes in sorted(por_rota.items()):
+        lista = sorted(duracoes[rota])
+        print(f"\n{rota}  ({len(lista)} traces, p50 {percentil(lista, 50):.1f}ms, p95 {percentil(lista, 95):.1f}ms)")
+        total_rota = sum(lista) or 1.0
+        for nome, valores in sorted(partes.items(), key=lambda item: sum(item[1]), reverse=True):
+            ordenados = sorted(valores)
+            print(f"  {nome[:60]:60} {sum(valores) / total_rota:6.1%}  "
+                  f"p50 {percentil(ordenados, 50):8.2f}ms  p95 {percentil(ordenados, 95):8.2f}ms")
+
+
+def imprimir_arvore(spans: List[Dict]):
+    filhos = defaultdict(list)
+    for span in spans:
+        filhos[span["pai_id"]].append(span)
+
+    def imprimir(span: Dict, nivel: int):
+        detalhe = span["atributos"].get("comando") or span["atributos"].get("arquivo") or ""
+        marca = " [ERRO]" if span["status"] == "erro" else ""
+        print(f"{'  ' * nivel}{span['duracao_ms']:9.2f}ms  {span['nome']}{marca}  {detalhe[:100]}")
+        for filho in sorted(filhos[span["span_id"]], key=lambda s: s["inicio"]):
+            imprimir(filho, nivel + 1)
+
+    imprimir(raiz_do_trace(spans), 0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Análise dos traces gravados em arquivo")
+    parser.add_argument("arquivos", nargs="+", help="Arquivos JSONL de spans (inclusive os rotacionados)")
+    parser.add_argument("--trace", help="Mostra a árvore de spans deste trace_id")
+    parser.add_argument("--lentos", type=int, help="Lista os N traces mais lentos")
+    args = parser.parse_args()
+
+    traces = ler_traces(args.arquivos)
+    if args.trace:
+        if args.trace not in traces:
+            print(f"Trace {args.trace} não encontrado.")
+            sys.exit(1)
+        imprimir_arvore(traces[args.trace])
+    elif args.lentos:
+        raizes = sorted((raiz_do_trace(spans) for spans in traces.values()), key=lambda r: r["duracao_ms"], reverse=True)
+        for raiz in raizes[:args.lentos]:
+            print(f"{raiz['duracao_ms']:9.1f}ms  {raiz['trace_id']}  {raiz['nome']}")
+    else:
+        resumo_por_rota(traces)
+    sys.exit(0)
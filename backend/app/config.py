@@ -4,7 +4,7 @@ Arquivo: backend/app/config.py
 """
 
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List, Optional
 
 
 class Settings(BaseSettings):
@@ -37,6 +37,13 @@ class Settings(BaseSettings):
     # Se True, imprime no terminal todo SQL que o sistema executa (bom para debug)
     DATABASE_ECHO: bool = False
 
+    # Orçamento GLOBAL de conexões (somando todos os workers). 0 = sem pool
+    # (NullPool, ideal atrás do PgBouncer); > 0 = cada worker mantém um pool
+    # de DB_CONEXOES_TOTAL // WORKERS conexões
+    DB_CONEXOES_TOTAL: int = 0
+    DB_POOL_TIMEOUT_S: int = 10  # espera máxima por uma conexão livre do pool
+    DB_POOL_RECICLAR_S: int = 1800  # conexões mais velhas que isso são reabertas
+
     # ==========================================================================
     # REDIS (Cache e Filas) - Opcional por enquanto
     # ==========================================================================
@@ -71,11 +78,23 @@ class Settings(BaseSettings):
     CORS_ALLOW_HEADERS: List[str] = ["*"] # Permite enviar tokens e JSONs
 
     # ==========================================================================
-    # INTEGRAÇÕES EXTERNAS (Placeholder)
+    # INTEGRAÇÕES EXTERNAS (IZA - app/integrations/iza.py)
     # ==========================================================================
     IZA_API_URL: str = "https://api.iza.df.gov.br"
     IZA_API_KEY: str = "your-iza-api-key-here"
     IZA_API_SECRET: str = "your-iza-api-secret-here"
+    IZA_ATIVA: bool = False  # analisa cada manifestação nova (tarefa em segundo plano)
+    IZA_TIMEOUT_CONEXAO_S: float = 2
+    IZA_TIMEOUT_S: float = 10  # leitura/escrita de cada requisição
+    IZA_TENTATIVAS: int = 3
+    IZA_ESPERA_BASE_S: float = 0.5  # espera entre tentativas: aleatória até base * 2^n
+    IZA_SIMULTANEAS_MAX: int = 4  # chamadas ao mesmo tempo por processo (= conexões do pool)
+    IZA_ESPERA_VAGA_S: float = 2
+    IZA_DISJUNTOR_FALHAS: int = 5
+    IZA_DISJUNTOR_ABERTO_S: float = 30
+    IZA_LOTE_MAX: int = 20  # textos por requisição
+    IZA_CACHE_DIAS: int = 30
+    IZA_VERSAO_CACHE: str = "1"  # trocar invalida as análises guardadas
 
     # ==========================================================================
     # UPLOAD DE ARQUIVOS
@@ -89,11 +108,233 @@ class Settings(BaseSettings):
     # Extensões permitidas por segurança (evita upload de .exe, .py, .sh)
     ALLOWED_EXTENSIONS: List[str] = ["mp3", "wav", "webm", "mp4", "jpg", "jpeg", "png", "webp"]
 
+    # ==========================================================================
+    # PRAZOS (SLA) - Agendador de vencimentos
+    # ==========================================================================
+    # Se True, a aplicação roda em segundo plano a varredura de prazos
+    PRAZO_AGENDADOR_ATIVO: bool = True
+
+    # Intervalo entre varreduras (em segundos)
+    PRAZO_INTERVALO_SEGUNDOS: int = 300
+
+    # Quantos dias antes do vencimento a manifestação passa a ser "a vencer"
+    PRAZO_DIAS_ALERTA: int = 5
+
+    # Quantidade de protocolos processados por transação (mantém os locks curtos)
+    PRAZO_TAMANHO_LOTE: int = 500
+
+    # Usuário técnico que assina as notas internas geradas automaticamente
+    PRAZO_EMAIL_SISTEMA: str = "sistema.prazos@participa-df.gov.br"
+
+    # ==========================================================================
+    # DADOS ABERTOS (Transparência)
+    # ==========================================================================
+    # Pasta onde ficam as partições diárias anonimizadas e o manifesto
+    DADOS_ABERTOS_DIR: str = "./dados_abertos"
+
     # ==========================================================================
     # LOGGING
     # ==========================================================================
     LOG_LEVEL: str = "INFO"
     LOG_FILE: str = "logs/app.log"
+    LOG_TAMANHO_MAX: int = 52428800  # 50MB por arquivo antes de rotacionar
+    LOG_BACKUPS: int = 5
+    # Registros aguardando a thread de escrita; acima disso são descartados
+    LOG_FILA_MAX: int = 10000
+    # Fração mantida dos eventos INFO/DEBUG por logger, ex.: {"uvicorn.access": 0.1}
+    LOG_AMOSTRAGEM: Dict[str, float] = {}
+
+    # ==========================================================================
+    # COMPARTIMENTOS (bulkheads por grupo de rotas)
+    # ==========================================================================
+    # Cada grupo tem seu limite de execuções simultâneas, sua fila e sua espera
+    # máxima; fila cheia ou espera estourada = 503. Toda rota síncrona está em
+    # um grupo, mas o threadpool também atende o que fica fora deles (lifespan,
+    # Idempotency-Key, perfilador, arquivos de /uploads). Por isso a soma dos
+    # limites fica ABAIXO do THREADPOOL_TAMANHO: a diferença é a reserva dessas
+    # chamadas, e só assim um grupo cheio não tira threads de outro.
+    COMPARTIMENTOS_ATIVOS: bool = True
+    COMPARTIMENTOS: Dict[str, Dict[str, float]] = {
+        "uploads": {"limite": 6, "fila": 16, "espera_s": 10},
+        "autenticacao": {"limite": 6, "fila": 32, "espera_s": 5},
+        "leituras": {"limite": 16, "fila": 200, "espera_s": 2},
+        "escritas": {"limite": 4, "fila": 32, "espera_s": 5},
+        "admin": {"limite": 4, "fila": 4, "espera_s": 30},
+    }
+
+    # ==========================================================================
+    # LIMITE DE TAXA (token bucket por IP / usuário alvo e rota)
+    # ==========================================================================
+    LIMITE_TAXA_ATIVO: bool = True
+    # "memoria" = por worker; "redis" = compartilhado entre workers (usa REDIS_URL)
+    LIMITE_TAXA_BACKEND: str = "memoria"
+    # capacidade = rajada permitida; por_minuto = reposição contínua do balde
+    LIMITE_TAXA_POLITICAS: Dict[str, Dict[str, float]] = {
+        "consulta_protocolo": {"capacidade": 30, "por_minuto": 30},
+        "login": {"capacidade": 10, "por_minuto": 5},
+        "recuperar_senha": {"capacidade": 3, "por_minuto": 1},
+    }
+
+    # ==========================================================================
+    # PROTOCOLOS (rejeição de números inexistentes sem consultar o banco)
+    # ==========================================================================
+    PROTOCOLO_FILTRO_ATIVO: bool = True
+    PROTOCOLO_FILTRO_CAPACIDADE: int = 2000000  # números previstos (define a memória: ~3,6MB)
+    PROTOCOLO_FILTRO_FALSOS_POSITIVOS: float = 0.001
+    PROTOCOLO_FILTRO_RECONSTRUIR_S: int = 3600  # 0 = só no início do worker
+    # Sinais dos scripts de carga em massa (stream no Redis, com CACHE_REDIS_ATIVO)
+    PROTOCOLO_FILTRO_SINAIS_S: float = 2  # intervalo de leitura dos sinais
+    PROTOCOLO_FILTRO_CARGA_S: int = 300  # filtro ignorado por este tempo após cada lote importado
+
+    # ==========================================================================
+    # CACHE COM COALESCÊNCIA (single-flight + stale-while-revalidate)
+    # ==========================================================================
+    CACHE_ATIVO: bool = True
+    # Quanto uma requisição espera o cálculo de outra antes de calcular sozinha
+    CACHE_ESPERA_MAX_S: float = 5
+    # Trava, valor e invalidações compartilhados entre workers (usa REDIS_URL)
+    CACHE_REDIS_ATIVO: bool = False
+    # De quanto em quanto tempo cada worker aplica as invalidações dos outros
+    CACHE_INVALIDACAO_INTERVALO_S: float = 1
+    # ttl_s = valor fresco; obsoleto_s = janela extra servindo o valor antigo
+    # enquanto uma thread recalcula; max_itens = chaves por worker (LRU).
+    # Sem Redis, uma invalidação só vale no worker que a fez: os demais servem
+    # o valor antigo por até ttl_s + obsoleto_s (assuntos: sem janela extra)
+    CACHES: Dict[str, Dict[str, float]] = {
+        "assuntos": {"ttl_s": 300, "obsoleto_s": 0, "max_itens": 10},
+        "rastreio": {"ttl_s": 10, "obsoleto_s": 20, "max_itens": 10000},
+        "estatisticas": {"ttl_s": 30, "obsoleto_s": 60, "max_itens": 10},
+    }
+
+    # ==========================================================================
+    # INGESTÃO EM RAJADA (diário local + gravação em lote)
+    # ==========================================================================
+    # "direto" = a requisição grava no banco; "diario" = a requisição grava no
+    # diário local (fsync), responde 202 com o protocolo e uma thread do worker
+    # grava os registros em lotes, uma transação por lote
+    INGESTAO_MODO: str = "direto"
+    INGESTAO_DIRETORIO: str = "dados/ingestao"  # precisa ser persistente (volume)
+    INGESTAO_FSYNC: bool = True
+    INGESTAO_LOTE_MAX: int = 200
+    INGESTAO_INTERVALO_S: float = 0.2  # espera máxima para juntar um lote
+    INGESTAO_FILA_MAX: int = 20000  # pendentes por worker antes de responder 503
+    INGESTAO_SEGMENTO_MAX: int = 5000  # registros por arquivo do diário
+    INGESTAO_RECUPERAR_S: int = 60  # procura diários de workers que caíram
+
+    # ==========================================================================
+    # IDEMPOTÊNCIA (cabeçalho Idempotency-Key nos envios)
+    # ==========================================================================
+    IDEMPOTENCIA_ATIVA: bool = True
+    IDEMPOTENCIA_TTL_S: int = 86400  # por quanto tempo a resposta é repetida
+    IDEMPOTENCIA_ESPERA_S: float = 30  # repetição simultânea espera a original
+    IDEMPOTENCIA_EXECUCAO_MAX_S: int = 300  # reserva de quem caiu no meio vence após isso
+
+    # ==========================================================================
+    # TAREFAS EM SEGUNDO PLANO (outbox + python trabalhador_tarefas.py)
+    # ==========================================================================
+    TAREFAS_PROCESSOS: int = 2
+    TAREFAS_LOTE: int = 20  # tarefas reservadas por vez em cada processo
+    TAREFAS_INTERVALO_S: float = 1.0  # espera quando a fila está vazia
+    TAREFAS_MAX_TENTATIVAS: int = 8
+    # Backoff entre tentativas: base * 2^(tentativa-1), limitado ao máximo
+    TAREFAS_ESPERA_BASE_S: float = 5
+    TAREFAS_ESPERA_MAX_S: float = 3600
+    TAREFAS_EXECUCAO_MAX_S: int = 300  # 'em_execucao' além disso volta para a fila
+    TAREFAS_RETENCAO_DIAS: int = 7  # concluídas são apagadas depois disso
+    TAREFAS_METRICAS_PORTA: int = 0  # /metrics do trabalhador (porta + n° do processo); 0 = sem
+    # Executa as tarefas numa thread da própria API (desenvolvimento, um processo só)
+    TAREFAS_NA_API: bool = False
+
+    # ==========================================================================
+    # E-MAIL (notificações enviadas pelo trabalhador de tarefas)
+    # ==========================================================================
+    EMAIL_ATIVO: bool = False  # False = só registra no log
+    EMAIL_REMETENTE: str = "naoresponda@participa.df.gov.br"
+    EMAIL_REMETENTE_NOME: str = "Ouvidoria Participa DF"
+    SMTP_HOST: str = "localhost"
+    SMTP_PORTA: int = 1025
+    SMTP_USUARIO: str = ""
+    SMTP_SENHA: str = ""
+    SMTP_STARTTLS: bool = False
+    SMTP_SSL: bool = False
+    SMTP_TIMEOUT_S: float = 10
+    # Ritmo e reaproveitamento da conexão (por processo do trabalhador)
+    EMAIL_POR_SEGUNDO: float = 5
+    EMAIL_POR_CONEXAO: int = 100
+    EMAIL_CONEXAO_OCIOSA_S: float = 30
+    # Respostas à mesma manifestação com menos de EMAIL_RESUMO_JANELA_S entre
+    # si vão num único e-mail (que espera no máximo EMAIL_RESUMO_MAX_S)
+    EMAIL_RESUMO_JANELA_S: int = 300
+    EMAIL_RESUMO_MAX_S: int = 3600
+
+    # ==========================================================================
+    # AQUECIMENTO (warm-up no início de cada worker)
+    # ==========================================================================
+    AQUECIMENTO_ATIVO: bool = True
+    AQUECIMENTO_CONEXOES: int = 1  # conexões do pool abertas antes da 1ª requisição
+
+    # ==========================================================================
+    # SAÚDE (readiness em /health/ready)
+    # ==========================================================================
+    SAUDE_INTERVALO_S: float = 5.0  # intervalo entre as verificações de fundo
+    SAUDE_TIMEOUT_S: float = 2.0  # tempo máximo de cada verificação
+    SAUDE_DISCO_MIN_MB: int = 500  # espaço livre mínimo no disco de uploads
+    SAUDE_THREADPOOL_MAX: float = 0.9  # ocupação do threadpool acima disso = não pronto
+    SAUDE_VERIFICAR_REDIS: bool = False  # ligar quando o Redis estiver em uso
+
+    # ==========================================================================
+    # MÉTRICAS (Prometheus)
+    # ==========================================================================
+    # Se True, expõe /metrics e instrumenta HTTP, banco e eventos de negócio
+    METRICAS_ATIVAS: bool = True
+
+    # ==========================================================================
+    # AUDITORIA DE SQL (detector de N+1)
+    # ==========================================================================
+    # Se True, informa X-SQL-Consultas/Server-Timing e avisa no log sobre N+1
+    SQL_AUDITORIA_ATIVA: bool = False
+    # Repetições do mesmo formato de consulta que caracterizam suspeita de N+1
+    SQL_N1_LIMIAR: int = 5
+
+    # ==========================================================================
+    # PERFILADOR POR AMOSTRAGEM (flame graphs) - Opcional
+    # ==========================================================================
+    PERFIL_ATIVO: bool = False
+    PERFIL_AMOSTRAGEM: float = 0.0  # fração das requisições perfiladas sempre
+    PERFIL_TOKEN: Optional[str] = None  # cabeçalho X-Perfil com este valor força o perfil
+    PERFIL_LENTAS_MS: int = 2000  # grava toda requisição mais lenta que isso (0 = desliga)
+    PERFIL_LENTAS_INICIO: float = 0.25  # amostra a partir desta fração de PERFIL_LENTAS_MS em andamento
+    PERFIL_INTERVALO_MS: float = 5.0  # intervalo entre amostras das pilhas
+    PERFIL_DIR: str = "logs/perfis"
+    PERFIL_QUOTA_MB: int = 200  # perfis mais antigos são apagados acima disso
+
+    # ==========================================================================
+    # PERFIL DE MEMÓRIA (tracemalloc) - Opcional
+    # ==========================================================================
+    # Deixa as alocações mais lentas: ligar só durante a investigação
+    MEMORIA_PERFIL_ATIVO: bool = False
+    MEMORIA_QUADROS: int = 1  # profundidade do traceback guardado por alocação
+    MEMORIA_MAX_SNAPSHOTS: int = 5  # snapshots guardados em memória por worker
+
+    # ==========================================================================
+    # RASTREAMENTO (spans por requisição, exportados em arquivo) - Opcional
+    # ==========================================================================
+    RASTREAMENTO_ATIVO: bool = False
+    RASTREAMENTO_AMOSTRAGEM: float = 0.01  # fração dos traces gravados
+    RASTREAMENTO_LENTAS_MS: int = 1000  # traces mais lentos são gravados sempre (0 = desliga)
+    RASTREAMENTO_ARQUIVO: str = "logs/rastros.jsonl"
+    RASTREAMENTO_TAMANHO_MAX: int = 52428800  # 50MB por arquivo
+    RASTREAMENTO_BACKUPS: int = 5
+
+    # ==========================================================================
+    # GRAVADOR DE TRÁFEGO (Planejamento de capacidade) - Opcional
+    # ==========================================================================
+    # Grava o "formato" de uma amostra das requisições para reprodução posterior
+    GRAVADOR_TRAFEGO_ATIVO: bool = False
+    GRAVADOR_TRAFEGO_AMOSTRAGEM: float = 0.1  # 10% das requisições
+    GRAVADOR_TRAFEGO_ARQUIVO: str = "logs/trafego.jsonl"  # um por worker: logs/trafego.<pid>.jsonl
+    GRAVADOR_TRAFEGO_TAMANHO_MAX: int = 52428800  # 50MB por arquivo
+    GRAVADOR_TRAFEGO_BACKUPS: int = 5
 
     # ==========================================================================
     # SERVIDOR DE DESENVOLVIMENTO (Uvicorn)
@@ -102,6 +343,25 @@ class Settings(BaseSettings):
     RELOAD: bool = True
     WORKERS: int = 1
 
+    # ==========================================================================
+    # SERVIDOR DE PRODUÇÃO (python servidor.py)
+    # ==========================================================================
+    SERVIDOR_HOST: str = "0.0.0.0"
+    SERVIDOR_PORTA: int = 8000
+    SERVIDOR_WORKERS: int = 0  # 0 = um worker por CPU disponível
+    SERVIDOR_MAX_REQUISICOES: int = 10000  # worker reciclado após isso (0 = nunca)
+    SERVIDOR_MAX_REQUISICOES_VARIACAO: int = 1000  # evita reciclar todos ao mesmo tempo
+    SERVIDOR_DRENAGEM_S: int = 30  # espera pelas requisições em andamento ao desligar
+    SERVIDOR_KEEP_ALIVE_S: int = 5
+    # Proxies reversos cujo X-Forwarded-For é aceito como IP do cliente (IPs ou
+    # redes separados por vírgula; "*" = qualquer). Os demais não podem forjar o IP
+    SERVIDOR_PROXIES_CONFIAVEIS: str = "127.0.0.1"
+    # Pasta das métricas compartilhadas pelos workers (PROMETHEUS_MULTIPROC_DIR);
+    # esvaziada a cada início do supervisor. Vazio = pasta temporária própria
+    SERVIDOR_METRICAS_DIR: str = ""
+    # Threads por worker para rotas síncronas (padrão do anyio: 40)
+    THREADPOOL_TAMANHO: int = 40
+
     class Config:
         """
         Configura o Pydantic para ler o arquivo .env
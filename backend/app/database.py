@@ -3,28 +3,77 @@ Database configuration and session management
 Arquivo: backend/app/database.py
 """
 
+import time
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import NullPool, QueuePool
 from app.config import settings
+from app.middleware import metricas, consultas_sql, rastreamento
+
+class _EsperaMedida:
+    """
+    Mede a espera por uma conexão (fila do pool ou abertura, no NullPool) no
+    momento em que a sessão realmente precisa dela: requisições que não
+    consultam o banco não abrem conexão nenhuma.
+    """
+
+    def connect(self):
+        inicio = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            metricas.registrar_espera_conexao(time.perf_counter() - inicio)
+
+
+class QueuePoolMedido(_EsperaMedida, QueuePool):
+    pass
+
+
+class NullPoolMedido(_EsperaMedida, NullPool):
+    pass
+
 
 # ==============================================================================
 # CONFIGURAÇÃO DO ENGINE (MOTOR DO BANCO)
 # ==============================================================================
 # O 'engine' é o ponto de entrada principal do SQLAlchemy. Ele gerencia
 # as conexões com o banco de dados PostgreSQL.
-engine = create_engine(
-    settings.DATABASE_URL, # A URL de conexão (vem do arquivo .env ou config)
-    echo=settings.DATABASE_ECHO, # Se True, imprime todo SQL gerado no terminal (ótimo para debug)
-    
+if settings.DB_CONEXOES_TOTAL > 0:
+    # Pool por worker: o orçamento global é dividido entre os processos
+    # (servidor.py exporta WORKERS). Sem overflow, o total nunca passa do orçamento.
+    opcoes_pool = {
+        "poolclass": QueuePoolMedido if settings.METRICAS_ATIVAS else QueuePool,
+        "pool_size": max(1, settings.DB_CONEXOES_TOTAL // max(1, settings.WORKERS)),
+        "max_overflow": 0,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_S,
+        "pool_recycle": settings.DB_POOL_RECICLAR_S,
+        "pool_pre_ping": True,
+    }
+else:
     # poolclass=NullPool:
     # IMPORTANTE: Isso desabilita o "pool de conexões" do lado da aplicação.
     # É essencial em ambientes como Heroku ou quando usamos PgBouncer, 
     # pois evita que a aplicação segure conexões abertas desnecessariamente,
     # prevenindo erros de "too many connections".
-    poolclass=NullPool,  
+    opcoes_pool = {"poolclass": NullPoolMedido if settings.METRICAS_ATIVAS else NullPool}
+
+engine = create_engine(
+    settings.DATABASE_URL, # A URL de conexão (vem do arquivo .env ou config)
+    echo=settings.DATABASE_ECHO, # Se True, imprime todo SQL gerado no terminal (ótimo para debug)
+    **opcoes_pool,
 )
 
+# Eventos de SQL para o /metrics (quantidade e tempo de consultas por requisição)
+if settings.METRICAS_ATIVAS:
+    metricas.instrumentar_engine(engine)
+
+# Contagem por requisição e detector de N+1 (usado também por assert_max_queries)
+consultas_sql.instrumentar_engine(engine)
+
+# Um span por comando SQL nos traces das requisições
+if settings.RASTREAMENTO_ATIVO:
+    rastreamento.instrumentar_engine(engine)
+
 # ==============================================================================
 # FÁBRICA DE SESSÕES (SESSION FACTORY)
 # ==============================================================================
@@ -53,6 +102,7 @@ def get_db() -> Session:
        
     Isso evita o vazamento de conexões (connection leaks).
     """
+    # A conexão só é obtida na primeira consulta (a espera é medida pelo pool)
     db = SessionLocal()
     try:
         yield db
@@ -0,0 +1,249 @@
+"""
+Cliente da IZA (inteligência artificial da Ouvidoria-Geral do DF)
+Arquivo: backend/app/integrations/iza.py
+
+OBJETIVO:
+Analisar os relatos na IZA sem que uma IZA lenta ou fora do ar atrase o
+envio de manifestações: o cliente só é chamado pelas tarefas em segundo
+plano (tipo 'analisar_iza', app/services/tarefa_service.py), nunca na
+requisição.
+
+COMO FUNCIONA:
+- Um httpx.Client por processo (pool de conexões com keep-alive; HTTP/2
+  quando o pacote 'h2' está instalado), com timeouts de conexão, leitura e
+  espera por conexão livre do pool.
+- Cache pelo hash do conteúdo (tabela analises_iza): só os textos ainda não
+  analisados vão para a IZA, em lotes de até IZA_LOTE_MAX por requisição.
+- Falha passageira (rede, timeout, 429, qualquer 5xx): até IZA_TENTATIVAS
+  com espera exponencial e variação aleatória (ou o Retry-After).
+- Disjuntor: após IZA_DISJUNTOR_FALHAS chamadas falhas seguidas, as chamadas
+  falham na hora (IzaIndisponivel) por IZA_DISJUNTOR_ABERTO_S; depois, uma
+  chamada de teste decide se fecha de novo.
+- Compartimento: no máximo IZA_SIMULTANEAS_MAX chamadas ao mesmo tempo por
+  processo; quem não consegue vaga em IZA_ESPERA_VAGA_S desiste.
+- 4xx (requisição recusada): IzaRecusou, sem nova tentativa.
+IzaIndisponivel faz a tarefa voltar para a fila com backoff; IzaRecusou a
+encerra como 'falhou' (repetir a mesma requisição não adianta).
+
+CONTRATO ASSUMIDO (ajustar em _analisar_lote quando a especificação da IZA
+estiver disponível):
+    POST {IZA_API_URL}/v1/analises
+    cabeçalhos X-API-Key e X-API-Secret
+    {"itens": [{"id": "...", "texto": "..."}]}
+    -> {"resultados": [{"id": "...", ...análise...}]}
+
+Para testar sem a IZA: python simulador_iza.py (servidor local + verificação).
+"""
+
+import hashlib
+import importlib.util
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import httpx
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.middleware.metricas import IZA_CACHE, IZA_CHAMADAS, IZA_DISJUNTOR, IZA_LATENCIA
+from app.models.analise_iza import AnaliseIza
+
+logger = logging.getLogger(__name__)
+
+
+def status_passageiro(status: int) -> bool:
+    """429 e qualquer 5xx (inclusive 500 e 501): nova tentativa e falha no disjuntor."""
+    return status == 429 or status >= 500
+
+
+class IzaIndisponivel(Exception):
+    """IZA fora do ar, lenta ou protegida pelo disjuntor/compartimento."""
+
+
+class IzaRecusou(Exception):
+    """A IZA respondeu 4xx (erro na nossa requisição): não passa com nova tentativa."""
+
+
+def hash_conteudo(texto: str) -> str:
+    normalizado = " ".join(texto.split())
+    return hashlib.sha256(f"{settings.IZA_VERSAO_CACHE}\n{normalizado}".encode()).hexdigest()
+
+
+class Disjuntor:
+    """Circuit breaker: fechado -> aberto (falhas seguidas) -> meio_aberto (uma chamada de teste)."""
+
+    FECHADO, MEIO_ABERTO, ABERTO = 0, 1, 2
+
+    def __init__(self, falhas_max: int, aberto_s: float):
+        self.falhas_max = falhas_max
+        self.aberto_s = aberto_s
+        self.estado = self.FECHADO
+        self._falhas = 0
+        self._aberto_ate = 0.0
+        self._lock = threading.Lock()
+
+    def permitir(self) -> bool:
+        with self._lock:
+            if self.estado == self.FECHADO:
+                return True
+            # Aberto vencido, ou chamada de teste que não voltou a tempo: nova chamada de teste
+            if time.monotonic() >= self._aberto_ate:
+                self._aberto_ate = time.monotonic() + self.aberto_s
+                self._mudar(self.MEIO_ABERTO)
+                return True
+            return False
+
+    def sucesso(self):
+        with self._lock:
+            self._falhas = 0
+            if self.estado != self.FECHADO:
+                self._mudar(self.FECHADO)
+
+    def falha(self):
+        with self._lock:
+            self._falhas += 1
+            if self.estado == self.MEIO_ABERTO or self._falhas >= self.falhas_max:
+                self._aberto_ate = time.monotonic() + self.aberto_s
+                if self.estado != self.ABERTO:
+                    logger.warning("IZA: disjuntor aberto por %ss após %d falhas", self.aberto_s, self._falhas)
+                self._mudar(self.ABERTO)
+
+    def _mudar(self, estado: int):
+        self.estado = estado
+        IZA_DISJUNTOR.set(estado)
+
+
+class ClienteIza:
+
+    def __init__(self):
+        self.disjuntor = Disjuntor(settings.IZA_DISJUNTOR_FALHAS, settings.IZA_DISJUNTOR_ABERTO_S)
+        self._vagas = threading.BoundedSemaphore(settings.IZA_SIMULTANEAS_MAX)
+        self._http: Optional[httpx.Client] = None
+        self._lock = threading.Lock()
+
+    def _cliente(self) -> httpx.Client:
+        """Cliente HTTP do processo, criado no primeiro uso."""
+        with self._lock:
+            if self._http is None:
+                self._http = httpx.Client(
+                    base_url=settings.IZA_API_URL,
+                    http2=importlib.util.find_spec("h2") is not None,
+                    headers={"X-API-Key": settings.IZA_API_KEY, "X-API-Secret": settings.IZA_API_SECRET},
+                    timeout=httpx.Timeout(
+                        settings.IZA_TIMEOUT_S,
+                        connect=settings.IZA_TIMEOUT_CONEXAO_S,
+                        pool=settings.IZA_ESPERA_VAGA_S,
+                    ),
+                    limits=httpx.Limits(
+                        max_connections=settings.IZA_SIMULTANEAS_MAX,
+                        max_keepalive_connections=settings.IZA_SIMULTANEAS_MAX,
+                        keepalive_expiry=60,
+                    ),
+                )
+            return self._http
+
+    def fechar(self):
+        with self._lock:
+            if self._http is not None:
+                self._http.close()
+                self._http = None
+
+    # ==========================================================================
+    # ANÁLISE (com cache pelo hash do conteúdo)
+    # ==========================================================================
+    def analisar(self, db: Session, textos: List[str]) -> List[Dict]:
+        """Análise de cada texto, na mesma ordem; só os que faltam no cache vão à IZA."""
+        hashes = [hash_conteudo(texto) for texto in textos]
+        limite = datetime.now() - timedelta(days=settings.IZA_CACHE_DIAS)
+        conhecidas = {
+            linha.hash_conteudo: linha.resultado
+            for linha in db.query(AnaliseIza).filter(
+                AnaliseIza.hash_conteudo.in_(set(hashes)), AnaliseIza.criado_em >= limite
+            )
+        }
+        faltando = {h: texto for h, texto in zip(hashes, textos) if h not in conhecidas}
+        IZA_CACHE.labels(resultado="acerto").inc(len(hashes) - len(faltando))
+        IZA_CACHE.labels(resultado="falta").inc(len(faltando))
+
+        pendentes = list(faltando.items())
+        for inicio in range(0, len(pendentes), settings.IZA_LOTE_MAX):
+            lote = dict(pendentes[inicio:inicio + settings.IZA_LOTE_MAX])
+            resultados = self._analisar_lote(lote)
+            agora = datetime.now()
+            for h, resultado in resultados.items():
+                db.merge(AnaliseIza(hash_conteudo=h, resultado=resultado, criado_em=agora))
+                conhecidas[h] = resultado
+            # Cada lote fica no cache mesmo se um lote seguinte falhar
+            db.commit()
+        return [conhecidas[h] for h in hashes]
+
+    def _analisar_lote(self, textos_por_hash: Dict[str, str]) -> Dict[str, Dict]:
+        corpo = {"itens": [{"id": h, "texto": texto} for h, texto in textos_por_hash.items()]}
+        resposta = self._requisitar("POST", "/v1/analises", json=corpo)
+        resultados = {
+            item.pop("id"): item for item in resposta.json()["resultados"] if item.get("id") in textos_por_hash
+        }
+        faltando = textos_por_hash.keys() - resultados.keys()
+        if faltando:
+            raise IzaIndisponivel(f"IZA não devolveu {len(faltando)} das {len(textos_por_hash)} análises")
+        return resultados
+
+    # ==========================================================================
+    # CHAMADA (compartimento, tentativas, disjuntor)
+    # ==========================================================================
+    def _requisitar(self, metodo: str, caminho: str, **kwargs) -> httpx.Response:
+        if not self._vagas.acquire(timeout=settings.IZA_ESPERA_VAGA_S):
+            IZA_CHAMADAS.labels(resultado="sem_vaga").inc()
+            raise IzaIndisponivel("Chamadas simultâneas à IZA no limite")
+        try:
+            if not self.disjuntor.permitir():
+                IZA_CHAMADAS.labels(resultado="disjuntor_aberto").inc()
+                raise IzaIndisponivel("Disjuntor aberto")
+            return self._com_tentativas(metodo, caminho, **kwargs)
+        finally:
+            self._vagas.release()
+
+    def _com_tentativas(self, metodo: str, caminho: str, **kwargs) -> httpx.Response:
+        erro = None
+        for tentativa in range(1, settings.IZA_TENTATIVAS + 1):
+            espera = None
+            inicio = time.perf_counter()
+            try:
+                resposta = self._cliente().request(metodo, caminho, **kwargs)
+            except httpx.TransportError as e:  # conexão, timeouts, protocolo
+                erro = e
+            else:
+                if not status_passageiro(resposta.status_code):
+                    IZA_LATENCIA.observe(time.perf_counter() - inicio)
+                    # 2xx, ou 4xx (erro nosso, não da IZA): a IZA respondeu, o disjuntor fica fechado
+                    self.disjuntor.sucesso()
+                    IZA_CHAMADAS.labels(resultado="sucesso" if resposta.is_success else "erro_cliente").inc()
+                    if not resposta.is_success:
+                        raise IzaRecusou(f"IZA recusou a requisição ({resposta.status_code}): {resposta.text[:500]}")
+                    return resposta
+                erro = httpx.HTTPStatusError(
+                    f"IZA respondeu {resposta.status_code}", request=resposta.request, response=resposta
+                )
+                try:
+                    espera = float(resposta.headers.get("retry-after", ""))
+                except ValueError:
+                    pass
+            IZA_LATENCIA.observe(time.perf_counter() - inicio)
+
+            if tentativa < settings.IZA_TENTATIVAS:
+                # Espera exponencial com variação total (full jitter)
+                if espera is None:
+                    espera = random.uniform(0, settings.IZA_ESPERA_BASE_S * 2 ** (tentativa - 1))
+                logger.info("IZA: tentativa %d falhou (%s); nova em %.2fs", tentativa, erro, espera)
+                time.sleep(min(espera, settings.IZA_TIMEOUT_S))
+
+        IZA_CHAMADAS.labels(resultado="falha").inc()
+        self.disjuntor.falha()
+        raise IzaIndisponivel(f"IZA indisponível após {settings.IZA_TENTATIVAS} tentativas: {erro}") from erro
+
+
+# Um por processo (o pool de conexões não é compartilhado entre processos)
+cliente_iza = ClienteIza()
@@ -0,0 +1,149 @@
+"""
+Configuração de Logging (JSON estruturado e não bloqueante)
+Arquivo: backend/app/logging_config.py
+
+COMO FUNCIONA:
+- As threads das requisições só colocam o registro numa fila em memória
+  (QueueHandler). Uma thread de fundo (QueueListener) formata em JSON e grava
+  no console e em LOG_FILE (com rotação por tamanho).
+- Fila cheia (disco travado): o registro é descartado e contado, a requisição
+  nunca espera pelo log.
+- Cada registro leva o request_id da requisição (ver app/middleware/id_requisicao.py).
+- Eventos ruidosos são amostrados: por logger (LOG_AMOSTRAGEM) ou por chamada
+  com extra={"amostragem": 0.01}. WARNING e acima nunca são descartados.
+
+Use sempre a forma preguiçosa, que só monta a mensagem se o nível estiver ligado:
+    logger.info("Manifestação criada: %s", protocolo)
+"""
+
+import atexit
+import copy
+import logging
+import os
+import queue
+import random
+import sys
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
+
+try:
+    from pythonjsonlogger.json import JsonFormatter
+except ImportError:  # python-json-logger < 3
+    from pythonjsonlogger.jsonlogger import JsonFormatter
+
+from app.config import settings
+
+# ID da requisição corrente (preenchido pelo IdRequisicaoMiddleware)
+id_requisicao_atual: ContextVar[Optional[str]] = ContextVar("id_requisicao", default=None)
+
+_listener: Optional[QueueListener] = None
+
+
+class ContextoRequisicaoFilter(logging.Filter):
+    """Anexa o request_id. Roda na thread que gerou o log, antes da fila."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = id_requisicao_atual.get()
+        return True
+
+
+class AmostragemFilter(logging.Filter):
+    """Descarta uma fração dos eventos INFO/DEBUG ruidosos."""
+
+    def __init__(self, taxas_por_logger: dict):
+        super().__init__()
+        self.taxas = taxas_por_logger
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        taxa = getattr(record, "amostragem", None)
+        if taxa is None:
+            taxa = self.taxas.get(record.name)
+        return taxa is None or random.random() < taxa
+
+
+class QueueHandlerSemBloqueio(QueueHandler):
+    """QueueHandler que descarta (e conta) em vez de bloquear quando a fila enche."""
+
+    descartados = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            QueueHandlerSemBloqueio.descartados += 1
+
+    def prepare(self, record):
+        # Resolve a mensagem e o traceback aqui (os args podem mudar depois),
+        # mas deixa a formatação JSON para a thread de fundo
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def criar_formatador() -> logging.Formatter:
+    return JsonFormatter(
+        "%(asctime)s %(levelname)s %(name)s %(message)s %(request_id)s",
+        rename_fields={"asctime": "timestamp", "levelname": "level", "name": "logger"},
+    )
+
+
+def configurar_logging():
+    """Liga o pipeline no logger raiz. Chamado uma vez em app/main.py."""
+    global _listener
+    if _listener is not None:
+        return
+
+    formatador = criar_formatador()
+    destinos = []
+
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(formatador)
+    destinos.append(console)
+
+    if settings.LOG_FILE:
+        os.makedirs(os.path.dirname(settings.LOG_FILE) or ".", exist_ok=True)
+        arquivo = RotatingFileHandler(
+            settings.LOG_FILE,
+            maxBytes=settings.LOG_TAMANHO_MAX,
+            backupCount=settings.LOG_BACKUPS,
+            encoding="utf-8",
+        )
+        arquivo.setFormatter(formatador)
+        destinos.append(arquivo)
+
+    fila = queue.Queue(maxsize=settings.LOG_FILA_MAX)
+    handler_fila = QueueHandlerSemBloqueio(fila)
+    handler_fila.addFilter(AmostragemFilter(settings.LOG_AMOSTRAGEM))
+    handler_fila.addFilter(ContextoRequisicaoFilter())
+
+    raiz = logging.getLogger()
+    for handler in list(raiz.handlers):
+        raiz.removeHandler(handler)
+    raiz.addHandler(handler_fila)
+    raiz.setLevel(settings.LOG_LEVEL.upper())
+
+    # Os loggers do uvicorn passam a usar o mesmo pipeline
+    for nome in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        logger_uvicorn = logging.getLogger(nome)
+        logger_uvicorn.handlers.clear()
+        logger_uvicorn.propagate = True
+
+    _listener = QueueListener(fila, *destinos, respect_handler_level=True)
+    _listener.start()
+    atexit.register(encerrar_logging)
+
+
+def encerrar_logging():
+    """Esvazia a fila e para a thread de escrita."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -9,29 +9,32 @@ from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
 import os 
 
-from app.database import engine
-# Importando todos os modelos para criar as tabelas
-from app.models.manifestacao import Base as ManifestacaoBase
-from app.models.protocolo import Base as ProtocoloBase
-from app.models.usuario import Base as UsuarioBase
-from app.models.assunto import Base as AssuntoBase
-from app.models.anexo import Base as AnexoBase
-from app.models.movimentacao import Base as MovimentacaoBase
-from app.routes import health, assuntos, manifestacoes, protocolos, auth, movimentacoes
+# Importando todos os modelos para registrar as tabelas no Base
+from app.models import manifestacao, protocolo, usuario, assunto, anexo, movimentacao, chave_idempotencia, tarefa, analise_iza  # noqa: F401
+from app.routes import health, assuntos, manifestacoes, protocolos, auth, movimentacoes, metricas
+from app.services.prazo_service import AgendadorPrazos
+from app.services.saude_service import verificador_prontidao
+from app.services.aquecimento_service import AquecimentoService
+from app.services.protocolo_service import filtro_protocolos
+from app.services.ingestao_service import diario_ingestao
+from app.services.tarefa_service import ExecutorTarefas
+from app.middleware.compartimentos import verificar_reserva
+from app.middleware.metricas import MetricasMiddleware
+from app.middleware.consultas_sql import AuditoriaSQLMiddleware
+from app.middleware.id_requisicao import IdRequisicaoMiddleware
+from app.middleware.rastreamento import RastreamentoMiddleware
+from app.logging_config import configurar_logging
+import anyio.to_thread
 import logging
 
 from app.config import settings
 
-# Criar tabelas no banco de dados (caso não existam)
-ManifestacaoBase.metadata.create_all(bind=engine)
-ProtocoloBase.metadata.create_all(bind=engine)
-UsuarioBase.metadata.create_all(bind=engine)
-AssuntoBase.metadata.create_all(bind=engine)
-AnexoBase.metadata.create_all(bind=engine)
-MovimentacaoBase.metadata.create_all(bind=engine)
+# Tabelas e migrações: 'python migrar_banco.py', uma vez antes de subir os
+# workers (DDL na importação custaria uma ida ao banco por worker, e N workers
+# criando tabelas ao mesmo tempo colidem no catálogo do PostgreSQL)
 
-# Configurar logging
-logging.basicConfig(level=logging.INFO)
+# Configurar logging (JSON, gravado por uma thread de fundo)
+configurar_logging()
 logger = logging.getLogger(__name__)
 
 
@@ -47,7 +50,52 @@ async def lifespan(app: FastAPI):
         logger.info("Pasta 'uploads' criada com sucesso.")
 
     logger.info("Iniciando Participa-DF-Ouvidoria Backend")
+    # Threads do worker para as rotas síncronas (servidor.py / THREADPOOL_TAMANHO)
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_TAMANHO
+    verificar_reserva()
+
+    # 2. Aquecimento: custos de "primeira requisição" pagos antes de ficar pronto
+    if settings.AQUECIMENTO_ATIVO:
+        await anyio.to_thread.run_sync(AquecimentoService.aquecer, app)
+
+    # Filtro de protocolos emitidos (404 sem ir ao banco); sem ele, tudo vai ao banco
+    if settings.PROTOCOLO_FILTRO_ATIVO:
+        try:
+            await anyio.to_thread.run_sync(filtro_protocolos.reconstruir)
+        except Exception:
+            logger.exception("Filtro de protocolos indisponível")
+        filtro_protocolos.iniciar()
+
+    # Ingestão em rajada (INGESTAO_MODO=diario): regrava diários de workers que
+    # caíram e inicia a gravação em lote
+    await anyio.to_thread.run_sync(diario_ingestao.iniciar)
+    verificador_prontidao.aquecido = True
+
+    # 3. Agendador de prazos (SLA) em segundo plano
+    agendador_prazos = None
+    if settings.PRAZO_AGENDADOR_ATIVO:
+        agendador_prazos = AgendadorPrazos()
+        agendador_prazos.iniciar()
+
+    # Tarefas em segundo plano na própria API (em produção: trabalhador_tarefas.py)
+    executor_tarefas = None
+    if settings.TAREFAS_NA_API:
+        executor_tarefas = ExecutorTarefas()
+        executor_tarefas.iniciar()
+
+    # 4. Verificações de prontidão (/health/ready) atualizadas em segundo plano
+    await verificador_prontidao.atualizar()
+    verificador_prontidao.iniciar()
+
     yield
+
+    await verificador_prontidao.parar()
+    await anyio.to_thread.run_sync(diario_ingestao.parar)
+    filtro_protocolos.parar()
+    if agendador_prazos:
+        agendador_prazos.parar()
+    if executor_tarefas:
+        executor_tarefas.parar()
     logger.info("Encerrando Participa-DF-Ouvidoria Backend")
 
 
@@ -59,6 +107,12 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# Idempotency-Key nos envios: registrado antes do CORS para ficar por dentro dele
+# (respostas repetidas também recebem os cabeçalhos de CORS, métricas e logs)
+if settings.IDEMPOTENCIA_ATIVA:
+    from app.middleware.idempotencia import IdempotenciaMiddleware
+    app.add_middleware(IdempotenciaMiddleware)
+
 # Configurar CORS (Permite que o Frontend acesse o Backend)
 app.add_middleware(
     CORSMiddleware,
@@ -68,11 +122,43 @@ app.add_middleware(
     allow_headers=settings.CORS_ALLOW_HEADERS,
 )
 
+# Gravação amostral do tráfego real (opcional, para reprodução em teste)
+# (middlewares opcionais só são importados quando ligados)
+if settings.GRAVADOR_TRAFEGO_ATIVO:
+    from app.middleware.gravador_trafego import GravadorTrafegoMiddleware
+    app.add_middleware(GravadorTrafegoMiddleware)
+
+# Métricas Prometheus (latência por rota, SQL por requisição) expostas em /metrics
+if settings.METRICAS_ATIVAS:
+    app.add_middleware(MetricasMiddleware)
+
+# Consultas SQL por requisição nos cabeçalhos e aviso de N+1 no log
+if settings.SQL_AUDITORIA_ATIVA:
+    app.add_middleware(AuditoriaSQLMiddleware)
+
+# Perfil por amostragem (flame graph) de requisições lentas ou marcadas
+if settings.PERFIL_ATIVO:
+    from app.middleware.perfilador import PerfiladorMiddleware
+    app.add_middleware(PerfiladorMiddleware)
+
+# Pico de memória por rota e snapshots do tracemalloc (/api/memoria)
+if settings.MEMORIA_PERFIL_ATIVO:
+    from app.middleware.memoria import MemoriaMiddleware
+    app.add_middleware(MemoriaMiddleware)
+
+# Span raiz de cada requisição (spans de rotas, services e SQL ficam abaixo dele)
+if settings.RASTREAMENTO_ATIVO:
+    app.add_middleware(RastreamentoMiddleware)
+
+# Por último = mais externo: todos os logs da requisição levam o request_id
+app.add_middleware(IdRequisicaoMiddleware)
+
 # ==============================================================================
 # ARQUIVOS ESTÁTICOS (IMAGENS)
 # ==============================================================================
 # Isso permite acessar http://localhost:8000/uploads/nome_da_imagem.png
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+# check_dir=False: a pasta é criada no lifespan, não na importação
+app.mount("/uploads", StaticFiles(directory="uploads", check_dir=False), name="uploads")
 
 
 # ==============================================================================
@@ -84,6 +170,11 @@ app.include_router(assuntos.router)
 app.include_router(manifestacoes.router)
 app.include_router(protocolos.router) 
 app.include_router(movimentacoes.router)
+if settings.METRICAS_ATIVAS:
+    app.include_router(metricas.router)
+if settings.MEMORIA_PERFIL_ATIVO:
+    from app.routes import memoria
+    app.include_router(memoria.router)
 
 
 
@@ -107,6 +198,7 @@ async def root():
 
 
 if __name__ == "__main__":
+    # Servidor de desenvolvimento. Em produção: python servidor.py
     import uvicorn
 
     uvicorn.run(
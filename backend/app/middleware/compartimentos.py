@@ -0,0 +1,136 @@
+"""
+Compartimentos (bulkheads) por grupo de rotas
+Arquivo: backend/app/middleware/compartimentos.py
+
+OBJETIVO:
+Todas as rotas síncronas dividem o mesmo threadpool. Sem separação, uma onda
+de envios com anexos ou de logins (hash de senha) ocupa todas as threads e a
+consulta barata de protocolo (/api/protocolos/{numero}) fica na fila atrás.
+
+COMO FUNCIONA:
+- Cada grupo (COMPARTIMENTOS) tem um limite de requisições executando ao mesmo
+  tempo, uma fila de espera e um tempo máximo na fila.
+- A rota entra no grupo com a dependência:
+      @router.get("/{numero}", dependencies=[Depends(compartimento("leituras"))])
+  A vaga é obtida antes das outras dependências (sessão do banco, usuário) e só
+  é devolvida depois que a resposta termina de ser enviada (inclusive streaming).
+- Fila cheia ou espera acima de 'espera_s' = 503 com Retry-After (o cliente
+  tenta de novo; melhor que ficar pendurado segurando uma conexão).
+- Uso, fila, espera e rejeições por grupo vão para o /metrics.
+
+Toda rota síncrona deve estar em um grupo (tests/test_compartimentos.py).
+A soma dos limites precisa ficar abaixo do THREADPOOL_TAMANHO: o restante é
+a reserva do que usa o threadpool fora dos grupos (lifespan, Idempotency-Key,
+perfilador, arquivos de /uploads). Sem reserva, essas chamadas disputam as
+threads com os grupos e um grupo cheio volta a atrasar os demais.
+"""
+
+import logging
+import time
+from typing import Dict
+
+import anyio
+from fastapi import HTTPException, status
+
+from app.config import settings
+from app.middleware.metricas import (
+    COMPARTIMENTO_EM_USO,
+    COMPARTIMENTO_ESPERA,
+    COMPARTIMENTO_FILA,
+    COMPARTIMENTO_REJEITADAS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class Compartimento:
+    """Limite de concorrência + fila limitada de um grupo de rotas."""
+
+    def __init__(self, nome: str, limite: int, fila: int, espera_s: float):
+        self.nome = nome
+        self.limite = limite
+        self.fila_max = fila
+        self.espera_s = espera_s
+        self.em_uso = 0
+        self.aguardando = 0
+        self._semaforo = anyio.Semaphore(limite)
+
+    def _rejeitar(self, motivo: str):
+        COMPARTIMENTO_REJEITADAS.labels(grupo=self.nome, motivo=motivo).inc()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Serviço sobrecarregado. Tente novamente em instantes.",
+            headers={"Retry-After": str(max(1, int(self.espera_s)))},
+        )
+
+    async def entrar(self):
+        if self.em_uso >= self.limite and self.aguardando >= self.fila_max:
+            self._rejeitar("fila_cheia")
+
+        self.aguardando += 1
+        COMPARTIMENTO_FILA.labels(grupo=self.nome).inc()
+        inicio = time.perf_counter()
+        try:
+            with anyio.fail_after(self.espera_s):
+                await self._semaforo.acquire()
+        except TimeoutError:
+            self._rejeitar("espera_excedida")
+        finally:
+            self.aguardando -= 1
+            COMPARTIMENTO_FILA.labels(grupo=self.nome).dec()
+            COMPARTIMENTO_ESPERA.labels(grupo=self.nome).observe(time.perf_counter() - inicio)
+
+        self.em_uso += 1
+        COMPARTIMENTO_EM_USO.labels(grupo=self.nome).inc()
+
+    def sair(self):
+        self.em_uso -= 1
+        COMPARTIMENTO_EM_USO.labels(grupo=self.nome).dec()
+        self._semaforo.release()
+
+    def estado(self) -> Dict:
+        return {"em_uso": self.em_uso, "aguardando": self.aguardando, "limite": self.limite, "fila": self.fila_max}
+
+
+# Um conjunto por worker, criado a partir das configurações
+compartimentos: Dict[str, Compartimento] = {
+    nome: Compartimento(
+        nome,
+        limite=int(config["limite"]),
+        fila=int(config["fila"]),
+        espera_s=float(config["espera_s"]),
+    )
+    for nome, config in settings.COMPARTIMENTOS.items()
+}
+
+
+def reserva_threadpool() -> int:
+    """Threads do worker que nenhum grupo pode ocupar (negativo = grupos demais)."""
+    return settings.THREADPOOL_TAMANHO - sum(grupo.limite for grupo in compartimentos.values())
+
+
+def verificar_reserva():
+    """Chamado no lifespan: avisa quando os grupos podem ocupar o threadpool inteiro."""
+    if settings.COMPARTIMENTOS_ATIVOS and reserva_threadpool() <= 0:
+        logger.warning(
+            "Soma dos limites dos COMPARTIMENTOS (%d) >= THREADPOOL_TAMANHO (%d): "
+            "sem reserva para chamadas fora dos grupos, um grupo cheio atrasa os outros",
+            settings.THREADPOOL_TAMANHO - reserva_threadpool(), settings.THREADPOOL_TAMANHO,
+        )
+
+
+def compartimento(nome: str):
+    """Dependência que coloca a rota no grupo 'nome'."""
+    grupo = compartimentos.get(nome) if settings.COMPARTIMENTOS_ATIVOS else None
+
+    async def dependencia():
+        if grupo is None:
+            yield
+            return
+        await grupo.entrar()
+        try:
+            yield
+        finally:
+            grupo.sair()
+
+    return dependencia
@@ -0,0 +1,185 @@
+"""
+Contabilidade de SQL por requisição e detector de N+1
+Arquivo: backend/app/middleware/consultas_sql.py
+
+OBJETIVO:
+Contar e cronometrar os comandos SQL emitidos em cada requisição e apontar
+"formatos" de consulta repetidos (mesmo SQL com parâmetros diferentes), o
+sintoma clássico de N+1 (ex.: acessar mov.autor dentro de um loop sem joinedload).
+
+USO:
+- Em execução: AuditoriaSQLMiddleware (ligado por SQL_AUDITORIA_ATIVA) adiciona os
+  cabeçalhos X-SQL-Consultas / Server-Timing e registra um aviso no log quando
+  um mesmo formato se repete SQL_N1_LIMIAR vezes ou mais.
+- Em CI / scripts: o gerenciador de contexto assert_max_queries(n).
+
+    with assert_max_queries(3):
+        cliente.get("/api/protocolos/OUVIDORIA-...")
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+
+from sqlalchemy import event
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Registro da requisição corrente (o threadpool das rotas síncronas herda o contexto)
+_registro_requisicao: ContextVar[Optional["RegistroSQL"]] = ContextVar("registro_sql", default=None)
+
+# Registros abertos por contar_consultas() no contexto corrente. Como o da
+# requisição, o contexto segue para o threadpool e para a aplicação chamada pelo
+# TestClient; comandos de outras threads (outros testes, agendadores) não entram
+_observadores: ContextVar[Tuple["RegistroSQL", ...]] = ContextVar("observadores_sql", default=())
+
+_ESPACOS = re.compile(r"\s+")
+_LISTA_PARAMETROS = re.compile(r"\((?:\s*(?:\?|%\(\w+\)s|:\w+|\$\d+)\s*,?)+\)")
+
+
+def formato_consulta(statement: str) -> str:
+    """
+    Normaliza o SQL para comparar consultas: os valores já chegam como
+    parâmetros, então basta unificar espaços e listas de IN (...).
+    """
+    texto = _ESPACOS.sub(" ", statement).strip()
+    return _LISTA_PARAMETROS.sub("(...)", texto)
+
+
+class ConsultasExcedidas(AssertionError):
+    """Levantada por assert_max_queries quando o limite é ultrapassado."""
+
+
+class RegistroSQL:
+    """Comandos SQL observados em um escopo (requisição ou bloco with)."""
+
+    def __init__(self):
+        self.quantidade = 0
+        self.duracao = 0.0
+        self.formatos: Counter = Counter()
+        self._trava = threading.Lock()
+
+    def adicionar(self, statement: str, duracao: float):
+        formato = formato_consulta(statement)
+        with self._trava:
+            self.quantidade += 1
+            self.duracao += duracao
+            self.formatos[formato] += 1
+
+    def suspeitas_n1(self, limiar: int = None) -> List[tuple]:
+        """Formatos repetidos pelo menos 'limiar' vezes, do mais repetido ao menos."""
+        limiar = settings.SQL_N1_LIMIAR if limiar is None else limiar
+        return [(formato, vezes) for formato, vezes in self.formatos.most_common() if vezes >= limiar]
+
+    def resumo(self) -> str:
+        linhas = [f"{self.quantidade} consultas em {self.duracao * 1000:.1f}ms"]
+        for formato, vezes in self.formatos.most_common():
+            linhas.append(f"  {vezes:4d}x {formato[:200]}")
+        return "\n".join(linhas)
+
+
+# ==============================================================================
+# EVENTOS DO ENGINE
+# ==============================================================================
+def instrumentar_engine(engine):
+    """Registra os eventos de SQL no engine. Chamado por app/database.py."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("auditoria_inicio", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _depois(conn, cursor, statement, parameters, context, executemany):
+        duracao = time.perf_counter() - conn.info["auditoria_inicio"].pop()
+        registro = _registro_requisicao.get()
+        if registro is not None:
+            registro.adicionar(statement, duracao)
+        for observador in _observadores.get():
+            observador.adicionar(statement, duracao)
+
+    @event.listens_for(engine, "handle_error")
+    def _erro(contexto):
+        conn = contexto.connection
+        if conn is not None and conn.info.get("auditoria_inicio"):
+            conn.info["auditoria_inicio"].pop()
+
+
+# ==============================================================================
+# HELPERS (CI / SCRIPTS)
+# ==============================================================================
+@contextmanager
+def contar_consultas():
+    """Captura os comandos SQL emitidos pelo bloco (no contexto de quem chamou)."""
+    registro = RegistroSQL()
+    token = _observadores.set(_observadores.get() + (registro,))
+    try:
+        yield registro
+    finally:
+        _observadores.reset(token)
+
+
+@contextmanager
+def assert_max_queries(maximo: int, permitir_n1: bool = False):
+    """
+    Falha (ConsultasExcedidas) se o bloco emitir mais de 'maximo' comandos SQL
+    ou, a menos que permitir_n1=True, se algum formato se repetir SQL_N1_LIMIAR vezes.
+    """
+    with contar_consultas() as registro:
+        yield registro
+
+    if registro.quantidade > maximo:
+        raise ConsultasExcedidas(f"Esperado no máximo {maximo} consultas, executadas {registro.resumo()}")
+    suspeitas = registro.suspeitas_n1()
+    if suspeitas and not permitir_n1:
+        formato, vezes = suspeitas[0]
+        raise ConsultasExcedidas(f"Possível N+1 ({vezes}x o mesmo formato): {formato}\n{registro.resumo()}")
+
+
+# ==============================================================================
+# MIDDLEWARE HTTP
+# ==============================================================================
+class AuditoriaSQLMiddleware:
+    """
+    Middleware ASGI puro: abre um RegistroSQL por requisição, informa a
+    contagem nos cabeçalhos da resposta e avisa no log sobre suspeitas de N+1.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        registro = RegistroSQL()
+        token = _registro_requisicao.set(registro)
+
+        async def send_com_cabecalhos(mensagem):
+            if mensagem["type"] == "http.response.start":
+                # Rotas comuns já terminaram aqui; em streaming, conta até o início do corpo
+                headers = list(mensagem.get("headers", []))
+                headers.append((b"x-sql-consultas", str(registro.quantidade).encode()))
+                headers.append((b"server-timing", f"db;dur={registro.duracao * 1000:.1f}".encode()))
+                mensagem = {**mensagem, "headers": headers}
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receive, send_com_cabecalhos)
+        finally:
+            _registro_requisicao.reset(token)
+            suspeitas = registro.suspeitas_n1()
+            if suspeitas:
+                rota = getattr(scope.get("route"), "path", None) or scope.get("path")
+                formato, vezes = suspeitas[0]
+                logger.warning(
+                    "Possível N+1 em %s %s: %sx '%s' (%s consultas, %.1fms)",
+                    scope["method"], rota, vezes, formato[:200], registro.quantidade, registro.duracao * 1000,
+                )
@@ -0,0 +1,130 @@
+"""
+Middleware Gravador de Tráfego
+Arquivo: backend/app/middleware/gravador_trafego.py
+
+OBJETIVO:
+Registrar uma amostra das requisições reais (apenas o "formato", nunca o conteúdo)
+para reproduzi-las depois em uma instância de teste (reproduzir_trafego.py).
+
+O QUE É GRAVADO (uma linha JSON por requisição):
+- rota como template (ex.: /api/protocolos/{numero}), nunca o valor do parâmetro
+- método, status, duração, tamanho da requisição e da resposta
+- nomes dos parâmetros de query (valores só quando numéricos, ex.: skip/limit)
+- se a requisição estava autenticada (sem o token)
+
+Opcional: ligado por GRAVADOR_TRAFEGO_ATIVO. A requisição só põe a linha numa
+fila (QueueHandlerSemBloqueio); uma thread de fundo grava. Cada worker do
+servidor.py tem o seu arquivo (GRAVADOR_TRAFEGO_ARQUIVO com o pid:
+logs/trafego.<pid>.jsonl), rotacionado por tamanho: workers rotacionando o
+mesmo arquivo perderiam linhas.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import time
+from logging.handlers import QueueListener, RotatingFileHandler
+from typing import Optional
+from urllib.parse import parse_qsl
+
+from app.config import settings
+from app.logging_config import QueueHandlerSemBloqueio
+
+logger_trafego = logging.getLogger("participa.trafego")
+
+_listener: Optional[QueueListener] = None
+
+
+def arquivo_do_worker(caminho: str) -> str:
+    """logs/trafego.jsonl -> logs/trafego.<pid>.jsonl"""
+    raiz, extensao = os.path.splitext(caminho)
+    return f"{raiz}.{os.getpid()}{extensao}"
+
+
+def configurar_arquivo_trafego(caminho: str, tamanho_max: int, backups: int):
+    """Logger dedicado, sem propagação: fila + thread de escrita + rotação por tamanho."""
+    global _listener
+    if _listener is not None:
+        return
+    caminho = arquivo_do_worker(caminho)
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    arquivo = RotatingFileHandler(caminho, maxBytes=tamanho_max, backupCount=backups, encoding="utf-8")
+    arquivo.setFormatter(logging.Formatter("%(message)s"))
+    fila = queue.Queue(maxsize=settings.LOG_FILA_MAX)
+    logger_trafego.handlers.clear()
+    logger_trafego.addHandler(QueueHandlerSemBloqueio(fila))
+    logger_trafego.setLevel(logging.INFO)
+    logger_trafego.propagate = False
+    _listener = QueueListener(fila, arquivo)
+    _listener.start()
+    atexit.register(encerrar_arquivo_trafego)
+
+
+def encerrar_arquivo_trafego():
+    """Esvazia a fila e para a thread de escrita."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class GravadorTrafegoMiddleware:
+    """
+    Middleware ASGI puro (sem BaseHTTPMiddleware) para não atrasar as
+    requisições que não entram na amostra.
+    """
+
+    def __init__(self, app, amostragem: float = None):
+        self.app = app
+        self.amostragem = settings.GRAVADOR_TRAFEGO_AMOSTRAGEM if amostragem is None else amostragem
+        configurar_arquivo_trafego(
+            settings.GRAVADOR_TRAFEGO_ARQUIVO,
+            settings.GRAVADOR_TRAFEGO_TAMANHO_MAX,
+            settings.GRAVADOR_TRAFEGO_BACKUPS,
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or random.random() >= self.amostragem:
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        resposta = {"status": 0, "bytes": 0}
+
+        async def send_contando(mensagem):
+            if mensagem["type"] == "http.response.start":
+                resposta["status"] = mensagem["status"]
+            elif mensagem["type"] == "http.response.body":
+                resposta["bytes"] += len(mensagem.get("body", b""))
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receive, send_contando)
+        finally:
+            self._registrar(scope, resposta, (time.perf_counter() - inicio) * 1000)
+
+    @staticmethod
+    def _registrar(scope, resposta, duracao_ms: float):
+        headers = dict(scope.get("headers") or [])
+        rota = scope.get("route")
+        query = {}
+        for nome, valor in parse_qsl(scope.get("query_string", b"").decode("latin-1")):
+            # Só números (paginação) são mantidos; textos podem conter dados pessoais
+            query[nome] = int(valor) if valor.isdigit() else None
+
+        registro = {
+            "ts": round(time.time(), 3),
+            "metodo": scope["method"],
+            "rota": getattr(rota, "path", None) or "desconhecida",
+            "query": query,
+            "status": resposta["status"],
+            "duracao_ms": round(duracao_ms, 2),
+            "bytes_requisicao": int(headers.get(b"content-length", b"0") or 0),
+            "bytes_resposta": resposta["bytes"],
+            "tipo_conteudo": headers.get(b"content-type", b"").decode("latin-1").split(";")[0] or None,
+            "autenticado": b"authorization" in headers,
+        }
+        logger_trafego.info(json.dumps(registro))
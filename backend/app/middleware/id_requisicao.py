@@ -0,0 +1,43 @@
+"""
+Middleware de ID de Requisição
+Arquivo: backend/app/middleware/id_requisicao.py
+
+Aproveita o cabeçalho X-Request-ID recebido (proxy/gateway) ou gera um novo,
+disponibiliza no contexto para os logs (app/logging_config.py) e devolve na resposta.
+"""
+
+import re
+from uuid import uuid4
+
+from app.logging_config import id_requisicao_atual
+
+# Só aceita IDs simples, para não permitir injeção de conteúdo nos logs
+_ID_VALIDO = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+class IdRequisicaoMiddleware:
+    """Middleware ASGI puro."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        recebido = dict(scope.get("headers") or []).get(b"x-request-id", b"").decode("latin-1")
+        id_requisicao = recebido if _ID_VALIDO.match(recebido) else uuid4().hex
+        token = id_requisicao_atual.set(id_requisicao)
+
+        async def send_com_id(mensagem):
+            if mensagem["type"] == "http.response.start":
+                headers = list(mensagem.get("headers", []))
+                headers.append((b"x-request-id", id_requisicao.encode()))
+                mensagem = {**mensagem, "headers": headers}
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receive, send_com_id)
+        finally:
+            id_requisicao_atual.reset(token)
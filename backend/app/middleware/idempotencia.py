@@ -0,0 +1,234 @@
+"""
+Middleware de Idempotência (cabeçalho Idempotency-Key)
+Arquivo: backend/app/middleware/idempotencia.py
+
+OBJETIVO:
+Apps móveis repetem POST /api/manifestacoes/ e POST /api/movimentacoes/{id}
+quando a resposta demora. Sem proteção, cada repetição grava os anexos de
+novo e cria outra manifestação, com outro protocolo.
+
+COMO FUNCIONA (só nas rotas de ROTAS e só com o cabeçalho):
+- A chave é (usuário, rota, Idempotency-Key): clientes diferentes nunca
+  colidem. O usuário é o "sub" do JWT, e não o token: renovar o token entre
+  uma tentativa e outra não muda a chave. Sem token válido, vale o próprio
+  cabeçalho Authorization. Quem consegue inserir a chave no banco executa a requisição; a
+  resposta (status, tipo e corpo) é guardada por IDEMPOTENCIA_TTL_S.
+- Repetição com a chave concluída: recebe a resposta guardada, com o
+  cabeçalho Idempotent-Replayed: true, sem executar a rota.
+- Repetição simultânea (original ainda em andamento): espera a original
+  terminar (até IDEMPOTENCIA_ESPERA_S) e recebe a mesma resposta; passando
+  disso, 409 e o cliente tenta de novo.
+- Mesma chave com outro conteúdo: 422. A impressão é o sha256 do corpo sem o
+  boundary do multipart (que muda a cada tentativa).
+- Respostas 5xx e 429 não são guardadas: a reserva é apagada e a próxima
+  tentativa executa de novo.
+"""
+
+import hashlib
+import logging
+import re
+from typing import Dict, Optional
+
+import anyio
+import anyio.to_thread
+from fastapi.responses import JSONResponse
+
+from app.config import settings
+from app.middleware.metricas import IDEMPOTENCIA_REQUISICOES
+from app.services.auth_service import AuthService
+from app.services.idempotencia_service import IdempotenciaService
+
+logger = logging.getLogger(__name__)
+
+ROTAS = [
+    re.compile(r"^/api/manifestacoes/?$"),
+    re.compile(r"^/api/movimentacoes/[^/]+$"),
+]
+
+# Erros passageiros: o cliente deve poder tentar de novo com a mesma chave
+NAO_GUARDAR = {408, 409, 425, 429}
+
+_CHAVE_VALIDA = re.compile(r"^[\x21-\x7e]{1,255}$")
+
+
+def _escopo(headers) -> str:
+    """Dono da chave: o usuário do token ou, sem token válido, o cabeçalho Authorization."""
+    autorizacao = headers.get(b"authorization", b"").decode("latin-1")
+    esquema, _, token = autorizacao.partition(" ")
+    if esquema.lower() == "bearer" and token:
+        conteudo = AuthService.decodificar_token(token.strip())
+        if conteudo and conteudo.get("sub"):
+            return f"usuario:{conteudo['sub']}"
+    return f"cabecalho:{hashlib.sha256(autorizacao.encode('latin-1')).hexdigest()}"
+
+
+class _Impressao:
+    """sha256 incremental do corpo, sem as ocorrências do boundary do multipart."""
+
+    def __init__(self, scope):
+        headers = dict(scope.get("headers") or [])
+        tipo = headers.get(b"content-type", b"").decode("latin-1")
+        self._hash = hashlib.sha256(f"{scope['method']} {scope['path']}\n{tipo.split(';')[0]}\n".encode())
+        boundary = re.search(r"boundary=\"?([^\";]+)", tipo) if tipo.startswith("multipart/") else None
+        self._boundary = boundary.group(1).encode("latin-1") if boundary else None
+        self._resto = b""
+        self.completa = False
+
+    def atualizar(self, pedaco: bytes, mais: bool):
+        if self._boundary is None:
+            self._hash.update(pedaco)
+        else:
+            # Guarda o fim do pedaço: um boundary pode estar dividido entre dois pedaços
+            dados = (self._resto + pedaco).replace(self._boundary, b"")
+            corte = max(0, len(dados) - len(self._boundary) + 1)
+            self._hash.update(dados[:corte])
+            self._resto = dados[corte:]
+        if not mais:
+            self._hash.update(self._resto)
+            self._resto = b""
+            self.completa = True
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+
+class IdempotenciaMiddleware:
+    """Middleware ASGI puro."""
+
+    def __init__(self, app):
+        self.app = app
+        # Requisições originais em andamento neste worker: a repetição acorda
+        # assim que terminam (de outros workers, consulta o banco)
+        self._em_andamento: Dict[str, anyio.Event] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" \
+                or not any(rota.match(scope["path"]) for rota in ROTAS):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        valor = headers.get(b"idempotency-key")
+        if valor is None:
+            await self.app(scope, receive, send)
+            return
+
+        chave_cliente = valor.decode("latin-1").strip()
+        if not _CHAVE_VALIDA.match(chave_cliente):
+            await JSONResponse({"detail": "Idempotency-Key inválida."}, status_code=400)(scope, receive, send)
+            return
+
+        escopo = _escopo(headers)
+        chave = hashlib.sha256(f"{escopo}|{scope['path']}|{chave_cliente}".encode()).hexdigest()
+
+        existente = await anyio.to_thread.run_sync(IdempotenciaService.reservar, chave)
+        if existente is None:
+            await self._executar(chave, scope, receive, send)
+        else:
+            await self._repetir(chave, existente, scope, receive, send)
+
+    # ==========================================================================
+    # REQUISIÇÃO ORIGINAL
+    # ==========================================================================
+    async def _executar(self, chave: str, scope, receive, send):
+        impressao = _Impressao(scope)
+        resposta = {"status": 500, "tipo": None, "corpo": bytearray()}
+
+        async def receive_com_impressao():
+            mensagem = await receive()
+            if mensagem["type"] == "http.request":
+                impressao.atualizar(mensagem.get("body", b""), mensagem.get("more_body", False))
+            return mensagem
+
+        async def send_guardando(mensagem):
+            if mensagem["type"] == "http.response.start":
+                resposta["status"] = mensagem["status"]
+                for nome, valor in mensagem.get("headers", []):
+                    if nome.lower() == b"content-type":
+                        resposta["tipo"] = valor.decode("latin-1")
+            elif mensagem["type"] == "http.response.body":
+                resposta["corpo"] += mensagem.get("body", b"")
+            await send(mensagem)
+
+        evento = self._em_andamento[chave] = anyio.Event()
+        guardada = False
+        try:
+            await self.app(scope, receive_com_impressao, send_guardando)
+            IDEMPOTENCIA_REQUISICOES.labels(resultado="executada").inc()
+            # Rota que respondeu sem ler o corpo (ex.: 401) não tem impressão completa
+            if resposta["status"] < 500 and resposta["status"] not in NAO_GUARDAR and impressao.completa:
+                try:
+                    corpo = bytes(resposta["corpo"]).decode("utf-8")
+                except UnicodeDecodeError:
+                    corpo = None
+                if corpo is not None:
+                    with anyio.CancelScope(shield=True):
+                        await anyio.to_thread.run_sync(
+                            IdempotenciaService.concluir,
+                            chave, impressao.hexdigest(), resposta["status"], resposta["tipo"], corpo,
+                        )
+                    guardada = True
+        finally:
+            with anyio.CancelScope(shield=True):
+                if not guardada:
+                    try:
+                        await anyio.to_thread.run_sync(IdempotenciaService.liberar, chave)
+                    except Exception:
+                        # A reserva vence sozinha em IDEMPOTENCIA_EXECUCAO_MAX_S
+                        logger.exception("Falha ao liberar a chave de idempotência")
+            self._em_andamento.pop(chave, None)
+            evento.set()
+
+    # ==========================================================================
+    # REPETIÇÃO
+    # ==========================================================================
+    async def _repetir(self, chave: str, existente: Optional[Dict], scope, receive, send):
+        # O corpo é lido só para a impressão (nada é gravado)
+        impressao = _Impressao(scope)
+        while not impressao.completa:
+            mensagem = await receive()
+            if mensagem["type"] == "http.disconnect":
+                return
+            impressao.atualizar(mensagem.get("body", b""), mensagem.get("more_body", False))
+
+        limite = anyio.current_time() + settings.IDEMPOTENCIA_ESPERA_S
+        while existente is not None and existente["situacao"] == "em_andamento":
+            restante = limite - anyio.current_time()
+            if restante <= 0:
+                break
+            evento = self._em_andamento.get(chave)
+            with anyio.move_on_after(restante if evento else min(restante, 0.25)):
+                if evento:
+                    await evento.wait()
+                else:
+                    await anyio.sleep(restante)
+            existente = await anyio.to_thread.run_sync(IdempotenciaService.obter, chave)
+
+        if existente is None or existente["situacao"] != "concluida":
+            # Original ainda executando, ou falhou (reserva apagada): o cliente tenta de novo
+            IDEMPOTENCIA_REQUISICOES.labels(resultado="conflito").inc()
+            await JSONResponse(
+                {"detail": "Requisição com esta Idempotency-Key em processamento. Tente novamente."},
+                status_code=409,
+                headers={"Retry-After": "1"},
+            )(scope, receive, send)
+            return
+
+        if existente["impressao"] != impressao.hexdigest():
+            IDEMPOTENCIA_REQUISICOES.labels(resultado="divergente").inc()
+            await JSONResponse(
+                {"detail": "Idempotency-Key já usada com outro conteúdo."},
+                status_code=422,
+            )(scope, receive, send)
+            return
+
+        IDEMPOTENCIA_REQUISICOES.labels(resultado="repetida").inc()
+        corpo = existente["corpo"].encode("utf-8")
+        headers = [
+            (b"content-length", str(len(corpo)).encode()),
+            (b"idempotent-replayed", b"true"),
+        ]
+        if existente["tipo_conteudo"]:
+            headers.append((b"content-type", existente["tipo_conteudo"].encode("latin-1")))
+        await send({"type": "http.response.start", "status": existente["status_http"], "headers": headers})
+        await send({"type": "http.response.body", "body": corpo})
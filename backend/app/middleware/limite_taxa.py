@@ -0,0 +1,242 @@
+"""
+Limite de Taxa (token bucket)
+Arquivo: backend/app/middleware/limite_taxa.py
+
+OBJETIVO:
+Conter raspagem e tentativa de senhas nas rotas públicas ou sensíveis
+(consulta de protocolo, login, recuperação de senha): cada acesso custa uma
+consulta ao banco e, no login, um hash de senha.
+
+COMO FUNCIONA:
+- Cada política (LIMITE_TAXA_POLITICAS) é um balde com 'capacidade' fichas,
+  reabastecido a 'por_minuto' fichas por minuto. Cada requisição gasta uma.
+- A rota entra com a dependência:
+      dependencies=[Depends(limitar_taxa("login", usuario=cpf_do_formulario))]
+  Há sempre um balde por IP + rota e, quando 'usuario' é informado, outro por
+  usuário alvo + rota (ex.: o CPF tentado no login, vindo de vários IPs).
+- IP do cliente: o X-Forwarded-For só vale quando a conexão vem de um proxy
+  de SERVIDOR_PROXIES_CONFIAVEIS (senão, qualquer um escolheria o próprio IP).
+- Backend "memoria": dicionário do worker (sem rede; o limite vale por worker).
+  Backend "redis": script Lua atômico, limite compartilhado entre workers e
+  máquinas. Se o Redis falhar, a requisição passa (falha aberta) e fica no log.
+- Cabeçalhos RateLimit-Limit/Remaining/Reset nas respostas de sucesso da
+  rota e 429 com Retry-After quando o balde esvazia.
+"""
+
+import ipaddress
+import logging
+import math
+import time
+from functools import lru_cache
+from typing import Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException, Request, Response, status
+
+from app.config import settings
+from app.middleware.metricas import LIMITE_TAXA_BLOQUEADAS
+
+logger = logging.getLogger(__name__)
+
+
+class Consumo(NamedTuple):
+    permitido: bool
+    restantes: float
+
+
+class LimitadorMemoria:
+    """Baldes num dicionário do processo (o event loop serializa os acessos)."""
+
+    LIMPEZA_A_CADA = 1000
+
+    def __init__(self):
+        # chave -> (fichas, último acesso, instante em que o balde fica cheio)
+        self._baldes: Dict[str, Tuple[float, float, float]] = {}
+        self._operacoes = 0
+
+    async def consumir(self, chave: str, capacidade: float, taxa: float) -> Consumo:
+        agora = time.monotonic()
+        fichas, ultimo, _ = self._baldes.get(chave, (capacidade, agora, agora))
+        fichas = min(capacidade, fichas + (agora - ultimo) * taxa)
+        permitido = fichas >= 1
+        if permitido:
+            fichas -= 1
+        self._baldes[chave] = (fichas, agora, agora + (capacidade - fichas) / taxa)
+
+        self._operacoes += 1
+        if self._operacoes % self.LIMPEZA_A_CADA == 0:
+            # Balde que já estaria cheio é igual a um balde novo: pode sair
+            self._baldes = {k: v for k, v in self._baldes.items() if v[2] > agora}
+        return Consumo(permitido, fichas)
+
+
+class LimitadorRedis:
+    """Baldes em hashes do Redis, atualizados por um script Lua (atômico)."""
+
+    SCRIPT = """
+    local capacidade = tonumber(ARGV[1])
+    local taxa = tonumber(ARGV[2])
+    local agora = tonumber(ARGV[3])
+    local estado = redis.call('HMGET', KEYS[1], 'f', 'u')
+    local fichas = tonumber(estado[1]) or capacidade
+    local ultimo = tonumber(estado[2]) or agora
+    fichas = math.min(capacidade, fichas + math.max(0, agora - ultimo) * taxa)
+    local permitido = 0
+    if fichas >= 1 then
+        fichas = fichas - 1
+        permitido = 1
+    end
+    redis.call('HSET', KEYS[1], 'f', tostring(fichas), 'u', tostring(agora))
+    redis.call('PEXPIRE', KEYS[1], math.ceil((capacidade - fichas) / taxa * 1000) + 1000)
+    return {permitido, tostring(fichas)}
+    """
+
+    def __init__(self, cliente):
+        # cliente: redis.asyncio.Redis (ou fakeredis.aioredis.FakeRedis nos testes)
+        self._cliente = cliente
+        self._script = cliente.register_script(self.SCRIPT)
+
+    async def consumir(self, chave: str, capacidade: float, taxa: float) -> Consumo:
+        permitido, fichas = await self._script(keys=[chave], args=[capacidade, taxa, time.time()])
+        return Consumo(bool(int(permitido)), float(fichas))
+
+
+_limitador = None
+
+
+def cliente_redis(url: str):
+    """
+    Cliente para o backend Redis: timeouts curtos e nenhuma nova tentativa.
+    Com o Redis fora do ar, a requisição é liberada na hora (falha aberta),
+    sem esperar pelas tentativas com backoff do redis-py.
+    """
+    import redis.asyncio  # dependência opcional: só carregada com o backend Redis
+    from redis.asyncio.retry import Retry
+    from redis.backoff import NoBackoff
+
+    return redis.asyncio.Redis.from_url(
+        url, socket_timeout=0.5, socket_connect_timeout=0.5, retry=Retry(NoBackoff(), 0)
+    )
+
+
+def obter_limitador():
+    """Backend escolhido em LIMITE_TAXA_BACKEND, criado no primeiro uso."""
+    global _limitador
+    if _limitador is None:
+        if settings.LIMITE_TAXA_BACKEND == "redis":
+            _limitador = LimitadorRedis(cliente_redis(settings.REDIS_URL))
+        else:
+            _limitador = LimitadorMemoria()
+    return _limitador
+
+
+def definir_limitador(limitador):
+    """Troca o backend (ex.: LimitadorRedis(fakeredis.aioredis.FakeRedis()) em testes)."""
+    global _limitador
+    _limitador = limitador
+
+
+# ==============================================================================
+# IDENTIFICAÇÃO DO CLIENTE E DO USUÁRIO ALVO
+# ==============================================================================
+@lru_cache(maxsize=1)
+def _redes_confiaveis(configuracao: str) -> Tuple:
+    redes = []
+    for item in configuracao.split(","):
+        item = item.strip()
+        if item == "*":
+            return ("*",)
+        if item:
+            redes.append(ipaddress.ip_network(item, strict=False))
+    return tuple(redes)
+
+
+def _proxy_confiavel(endereco: str) -> bool:
+    redes = _redes_confiaveis(settings.SERVIDOR_PROXIES_CONFIAVEIS)
+    if redes == ("*",):
+        return True
+    try:
+        ip = ipaddress.ip_address(endereco)
+    except ValueError:
+        return False
+    return any(ip in rede for rede in redes)
+
+
+def ip_do_cliente(request: Request) -> str:
+    """
+    IP de quem fez a requisição. Atrás de proxy confiável, o X-Forwarded-For é
+    lido da direita para a esquerda (cada proxy acrescenta quem o chamou) até o
+    primeiro endereço que não é de um proxy confiável.
+    """
+    ip = request.client.host if request.client else "desconhecido"
+    if not _proxy_confiavel(ip):
+        return ip
+    encaminhados = [p.strip() for p in request.headers.get("x-forwarded-for", "").split(",") if p.strip()]
+    for endereco in reversed(encaminhados):
+        ip = endereco
+        if not _proxy_confiavel(endereco):
+            break
+    return ip
+
+
+async def cpf_do_formulario(request: Request) -> Optional[str]:
+    """CPF tentado no login (o formulário já foi lido pelo FastAPI: fica em cache)."""
+    formulario = await request.form()
+    cpf = "".join(c for c in str(formulario.get("username") or "") if c.isdigit())
+    return cpf or None
+
+
+async def email_do_formulario(request: Request) -> Optional[str]:
+    formulario = await request.form()
+    return str(formulario.get("email") or "").strip().lower() or None
+
+
+# ==============================================================================
+# DEPENDÊNCIA DAS ROTAS
+# ==============================================================================
+def limitar_taxa(politica: str, usuario: Optional[Callable[[Request], Awaitable[Optional[str]]]] = None):
+    """Dependência que aplica a política 'politica' por IP (e por usuário alvo)."""
+    config = settings.LIMITE_TAXA_POLITICAS.get(politica) if settings.LIMITE_TAXA_ATIVO else None
+
+    async def dependencia(request: Request, response: Response):
+        if config is None:
+            return
+        capacidade = float(config["capacidade"])
+        taxa = float(config["por_minuto"]) / 60
+
+        chaves = [f"ip:{ip_do_cliente(request)}"]
+        if usuario is not None:
+            alvo = await usuario(request)
+            if alvo:
+                chaves.append(f"usuario:{alvo}")
+
+        limitador = obter_limitador()
+        restantes = capacidade
+        bloqueado = False
+        for chave in chaves:
+            try:
+                consumo = await limitador.consumir(f"taxa:{politica}:{chave}", capacidade, taxa)
+            except Exception as e:
+                logger.warning("Limite de taxa indisponível, requisição liberada: %s", type(e).__name__)
+                return
+            restantes = min(restantes, consumo.restantes)
+            if not consumo.permitido:
+                # Não gasta as fichas dos outros baldes com uma requisição recusada
+                bloqueado = True
+                break
+
+        headers = {
+            "RateLimit-Limit": str(int(capacidade)),
+            "RateLimit-Remaining": str(int(restantes)),
+            "RateLimit-Reset": str(math.ceil((capacidade - restantes) / taxa)),
+        }
+        if bloqueado:
+            LIMITE_TAXA_BLOQUEADAS.labels(politica=politica).inc()
+            headers["Retry-After"] = str(max(1, math.ceil((1 - restantes) / taxa)))
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Muitas requisições. Tente novamente mais tarde.",
+                headers=headers,
+            )
+        response.headers.update(headers)
+
+    return dependencia
@@ -0,0 +1,30 @@
+"""
+Middleware de Perfil de Memória
+Arquivo: backend/app/middleware/memoria.py
+
+Mede, com o tracemalloc, o pico de alocação e a memória retida de cada rota.
+Os números ficam em GET /api/memoria/rotas (ver app/services/memoria_service.py).
+Ligado por MEMORIA_PERFIL_ATIVO.
+"""
+
+from app.services.memoria_service import MemoriaService
+
+
+class MemoriaMiddleware:
+    """Middleware ASGI puro."""
+
+    def __init__(self, app):
+        self.app = app
+        MemoriaService.iniciar()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        medicao = MemoriaService.inicio_requisicao()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            rota = getattr(scope.get("route"), "path", None) or "desconhecida"
+            MemoriaService.fim_requisicao(f"{scope['method']} {rota}", medicao)
@@ -0,0 +1,282 @@
+"""
+Métricas no formato Prometheus
+Arquivo: backend/app/middleware/metricas.py
+
+OBJETIVO:
+Expor em /metrics (app/routes/metricas.py) o comportamento da aplicação:
+- HTTP: latência por rota (histograma), total por status e requisições em andamento.
+- Banco: tempo de espera por conexão, tamanho/uso do pool, consultas por
+  requisição e tempo de SQL (via eventos do engine de app/database.py).
+- Threadpool: threads ocupadas x limite (onde rodam as rotas síncronas).
+- Negócio: uploads, manifestações criadas por assunto e mudanças de status.
+- Compartimentos (app/middleware/compartimentos.py): uso, fila, espera e 503 por grupo.
+- Limite de taxa (app/middleware/limite_taxa.py): 429 por política.
+
+Tudo é barato no caminho quente: o middleware é ASGI puro e os contadores
+por requisição usam ContextVar (sem travas).
+
+Vários workers (servidor.py): com PROMETHEUS_MULTIPROC_DIR definida, cada
+processo grava seus valores em arquivos dessa pasta e o /metrics soma todos.
+Os gauges declaram como combinar os processos vivos: "livesum" para o que
+soma (em uso, fila, pool) e "livemax" para o que é igual ou pior em qualquer
+um (fila de tarefas lida do banco, disjuntor da IZA).
+"""
+
+import os
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+import anyio.to_thread
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import event
+
+# ==============================================================================
+# DEFINIÇÃO DAS MÉTRICAS
+# ==============================================================================
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+HTTP_REQUISICOES = Counter(
+    "http_requisicoes_total", "Requisições HTTP atendidas", ["metodo", "rota", "status"]
+)
+HTTP_LATENCIA = Histogram(
+    "http_requisicao_duracao_segundos", "Latência das requisições HTTP", ["metodo", "rota"],
+    buckets=BUCKETS_LATENCIA,
+)
+HTTP_EM_ANDAMENTO = Gauge(
+    "http_requisicoes_em_andamento", "Requisições HTTP sendo processadas agora", ["metodo"],
+    multiprocess_mode="livesum",
+)
+
+THREADPOOL_OCUPADAS = Gauge(
+    "threadpool_threads_ocupadas", "Threads do threadpool em uso", multiprocess_mode="livesum"
+)
+THREADPOOL_LIMITE = Gauge(
+    "threadpool_threads_limite", "Tamanho máximo do threadpool", multiprocess_mode="livesum"
+)
+
+DB_ESPERA_CONEXAO = Histogram(
+    "db_espera_conexao_segundos", "Tempo para obter uma conexão do pool",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+)
+DB_POOL_TAMANHO = Gauge(
+    "db_pool_tamanho", "Tamanho configurado do pool de conexões", multiprocess_mode="livesum"
+)
+DB_POOL_EM_USO = Gauge(
+    "db_pool_conexoes_em_uso", "Conexões emprestadas do pool", multiprocess_mode="livesum"
+)
+DB_POOL_EXCEDENTE = Gauge(
+    "db_pool_conexoes_excedentes", "Conexões acima do tamanho do pool (overflow)", multiprocess_mode="livesum"
+)
+DB_CONSULTA_DURACAO = Histogram(
+    "db_consulta_duracao_segundos", "Duração de cada comando SQL",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1, 5),
+)
+DB_CONSULTAS_POR_REQUISICAO = Histogram(
+    "db_consultas_por_requisicao", "Comandos SQL emitidos por requisição", ["rota"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+)
+DB_TEMPO_POR_REQUISICAO = Histogram(
+    "db_tempo_por_requisicao_segundos", "Tempo total de SQL por requisição", ["rota"],
+    buckets=BUCKETS_LATENCIA,
+)
+
+UPLOAD_BYTES = Histogram(
+    "upload_bytes", "Tamanho dos arquivos enviados",
+    buckets=(10_000, 100_000, 500_000, 1_000_000, 5_000_000, 10_000_000, 25_000_000, 50_000_000),
+)
+UPLOAD_DURACAO = Histogram(
+    "upload_duracao_segundos", "Tempo para gravar cada arquivo enviado", buckets=BUCKETS_LATENCIA
+)
+MANIFESTACOES_CRIADAS = Counter(
+    "manifestacoes_criadas_total", "Manifestações registradas", ["assunto"]
+)
+TRANSICOES_STATUS = Counter(
+    "manifestacao_transicoes_status_total", "Mudanças de status das manifestações", ["de", "para"]
+)
+
+COMPARTIMENTO_EM_USO = Gauge(
+    "compartimento_em_uso", "Requisições executando em cada compartimento (bulkhead)", ["grupo"],
+    multiprocess_mode="livesum",
+)
+COMPARTIMENTO_FILA = Gauge(
+    "compartimento_fila", "Requisições aguardando vaga em cada compartimento", ["grupo"],
+    multiprocess_mode="livesum",
+)
+COMPARTIMENTO_ESPERA = Histogram(
+    "compartimento_espera_segundos", "Tempo na fila do compartimento até obter vaga", ["grupo"],
+    buckets=BUCKETS_LATENCIA,
+)
+COMPARTIMENTO_REJEITADAS = Counter(
+    "compartimento_rejeitadas_total", "Requisições recusadas com 503 pelo compartimento", ["grupo", "motivo"]
+)
+LIMITE_TAXA_BLOQUEADAS = Counter(
+    "limite_taxa_bloqueadas_total", "Requisições recusadas com 429 pelo limite de taxa", ["politica"]
+)
+PROTOCOLOS_REJEITADOS = Counter(
+    "protocolos_rejeitados_total", "Consultas de protocolo respondidas 404 sem ir ao banco", ["motivo"]
+)
+CACHE_CONSULTAS = Counter(
+    "cache_consultas_total", "Consultas ao cache (fresco, obsoleto, calculado, coalescido)", ["cache", "resultado"]
+)
+CACHE_CALCULO = Histogram(
+    "cache_calculo_segundos", "Tempo de cálculo de um valor do cache", ["cache"]
+)
+INGESTAO_PENDENTES = Gauge(
+    "ingestao_pendentes", "Manifestações no diário do worker aguardando gravação no banco",
+    multiprocess_mode="livesum",
+)
+INGESTAO_LOTE = Histogram(
+    "ingestao_lote_registros", "Registros por transação da gravação em lote",
+    buckets=(1, 5, 10, 25, 50, 100, 200, 500, 1000),
+)
+INGESTAO_REJEITADAS = Counter(
+    "ingestao_rejeitadas_total", "Registros do diário recusados pelo banco (separados em rejeitados-*.jsonl)"
+)
+TAREFAS_FILA = Gauge(
+    "tarefas_fila", "Tarefas em segundo plano por situação", ["situacao"],
+    multiprocess_mode="livemax",
+)
+TAREFAS_ATRASO = Gauge(
+    "tarefas_atraso_segundos", "Há quanto tempo a tarefa disponível mais antiga espera",
+    multiprocess_mode="livemax",
+)
+TAREFAS_LATENCIA = Histogram(
+    "tarefas_latencia_segundos", "Da gravação da tarefa até a primeira execução", ["tipo"],
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, 3600),
+)
+TAREFAS_DURACAO = Histogram(
+    "tarefas_duracao_segundos", "Tempo de execução de uma tarefa", ["tipo"]
+)
+TAREFAS_EXECUTADAS = Counter(
+    "tarefas_executadas_total", "Execuções de tarefas (concluida, nova_tentativa, falhou)", ["tipo", "resultado"]
+)
+EMAILS_ENVIADOS = Counter(
+    "emails_enviados_total", "E-mails entregues ao servidor SMTP (enviado, erro)", ["resultado"]
+)
+EMAIL_CONEXOES = Counter("email_conexoes_total", "Conexões SMTP abertas")
+IZA_CHAMADAS = Counter(
+    "iza_chamadas_total",
+    "Chamadas à IZA (sucesso, erro_cliente, falha, disjuntor_aberto, sem_vaga)",
+    ["resultado"],
+)
+IZA_LATENCIA = Histogram("iza_latencia_segundos", "Duração de cada tentativa de chamada à IZA")
+IZA_DISJUNTOR = Gauge(
+    "iza_disjuntor_estado", "Disjuntor da IZA: 0 fechado, 1 meio aberto, 2 aberto", multiprocess_mode="livemax"
+)
+IZA_CACHE = Counter("iza_cache_total", "Textos encontrados (acerto) ou não (falta) no cache da IZA", ["resultado"])
+IDEMPOTENCIA_REQUISICOES = Counter(
+    "idempotencia_requisicoes_total", "Envios com Idempotency-Key (executada, repetida, conflito, divergente)",
+    ["resultado"]
+)
+
+# Modo multiprocesso do prometheus_client (definido por servidor.py)
+MULTIPROCESSO = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+# Acumulador de SQL da requisição corrente: [quantidade, segundos]
+_sql_requisicao: ContextVar[Optional[list]] = ContextVar("sql_requisicao", default=None)
+
+
+def _valor(status) -> str:
+    return getattr(status, "value", status) or "desconhecido"
+
+
+def registrar_transicao_status(de, para):
+    TRANSICOES_STATUS.labels(de=_valor(de), para=_valor(para)).inc()
+
+
+# ==============================================================================
+# MIDDLEWARE HTTP
+# ==============================================================================
+class MetricasMiddleware:
+    """Middleware ASGI puro: mede latência e SQL de cada requisição HTTP."""
+
+    def __init__(self, app):
+        self.app = app
+        # O scrape chega a um único worker: os demais atualizam os valores
+        # coletados ao fim de cada requisição
+        self.engine = None
+        if MULTIPROCESSO:
+            from app.database import engine
+            self.engine = engine
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metodo = scope["method"]
+        status = {"codigo": 500}
+        acumulador = [0, 0.0]
+        token = _sql_requisicao.set(acumulador)
+
+        async def send_com_status(mensagem):
+            if mensagem["type"] == "http.response.start":
+                status["codigo"] = mensagem["status"]
+            await send(mensagem)
+
+        em_andamento = HTTP_EM_ANDAMENTO.labels(metodo)
+        em_andamento.inc()
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_com_status)
+        finally:
+            duracao = time.perf_counter() - inicio
+            em_andamento.dec()
+            _sql_requisicao.reset(token)
+
+            # Template da rota (ex.: /api/protocolos/{numero}) evita explosão de séries
+            rota = getattr(scope.get("route"), "path", None) or "desconhecida"
+            HTTP_LATENCIA.labels(metodo, rota).observe(duracao)
+            HTTP_REQUISICOES.labels(metodo, rota, str(status["codigo"])).inc()
+            DB_CONSULTAS_POR_REQUISICAO.labels(rota).observe(acumulador[0])
+            DB_TEMPO_POR_REQUISICAO.labels(rota).observe(acumulador[1])
+            if self.engine is not None:
+                atualizar_metricas_coletadas(self.engine)
+
+
+# ==============================================================================
+# BANCO DE DADOS (eventos do engine)
+# ==============================================================================
+def instrumentar_engine(engine):
+    """Registra os eventos de SQL no engine. Chamado por app/database.py."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metricas_inicio", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _depois(conn, cursor, statement, parameters, context, executemany):
+        duracao = time.perf_counter() - conn.info["metricas_inicio"].pop()
+        DB_CONSULTA_DURACAO.observe(duracao)
+        acumulador = _sql_requisicao.get()
+        if acumulador is not None:
+            acumulador[0] += 1
+            acumulador[1] += duracao
+
+    @event.listens_for(engine, "handle_error")
+    def _erro(contexto):
+        conn = contexto.connection
+        if conn is not None and conn.info.get("metricas_inicio"):
+            conn.info["metricas_inicio"].pop()
+
+
+def registrar_espera_conexao(segundos: float):
+    DB_ESPERA_CONEXAO.observe(segundos)
+
+
+def atualizar_metricas_coletadas(engine):
+    """
+    Valores lidos sob demanda (no momento do scrape), para não custar
+    nada durante as requisições. Deve rodar dentro do event loop.
+    """
+    limitador = anyio.to_thread.current_default_thread_limiter()
+    THREADPOOL_OCUPADAS.set(limitador.borrowed_tokens)
+    THREADPOOL_LIMITE.set(limitador.total_tokens)
+
+    pool = engine.pool
+    # NullPool não tem tamanho fixo: os métodos abaixo só existem em QueuePool
+    if hasattr(pool, "size"):
+        DB_POOL_TAMANHO.set(pool.size())
+        DB_POOL_EM_USO.set(pool.checkedout())
+        DB_POOL_EXCEDENTE.set(max(pool.overflow(), 0))
@@ -0,0 +1,288 @@
+"""
+Perfilador por Amostragem (requisições lentas)
+Arquivo: backend/app/middleware/perfilador.py
+
+OBJETIVO:
+Descobrir para onde vai o tempo de uma rota lenta em produção (validação,
+gravação de arquivos, hash de senha, banco...) sem ligar um profiler
+determinístico, que deixaria tudo mais lento.
+
+COMO FUNCIONA:
+- Uma única thread "amostradora" lê a pilha das threads (sys._current_frames)
+  a cada PERFIL_INTERVALO_MS enquanto houver requisição sendo perfilada.
+- Na thread do event loop, só entram as amostras em que a própria requisição
+  está executando; nas threads do threadpool (rotas síncronas), as amostras
+  que passam pela função da rota ou pelas suas dependências.
+- Cada amostra vale o tempo real desde a anterior (em ms): código em C que
+  segura o GIL (ex.: crypt do hash de senha) atrasa a amostragem, mas não
+  some do gráfico.
+- Ao final, as pilhas são gravadas no formato "folded" (uma pilha por linha +
+  milissegundos), aceito por flamegraph.pl, speedscope e inferno:
+      logs/perfis/<rota>/<data>_<metodo>_<duracao>ms.folded
+
+QUAIS REQUISIÇÕES:
+- Uma fração aleatória (PERFIL_AMOSTRAGEM);
+- As que enviam o cabeçalho X-Perfil com o valor de PERFIL_TOKEN;
+- Qualquer uma mais lenta que PERFIL_LENTAS_MS. Toda requisição registra só
+  o horário de início; a amostragem das pilhas começa quando ela passa de
+  PERFIL_LENTAS_INICIO x PERFIL_LENTAS_MS ainda em andamento. Assim as
+  rápidas não custam leitura de pilha, e o perfil da lenta cobre tudo depois
+  desse ponto (o começo fica de fora do gráfico).
+A pasta é limitada a PERFIL_QUOTA_MB: os perfis mais antigos são apagados.
+"""
+
+import hmac
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+import anyio.to_thread
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Arquivos da infraestrutura de threads: pilhas só com eles são threads ociosas
+_ARQUIVOS_OCIOSOS = ("threading.py", "queue.py")
+_PACOTE_ANYIO = os.sep + "anyio" + os.sep
+_CARACTERES_ROTA = re.compile(r"[^A-Za-z0-9]+")
+
+
+def _descrever(codigo) -> str:
+    """Nome do quadro no flame graph: função (arquivo:linha da definição)."""
+    arquivo = codigo.co_filename
+    partes = arquivo.split(os.sep)
+    if "site-packages" in partes:
+        arquivo = os.sep.join(partes[partes.index("site-packages") + 1:])
+    elif "app" in partes:
+        arquivo = os.sep.join(partes[partes.index("app"):])
+    return f"{codigo.co_name} ({arquivo}:{codigo.co_firstlineno})".replace(";", ",")
+
+
+def _pilha(quadro) -> List:
+    """Quadros da raiz até a folha."""
+    quadros = []
+    while quadro is not None:
+        quadros.append(quadro)
+        quadro = quadro.f_back
+    quadros.reverse()
+    return quadros
+
+
+def _thread_ociosa(codigos) -> bool:
+    return all(c.co_filename.endswith(_ARQUIVOS_OCIOSOS) or _PACOTE_ANYIO in c.co_filename for c in codigos)
+
+
+def _codigos_da_rota(rota) -> Set:
+    """Código da função da rota e das dependências (recursivamente)."""
+    codigos = set()
+    pendentes = [getattr(rota, "dependant", None)]
+    while pendentes:
+        dependente = pendentes.pop()
+        if dependente is None:
+            continue
+        codigo = getattr(getattr(dependente, "call", None), "__code__", None)
+        if codigo is not None:
+            codigos.add(codigo)
+        pendentes.extend(dependente.dependencies)
+    return codigos
+
+
+# ==============================================================================
+# COLETA DE UMA REQUISIÇÃO
+# ==============================================================================
+class Coleta:
+    """Amostras de uma requisição em andamento."""
+
+    def __init__(self, marcador, thread_loop: int):
+        # 'marcador' é o quadro do middleware: se está na pilha do loop, a requisição está rodando
+        self.marcador = marcador
+        self.thread_loop = thread_loop
+        self.amostras_loop: Counter = Counter()
+        self.amostras_threads: Counter = Counter()
+
+    def adicionar_loop(self, quadros: List, peso: int):
+        for posicao, quadro in enumerate(quadros):
+            if quadro is self.marcador:
+                self.amostras_loop[tuple(q.f_code for q in quadros[posicao + 1:])] += peso
+                return
+
+    def linhas_folded(self, prefixo: str, codigos_rota: Set) -> List[str]:
+        pilhas: Counter = Counter()
+        for codigos, vezes in self.amostras_loop.items():
+            pilhas[";".join([prefixo, "[loop]"] + [_descrever(c) for c in codigos])] += vezes
+        for codigos, vezes in self.amostras_threads.items():
+            # Corta a pilha da thread a partir da rota/dependência; sem elas, é outra requisição
+            inicio = next((i for i, c in enumerate(codigos) if c in codigos_rota), None)
+            if inicio is not None:
+                pilhas[";".join([prefixo, "[threadpool]"] + [_descrever(c) for c in codigos[inicio:]])] += vezes
+        return [f"{pilha} {vezes}" for pilha, vezes in pilhas.most_common()]
+
+
+# ==============================================================================
+# THREAD AMOSTRADORA (única por processo)
+# ==============================================================================
+class Amostrador:
+
+    def __init__(self, intervalo: float):
+        self.intervalo = intervalo
+        self.coletas: Set[Coleta] = set()  # sendo amostradas
+        self.em_espera: Dict[Coleta, float] = {}  # coleta -> perf_counter em que passa a ser amostrada
+        self._trava = threading.Lock()
+        self._acordar = threading.Event()
+        self._acordar_em: Optional[float] = None  # None = thread esperando um registro
+        self._thread: Optional[threading.Thread] = None
+
+    def registrar(self, coleta: Coleta, a_partir_de: float = 0.0):
+        """Amostra a coleta já, ou só a partir do instante 'a_partir_de' (perf_counter)."""
+        with self._trava:
+            if a_partir_de <= time.perf_counter():
+                self.coletas.add(coleta)
+                acordar = True
+            else:
+                self.em_espera[coleta] = a_partir_de
+                # A thread já acorda antes (todas esperam o mesmo tanto): nada a fazer
+                acordar = self._acordar_em is None or a_partir_de < self._acordar_em
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._executar, name="perfilador", daemon=True)
+                self._thread.start()
+        if acordar:
+            self._acordar.set()
+
+    def remover(self, coleta: Coleta):
+        with self._trava:
+            self.coletas.discard(coleta)
+            self.em_espera.pop(coleta, None)
+
+    def _executar(self):
+        propria = threading.get_ident()
+        ultima = time.perf_counter()
+        while True:
+            with self._trava:
+                agora = time.perf_counter()
+                for coleta, momento in list(self.em_espera.items()):
+                    if momento <= agora:
+                        del self.em_espera[coleta]
+                        self.coletas.add(coleta)
+                ativas = list(self.coletas)
+                if not ativas:
+                    self._acordar.clear()
+                    self._acordar_em = min(self.em_espera.values(), default=None)
+            if not ativas:
+                # Nada para amostrar: dorme até a próxima requisição passar do ponto (ou um registro novo)
+                self._acordar.wait(None if self._acordar_em is None else max(0.0, self._acordar_em - agora))
+                ultima = time.perf_counter()
+                continue
+
+            agora = time.perf_counter()
+            peso = max(1, round((agora - ultima) * 1000))
+            ultima = agora
+
+            quadros_por_thread = sys._current_frames()
+            nomes = {t.ident: t.name for t in threading.enumerate()}
+            pilhas_loop: Dict[int, List] = {}
+            pilhas_threads = []
+            threads_loop = {coleta.thread_loop for coleta in ativas}
+            for ident, quadro in quadros_por_thread.items():
+                if ident == propria:
+                    continue
+                if ident in threads_loop:
+                    pilhas_loop[ident] = _pilha(quadro)
+                elif nomes.get(ident, "").startswith("AnyIO worker"):
+                    codigos = tuple(q.f_code for q in _pilha(quadro))
+                    if not _thread_ociosa(codigos):
+                        pilhas_threads.append(codigos)
+            del quadros_por_thread
+
+            for coleta in ativas:
+                if coleta.thread_loop in pilhas_loop:
+                    coleta.adicionar_loop(pilhas_loop[coleta.thread_loop], peso)
+                for codigos in pilhas_threads:
+                    coleta.amostras_threads[codigos] += peso
+            time.sleep(self.intervalo)
+
+
+# ==============================================================================
+# GRAVAÇÃO (com quota de disco)
+# ==============================================================================
+def _aplicar_quota(diretorio: str, quota_bytes: int):
+    arquivos = []
+    for raiz, _, nomes in os.walk(diretorio):
+        for nome in nomes:
+            caminho = os.path.join(raiz, nome)
+            info = os.stat(caminho)
+            arquivos.append((info.st_mtime, info.st_size, caminho))
+    total = sum(tamanho for _, tamanho, _ in arquivos)
+    for _, tamanho, caminho in sorted(arquivos):
+        if total <= quota_bytes:
+            break
+        os.remove(caminho)
+        total -= tamanho
+
+
+def salvar_perfil(metodo: str, rota: str, duracao_ms: float, linhas: List[str]) -> Optional[str]:
+    if not linhas:
+        return None
+    pasta = os.path.join(settings.PERFIL_DIR, _CARACTERES_ROTA.sub("_", rota).strip("_") or "raiz")
+    os.makedirs(pasta, exist_ok=True)
+    nome = f"{datetime.now():%Y%m%d-%H%M%S-%f}_{metodo}_{int(duracao_ms)}ms.folded"
+    caminho = os.path.join(pasta, nome)
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        arquivo.write("\n".join(linhas) + "\n")
+    _aplicar_quota(settings.PERFIL_DIR, settings.PERFIL_QUOTA_MB * 1024 * 1024)
+    return caminho
+
+
+# ==============================================================================
+# MIDDLEWARE HTTP
+# ==============================================================================
+class PerfiladorMiddleware:
+    """Middleware ASGI puro: requisições fora da amostra passam direto."""
+
+    def __init__(self, app):
+        self.app = app
+        self.amostrador = Amostrador(settings.PERFIL_INTERVALO_MS / 1000)
+
+    def _deve_gravar_sempre(self, scope) -> bool:
+        if settings.PERFIL_TOKEN:
+            for nome, valor in scope.get("headers") or []:
+                if nome == b"x-perfil":
+                    return hmac.compare_digest(valor, settings.PERFIL_TOKEN.encode())
+        return random.random() < settings.PERFIL_AMOSTRAGEM
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        gravar_sempre = self._deve_gravar_sempre(scope)
+        if not gravar_sempre and settings.PERFIL_LENTAS_MS <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        coleta = Coleta(sys._getframe(), threading.get_ident())
+        inicio = time.perf_counter()
+        a_partir_de = 0.0 if gravar_sempre else inicio + settings.PERFIL_LENTAS_MS * settings.PERFIL_LENTAS_INICIO / 1000
+        self.amostrador.registrar(coleta, a_partir_de)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.amostrador.remover(coleta)
+            duracao_ms = (time.perf_counter() - inicio) * 1000
+            if gravar_sempre or duracao_ms >= settings.PERFIL_LENTAS_MS:
+                rota = scope.get("route")
+                caminho_rota = getattr(rota, "path", None) or "desconhecida"
+                linhas = coleta.linhas_folded(f"{scope['method']} {caminho_rota}", _codigos_da_rota(rota))
+                # Disco fora do event loop
+                caminho = await anyio.to_thread.run_sync(
+                    salvar_perfil, scope["method"], caminho_rota, duracao_ms, linhas
+                )
+                if caminho:
+                    logger.info("Perfil de %s %s (%.0fms) salvo em %s", scope["method"], caminho_rota, duracao_ms, caminho)
@@ -0,0 +1,277 @@
+"""
+Rastreamento de Requisições (spans)
+Arquivo: backend/app/middleware/rastreamento.py
+
+OBJETIVO:
+Ver para onde vai o tempo dentro de UMA requisição (ex.: envio de manifestação:
+leitura do formulário, gravação dos anexos, consulta de sequência, flush,
+commit, refresh), sem depender de um coletor externo.
+
+COMO FUNCIONA:
+- RastreamentoMiddleware abre o span raiz "HTTP <método> <rota>". Se vier o
+  cabeçalho W3C 'traceparent', o trace_id (e a decisão de amostragem) é herdado.
+- Filhos: função da rota (RotaRastreada), métodos dos services (@rastrear),
+  cada comando SQL (eventos do engine) e gravação de arquivos (span(...)).
+- Política de amostragem: RASTREAMENTO_AMOSTRAGEM decide no início; traces
+  mais lentos que RASTREAMENTO_LENTAS_MS ou com erro 5xx são gravados sempre.
+- Exportação local: uma linha JSON por span em RASTREAMENTO_ARQUIVO (com
+  rotação), escrita por thread de fundo. Análise: python analisar_rastros.py.
+
+Desligado (RASTREAMENTO_ATIVO=False), @rastrear e span() custam só uma leitura de ContextVar.
+"""
+
+import functools
+import inspect
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import QueueListener, RotatingFileHandler
+from typing import Dict, List, Optional
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+
+from app.config import settings
+from app.logging_config import QueueHandlerSemBloqueio
+
+logger_rastros = logging.getLogger("participa.rastreamento")
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+_span_atual: ContextVar[Optional["Span"]] = ContextVar("span_atual", default=None)
+_listener: Optional[QueueListener] = None
+
+
+def _novo_id(bytes_: int) -> str:
+    return os.urandom(bytes_).hex()
+
+
+class Trace:
+    """Spans já encerrados de uma requisição (compartilhado entre threads)."""
+
+    def __init__(self, trace_id: str, amostrado: bool):
+        self.trace_id = trace_id
+        self.amostrado = amostrado
+        self.spans: List[Dict] = []
+        self._trava = threading.Lock()
+
+    def registrar(self, span: "Span"):
+        with self._trava:
+            self.spans.append(span.como_dict())
+
+
+class Span:
+
+    def __init__(self, trace: Trace, nome: str, pai_id: Optional[str], atributos: Dict):
+        self.trace = trace
+        self.span_id = _novo_id(8)
+        self.pai_id = pai_id
+        self.nome = nome
+        self.atributos = atributos
+        self.status = "ok"
+        self.inicio = time.time()
+        self._inicio_contador = time.perf_counter()
+        self.duracao_ms = 0.0
+
+    def encerrar(self):
+        self.duracao_ms = (time.perf_counter() - self._inicio_contador) * 1000
+        self.trace.registrar(self)
+
+    def como_dict(self) -> Dict:
+        return {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "pai_id": self.pai_id,
+            "nome": self.nome,
+            "inicio": round(self.inicio, 6),
+            "duracao_ms": round(self.duracao_ms, 3),
+            "status": self.status,
+            "atributos": self.atributos,
+        }
+
+
+# ==============================================================================
+# API PARA O CÓDIGO DA APLICAÇÃO
+# ==============================================================================
+def abrir_span(nome: str, **atributos):
+    """Abre um span filho do atual. Devolve (span, token) ou (None, None) sem trace ativo."""
+    pai = _span_atual.get()
+    if pai is None:
+        return None, None
+    span = Span(pai.trace, nome, pai.span_id, atributos)
+    return span, _span_atual.set(span)
+
+
+def fechar_span(span: Optional[Span], token, erro: Optional[BaseException] = None):
+    if span is None:
+        return
+    if erro is not None:
+        span.status = "erro"
+        span.atributos["erro"] = type(erro).__name__
+    span.encerrar()
+    try:
+        _span_atual.reset(token)
+    except ValueError:
+        # Token de outro contexto (ex.: eventos do SQLAlchemy em outra task)
+        pass
+
+
+@contextmanager
+def span(nome: str, **atributos):
+    """with span("arquivo.gravar", tamanho=123): ..."""
+    aberto, token = abrir_span(nome, **atributos)
+    try:
+        yield aberto
+    except BaseException as e:
+        fechar_span(aberto, token, e)
+        raise
+    fechar_span(aberto, token)
+
+
+def rastrear(nome: Optional[str] = None):
+    """Decorator: um span por chamada (funções síncronas ou async)."""
+
+    def decorator(funcao):
+        nome_span = nome or funcao.__qualname__
+
+        if inspect.iscoroutinefunction(funcao):
+            @functools.wraps(funcao)
+            async def envoltorio_async(*args, **kwargs):
+                if _span_atual.get() is None:
+                    return await funcao(*args, **kwargs)
+                with span(nome_span):
+                    return await funcao(*args, **kwargs)
+            return envoltorio_async
+
+        @functools.wraps(funcao)
+        def envoltorio(*args, **kwargs):
+            if _span_atual.get() is None:
+                return funcao(*args, **kwargs)
+            with span(nome_span):
+                return funcao(*args, **kwargs)
+        return envoltorio
+
+    return decorator
+
+
+class RotaRastreada(APIRoute):
+    """route_class dos routers: cada função de rota vira um span 'rota.<nome>'."""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, rastrear(f"rota.{endpoint.__name__}")(endpoint), **kwargs)
+
+
+# ==============================================================================
+# SQL (eventos do engine)
+# ==============================================================================
+def instrumentar_engine(engine):
+    """Um span por comando SQL. Chamado por app/database.py."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        aberto, token = abrir_span("sql", comando=" ".join(statement.split())[:300], em_lote=executemany)
+        conn.info.setdefault("rastreamento_spans", []).append((aberto, token))
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _depois(conn, cursor, statement, parameters, context, executemany):
+        aberto, token = conn.info["rastreamento_spans"].pop()
+        if aberto is not None and cursor.rowcount is not None and cursor.rowcount >= 0:
+            aberto.atributos["linhas"] = cursor.rowcount
+        fechar_span(aberto, token)
+
+    @event.listens_for(engine, "handle_error")
+    def _erro(contexto):
+        conn = contexto.connection
+        if conn is not None and conn.info.get("rastreamento_spans"):
+            aberto, token = conn.info["rastreamento_spans"].pop()
+            fechar_span(aberto, token, contexto.original_exception)
+
+
+# ==============================================================================
+# EXPORTAÇÃO (arquivo local)
+# ==============================================================================
+def configurar_exportador():
+    """Logger dedicado: fila + thread de escrita + rotação por tamanho."""
+    global _listener
+    if _listener is not None:
+        return
+    caminho = settings.RASTREAMENTO_ARQUIVO
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    arquivo = RotatingFileHandler(
+        caminho,
+        maxBytes=settings.RASTREAMENTO_TAMANHO_MAX,
+        backupCount=settings.RASTREAMENTO_BACKUPS,
+        encoding="utf-8",
+    )
+    arquivo.setFormatter(logging.Formatter("%(message)s"))
+    fila = queue.Queue(maxsize=settings.LOG_FILA_MAX)
+    logger_rastros.handlers.clear()
+    logger_rastros.addHandler(QueueHandlerSemBloqueio(fila))
+    logger_rastros.setLevel(logging.INFO)
+    logger_rastros.propagate = False
+    _listener = QueueListener(fila, arquivo)
+    _listener.start()
+
+
+def exportar(trace: Trace):
+    for registro in trace.spans:
+        logger_rastros.info(json.dumps(registro, ensure_ascii=False, default=str))
+
+
+# ==============================================================================
+# MIDDLEWARE HTTP
+# ==============================================================================
+class RastreamentoMiddleware:
+    """Middleware ASGI puro: abre o span raiz e decide se o trace é gravado."""
+
+    def __init__(self, app):
+        self.app = app
+        configurar_exportador()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        pai = _TRACEPARENT.match(headers.get(b"traceparent", b"").decode("latin-1"))
+        if pai:
+            trace = Trace(pai.group(1), amostrado=bool(int(pai.group(3), 16) & 1))
+            pai_id = pai.group(2)
+        else:
+            trace = Trace(_novo_id(16), amostrado=random.random() < settings.RASTREAMENTO_AMOSTRAGEM)
+            pai_id = None
+
+        raiz = Span(trace, f"HTTP {scope['method']}", pai_id, {"http.caminho": scope.get("path")})
+        token = _span_atual.set(raiz)
+        resposta = {"status": 500}
+
+        async def send_com_trace(mensagem):
+            if mensagem["type"] == "http.response.start":
+                resposta["status"] = mensagem["status"]
+                headers_resposta = list(mensagem.get("headers", []))
+                headers_resposta.append((b"x-trace-id", trace.trace_id.encode()))
+                mensagem = {**mensagem, "headers": headers_resposta}
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receive, send_com_trace)
+        finally:
+            _span_atual.reset(token)
+            rota = getattr(scope.get("route"), "path", None) or "desconhecida"
+            raiz.nome = f"HTTP {scope['method']} {rota}"
+            raiz.atributos["http.status"] = resposta["status"]
+            if resposta["status"] >= 500:
+                raiz.status = "erro"
+            raiz.encerrar()
+
+            lenta = 0 < settings.RASTREAMENTO_LENTAS_MS <= raiz.duracao_ms
+            if trace.amostrado or lenta or raiz.status == "erro":
+                exportar(trace)
@@ -0,0 +1,100 @@
+"""
+Migrações do esquema (DDL para bancos já existentes)
+Arquivo: backend/app/migracoes.py
+
+OBJETIVO:
+'Base.metadata.create_all' só cria as tabelas que ainda não existem: colunas
+e índices novos em tabelas antigas nunca chegam a um banco já em uso (e toda
+consulta ao modelo falha com "column does not exist").
+
+COMO FUNCIONA:
+- MIGRACOES é uma lista numerada; cada uma roda uma única vez e fica
+  registrada na tabela 'migracoes_aplicadas'.
+- Cada passo confere o catálogo antes (coluna/índice já existe = nada a
+  fazer), então um banco novo, criado pelo create_all, também passa por elas.
+- No PostgreSQL, uma trava consultiva (pg_advisory_xact_lock) serializa
+  execuções simultâneas.
+
+Aplicadas por 'python migrar_banco.py'.
+"""
+
+import logging
+from datetime import datetime
+from typing import Callable, List, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+logger = logging.getLogger(__name__)
+
+# Chave da trava consultiva do PostgreSQL (qualquer número fixo do projeto)
+TRAVA_MIGRACOES = 20260121
+
+
+def _adicionar_coluna(conexao: Connection, tabela: str, coluna: str, tipo: str):
+    if coluna not in {c["name"] for c in inspect(conexao).get_columns(tabela)}:
+        conexao.execute(text(f"ALTER TABLE {tabela} ADD COLUMN {coluna} {tipo}"))
+
+
+def _criar_indice(conexao: Connection, nome: str, tabela: str, colunas: str):
+    conexao.execute(text(f"CREATE INDEX IF NOT EXISTS {nome} ON {tabela} ({colunas})"))
+
+
+# ==============================================================================
+# MIGRAÇÕES (só acrescentar no fim; nunca renumerar)
+# ==============================================================================
+def _m001_prazos_protocolos(conexao: Connection):
+    """Alertas de prazo (SLA) do agendador de prazos."""
+    _adicionar_coluna(conexao, "protocolos", "situacao_prazo", "VARCHAR(20)")
+    _adicionar_coluna(conexao, "protocolos", "data_alerta_prazo", "TIMESTAMP WITH TIME ZONE")
+    _criar_indice(conexao, "ix_protocolos_prazo", "protocolos", "data_expiracao, situacao_prazo")
+
+
+def _m002_data_gravacao(conexao: Connection):
+    """Dados abertos: linhas gravadas depois de publicado o dia da sua data_criacao."""
+    for tabela in ("manifestacoes", "movimentacoes"):
+        # Sem DEFAULT no ADD COLUMN: as linhas antigas ficam nulas (já publicadas
+        # pela data_criacao) em vez de todas caírem na partição de hoje
+        _adicionar_coluna(conexao, tabela, "data_gravacao", "TIMESTAMP WITH TIME ZONE")
+        if conexao.dialect.name == "postgresql":
+            conexao.execute(text(f"ALTER TABLE {tabela} ALTER COLUMN data_gravacao SET DEFAULT now()"))
+        _criar_indice(conexao, f"ix_{tabela}_data_gravacao", tabela, "data_gravacao")
+
+
+def _m003_indices_datas(conexao: Connection):
+    """Dados abertos: a consulta do dia filtra por data_criacao/data_atualizacao."""
+    _criar_indice(conexao, "ix_manifestacoes_data_criacao", "manifestacoes", "data_criacao")
+    _criar_indice(conexao, "ix_manifestacoes_data_atualizacao", "manifestacoes", "data_atualizacao")
+    _criar_indice(conexao, "ix_movimentacoes_data_criacao", "movimentacoes", "data_criacao")
+
+
+MIGRACOES: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "prazos_protocolos", _m001_prazos_protocolos),
+    (2, "data_gravacao", _m002_data_gravacao),
+    (3, "indices_datas", _m003_indices_datas),
+]
+
+
+def aplicar_migracoes(engine: Engine) -> List[str]:
+    """Aplica as migrações pendentes numa transação; retorna os nomes aplicados."""
+    aplicadas = []
+    with engine.begin() as conexao:
+        if conexao.dialect.name == "postgresql":
+            conexao.execute(text("SELECT pg_advisory_xact_lock(:chave)"), {"chave": TRAVA_MIGRACOES})
+        conexao.execute(text(
+            "CREATE TABLE IF NOT EXISTS migracoes_aplicadas ("
+            "numero INTEGER PRIMARY KEY, nome VARCHAR(100) NOT NULL, aplicada_em TIMESTAMP NOT NULL)"
+        ))
+        feitas = set(conexao.execute(text("SELECT numero FROM migracoes_aplicadas")).scalars())
+        for numero, nome, migrar in MIGRACOES:
+            if numero in feitas:
+                continue
+            migrar(conexao)
+            conexao.execute(
+                text("INSERT INTO migracoes_aplicadas (numero, nome, aplicada_em) VALUES (:numero, :nome, :agora)"),
+                {"numero": numero, "nome": nome, "agora": datetime.now()},
+            )
+            aplicadas.append(nome)
+    if aplicadas:
+        logger.info("Migrações aplicadas: %s", ", ".join(aplicadas))
+    return aplicadas
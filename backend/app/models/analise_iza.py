@@ -0,0 +1,28 @@
+"""
+AnaliseIza model - SQLAlchemy ORM
+"""
+
+from sqlalchemy import Column, String, DateTime, JSON
+from app.models import Base
+
+
+class AnaliseIza(Base):
+    """
+    Resposta da IZA para um texto, guardada pelo hash do conteúdo.
+
+    Finalidade:
+    - Cache entre processos e reinícios: o mesmo relato (reenvio, importação,
+      nova tentativa de uma tarefa) não é analisado duas vezes.
+    - A análise de uma manifestação é encontrada pelo hash do seu relato.
+
+    Ver app/integrations/iza.py.
+    """
+    __tablename__ = "analises_iza"
+
+    # sha256 de (IZA_VERSAO_CACHE, texto normalizado)
+    hash_conteudo = Column(String(64), primary_key=True)
+    resultado = Column(JSON, nullable=False)
+    criado_em = Column(DateTime, nullable=False)  # vale por IZA_CACHE_DIAS
+
+    def __repr__(self):
+        return f"<AnaliseIza(hash={self.hash_conteudo[:12]})>"
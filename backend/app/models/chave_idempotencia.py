@@ -0,0 +1,42 @@
+"""
+ChaveIdempotencia model - SQLAlchemy ORM
+"""
+
+from sqlalchemy import Column, String, DateTime, Integer, Text
+from app.models import Base
+
+
+class ChaveIdempotencia(Base):
+    """
+    Resposta guardada de um envio com cabeçalho Idempotency-Key.
+
+    Finalidade:
+    - Repetições do mesmo envio (app móvel tentando de novo após timeout)
+      recebem a resposta original em vez de criar outra manifestação.
+    - A inserção da linha é a "trava" entre workers: só quem insere executa.
+
+    Ver app/middleware/idempotencia.py.
+    """
+    __tablename__ = "chaves_idempotencia"
+
+    # sha256 de (usuário, rota, Idempotency-Key)
+    chave = Column(String(64), primary_key=True)
+
+    # 'em_andamento' enquanto a requisição original executa; depois 'concluida'
+    situacao = Column(String(20), nullable=False)
+
+    # sha256 do corpo enviado (sem o boundary do multipart): a mesma chave com
+    # outro conteúdo é erro do cliente
+    impressao = Column(String(64), nullable=True)
+
+    # Resposta original
+    status_http = Column(Integer, nullable=True)
+    tipo_conteudo = Column(String(100), nullable=True)
+    corpo = Column(Text, nullable=True)
+
+    criado_em = Column(DateTime, nullable=False)
+    # Em andamento: prazo da reserva (queda do worker); concluída: fim do TTL
+    expira_em = Column(DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<ChaveIdempotencia(chave={self.chave[:12]}, situacao={self.situacao})>"
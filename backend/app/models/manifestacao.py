@@ -47,10 +47,13 @@ class Manifestacao(Base):
     anonimo = Column(Boolean, default=False)
     status = Column(Enum(StatusManifestacao), default=StatusManifestacao.PENDENTE)
     
-    # Rastreamento
-    data_criacao = Column(DateTime(timezone=True), server_default=func.now())
-    data_atualizacao = Column(DateTime(timezone=True), onupdate=func.now())
+    # Rastreamento (indexadas: usadas como marca d'água dos dados abertos)
+    data_criacao = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    data_atualizacao = Column(DateTime(timezone=True), onupdate=func.now(), index=True)
     data_conclusao = Column(DateTime(timezone=True), nullable=True)
+    # Quando a linha chegou ao banco (diferente de data_criacao na importação em
+    # massa e na regravação do diário): dados abertos publicam as que chegam atrasadas
+    data_gravacao = Column(DateTime(timezone=True), server_default=func.now(), index=True)
 
     # Relacionamentos
     assunto_id = Column(String(36), ForeignKey("assuntos.id"), nullable=False)
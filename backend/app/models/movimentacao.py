@@ -32,7 +32,10 @@ class Movimentacao(Base):
     interno = Column(Boolean, default=False)
     
     # Data e Hora que a mensagem foi criada (automático pelo banco)
-    data_criacao = Column(DateTime(timezone=True), server_default=func.now())
+    # Indexada para as consultas por período (notificações e dados abertos)
+    data_criacao = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    # Quando a linha chegou ao banco (a importação em massa grava datas passadas)
+    data_gravacao = Column(DateTime(timezone=True), server_default=func.now(), index=True)
 
     # ==========================================================================
     # CHAVES ESTRANGEIRAS (Os "Links" do Banco de Dados)
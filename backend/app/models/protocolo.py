@@ -2,7 +2,7 @@
 Protocolo model - SQLAlchemy ORM
 """
 
-from sqlalchemy import Column, String, DateTime, Integer, ForeignKey
+from sqlalchemy import Column, String, DateTime, Integer, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.models import Base
@@ -17,15 +17,23 @@ class Protocolo(Base):
     - Controlar prazos (SLA) de resposta.
     - Manter auditoria sequencial diária.
     
-    Formato do Número: OUVIDORIA-YYYYMMDD-XXXXXX
+    Formato do Número: OUVIDORIA-YYYYMMDD-XXXXXXD
+    (D = dígito verificador, ver app/services/protocolo_service.py;
+    números antigos, sem D, continuam válidos)
     """
     __tablename__ = "protocolos"
 
+    # Índice usado pelo agendador de prazos para varrer apenas os protocolos
+    # próximos do vencimento (evita full scan na tabela inteira)
+    __table_args__ = (
+        Index("ix_protocolos_prazo", "data_expiracao", "situacao_prazo"),
+    )
+
     # ==========================================================================
     # IDENTIFICADORES
     # ==========================================================================
     # O próprio número do protocolo é a chave primária
-    numero = Column(String(50), primary_key=True, index=True, comment="Ex: OUVIDORIA-20260121-A1B2C3")
+    numero = Column(String(50), primary_key=True, index=True, comment="Ex: OUVIDORIA-20260121-A1B2C3K")
     
     # Chave estrangeira ligando à tabela de manifestações
     # Garante que todo protocolo pertença a uma manifestação real
@@ -47,6 +55,14 @@ class Protocolo(Base):
     # Data limite para resposta (Calculado: data_geracao + dias de prazo legal)
     data_expiracao = Column(DateTime(timezone=True), nullable=True)
 
+    # ==========================================================================
+    # ALERTAS DE PRAZO (SLA)
+    # ==========================================================================
+    # Preenchidos pelo agendador de prazos (app/services/prazo_service.py)
+    # Valores: None (sem alerta), 'a_vencer' ou 'vencido'
+    situacao_prazo = Column(String(20), nullable=True)
+    data_alerta_prazo = Column(DateTime(timezone=True), nullable=True)
+
     # ==========================================================================
     # RELACIONAMENTOS (ORM)
     # ==========================================================================
@@ -0,0 +1,47 @@
+"""
+Tarefa model (outbox) - SQLAlchemy ORM
+"""
+
+from sqlalchemy import Column, String, DateTime, Integer, Text, JSON, Index
+from app.models import Base
+
+
+class Tarefa(Base):
+    """
+    Efeito colateral a executar fora da requisição (notificações etc.).
+
+    Finalidade:
+    - Gravada na MESMA transação da mudança que a originou (outbox): se a
+      manifestação/resposta foi gravada, a tarefa também foi, e vice-versa.
+    - Executada pelos processos de 'python trabalhador_tarefas.py', que
+      reservam lotes com FOR UPDATE SKIP LOCKED (PostgreSQL).
+
+    Ver app/services/tarefa_service.py.
+    """
+    __tablename__ = "tarefas"
+
+    # Índice da fila: próximas tarefas disponíveis, em ordem
+    __table_args__ = (
+        Index("ix_tarefas_fila", "situacao", "disponivel_em"),
+    )
+
+    id = Column(String(36), primary_key=True)
+    tipo = Column(String(50), nullable=False)  # chave em MANIPULADORES
+    dados = Column(JSON, nullable=False)
+
+    # ==========================================================================
+    # CONTROLE DA FILA
+    # ==========================================================================
+    # Valores: 'pendente', 'em_execucao', 'concluida', 'falhou' (esgotou as tentativas)
+    situacao = Column(String(20), nullable=False, default="pendente")
+    tentativas = Column(Integer, nullable=False, default=0)
+    disponivel_em = Column(DateTime, nullable=False)  # adiada pelo backoff entre tentativas
+    executor = Column(String(100), nullable=True)  # processo que reservou
+    ultimo_erro = Column(Text, nullable=True)
+
+    criado_em = Column(DateTime, nullable=False)
+    iniciado_em = Column(DateTime, nullable=True)
+    concluido_em = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<Tarefa(tipo={self.tipo}, situacao={self.situacao}, tentativas={self.tentativas})>"
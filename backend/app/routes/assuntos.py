@@ -3,38 +3,50 @@ from uuid import uuid4
 from fastapi import APIRouter, Depends, HTTPException, status, Body
 from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app.database import get_db, SessionLocal
+from app.middleware.compartimentos import compartimento
+from app.middleware.rastreamento import RotaRastreada
 from app.models.assunto import Assunto
 from app.schemas.assunto import AssuntoResponse, AssuntoListResponse, AssuntoCreate, AssuntoUpdate
+from app.services.cache_service import caches
 
 router = APIRouter(
     prefix="/api/assuntos",
-    tags=["Assuntos"]
+    tags=["Assuntos"],
+    route_class=RotaRastreada
 )
 
 # ==============================================================================
 # LISTAR (GET)
 # ==============================================================================
-@router.get("/", response_model=AssuntoListResponse)
-def listar_assuntos(
-    apenas_ativos: bool = True, 
-    db: Session = Depends(get_db)
-):
-    query = db.query(Assunto)
-    if apenas_ativos:
-        query = query.filter(Assunto.ativo == True)
-    
-    lista = query.order_by(Assunto.nome.asc()).all()
-    
-    return {
-        "total": len(lista),
-        "assuntos": lista
-    }
+def _calcular_lista(apenas_ativos: bool):
+    """Catálogo serializado (roda fora da requisição quando revalidado)."""
+    db = SessionLocal()
+    try:
+        query = db.query(Assunto)
+        if apenas_ativos:
+            query = query.filter(Assunto.ativo == True)
+        lista = query.order_by(Assunto.nome.asc()).all()
+        return {
+            "total": len(lista),
+            "assuntos": [AssuntoResponse.model_validate(a).model_dump(mode="json") for a in lista]
+        }
+    finally:
+        db.close()
+
+
+@router.get("/", response_model=AssuntoListResponse, dependencies=[Depends(compartimento("leituras"))])
+def listar_assuntos(apenas_ativos: bool = True):
+    # Catálogo lido em todo formulário: cache coalescido, invalidado nas alterações
+    return caches["assuntos"].obter(
+        "ativos" if apenas_ativos else "todos",
+        lambda: _calcular_lista(apenas_ativos),
+    )
 
 # ==============================================================================
 # OBTER UM (GET)
 # ==============================================================================
-@router.get("/{assunto_id}", response_model=AssuntoResponse)
+@router.get("/{assunto_id}", response_model=AssuntoResponse, dependencies=[Depends(compartimento("leituras"))])
 def obter_assunto(assunto_id: str, db: Session = Depends(get_db)):
     assunto = db.query(Assunto).filter(Assunto.id == assunto_id).first()
     if not assunto:
@@ -44,7 +56,7 @@ def obter_assunto(assunto_id: str, db: Session = Depends(get_db)):
 # ==============================================================================
 # CRIAR (POST)
 # ==============================================================================
-@router.post("/", response_model=AssuntoResponse, status_code=201)
+@router.post("/", response_model=AssuntoResponse, status_code=201, dependencies=[Depends(compartimento("admin"))])
 def criar_assunto(
     dados: AssuntoCreate, 
     db: Session = Depends(get_db)
@@ -65,12 +77,13 @@ def criar_assunto(
     db.add(novo_assunto)
     db.commit()
     db.refresh(novo_assunto)
+    caches["assuntos"].invalidar()
     return novo_assunto
 
 # ==============================================================================
 # ATUALIZAR (PUT)
 # ==============================================================================
-@router.put("/{assunto_id}", response_model=AssuntoResponse)
+@router.put("/{assunto_id}", response_model=AssuntoResponse, dependencies=[Depends(compartimento("admin"))])
 def atualizar_assunto(
     assunto_id: str,
     dados: AssuntoUpdate,
@@ -100,12 +113,13 @@ def atualizar_assunto(
     db.add(assunto)
     db.commit()
     db.refresh(assunto)
+    caches["assuntos"].invalidar()
     return assunto
 
 # ==============================================================================
 # DELETAR (DELETE)
 # ==============================================================================
-@router.delete("/{assunto_id}", status_code=204)
+@router.delete("/{assunto_id}", status_code=204, dependencies=[Depends(compartimento("admin"))])
 def deletar_assunto(assunto_id: str, db: Session = Depends(get_db)):
     assunto = db.query(Assunto).filter(Assunto.id == assunto_id).first()
     if not assunto:
@@ -117,4 +131,5 @@ def deletar_assunto(assunto_id: str, db: Session = Depends(get_db)):
     
     db.delete(assunto)
     db.commit()
+    caches["assuntos"].invalidar()
     return None
\ No newline at end of file
@@ -6,23 +6,25 @@ from typing import Optional, Any
 from fastapi import APIRouter, Depends, HTTPException, status, Form
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
 from sqlalchemy.orm import Session
-from jose import jwt, JWTError
-from passlib.context import CryptContext
 
 from app.database import get_db
+from app.middleware.compartimentos import compartimento
+from app.middleware.limite_taxa import limitar_taxa, cpf_do_formulario, email_do_formulario
+from app.middleware.rastreamento import RotaRastreada
 from app.config import settings
 from app.services.auth_service import AuthService
+from app.services.tarefa_service import TarefaService
 from app.schemas.usuario import UsuarioCreate, UsuarioResponse, Token, UsuarioLogin, UsuarioUpdate
 from app.models.usuario import Usuario 
 
-logger = logging.getLogger("uvicorn")
-pwd_context = CryptContext(schemes=["sha256_crypt"], deprecated="auto")
+logger = logging.getLogger(__name__)
 
 FUSO_BRASIL = timezone(timedelta(hours=-3))
 
 router = APIRouter(
     prefix="/api/auth",
-    tags=["Autenticação"]
+    tags=["Autenticação"],
+    route_class=RotaRastreada
 )
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
@@ -36,12 +38,9 @@ def get_current_user(
         detail="Não foi possível validar as credenciais",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-    except JWTError:
+    payload = AuthService.decodificar_token(token)
+    email: str = payload.get("sub") if payload else None
+    if email is None:
         raise credentials_exception
     
     user = db.query(Usuario).filter(Usuario.email == email).first()
@@ -50,7 +49,7 @@ def get_current_user(
         
     return user
 
-@router.post("/registrar", response_model=UsuarioResponse, status_code=201)
+@router.post("/registrar", response_model=UsuarioResponse, status_code=201, dependencies=[Depends(compartimento("autenticacao"))])
 def registrar_usuario(
     nome: str = Form(...),
     email: str = Form(...),
@@ -76,7 +75,14 @@ def registrar_usuario(
     
     return novo_user
 
-@router.post("/login", response_model=Token)
+@router.post(
+    "/login",
+    response_model=Token,
+    dependencies=[
+        Depends(limitar_taxa("login", usuario=cpf_do_formulario)),
+        Depends(compartimento("autenticacao")),
+    ],
+)
 def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     cpf_limpo = form_data.username.replace(".", "").replace("-", "")
     
@@ -113,7 +119,7 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
     
     return {"access_token": token_acesso, "token_type": "bearer"}
 
-@router.post("/marcar-lido")
+@router.post("/marcar-lido", dependencies=[Depends(compartimento("escritas"))])
 def marcar_notificacoes_lidas(
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_user)
@@ -127,7 +133,7 @@ def marcar_notificacoes_lidas(
     db.commit()
     return {"status": "ok", "mensagem": "Notificações zeradas"}
 
-@router.put("/atualizar-perfil", response_model=UsuarioResponse)
+@router.put("/atualizar-perfil", response_model=UsuarioResponse, dependencies=[Depends(compartimento("escritas"))])
 def atualizar_meu_perfil(
     dados: UsuarioUpdate,
     current_user: Usuario = Depends(get_current_user),
@@ -142,7 +148,13 @@ def atualizar_meu_perfil(
     
     return current_user
 
-@router.post("/esqueci-senha")
+@router.post(
+    "/esqueci-senha",
+    dependencies=[
+        Depends(limitar_taxa("recuperar_senha", usuario=email_do_formulario)),
+        Depends(compartimento("autenticacao")),
+    ],
+)
 def solicitar_recuperacao_senha(
     email: str = Form(...), 
     db: Session = Depends(get_db)
@@ -152,31 +164,25 @@ def solicitar_recuperacao_senha(
     if not usuario:
         return {"mensagem": "Se o e-mail existir, enviamos um link."}
 
-    expiracao = datetime.utcnow() + timedelta(hours=24)
-    dados_token = {
-        "sub": usuario.email, 
-        "tipo": "reset_senha",
-        "exp": expiracao
-    }
-    
-    token_reset = jwt.encode(dados_token, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-    link = f"http://localhost:3000/redefinir-senha?token={token_reset}"
-    
-    print(f"\nLINK DE RECUPERAÇÃO: {link}\n", flush=True)
+    # Entrega fora da requisição (outbox): o trabalhador de tarefas gera e envia o link
+    TarefaService.enfileirar(db, "recuperar_senha", {"usuario_id": usuario.id})
+    db.commit()
+    logger.info("Recuperação de senha solicitada para o usuário %s", usuario.id)
 
-    return {
-        "mensagem": "Link gerado com sucesso!", 
-        "debug_link_autorizado": link 
-    }
+    resposta = {"mensagem": "Se o e-mail existir, enviamos um link."}
+    # O link contém o token: só volta na resposta em modo de desenvolvimento
+    if settings.DEBUG:
+        resposta["debug_link_autorizado"] = AuthService.link_recuperacao_senha(usuario.email)
+    return resposta
 
-@router.post("/redefinir-senha")
+@router.post("/redefinir-senha", dependencies=[Depends(compartimento("autenticacao"))])
 def redefinir_senha(
     token: str = Form(...),
     nova_senha: str = Form(...),
     db: Session = Depends(get_db)
 ):
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = AuthService.decodificar_token(token) or {}
         email: str = payload.get("sub")
         tipo: str = payload.get("tipo")
         
@@ -189,7 +195,7 @@ def redefinir_senha(
 
         AuthService.validar_senha(nova_senha)
 
-        usuario.senha_hash = pwd_context.hash(nova_senha)
+        usuario.senha_hash = AuthService.gerar_hash_senha(nova_senha)
         db.add(usuario)
         db.commit()
         
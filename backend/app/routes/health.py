@@ -3,6 +3,9 @@ Rotas de Health Check
 """
 
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app.services.saude_service import verificador_prontidao
 
 # ==============================================================================
 # CONFIGURAÇÃO DO ROTA
@@ -27,4 +30,28 @@ async def health_check():
         "status": "healthy",
         "service": "Participa-DF API",
         "version": "1.0.0",
-    }
\ No newline at end of file
+    }
+
+# ==============================================================================
+# ROTA: LIVENESS (GET)
+# ==============================================================================
+@router.get("/health/live")
+async def liveness():
+    """
+    O processo está vivo? (não consulta dependências: se falhar, reinicie o worker)
+    """
+    return {"status": "alive"}
+
+
+# ==============================================================================
+# ROTA: READINESS (GET)
+# ==============================================================================
+@router.get("/health/ready")
+async def readiness():
+    """
+    O worker pode receber tráfego? Banco, Redis, disco de uploads e threadpool.
+    Responde 503 quando não, para o balanceador tirar o worker da rotação.
+    """
+    # async: lê o cache sem ocupar uma thread do threadpool
+    estado = verificador_prontidao.estado()
+    return JSONResponse(estado, status_code=200 if estado["status"] == "ready" else 503)
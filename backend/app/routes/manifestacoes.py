@@ -6,29 +6,40 @@ Arquivo: backend/app/routes/manifestacoes.py
 import os
 import shutil
 import json
+import time
 from uuid import uuid4
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Form, File, UploadFile
+from datetime import date
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Form, File, UploadFile, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app.database import get_db, SessionLocal
+from app.middleware.compartimentos import compartimento
+from app.middleware.limite_taxa import limitar_taxa
+from app.middleware.rastreamento import RotaRastreada, span
 from app.services.manifestacao_service import ManifestacaoService 
+from app.services.protocolo_service import ProtocoloService
+from app.services.exportacao_service import ExportacaoService
+from app.services.cache_service import caches
+from app.services.ingestao_service import diario_ingestao, assunto_existe, FilaIngestaoCheia
 from app.schemas.manifestacao import (
     ManifestacaoCreate,
     ManifestacaoResponse,
     ManifestacaoListResponse,
-    ClassificacaoManifestacaoSchema
+    ClassificacaoManifestacaoSchema,
+    StatusManifestacaoSchema
 )
 from app.routes.auth import get_current_user 
+from app.middleware.metricas import UPLOAD_BYTES, UPLOAD_DURACAO
 
 router = APIRouter(
     prefix="/api/manifestacoes",
-    tags=["Manifestações"]
+    tags=["Manifestações"],
+    route_class=RotaRastreada
 )
 
 UPLOAD_DIR = "uploads"
-if not os.path.exists(UPLOAD_DIR):
-    os.makedirs(UPLOAD_DIR)
 
 # ==============================================================================
 # ROTA: CRIAR MANIFESTAÇÃO (POST)
@@ -36,9 +47,11 @@ if not os.path.exists(UPLOAD_DIR):
 @router.post(
     "/", 
     response_model=ManifestacaoResponse, 
-    status_code=status.HTTP_201_CREATED
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(compartimento("uploads"))],
 )
 def criar_manifestacao(
+    response: Response,
     relato: str = Form(..., min_length=10),
     assunto_id: str = Form(...),
     classificacao: ClassificacaoManifestacaoSchema = Form(ClassificacaoManifestacaoSchema.RECLAMACAO),
@@ -64,16 +77,25 @@ def criar_manifestacao(
     except ValueError as e:
         raise HTTPException(status_code=422, detail=str(e))
 
+    # Modo diário: o banco só vê o registro no próximo lote, então o assunto é validado aqui
+    if diario_ingestao.ativo and not assunto_existe(assunto_id):
+        raise HTTPException(status_code=422, detail="Assunto não encontrado.")
+
     arquivos_processados = []
     if arquivos:
         try:
+            # Criada aqui (e no lifespan), não na importação do módulo
+            os.makedirs(UPLOAD_DIR, exist_ok=True)
             for arquivo in arquivos:
                 nome_unico = f"{uuid4()}_{arquivo.filename}"
                 caminho_completo = os.path.join(UPLOAD_DIR, nome_unico)
-                with open(caminho_completo, "wb") as buffer:
+                inicio = time.perf_counter()
+                with span("arquivo.gravar", arquivo=nome_unico), open(caminho_completo, "wb") as buffer:
                     shutil.copyfileobj(arquivo.file, buffer)
                 
                 tamanho_bytes = os.path.getsize(caminho_completo)
+                UPLOAD_DURACAO.observe(time.perf_counter() - inicio)
+                UPLOAD_BYTES.observe(tamanho_bytes)
                 arquivos_processados.append({
                     "caminho": caminho_completo,
                     "tipo": arquivo.content_type,
@@ -82,9 +104,39 @@ def criar_manifestacao(
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Erro no upload: {str(e)}")
 
-    try:
-        usuario_id = str(current_user.id) if not anonimo else None # Usar None para manifestações anônimas'
+    usuario_id = str(current_user.id) if not anonimo else None # Usar None para manifestações anônimas'
+
+    # --------------------------------------------------------------------------
+    # INGESTÃO EM RAJADA: grava no diário e responde 202 com o protocolo
+    # --------------------------------------------------------------------------
+    if diario_ingestao.ativo:
+        registro = ManifestacaoService.montar_registro(manifestacao_validada, usuario_id, arquivos_processados)
+        try:
+            diario_ingestao.enfileirar(registro)
+        except FilaIngestaoCheia:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Serviço sobrecarregado. Tente novamente em instantes.",
+                headers={"Retry-After": "1"},
+            )
+        response.status_code = status.HTTP_202_ACCEPTED
+        return {
+            **registro,
+            "status": "pendente",
+            "data_atualizacao": None,
+            "anexos": [
+                {
+                    "id": arq["id"],
+                    "arquivo_url": arq["caminho"],
+                    "tipo_arquivo": arq["tipo"],
+                    "tamanho": arq["tamanho"],
+                    "data_upload": registro["data_criacao"],
+                }
+                for arq in registro["anexos"]
+            ],
+        }
 
+    try:
         nova_manifestacao = ManifestacaoService.criar_manifestacao(
             db=db,
             manifestacao_data=manifestacao_validada,
@@ -100,7 +152,7 @@ def criar_manifestacao(
 # ==============================================================================
 # ROTA: LISTAR MANIFESTAÇÕES (GET)
 # ==============================================================================
-@router.get("/", response_model=ManifestacaoListResponse)
+@router.get("/", response_model=ManifestacaoListResponse, dependencies=[Depends(compartimento("leituras"))])
 def listar_manifestacoes(
     skip: int = Query(0),
     limit: int = Query(10),
@@ -126,7 +178,24 @@ def listar_manifestacoes(
 # ==============================================================================
 # ROTA: CONSULTAR POR PROTOCOLO (GET)
 # ==============================================================================
-@router.get("/{protocolo}", response_model=ManifestacaoResponse)
+def protocolo_pode_existir(protocolo: str):
+    """
+    404 para número impossível (dígito, data, filtro) antes de abrir a sessão:
+    as dependências da rota são resolvidas antes das do endpoint (get_db).
+    """
+    if not ProtocoloService.pode_existir(protocolo):
+        raise HTTPException(status_code=404, detail="Manifestação não encontrada")
+
+
+@router.get(
+    "/{protocolo}",
+    response_model=ManifestacaoResponse,
+    dependencies=[
+        Depends(limitar_taxa("consulta_protocolo")),
+        Depends(compartimento("leituras")),
+        Depends(protocolo_pode_existir),
+    ],
+)
 def consultar_manifestacao(
     protocolo: str, 
     db: Session = Depends(get_db),
@@ -141,21 +210,115 @@ def consultar_manifestacao(
 # ==============================================================================
 # ROTA ADMIN: LISTAGEM COMPLETA
 # ==============================================================================
-@router.get("/admin/todas", response_model=ManifestacaoListResponse)
+def filtros_caixa_entrada(
+    status: Optional[StatusManifestacaoSchema] = Query(None),
+    assunto_id: Optional[str] = Query(None),
+    classificacao: Optional[ClassificacaoManifestacaoSchema] = Query(None),
+    data_inicio: Optional[date] = Query(None, description="Criadas a partir de (AAAA-MM-DD)"),
+    data_fim: Optional[date] = Query(None, description="Criadas até (AAAA-MM-DD)"),
+) -> dict:
+    """Filtros compartilhados entre a caixa de entrada do admin e a exportação."""
+    return {
+        "status": status.value if status else None,
+        "assunto_id": assunto_id,
+        "classificacao": classificacao.value if classificacao else None,
+        "data_inicio": data_inicio,
+        "data_fim": data_fim,
+    }
+
+
+@router.get("/admin/todas", response_model=ManifestacaoListResponse, dependencies=[Depends(compartimento("admin"))])
 def listar_todas_admin(
     skip: int = Query(0),
     limit: int = Query(50),
+    filtros: dict = Depends(filtros_caixa_entrada),
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
     if not current_user.admin:
         raise HTTPException(status_code=403, detail="Acesso restrito.")
 
-    lista, total = ManifestacaoService.listar_manifestacoes(db, skip, limit)
+    lista, total = ManifestacaoService.listar_manifestacoes(db, skip, limit, **filtros)
     
     return {
         "total": total,
         "skip": skip,
         "limit": limit,
         "manifestacoes": lista
-    }
\ No newline at end of file
+    }
+
+# ==============================================================================
+# ROTA ADMIN: ESTATÍSTICAS DO PAINEL
+# ==============================================================================
+def _calcular_estatisticas():
+    db = SessionLocal()
+    try:
+        return ManifestacaoService.estatisticas(db)
+    finally:
+        db.close()
+
+
+@router.get("/admin/estatisticas", dependencies=[Depends(compartimento("admin"))])
+def estatisticas_admin(current_user = Depends(get_current_user)):
+    """
+    Totais do painel. Vários admins com o painel aberto compartilham um único
+    cálculo (cache coalescido); 'gerado_em' mostra a idade dos números.
+    """
+    if not current_user.admin:
+        raise HTTPException(status_code=403, detail="Acesso restrito.")
+
+    return caches["estatisticas"].obter("painel", _calcular_estatisticas)
+
+# ==============================================================================
+# ROTA ADMIN: ANÁLISE DA IZA
+# ==============================================================================
+@router.get("/admin/{manifestacao_id}/analise-iza", dependencies=[Depends(compartimento("admin"))])
+def analise_iza_admin(
+    manifestacao_id: str,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Resultado da análise da IZA (feita em segundo plano; 404 enquanto não existe)."""
+    if not current_user.admin:
+        raise HTTPException(status_code=403, detail="Acesso restrito.")
+
+    analise = ManifestacaoService.analise_iza(db, manifestacao_id)
+    if analise is None:
+        raise HTTPException(status_code=404, detail="Análise da IZA não disponível.")
+    return analise
+
+# ==============================================================================
+# ROTA ADMIN: EXPORTAÇÃO EM MASSA (STREAMING)
+# ==============================================================================
+@router.get("/admin/exportar", dependencies=[Depends(compartimento("admin"))])
+def exportar_manifestacoes(
+    formato: str = Query("csv", description="csv, jsonl ou parquet"),
+    filtros: dict = Depends(filtros_caixa_entrada),
+    current_user = Depends(get_current_user)
+):
+    """
+    Exporta as manifestações filtradas em streaming (memória constante).
+    CSV e JSONL saem compactados com gzip.
+    """
+    if not current_user.admin:
+        raise HTTPException(status_code=403, detail="Acesso restrito.")
+
+    try:
+        formato = ExportacaoService.validar_formato(formato)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def gerar():
+        # Sessão própria: precisa continuar aberta enquanto a resposta é enviada
+        db = SessionLocal()
+        try:
+            yield from ExportacaoService.gerar_arquivo(db, formato, filtros)
+        finally:
+            db.close()
+
+    nome_arquivo = ExportacaoService.nome_arquivo(formato)
+    return StreamingResponse(
+        gerar(),
+        media_type=ExportacaoService.media_type(formato),
+        headers={"Content-Disposition": f'attachment; filename="{nome_arquivo}"'},
+    )
@@ -0,0 +1,82 @@
+"""
+Rotas de Perfil de Memória (ADMIN)
+Arquivo: backend/app/routes/memoria.py
+"""
+
+import os
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.middleware.compartimentos import compartimento
+from app.routes.auth import get_current_user
+from app.services.memoria_service import MemoriaService, SnapshotDeOutroWorker
+
+# ==============================================================================
+# CONFIGURAÇÃO DO ROTA
+# ==============================================================================
+router = APIRouter(
+    prefix="/api/memoria",
+    tags=["Memória"],
+    dependencies=[Depends(compartimento("admin"))],
+)
+
+
+def exigir_admin_memoria(current_user = Depends(get_current_user)):
+    if not current_user.admin:
+        raise HTTPException(status_code=403, detail="Acesso restrito.")
+    if not MemoriaService.ativo():
+        raise HTTPException(status_code=409, detail="Perfil de memória desligado (MEMORIA_PERFIL_ATIVO).")
+    return current_user
+
+
+# ==============================================================================
+# ROTA: PICO DE MEMÓRIA POR ROTA (GET)
+# ==============================================================================
+@router.get("/rotas")
+def relatorio_rotas(current_user = Depends(exigir_admin_memoria)):
+    """
+    Pico de alocação (medido quando a requisição rodou sozinha) e memória retida por rota,
+    do worker que atendeu ('pid').
+    """
+    return MemoriaService.relatorio_rotas()
+
+
+# ==============================================================================
+# ROTA: SNAPSHOTS (POST / GET)
+# ==============================================================================
+@router.post("/snapshots")
+def capturar_snapshot(
+    limite: int = Query(20, ge=1, le=200),
+    current_user = Depends(exigir_admin_memoria)
+):
+    """
+    Tira um snapshot do tracemalloc neste worker e lista os maiores locais de alocação.
+    O id ("<pid>-<n>") só pode ser comparado no mesmo worker.
+    """
+    return MemoriaService.capturar_snapshot(limite)
+
+
+@router.get("/snapshots")
+def listar_snapshots(current_user = Depends(exigir_admin_memoria)):
+    return MemoriaService.listar_snapshots()
+
+
+@router.get("/snapshots/{snapshot_id}/comparar")
+def comparar_snapshots(
+    snapshot_id: str,
+    base: Optional[str] = Query(None, description="Snapshot de referência (padrão: o anterior)"),
+    limite: int = Query(20, ge=1, le=200),
+    current_user = Depends(exigir_admin_memoria)
+):
+    """
+    Mostra o que cresceu entre dois snapshots (linhas de código que mais alocaram).
+    """
+    try:
+        return MemoriaService.comparar(snapshot_id, base, limite)
+    except SnapshotDeOutroWorker as e:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Snapshot do worker {e.pid}; esta requisição caiu no worker {os.getpid()}. Tente de novo.",
+        )
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Snapshot não encontrado (são mantidos só os mais recentes).")
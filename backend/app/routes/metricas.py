@@ -0,0 +1,36 @@
+"""
+Rota de Métricas (Prometheus)
+Arquivo: backend/app/routes/metricas.py
+"""
+
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, generate_latest, multiprocess
+
+from app.database import engine
+from app.middleware.metricas import MULTIPROCESSO, atualizar_metricas_coletadas
+
+# ==============================================================================
+# CONFIGURAÇÃO DO ROTA
+# ==============================================================================
+router = APIRouter(
+    tags=["Métricas"]
+)
+
+
+# ==============================================================================
+# ROTA: MÉTRICAS (GET)
+# ==============================================================================
+@router.get("/metrics", include_in_schema=False)
+async def metricas():
+    """
+    Expõe as métricas no formato texto do Prometheus.
+    """
+    # async: roda no event loop, onde dá para ler a ocupação do threadpool
+    atualizar_metricas_coletadas(engine)
+    if not MULTIPROCESSO:
+        return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+    # Vários workers: soma os arquivos de todos os processos (servidor.py)
+    registro = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registro)
+    return Response(generate_latest(registro), media_type=CONTENT_TYPE_LATEST)
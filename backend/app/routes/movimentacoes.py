@@ -7,6 +7,8 @@ from fastapi import APIRouter, Depends, HTTPException, status, Form
 from sqlalchemy.orm import Session
 
 from app.database import get_db
+from app.middleware.compartimentos import compartimento
+from app.middleware.rastreamento import RotaRastreada
 from app.schemas.movimentacao import MovimentacaoResponse, StatusManifestacaoSchema
 from app.services.movimentacao_service import MovimentacaoService
 from app.models.usuario import Usuario
@@ -14,13 +16,14 @@ from app.routes.auth import get_current_user
 
 router = APIRouter(
     prefix="/api/movimentacoes",
-    tags=["Movimentações"]
+    tags=["Movimentações"],
+    route_class=RotaRastreada
 )
 
 # ==============================================================================
 # ROTA CORRIGIDA: NOTIFICAÇÕES COMPLETAS
 # ==============================================================================
-@router.get("/notificacoes/novas")
+@router.get("/notificacoes/novas", dependencies=[Depends(compartimento("leituras"))])
 def obter_notificacoes(
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_user)
@@ -47,7 +50,7 @@ def obter_notificacoes(
 # ==============================================================================
 # ROTA: LISTAR HISTÓRICO 
 # ==============================================================================
-@router.get("/{manifestacao_id}", response_model=List[MovimentacaoResponse])
+@router.get("/{manifestacao_id}", response_model=List[MovimentacaoResponse], dependencies=[Depends(compartimento("leituras"))])
 def listar_historico(
     manifestacao_id: str,
     db: Session = Depends(get_db),
@@ -76,7 +79,7 @@ def listar_historico(
 # ==============================================================================
 # ROTA: RESPONDER (Criar Movimentação)
 # ==============================================================================
-@router.post("/{manifestacao_id}", response_model=MovimentacaoResponse)
+@router.post("/{manifestacao_id}", response_model=MovimentacaoResponse, dependencies=[Depends(compartimento("escritas"))])
 def responder_manifestacao(
     manifestacao_id: str,
     texto: str = Form(..., description="O conteúdo da resposta"),
@@ -4,12 +4,18 @@ Arquivo: backend/app/routes/protocolos.py
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import joinedload
 from datetime import datetime
 from uuid import uuid4
 
-from app.database import get_db
+from app.database import SessionLocal
+from app.middleware.compartimentos import compartimento
+from app.middleware.limite_taxa import limitar_taxa
+from app.middleware.rastreamento import RotaRastreada
 from app.models.protocolo import Protocolo
+from app.services.cache_service import caches
+from app.services.protocolo_service import ProtocoloService
 # Opcional: Se quiser retornar dados da manifestação junto, importe o modelo
 from app.models.manifestacao import Manifestacao
 
@@ -19,23 +25,54 @@ from app.models.manifestacao import Manifestacao
 # Adicionamos o prefixo aqui para padronizar com as outras rotas (/api/protocolos)
 router = APIRouter(
     prefix="/api/protocolos",
-    tags=["Protocolos"]
+    tags=["Protocolos"],
+    route_class=RotaRastreada
 )
 
 
 # ==============================================================================
 # ROTA: RASTREAR PROTOCOLO (GET)
 # ==============================================================================
-@router.get("/{numero}")
-def rastrear_protocolo(numero: str, db: Session = Depends(get_db)):
+def _calcular_rastreio(numero: str):
+    """Payload do rastreio (None = não existe). Abre a própria sessão: pode rodar em segundo plano."""
+    db = SessionLocal()
+    try:
+        # Busca exata pelo número (chave primária)
+        # joinedload: o status vem da manifestação, buscada na mesma consulta
+        protocolo_encontrado = db.query(Protocolo)\
+            .options(joinedload(Protocolo.manifestacao))\
+            .filter(Protocolo.numero == numero)\
+            .first()
+        if not protocolo_encontrado:
+            return None
+
+        # Como definimos o relationship no Model, ele pode incluir dados extras se acessados.
+        return jsonable_encoder({
+            "numero": protocolo_encontrado.numero,
+            "status_manifestacao": protocolo_encontrado.manifestacao.status, # Acessando via relacionamento
+            "data_geracao": protocolo_encontrado.data_geracao,
+            "data_expiracao": protocolo_encontrado.data_expiracao,
+            "sequencia_diaria": protocolo_encontrado.sequencia_diaria,
+            "manifestacao_id": protocolo_encontrado.manifestacao_id
+        })
+    finally:
+        db.close()
+
+
+@router.get("/{numero}", dependencies=[Depends(limitar_taxa("consulta_protocolo")), Depends(compartimento("leituras"))])
+def rastrear_protocolo(numero: str):
     """
     Rastreia um protocolo específico buscando na tabela de auditoria.
     """
     # --------------------------------------------------------------------------
-    # 1. BUSCA NO BANCO (TABELA PROTOCOLOS)
+    # 1. BUSCA (CACHE COALESCIDO -> TABELA PROTOCOLOS)
     # --------------------------------------------------------------------------
-    # Busca exata pelo número (chave primária)
-    protocolo_encontrado = db.query(Protocolo).filter(Protocolo.numero == numero).first()
+    # Dígito verificador errado ou número fora do filtro: 404 sem ir ao banco.
+    # Protocolo muito consultado: uma única consulta atende todos os acessos
+    # simultâneos; a mudança de status invalida a chave (MovimentacaoService).
+    protocolo_encontrado = None
+    if ProtocoloService.pode_existir(numero):
+        protocolo_encontrado = caches["rastreio"].obter(numero, lambda: _calcular_rastreio(numero))
 
     # --------------------------------------------------------------------------
     # 2. TRATAMENTO DE ERRO (404)
@@ -49,22 +86,13 @@ def rastrear_protocolo(numero: str, db: Session = Depends(get_db)):
     # --------------------------------------------------------------------------
     # 3. RETORNO
     # --------------------------------------------------------------------------
-    # Retornamos o objeto direto. O FastAPI converte para JSON automaticamente.
-    # Como definimos o relationship no Model, ele pode incluir dados extras se acessados.
-    return {
-        "numero": protocolo_encontrado.numero,
-        "status_manifestacao": protocolo_encontrado.manifestacao.status, # Acessando via relacionamento
-        "data_geracao": protocolo_encontrado.data_geracao,
-        "data_expiracao": protocolo_encontrado.data_expiracao,
-        "sequencia_diaria": protocolo_encontrado.sequencia_diaria,
-        "manifestacao_id": protocolo_encontrado.manifestacao_id
-    }
+    return protocolo_encontrado
 
 
 # ==============================================================================
 # ROTA: SIMULAR GERAÇÃO (POST) - (UTILITÁRIO)
 # ==============================================================================
-@router.post("/simular-geracao")
+@router.post("/simular-geracao", dependencies=[Depends(compartimento("leituras"))])
 def simular_geracao_protocolo():
     """
     Gera um exemplo de número de protocolo válido para testes (SEM SALVAR).
@@ -72,10 +100,9 @@ def simular_geracao_protocolo():
     """
     # 1. Lógica de formatação (A mesma usada em manifestacoes.py)
     data_hoje = datetime.now()
-    data_formatada = data_hoje.strftime("%Y%m%d")
     sufixo = str(uuid4().hex)[:6].upper()
     
-    protocolo_exemplo = f"OUVIDORIA-{data_formatada}-{sufixo}"
+    protocolo_exemplo = ProtocoloService.gerar_numero(data_hoje, sufixo)
 
     return {
         "exemplo_protocolo": protocolo_exemplo,
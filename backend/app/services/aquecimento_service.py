@@ -0,0 +1,97 @@
+"""
+Service de Aquecimento (warm-up do worker)
+Arquivo: backend/app/services/aquecimento_service.py
+
+OBJETIVO:
+Tirar da PRIMEIRA requisição de um worker novo os custos que só acontecem
+uma vez, executando-os no lifespan, antes do worker ficar pronto:
+- configuração dos mappers do SQLAlchemy e cache de SQL compilado
+  (as consultas mais usadas são executadas uma vez);
+- conexões do pool abertas de antemão (AQUECIMENTO_CONEXOES);
+- esquema OpenAPI e serializadores das respostas;
+- backend de hash de senha do passlib (carregado sob demanda).
+
+/health/ready só responde "ready" depois que o aquecimento termina.
+"""
+
+import logging
+import time
+from typing import Dict
+
+from sqlalchemy import func, text
+from sqlalchemy.orm import configure_mappers
+
+from app.config import settings
+from app.database import SessionLocal, engine
+from app.models.assunto import Assunto
+from app.models.manifestacao import Manifestacao
+from app.models.movimentacao import Movimentacao
+from app.models.protocolo import Protocolo
+from app.models.usuario import Usuario
+
+logger = logging.getLogger(__name__)
+
+
+class AquecimentoService:
+
+    @staticmethod
+    def abrir_conexoes(quantidade: int):
+        """Mantém N conexões abertas juntas (o pool cresce até N) e as devolve já autenticadas."""
+        conexoes = []
+        try:
+            for _ in range(quantidade):
+                conexao = engine.connect()
+                conexao.execute(text("SELECT 1"))
+                conexoes.append(conexao)
+        finally:
+            for conexao in conexoes:
+                conexao.close()
+
+    @staticmethod
+    def preparar_consultas():
+        """Executa uma vez (sem trazer linhas) as consultas dos caminhos quentes."""
+        db = SessionLocal()
+        try:
+            db.query(Assunto).filter(Assunto.ativo == True).order_by(Assunto.nome.asc()).limit(0).all()
+            db.query(Usuario).filter(Usuario.cpf == "").first()
+            db.query(Protocolo).filter(Protocolo.numero == "").first()
+            db.query(func.count(Manifestacao.id)).filter(Manifestacao.usuario_id == "").scalar()
+            db.query(Movimentacao).filter(Movimentacao.manifestacao_id == "").limit(0).all()
+        finally:
+            db.close()
+
+    @staticmethod
+    def preparar_serializadores(app):
+        # O OpenAPI monta o JSON Schema de todos os modelos de entrada e resposta
+        app.openapi()
+
+    @staticmethod
+    def preparar_hash_senha():
+        # passlib e jose são importados sob demanda (auth_service): pagos aqui
+        from jose import jwt  # noqa: F401
+
+        from app.services.auth_service import contexto_senhas
+
+        contexto_senhas().handler().get_backend()
+
+    @staticmethod
+    def aquecer(app) -> Dict[str, float]:
+        """Roda todas as etapas e devolve o tempo (ms) de cada uma."""
+        etapas = {
+            "mappers": configure_mappers,
+            "conexoes": lambda: AquecimentoService.abrir_conexoes(settings.AQUECIMENTO_CONEXOES),
+            "consultas": AquecimentoService.preparar_consultas,
+            "serializadores": lambda: AquecimentoService.preparar_serializadores(app),
+            "hash_senha": AquecimentoService.preparar_hash_senha,
+        }
+        tempos = {}
+        for nome, etapa in etapas.items():
+            inicio = time.perf_counter()
+            try:
+                etapa()
+            except Exception:
+                # Aquecimento é otimização: falhar aqui não pode impedir o worker de subir
+                logger.exception("Falha no aquecimento (%s)", nome)
+            tempos[nome] = round((time.perf_counter() - inicio) * 1000, 1)
+        logger.info("Aquecimento concluído em %.0fms: %s", sum(tempos.values()), tempos)
+        return tempos
@@ -1,18 +1,28 @@
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional
 from uuid import uuid4
 import re  # IMPORTANTE: Necessário para as validações de Regex
+import logging
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
-from jose import jwt
-from passlib.context import CryptContext 
 
 from app.models.usuario import Usuario
 from app.schemas.usuario import UsuarioCreate, UsuarioLogin
 from app.config import settings
+from app.middleware.rastreamento import rastrear
+
+logger = logging.getLogger(__name__)
+
+# passlib e jose só são importados no primeiro uso (ou no aquecimento do
+# worker, app/services/aquecimento_service.py), não na importação da API
+@lru_cache(maxsize=None)
+def contexto_senhas():
+    """Configuração do contexto de senha"""
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["sha256_crypt"], deprecated="auto")
 
-# Configuração do contexto de senha
-pwd_context = CryptContext(schemes=["sha256_crypt"], deprecated="auto")
 
 class AuthService:
     
@@ -21,14 +31,16 @@ class AuthService:
     # ==========================================================================
     
     @staticmethod
+    @rastrear()
     def verificar_senha(senha_pura: str, senha_hash: str) -> bool:
         """Confere se a senha digitada bate com o hash do banco"""
-        return pwd_context.verify(senha_pura, senha_hash)
+        return contexto_senhas().verify(senha_pura, senha_hash)
 
     @staticmethod
+    @rastrear()
     def gerar_hash_senha(senha: str) -> str:
         """Transforma texto puro em hash seguro"""
-        return pwd_context.hash(senha)
+        return contexto_senhas().hash(senha)
 
     @staticmethod
     def validar_senha(senha: str):
@@ -55,18 +67,45 @@ class AuthService:
             )
 
     @staticmethod
+    @rastrear()
     def criar_token_acesso(data: dict, expires_delta: Optional[timedelta] = None):
         """Gera o Token JWT"""
+        from jose import jwt
+
         to_encode = data.copy()
         expire = datetime.utcnow() + (expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
         to_encode.update({"exp": expire})
         return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
+    @staticmethod
+    def decodificar_token(token: str) -> Optional[dict]:
+        """Conteúdo do JWT, ou None se a assinatura for inválida ou o token tiver expirado."""
+        from jose import JWTError, jwt
+
+        try:
+            return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        except JWTError:
+            return None
+
+    @staticmethod
+    def link_recuperacao_senha(email: str) -> str:
+        """Link de redefinição com token válido por 24h."""
+        from jose import jwt
+
+        dados_token = {
+            "sub": email,
+            "tipo": "reset_senha",
+            "exp": datetime.utcnow() + timedelta(hours=24)
+        }
+        token_reset = jwt.encode(dados_token, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+        return f"http://localhost:3000/redefinir-senha?token={token_reset}"
+
     # ==========================================================================
     # REGRAS DE NEGÓCIO
     # ==========================================================================
 
     @staticmethod
+    @rastrear()
     def criar_usuario(db: Session, usuario_data: UsuarioCreate):
         """Registra um novo usuário com validações de segurança."""
         
@@ -86,7 +125,7 @@ class AuthService:
         try:
             hash_gerado = AuthService.gerar_hash_senha(usuario_data.senha)
         except Exception as e:
-            print(f"ERRO AO GERAR HASH: {e}")
+            logger.exception("Erro ao gerar hash de senha")
             raise HTTPException(status_code=500, detail="Erro interno na geração de segurança.")
 
         novo_usuario = Usuario(
@@ -106,6 +145,30 @@ class AuthService:
         return novo_usuario
 
     @staticmethod
+    def obter_usuario_sistema(db: Session, email: str, nome: str) -> str:
+        """
+        Retorna o id de um usuário técnico (criando se necessário).
+        Usado para assinar movimentações geradas por rotinas automáticas.
+        Fica inativo e sem senha, portanto não consegue fazer login.
+        """
+        usuario_id = db.query(Usuario.id).filter(Usuario.email == email).scalar()
+        if usuario_id:
+            return usuario_id
+
+        usuario_id = str(uuid4())
+        db.add(Usuario(
+            id=usuario_id,
+            nome=nome,
+            email=email,
+            senha_hash=None,
+            admin=True,
+            ativo=False,
+        ))
+        db.commit()
+        return usuario_id
+
+    @staticmethod
+    @rastrear()
     def autenticar_usuario(db: Session, dados_login: UsuarioLogin):
         """Tenta fazer login comparando a senha com o hash."""
         usuario = db.query(Usuario).filter(Usuario.email == dados_login.email).first()
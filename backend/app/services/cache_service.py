@@ -0,0 +1,299 @@
+"""
+Service de Cache com Coalescência (single-flight)
+Arquivo: backend/app/services/cache_service.py
+
+OBJETIVO:
+Evitar o "estouro de cache" (cache stampede): quando o catálogo de assuntos,
+o rastreio de um protocolo muito consultado ou as estatísticas do painel
+vencem, dezenas de requisições simultâneas recalculariam a mesma consulta.
+
+COMO FUNCIONA (por cache, configurado em CACHES):
+- Valor fresco (idade < ttl_s): devolvido direto da memória do worker.
+- Valor vencido há menos de obsoleto_s: devolvido assim mesmo (stale-while-
+  revalidate) e UMA thread de fundo recalcula.
+- Sem valor: a primeira requisição calcula (líder); as outras com a mesma
+  chave esperam o resultado dela (coalescidas) em vez de ir ao banco.
+- CACHE_REDIS_ATIVO: entre workers, o líder pega uma trava no Redis
+  (SET NX) e publica o valor; os líderes dos outros workers esperam o valor
+  aparecer em vez de recalcular. Redis fora do ar = cada worker calcula.
+- Invalidação: com o Redis, 'invalidar' também publica o evento num stream
+  (cache:<nome>:invalidacoes) que cada worker lê na consulta, no máximo a
+  cada CACHE_INVALIDACAO_INTERVALO_S; o valor antigo deixa de ser servido em
+  todos os workers nesse prazo. Sem Redis, só no worker que invalidou.
+- Cálculo em andamento durante uma invalidação: o valor dele é entregue a
+  quem já esperava, mas não é guardado (nem na memória, nem no Redis); a
+  próxima consulta calcula de novo.
+
+A função de cálculo abre a própria sessão do banco (pode rodar numa thread de
+fundo, depois que a requisição que a disparou terminou) e devolve um valor
+serializável em JSON. None não é guardado (ex.: protocolo inexistente).
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from app.config import settings
+from app.middleware.metricas import CACHE_CONSULTAS, CACHE_CALCULO
+
+logger = logging.getLogger(__name__)
+
+# Revalidações em segundo plano (stale-while-revalidate)
+_revalidacoes = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cache-revalidar")
+
+# Eventos guardados por stream de invalidação (aproximado; XADD MAXLEN ~)
+INVALIDACOES_MAX = 10000
+
+_cliente_redis = None
+
+
+def _redis():
+    """Cliente Redis síncrono (as rotas rodam no threadpool), criado no primeiro uso."""
+    global _cliente_redis
+    if not settings.CACHE_REDIS_ATIVO:
+        return None
+    if _cliente_redis is None:
+        import redis  # dependência opcional: só carregada com CACHE_REDIS_ATIVO
+        from redis.backoff import NoBackoff
+        from redis.retry import Retry
+
+        # Sem novas tentativas: Redis fora do ar não pode atrasar a consulta
+        _cliente_redis = redis.Redis.from_url(
+            settings.REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5, retry=Retry(NoBackoff(), 0)
+        )
+    return _cliente_redis
+
+
+class _Voo:
+    """Cálculo em andamento de uma chave: quem chega depois espera o evento."""
+
+    __slots__ = ("evento", "valor", "erro", "invalidado")
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.valor = None
+        self.erro: Optional[BaseException] = None
+        # A chave foi invalidada durante o cálculo: o valor já nasceu velho
+        self.invalidado = False
+
+
+class CacheCoalescido:
+
+    def __init__(self, nome: str, ttl_s: float, obsoleto_s: float = 0, max_itens: int = 1000):
+        self.nome = nome
+        self.ttl_s = ttl_s
+        self.obsoleto_s = obsoleto_s
+        self.max_itens = max_itens
+        self._entradas: "OrderedDict[str, tuple]" = OrderedDict()  # chave -> (valor, calculado_em)
+        self._voos: Dict[str, _Voo] = {}
+        self._trava = threading.Lock()
+        # Invalidações de outros workers (stream no Redis)
+        self._fluxo = f"cache:{nome}:invalidacoes"
+        self._ultimo_evento: Optional[bytes] = None
+        self._proxima_leitura = 0.0
+        self._trava_leitura = threading.Lock()
+
+    def _contar(self, resultado: str):
+        CACHE_CONSULTAS.labels(cache=self.nome, resultado=resultado).inc()
+
+    def obter(self, chave: str, calcular: Callable[[], Any]) -> Any:
+        if not settings.CACHE_ATIVO:
+            return calcular()
+
+        agora = time.monotonic()
+        if agora >= self._proxima_leitura:
+            self._aplicar_invalidacoes(agora)
+        with self._trava:
+            entrada = self._entradas.get(chave)
+            if entrada is not None:
+                idade = agora - entrada[1]
+                if idade < self.ttl_s:
+                    self._entradas.move_to_end(chave)
+                    self._contar("fresco")
+                    return entrada[0]
+                if idade < self.ttl_s + self.obsoleto_s:
+                    if chave not in self._voos:
+                        voo = self._voos[chave] = _Voo()
+                        _revalidacoes.submit(self._calcular_silencioso, chave, voo, calcular)
+                    self._contar("obsoleto")
+                    return entrada[0]
+
+            voo = self._voos.get(chave)
+            lider = voo is None
+            if lider:
+                voo = self._voos[chave] = _Voo()
+
+        if lider:
+            self._contar("calculado")
+            return self._calcular(chave, voo, calcular)
+
+        self._contar("coalescido")
+        if not voo.evento.wait(settings.CACHE_ESPERA_MAX_S):
+            # Líder travado: melhor calcular do que deixar a requisição pendurada
+            return calcular()
+        if voo.erro is not None:
+            raise voo.erro
+        return voo.valor
+
+    def _calcular(self, chave: str, voo: _Voo, calcular: Callable[[], Any]) -> Any:
+        inicio = time.perf_counter()
+        try:
+            valor = self._calcular_compartilhado(chave, calcular)
+            voo.valor = valor
+            with self._trava:
+                if valor is not None and not voo.invalidado:
+                    self._entradas[chave] = (valor, time.monotonic())
+                    self._entradas.move_to_end(chave)
+                    while len(self._entradas) > self.max_itens:
+                        self._entradas.popitem(last=False)
+            return valor
+        except BaseException as e:
+            voo.erro = e
+            raise
+        finally:
+            CACHE_CALCULO.labels(cache=self.nome).observe(time.perf_counter() - inicio)
+            with self._trava:
+                # Depois de uma invalidação, a chave pode já ter outro voo
+                if self._voos.get(chave) is voo:
+                    del self._voos[chave]
+            voo.evento.set()
+
+    def _calcular_silencioso(self, chave: str, voo: _Voo, calcular: Callable[[], Any]):
+        try:
+            self._calcular(chave, voo, calcular)
+        except Exception:
+            # O valor antigo continua servido até o fim da janela de obsoleto
+            logger.exception("Falha ao revalidar o cache %s (%s)", self.nome, chave)
+
+    # ==========================================================================
+    # ENTRE WORKERS (Redis opcional)
+    # ==========================================================================
+    def _calcular_compartilhado(self, chave: str, calcular: Callable[[], Any]) -> Any:
+        cliente = _redis()
+        if cliente is None:
+            return calcular()
+
+        chave_redis = f"cache:{self.nome}:{chave}"
+        try:
+            # Último evento de invalidação antes do cálculo (mesma ida ao Redis do GET)
+            bruto, ultimo = cliente.pipeline(transaction=False).get(chave_redis).xrevrange(self._fluxo, count=1).execute()
+            if bruto is not None:
+                return json.loads(bruto)
+            marca = ultimo[0][0] if ultimo else b"0-0"
+            lider = cliente.set(f"{chave_redis}:trava", "1", nx=True, px=int(settings.CACHE_ESPERA_MAX_S * 1000))
+        except Exception as e:
+            logger.warning("Redis indisponível para o cache %s: %s", self.nome, type(e).__name__)
+            return calcular()
+
+        if not lider:
+            # Outro worker está calculando: espera o valor publicado
+            limite = time.monotonic() + settings.CACHE_ESPERA_MAX_S
+            while time.monotonic() < limite:
+                time.sleep(0.05)
+                try:
+                    bruto = cliente.get(chave_redis)
+                except Exception:
+                    break
+                if bruto is not None:
+                    return json.loads(bruto)
+            return calcular()
+
+        try:
+            valor = calcular()
+            if valor is not None:
+                cliente.set(chave_redis, json.dumps(valor), px=int(self.ttl_s * 1000))
+                # Publica e só então confere o stream: 'invalidar' avisa antes de
+                # apagar, então uma invalidação durante o cálculo ou aparece aqui
+                # ou apaga o valor recém-publicado
+                if self._invalidada_desde(cliente, chave, marca):
+                    cliente.delete(chave_redis)
+                    self._descartar(chave)
+            return valor
+        finally:
+            try:
+                cliente.delete(f"{chave_redis}:trava")
+            except Exception:
+                pass
+
+    def _invalidada_desde(self, cliente, chave: str, marca: bytes) -> bool:
+        try:
+            for _, eventos in cliente.xread({self._fluxo: marca}) or []:
+                if any(campos[b"chave"].decode() in (chave, "*") for _, campos in eventos):
+                    return True
+        except Exception as e:
+            logger.warning("Redis indisponível ao conferir invalidações do cache %s: %s", self.nome, type(e).__name__)
+        return False
+
+    def _descartar(self, chave: Optional[str]):
+        """Apaga a entrada e solta os cálculos em andamento da chave (ou de todas)."""
+        with self._trava:
+            if chave is None:
+                self._entradas.clear()
+                voos = list(self._voos.values())
+                self._voos.clear()
+            else:
+                self._entradas.pop(chave, None)
+                voos = [self._voos.pop(chave)] if chave in self._voos else []
+            # Quem chegar agora calcula de novo em vez de esperar o valor velho
+            for voo in voos:
+                voo.invalidado = True
+
+    def _aplicar_invalidacoes(self, agora: float):
+        """Descarta as chaves invalidadas pelos outros workers desde a última leitura."""
+        cliente = _redis()
+        # Uma thread lê por vez; as demais seguem com o que já foi aplicado
+        if cliente is None or not self._trava_leitura.acquire(blocking=False):
+            return
+        try:
+            self._proxima_leitura = agora + settings.CACHE_INVALIDACAO_INTERVALO_S
+            if self._ultimo_evento is None:
+                # Worker novo: o cache local está vazio, só interessa o que vier depois
+                ultimo = cliente.xrevrange(self._fluxo, count=1)
+                self._ultimo_evento = ultimo[0][0] if ultimo else b"0-0"
+                return
+            for _, eventos in cliente.xread({self._fluxo: self._ultimo_evento}) or []:
+                for id_evento, campos in eventos:
+                    chave = campos[b"chave"].decode()
+                    self._descartar(None if chave == "*" else chave)
+                    self._ultimo_evento = id_evento
+        except Exception as e:
+            logger.warning("Redis indisponível ao ler invalidações do cache %s: %s", self.nome, type(e).__name__)
+        finally:
+            self._trava_leitura.release()
+
+    def invalidar(self, chave: Optional[str] = None):
+        """Apaga uma chave (ou tudo) deste worker e do Redis e avisa os outros workers."""
+        self._descartar(chave)
+        cliente = _redis()
+        if cliente is not None:
+            try:
+                # Avisa antes de apagar (ver _calcular_compartilhado)
+                cliente.xadd(self._fluxo, {"chave": chave or "*"}, maxlen=INVALIDACOES_MAX, approximate=True)
+                if chave is None:
+                    # Fica de fora o stream e as travas dos líderes dos outros workers
+                    chaves = [
+                        c for c in cliente.scan_iter(f"cache:{self.nome}:*")
+                        if c != self._fluxo.encode() and not c.endswith(b":trava")
+                    ]
+                    if chaves:
+                        cliente.delete(*chaves)
+                else:
+                    cliente.delete(f"cache:{self.nome}:{chave}")
+            except Exception as e:
+                logger.warning("Redis indisponível ao invalidar o cache %s: %s", self.nome, type(e).__name__)
+
+
+# Um conjunto por worker, criado a partir das configurações
+caches: Dict[str, CacheCoalescido] = {
+    nome: CacheCoalescido(
+        nome,
+        ttl_s=float(config["ttl_s"]),
+        obsoleto_s=float(config.get("obsoleto_s", 0)),
+        max_itens=int(config.get("max_itens", 1000)),
+    )
+    for nome, config in settings.CACHES.items()
+}
@@ -0,0 +1,70 @@
+"""
+Service de Carga em Massa
+Arquivo: backend/app/services/carga_service.py
+
+OBJETIVO:
+Inserir grandes volumes de linhas sem passar pelo ORM objeto a objeto.
+- PostgreSQL: usa COPY ... FROM STDIN (o caminho mais rápido do banco).
+- Outros bancos (ex.: SQLite em desenvolvimento): INSERT com executemany.
+Usado pela importação do legado e pelo gerador de dados sintéticos.
+"""
+
+import csv
+import io
+from typing import Dict, List
+
+from sqlalchemy import Table, insert
+from sqlalchemy.orm import Session
+
+# Marcador de NULL no COPY (diferencia NULL de string vazia)
+NULO_COPY = "\\N"
+
+
+class CargaService:
+
+    @staticmethod
+    def _linhas_copy(tabela: Table, colunas: List[str], linhas: List[Dict], dialeto) -> io.StringIO:
+        """
+        Monta o CSV do COPY aplicando os conversores de cada tipo de coluna
+        (Enum -> nome gravado no banco, JSON -> texto), como o INSERT faria.
+        """
+        conversores = [tabela.c[nome].type.bind_processor(dialeto) for nome in colunas]
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer)
+        for linha in linhas:
+            valores = []
+            for nome, conversor in zip(colunas, conversores):
+                valor = linha.get(nome)
+                if valor is not None and conversor:
+                    valor = conversor(valor)
+                valores.append(NULO_COPY if valor is None else valor)
+            escritor.writerow(valores)
+        buffer.seek(0)
+        return buffer
+
+    @staticmethod
+    def inserir_em_massa(db: Session, tabela: Table, linhas: List[Dict]) -> int:
+        """
+        Insere 'linhas' (lista de dicts com as mesmas chaves) em 'tabela'
+        dentro da transação corrente da sessão. Não faz commit.
+        """
+        if not linhas:
+            return 0
+
+        conexao = db.connection()
+        if conexao.dialect.name != "postgresql":
+            conexao.execute(insert(tabela), linhas)
+            return len(linhas)
+
+        colunas = list(linhas[0].keys())
+        buffer = CargaService._linhas_copy(tabela, colunas, linhas, conexao.dialect)
+        comando = (
+            f"COPY {tabela.name} ({', '.join(colunas)}) "
+            f"FROM STDIN WITH (FORMAT csv, NULL '{NULO_COPY}')"
+        )
+        cursor = conexao.connection.cursor()
+        try:
+            cursor.copy_expert(comando, buffer)
+        finally:
+            cursor.close()
+        return len(linhas)
@@ -0,0 +1,268 @@
+"""
+Service de Dados Abertos (Transparência)
+Arquivo: backend/app/services/dados_abertos_service.py
+
+OBJETIVO:
+Publicar diariamente os registros e estatísticas das manifestações de forma
+anonimizada, sem regerar o histórico inteiro a cada noite.
+
+COMO FUNCIONA:
+- Cada dia fechado vira UMA partição imutável: particoes/dia=AAAA-MM-DD.jsonl.gz
+- O arquivo 'manifesto.json' guarda a marca d'água (até onde já foi processado)
+  e a lista de partições com contagens e hash SHA-256.
+- Só entram na partição as linhas criadas/alteradas naquele dia
+  ('data_criacao' e 'data_atualizacao'), então o custo depende do volume do dia.
+  Também entram as gravadas no banco naquele dia ('data_gravacao'): a
+  importação em massa e a regravação do diário de ingestão gravam linhas com
+  datas de dias já publicados, que de outro modo nunca seriam capturadas.
+- Publicação retomável: antes de renomear a partição, o manifesto registra a
+  entrada como 'pendente'. Se a execução cair entre a renomeação e o
+  manifesto final, a próxima adota o arquivo (mesmo SHA-256) sem refazê-lo;
+  uma partição fora do manifesto nunca foi publicada e pode ser regerada.
+- Consumidores reconstroem o estado atual aplicando as partições em ordem
+  (a versão mais recente de cada 'id' prevalece).
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+from collections import Counter
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.assunto import Assunto
+from app.models.manifestacao import Manifestacao
+from app.models.movimentacao import Movimentacao
+from app.models.usuario import Usuario
+
+logger = logging.getLogger(__name__)
+
+NOME_MANIFESTO = "manifesto.json"
+TAMANHO_LOTE = 1000
+
+# Horário de Brasília (UTC-3), o mesmo de MovimentacaoService: os limites de
+# cada dia não dependem do TimeZone da sessão do banco
+FUSO_BRASIL = timezone(timedelta(hours=-3))
+
+
+def _valor_simples(valor: Any) -> Any:
+    if hasattr(valor, "value"):
+        return valor.value
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    return valor
+
+
+class DadosAbertosService:
+    """
+    Gera as partições diárias anonimizadas e mantém o manifesto.
+    """
+
+    # ==========================================
+    # MANIFESTO (marca d'água)
+    # ==========================================
+    @staticmethod
+    def carregar_manifesto(diretorio: str) -> Dict:
+        caminho = os.path.join(diretorio, NOME_MANIFESTO)
+        if not os.path.exists(caminho):
+            return {"marca_dagua": None, "particoes": []}
+        with open(caminho, "r", encoding="utf-8") as arquivo:
+            return json.load(arquivo)
+
+    @staticmethod
+    def _sha256(caminho: str) -> Optional[str]:
+        if not os.path.exists(caminho):
+            return None
+        sha256 = hashlib.sha256()
+        with open(caminho, "rb") as arquivo:
+            for bloco in iter(lambda: arquivo.read(1024 * 1024), b""):
+                sha256.update(bloco)
+        return sha256.hexdigest()
+
+    @staticmethod
+    def salvar_manifesto(diretorio: str, manifesto: Dict):
+        """Gravação atômica: escreve num temporário e renomeia."""
+        caminho = os.path.join(diretorio, NOME_MANIFESTO)
+        temporario = caminho + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as arquivo:
+            json.dump(manifesto, arquivo, ensure_ascii=False, indent=2)
+        os.replace(temporario, caminho)
+
+    # ==========================================
+    # CONSULTAS DO DIA (apenas colunas não pessoais)
+    # ==========================================
+    @staticmethod
+    def _manifestacoes_do_dia(db: Session, inicio: datetime, fim: datetime):
+        """
+        Manifestações criadas, alteradas OU gravadas na janela [inicio, fim).
+        Ficam de fora: relato, dados complementares, usuário e protocolo.
+        """
+        consulta = select(
+            Manifestacao.id,
+            Assunto.nome,
+            Manifestacao.classificacao,
+            Manifestacao.status,
+            Manifestacao.anonimo,
+            Manifestacao.data_criacao,
+            Manifestacao.data_atualizacao,
+            Manifestacao.data_conclusao,
+        ).join(
+            Assunto, Manifestacao.assunto_id == Assunto.id
+        ).where(
+            or_(
+                and_(Manifestacao.data_criacao >= inicio, Manifestacao.data_criacao < fim),
+                and_(Manifestacao.data_atualizacao >= inicio, Manifestacao.data_atualizacao < fim),
+                and_(Manifestacao.data_gravacao >= inicio, Manifestacao.data_gravacao < fim),
+            )
+        ).execution_options(stream_results=True, yield_per=TAMANHO_LOTE)
+        return db.execute(consulta)
+
+    @staticmethod
+    def _movimentacoes_do_dia(db: Session, inicio: datetime, fim: datetime):
+        """
+        Respostas públicas criadas ou gravadas no dia. O texto e o autor não
+        são publicados, apenas se a mensagem veio da ouvidoria ou do cidadão.
+        """
+        consulta = select(
+            Movimentacao.id,
+            Movimentacao.manifestacao_id,
+            Movimentacao.data_criacao,
+            Usuario.admin,
+        ).join(
+            Usuario, Movimentacao.autor_id == Usuario.id
+        ).where(
+            Movimentacao.interno == False,
+            or_(
+                and_(Movimentacao.data_criacao >= inicio, Movimentacao.data_criacao < fim),
+                and_(Movimentacao.data_gravacao >= inicio, Movimentacao.data_gravacao < fim),
+            ),
+        ).execution_options(stream_results=True, yield_per=TAMANHO_LOTE)
+        return db.execute(consulta)
+
+    # ==========================================
+    # PARTIÇÃO DIÁRIA
+    # ==========================================
+    @staticmethod
+    def gerar_particao(db: Session, diretorio: str, dia: date, manifesto: Optional[Dict] = None) -> Dict:
+        """
+        Escreve a partição de um dia e devolve sua entrada para o manifesto.
+        Uma partição já publicada (listada no manifesto) nunca é sobrescrita.
+        Com 'manifesto', a entrada é gravada nele como 'pendente' antes de a
+        partição aparecer na pasta.
+        """
+        pasta = os.path.join(diretorio, "particoes")
+        os.makedirs(pasta, exist_ok=True)
+        nome = f"dia={dia.isoformat()}.jsonl.gz"
+        caminho = os.path.join(pasta, nome)
+        if os.path.exists(caminho):
+            publicadas = (manifesto or DadosAbertosService.carregar_manifesto(diretorio))["particoes"]
+            if any(particao["arquivo"] == f"particoes/{nome}" for particao in publicadas):
+                raise FileExistsError(f"Partição {nome} já publicada (imutável).")
+            logger.warning("Partição %s fora do manifesto (execução interrompida): regerando", nome)
+
+        inicio = datetime.combine(dia, time.min, tzinfo=FUSO_BRASIL)
+        fim = inicio + timedelta(days=1)
+
+        por_status, por_assunto, por_classificacao = Counter(), Counter(), Counter()
+        qtd_manifestacoes = qtd_movimentacoes = 0
+
+        temporario = caminho + ".tmp"
+        with gzip.open(temporario, "wt", encoding="utf-8") as arquivo:
+            for (id_, assunto, classificacao, status, anonimo,
+                 criacao, atualizacao, conclusao) in DadosAbertosService._manifestacoes_do_dia(db, inicio, fim):
+                registro = {
+                    "tabela": "manifestacoes",
+                    "id": id_,
+                    "assunto": assunto,
+                    "classificacao": _valor_simples(classificacao),
+                    "status": _valor_simples(status),
+                    "anonimo": anonimo,
+                    # Só a data (sem horário) para dificultar reidentificação
+                    "data_criacao": criacao.date().isoformat() if criacao else None,
+                    "data_atualizacao": atualizacao.date().isoformat() if atualizacao else None,
+                    "data_conclusao": conclusao.date().isoformat() if conclusao else None,
+                }
+                arquivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+                qtd_manifestacoes += 1
+                por_status[registro["status"]] += 1
+                por_assunto[assunto] += 1
+                por_classificacao[registro["classificacao"]] += 1
+
+            for id_, manifestacao_id, criacao, autor_admin in DadosAbertosService._movimentacoes_do_dia(db, inicio, fim):
+                registro = {
+                    "tabela": "movimentacoes",
+                    "id": id_,
+                    "manifestacao_id": manifestacao_id,
+                    "origem": "ouvidoria" if autor_admin else "cidadao",
+                    "data_criacao": criacao.date().isoformat() if criacao else None,
+                }
+                arquivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+                qtd_movimentacoes += 1
+
+        entrada = {
+            "dia": dia.isoformat(),
+            "arquivo": f"particoes/{nome}",
+            "sha256": DadosAbertosService._sha256(temporario),
+            "manifestacoes": qtd_manifestacoes,
+            "movimentacoes": qtd_movimentacoes,
+            "por_status": dict(por_status),
+            "por_assunto": dict(por_assunto),
+            "por_classificacao": dict(por_classificacao),
+        }
+        if manifesto is not None:
+            manifesto["pendente"] = entrada
+            DadosAbertosService.salvar_manifesto(diretorio, manifesto)
+        os.replace(temporario, caminho)
+        return entrada
+
+    # ==========================================
+    # EXECUÇÃO INCREMENTAL
+    # ==========================================
+    @staticmethod
+    def atualizar(db: Session, diretorio: Optional[str] = None, ate: Optional[date] = None) -> Dict:
+        """
+        Gera as partições de todos os dias fechados desde a última marca d'água
+        (por padrão, até ontem). Na primeira execução começa pelo dia da
+        manifestação mais antiga.
+        """
+        diretorio = diretorio or settings.DADOS_ABERTOS_DIR
+        os.makedirs(diretorio, exist_ok=True)
+        ate = ate or (datetime.now(FUSO_BRASIL).date() - timedelta(days=1))
+
+        manifesto = DadosAbertosService.carregar_manifesto(diretorio)
+        if manifesto["marca_dagua"]:
+            dia = date.fromisoformat(manifesto["marca_dagua"]) + timedelta(days=1)
+        else:
+            primeira = db.query(func.min(Manifestacao.data_criacao)).scalar()
+            if not primeira:
+                logger.info("Nenhuma manifestação para publicar.")
+                return manifesto
+            dia = (primeira.astimezone(FUSO_BRASIL) if primeira.tzinfo else primeira).date()
+
+        while dia <= ate:
+            pendente = manifesto.pop("pendente", None)
+            if (pendente and pendente["dia"] == dia.isoformat()
+                    and DadosAbertosService._sha256(os.path.join(diretorio, pendente["arquivo"])) == pendente["sha256"]):
+                # Renomeada na execução anterior, que caiu antes de concluir o manifesto
+                entrada = pendente
+            else:
+                entrada = DadosAbertosService.gerar_particao(db, diretorio, dia, manifesto)
+                manifesto.pop("pendente", None)
+            manifesto["particoes"].append(entrada)
+            manifesto["marca_dagua"] = dia.isoformat()
+            manifesto["gerado_em"] = datetime.now().isoformat()
+            # Salva a cada dia: se falhar no meio, a próxima execução continua daqui
+            DadosAbertosService.salvar_manifesto(diretorio, manifesto)
+            logger.info(
+                "Partição %s publicada (%s manifestações, %s movimentações)",
+                entrada["dia"], entrada["manifestacoes"], entrada["movimentacoes"],
+            )
+            dia += timedelta(days=1)
+
+        return manifesto
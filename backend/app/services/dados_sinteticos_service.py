@@ -0,0 +1,288 @@
+"""
+Service de Dados Sintéticos (Testes de Carga)
+Arquivo: backend/app/services/dados_sinteticos_service.py
+
+OBJETIVO:
+Montar um banco realista com milhões de linhas para testes de capacidade e de
+planos de execução (EXPLAIN), de forma reprodutível:
+- Semente fixa: a mesma semente sempre gera os mesmos dados.
+- Distribuições realistas: poucos assuntos concentram a maioria das
+  manifestações (Zipf), fins de semana mais calmos e dias de campanha com picos.
+- Carga via COPY (CargaService), em lotes, com commit por lote.
+"""
+
+import logging
+import random
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy import Date, cast, func
+from sqlalchemy.orm import Session
+
+from app.models.anexo import Anexo
+from app.models.assunto import Assunto
+from app.models.manifestacao import ClassificacaoManifestacao, Manifestacao, StatusManifestacao
+from app.models.movimentacao import Movimentacao
+from app.models.protocolo import Protocolo
+from app.models.usuario import Usuario
+from app.services.auth_service import AuthService
+from app.services.carga_service import CargaService
+from app.services.protocolo_service import CARGA_CONCLUIDA, CARGA_IMPORTANDO, ProtocoloService, avisar_carga
+
+logger = logging.getLogger(__name__)
+
+SENHA_PADRAO = "Sintetico@123"
+DOMINIO_EMAIL = "sintetico.participa-df.gov.br"
+PRAZO_RESPOSTA_DIAS = 30
+
+PESOS_CLASSIFICACAO = {
+    ClassificacaoManifestacao.RECLAMACAO: 50,
+    ClassificacaoManifestacao.SOLICITACAO: 20,
+    ClassificacaoManifestacao.DENUNCIA: 10,
+    ClassificacaoManifestacao.INFORMACAO: 10,
+    ClassificacaoManifestacao.SUGESTAO: 5,
+    ClassificacaoManifestacao.ELOGIO: 5,
+}
+TIPOS_ANEXO = [("image/jpeg", 350_000), ("image/png", 500_000), ("audio/webm", 900_000), ("video/mp4", 8_000_000)]
+PALAVRAS = (
+    "atendimento demora unidade servidor fila posto escola ônibus rua buraco "
+    "iluminação hospital medicamento agendamento protocolo calçada lixo coleta "
+    "obra segurança praça linha horário informação resposta prazo setor"
+).split()
+
+
+class GeradorDadosSinteticos:
+    """
+    Gera usuários, manifestações, protocolos, anexos (metadados) e
+    movimentações, gravando tudo em lotes.
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        usuarios: int = 10_000,
+        manifestacoes: int = 100_000,
+        dias: int = 365,
+        semente: int = 42,
+        tamanho_lote: int = 5_000,
+        data_final: Optional[date] = None,
+    ):
+        self.db = db
+        self.qtd_usuarios = usuarios
+        self.qtd_manifestacoes = manifestacoes
+        self.dias = dias
+        self.tamanho_lote = tamanho_lote
+        self.data_final = data_final or date.today()
+        self.rng = random.Random(semente)
+
+        self._classificacoes = list(PESOS_CLASSIFICACAO)
+        self._pesos_classificacao = list(PESOS_CLASSIFICACAO.values())
+
+        self.cidadaos: List[str] = []
+        self.admins: List[str] = []
+        self.buffers: Dict[str, List[Dict]] = {"manifestacoes": [], "protocolos": [], "anexos": [], "movimentacoes": []}
+        self.linhas_gravadas = 0
+
+    # ==========================================
+    # DISTRIBUIÇÕES
+    # ==========================================
+    def _uuid(self) -> str:
+        """UUID derivado do gerador com semente (reprodutível)."""
+        return str(UUID(int=self.rng.getrandbits(128), version=4))
+
+    def _pesos_assuntos(self, assuntos: List[str]) -> List[float]:
+        """Zipf: o 1º assunto recebe ~1/1, o 2º ~1/2, o 3º ~1/3..."""
+        ordem = assuntos[:]
+        self.rng.shuffle(ordem)
+        posicao = {assunto: i + 1 for i, assunto in enumerate(ordem)}
+        return [1.0 / (posicao[a] ** 1.1) for a in assuntos]
+
+    def _volume_por_dia(self) -> Dict[date, int]:
+        """Distribui o total entre os dias com sazonalidade semanal e picos de campanha."""
+        inicio = self.data_final - timedelta(days=self.dias - 1)
+        pesos = {}
+        for i in range(self.dias):
+            dia = inicio + timedelta(days=i)
+            peso = 0.4 if dia.weekday() >= 5 else 1.0
+            peso *= self.rng.uniform(0.7, 1.3)
+            if self.rng.random() < 0.05:  # dia de campanha
+                peso *= self.rng.uniform(3, 8)
+            pesos[dia] = peso
+
+        soma = sum(pesos.values())
+        volumes = {dia: int(self.qtd_manifestacoes * peso / soma) for dia, peso in pesos.items()}
+        # Resto da divisão vai para os dias de maior peso
+        resto = self.qtd_manifestacoes - sum(volumes.values())
+        for dia in sorted(pesos, key=pesos.get, reverse=True)[:resto]:
+            volumes[dia] += 1
+        return volumes
+
+    def _relato(self) -> str:
+        return " ".join(self.rng.choices(PALAVRAS, k=self.rng.randint(12, 120))).capitalize() + "."
+
+    # ==========================================
+    # GRAVAÇÃO EM LOTE
+    # ==========================================
+    def _descarregar(self):
+        """Grava os buffers na ordem das chaves estrangeiras e faz commit."""
+        for modelo, chave in ((Manifestacao, "manifestacoes"), (Protocolo, "protocolos"),
+                              (Anexo, "anexos"), (Movimentacao, "movimentacoes")):
+            self.linhas_gravadas += CargaService.inserir_em_massa(self.db, modelo.__table__, self.buffers[chave])
+            self.buffers[chave] = []
+        self.db.commit()
+        avisar_carga(CARGA_IMPORTANDO)
+
+    # ==========================================
+    # ETAPAS
+    # ==========================================
+    def gerar_usuarios(self):
+        """Cidadãos e administradores. O hash da senha é calculado uma única vez."""
+        base = self.db.query(func.count(Usuario.id)).scalar() or 0
+        senha_hash = AuthService.gerar_hash_senha(SENHA_PADRAO)
+        qtd_admins = max(5, self.qtd_usuarios // 1000)
+        agora = datetime.now()
+
+        lote = []
+        for i in range(self.qtd_usuarios + qtd_admins):
+            numero = base + i
+            admin = i >= self.qtd_usuarios
+            usuario_id = self._uuid()
+            (self.admins if admin else self.cidadaos).append(usuario_id)
+            lote.append({
+                "id": usuario_id,
+                "email": f"{'admin' if admin else 'cidadao'}{numero}@{DOMINIO_EMAIL}",
+                "cpf": f"{90_000_000_000 + numero:011d}",
+                "senha_hash": senha_hash,
+                "admin": admin,
+                "nome": f"{'Servidor' if admin else 'Cidadão'} Sintético {numero}",
+                "telefone": f"61{self.rng.randint(900000000, 999999999)}",
+                "ativo": True,
+                "data_criacao": agora - timedelta(days=self.rng.randint(0, self.dias)),
+                "ultimo_acesso": agora,
+                "ultimo_visto_notificacoes": agora,
+            })
+            if len(lote) >= self.tamanho_lote:
+                self.linhas_gravadas += CargaService.inserir_em_massa(self.db, Usuario.__table__, lote)
+                self.db.commit()
+                lote = []
+        self.linhas_gravadas += CargaService.inserir_em_massa(self.db, Usuario.__table__, lote)
+        self.db.commit()
+
+    def _gerar_manifestacao(self, dia: date, sequencia: int, assunto_id: str, agora: datetime):
+        criacao = datetime.combine(dia, datetime.min.time()) + timedelta(seconds=self.rng.randint(7 * 3600, 22 * 3600))
+        criacao = min(criacao, agora)  # o dia de hoje ainda não terminou
+        idade = (agora - criacao).days
+
+        # Quanto mais antiga, maior a chance de já estar concluída
+        sorteio = self.rng.random()
+        if idade > PRAZO_RESPOSTA_DIAS:
+            status = StatusManifestacao.CONCLUIDA if sorteio < 0.85 else (
+                StatusManifestacao.REJEITADA if sorteio < 0.92 else StatusManifestacao.EM_PROCESSAMENTO)
+        else:
+            status = StatusManifestacao.PENDENTE if sorteio < 0.4 else (
+                StatusManifestacao.RECEBIDA if sorteio < 0.6 else (
+                    StatusManifestacao.EM_PROCESSAMENTO if sorteio < 0.85 else StatusManifestacao.CONCLUIDA))
+
+        anonimo = self.rng.random() < 0.15
+        autor_id = self.rng.choice(self.cidadaos)
+        manifestacao_id = self._uuid()
+        protocolo = ProtocoloService.gerar_numero(dia, f"{sequencia:06X}")
+
+        # Thread de movimentações: alterna ouvidoria e cidadão
+        qtd_movs = min(int(self.rng.expovariate(1 / 2.5)), 20)
+        momento = criacao  # última movimentação gravada (nunca depois de agora)
+        for i in range(qtd_movs):
+            proximo = momento + timedelta(hours=self.rng.uniform(1, 24 * 7))
+            if proximo > agora:
+                break
+            momento = proximo
+            da_ouvidoria = i % 2 == 0
+            self.buffers["movimentacoes"].append({
+                "id": self._uuid(),
+                "manifestacao_id": manifestacao_id,
+                "autor_id": self.rng.choice(self.admins) if da_ouvidoria else autor_id,
+                "texto": self._relato(),
+                "interno": da_ouvidoria and self.rng.random() < 0.15,
+                "data_criacao": momento,
+            })
+
+        encerrada = status in (StatusManifestacao.CONCLUIDA, StatusManifestacao.REJEITADA)
+        self.buffers["manifestacoes"].append({
+            "id": manifestacao_id,
+            "protocolo": protocolo,
+            "relato": self._relato(),
+            "dados_complementares": None,
+            "classificacao": self.rng.choices(self._classificacoes, self._pesos_classificacao)[0],
+            "anonimo": anonimo,
+            "status": status,
+            "data_criacao": criacao,
+            "data_atualizacao": momento if momento > criacao else None,
+            "data_conclusao": momento if encerrada else None,
+            "assunto_id": assunto_id,
+            "usuario_id": None if anonimo else autor_id,
+        })
+        self.buffers["protocolos"].append({
+            "numero": protocolo,
+            "manifestacao_id": manifestacao_id,
+            "sequencia_diaria": sequencia,
+            "data_geracao": criacao,
+            "data_expiracao": criacao + timedelta(days=PRAZO_RESPOSTA_DIAS),
+        })
+
+        if self.rng.random() < 0.3:
+            for _ in range(self.rng.randint(1, 3)):
+                tipo, tamanho_medio = self.rng.choice(TIPOS_ANEXO)
+                anexo_id = self._uuid()
+                self.buffers["anexos"].append({
+                    "id": anexo_id,
+                    "manifestacao_id": manifestacao_id,
+                    "arquivo_url": f"uploads/sintetico/{anexo_id}",
+                    "tipo_arquivo": tipo,
+                    "tamanho": int(self.rng.lognormvariate(0, 0.6) * tamanho_medio),
+                    "data_upload": criacao,
+                })
+
+    def gerar_manifestacoes(self):
+        assuntos = [id_ for (id_,) in self.db.query(Assunto.id).order_by(Assunto.nome).all()]
+        if not assuntos:
+            raise RuntimeError("Nenhum assunto cadastrado. Rode 'python seed_assuntos.py' antes.")
+        pesos_assuntos = self._pesos_assuntos(assuntos)
+
+        volumes = self._volume_por_dia()
+        dia_geracao = cast(Protocolo.data_geracao, Date)
+        ultimas = dict(
+            self.db.query(dia_geracao, func.max(Protocolo.sequencia_diaria))
+            .filter(dia_geracao >= min(volumes))
+            .group_by(dia_geracao)
+            .all()
+        )
+
+        agora = datetime.now()
+        for dia in sorted(volumes):
+            sequencia = ultimas.get(dia) or 0
+            for assunto_id in self.rng.choices(assuntos, pesos_assuntos, k=volumes[dia]):
+                sequencia += 1
+                self._gerar_manifestacao(dia, sequencia, assunto_id, agora)
+                if len(self.buffers["manifestacoes"]) >= self.tamanho_lote:
+                    self._descarregar()
+        self._descarregar()
+
+    def executar(self) -> Dict:
+        inicio = time.perf_counter()
+        self.gerar_usuarios()
+        logger.info("%s cidadãos e %s administradores gerados", len(self.cidadaos), len(self.admins))
+        try:
+            self.gerar_manifestacoes()
+        finally:
+            avisar_carga(CARGA_CONCLUIDA)
+
+        decorrido = time.perf_counter() - inicio
+        resultado = {
+            "linhas": self.linhas_gravadas,
+            "segundos": round(decorrido, 1),
+            "linhas_por_segundo": round(self.linhas_gravadas / max(decorrido, 1e-9), 1),
+        }
+        logger.info("Geração concluída: %s", resultado)
+        return resultado
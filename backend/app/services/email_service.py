@@ -0,0 +1,151 @@
+"""
+Service de E-mail (envio das notificações)
+Arquivo: backend/app/services/email_service.py
+
+OBJETIVO:
+Entregar por e-mail os avisos das tarefas em segundo plano (recebimento,
+respostas e mudança de situação, link de recuperação de senha) sem abrir
+uma sessão SMTP por mensagem.
+
+COMO FUNCIONA:
+- Chamado pelos manipuladores de app/services/tarefa_service.py, nos
+  processos do trabalhador (nunca na requisição). O envio é síncrono: a
+  tarefa só é concluída depois que o servidor SMTP aceitou a mensagem; se
+  falhar, o outbox tenta de novo com backoff.
+- Uma conexão SMTP por processo, reaproveitada entre mensagens e entre
+  lotes; renovada a cada EMAIL_POR_CONEXAO mensagens e fechada depois de
+  EMAIL_CONEXAO_OCIOSA_S sem uso. Conexão que caiu é refeita uma vez na hora.
+- Ritmo: no máximo EMAIL_POR_SEGUNDO mensagens por segundo em cada processo
+  (provedores recusam rajadas).
+- Com EMAIL_ATIVO=False a mensagem só vai para o log (desenvolvimento).
+"""
+
+import logging
+import smtplib
+import ssl
+import threading
+import time
+from email.message import EmailMessage
+from email.utils import formataddr, make_msgid
+from typing import Optional
+
+from app.config import settings
+from app.middleware.metricas import EMAIL_CONEXOES, EMAILS_ENVIADOS
+
+logger = logging.getLogger(__name__)
+
+
+def _conexao_caiu(erro: Exception) -> bool:
+    """Erros em que vale refazer a conexão e reenviar na hora."""
+    if isinstance(erro, (smtplib.SMTPServerDisconnected, ConnectionError)):
+        return True
+    # 421: o servidor está encerrando esta sessão
+    return isinstance(erro, smtplib.SMTPResponseException) and erro.smtp_code == 421
+
+
+class DespachanteEmail:
+    """Conexão SMTP reaproveitada e ritmo de envio de um processo."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._enviadas_na_conexao = 0
+        self._ultimo_uso = 0.0
+        self._proximo_envio = 0.0
+
+    def enviar(self, destinatario: str, assunto: str, texto: str):
+        if not settings.EMAIL_ATIVO:
+            logger.info("E-mail (desativado) para %s: %s", destinatario, assunto)
+            if settings.DEBUG:
+                logger.info("Conteúdo do e-mail: %s", texto)
+            return
+
+        mensagem = EmailMessage()
+        mensagem["From"] = formataddr((settings.EMAIL_REMETENTE_NOME, settings.EMAIL_REMETENTE))
+        mensagem["To"] = destinatario
+        mensagem["Subject"] = assunto
+        mensagem["Message-ID"] = make_msgid(domain=settings.EMAIL_REMETENTE.split("@")[-1])
+        mensagem.set_content(texto)
+
+        with self._lock:
+            self._aguardar_vez()
+            try:
+                try:
+                    self._conexao().send_message(mensagem)
+                except Exception as e:
+                    self._descartar()
+                    if not _conexao_caiu(e):
+                        raise
+                    self._conexao().send_message(mensagem)
+            except Exception:
+                self._descartar()
+                EMAILS_ENVIADOS.labels(resultado="erro").inc()
+                raise
+            self._enviadas_na_conexao += 1
+            self._ultimo_uso = time.monotonic()
+        EMAILS_ENVIADOS.labels(resultado="enviado").inc()
+
+    def fechar_ociosa(self):
+        """Fecha a conexão parada há mais de EMAIL_CONEXAO_OCIOSA_S (fila vazia)."""
+        with self._lock:
+            if self._smtp and time.monotonic() - self._ultimo_uso > settings.EMAIL_CONEXAO_OCIOSA_S:
+                self._fechar()
+
+    def fechar(self):
+        with self._lock:
+            self._fechar()
+
+    # ==========================================================================
+    # CONEXÃO E RITMO (chamados com o lock)
+    # ==========================================================================
+    def _aguardar_vez(self):
+        agora = time.monotonic()
+        if self._proximo_envio > agora:
+            time.sleep(self._proximo_envio - agora)
+            agora = self._proximo_envio
+        self._proximo_envio = agora + 1.0 / settings.EMAIL_POR_SEGUNDO
+
+    def _conexao(self) -> smtplib.SMTP:
+        if self._smtp is not None and (
+            self._enviadas_na_conexao >= settings.EMAIL_POR_CONEXAO
+            or time.monotonic() - self._ultimo_uso > settings.EMAIL_CONEXAO_OCIOSA_S
+        ):
+            self._fechar()
+        if self._smtp is None:
+            if settings.SMTP_SSL:
+                smtp = smtplib.SMTP_SSL(
+                    settings.SMTP_HOST, settings.SMTP_PORTA,
+                    timeout=settings.SMTP_TIMEOUT_S, context=ssl.create_default_context(),
+                )
+            else:
+                smtp = smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORTA, timeout=settings.SMTP_TIMEOUT_S)
+                if settings.SMTP_STARTTLS:
+                    smtp.starttls(context=ssl.create_default_context())
+            if settings.SMTP_USUARIO:
+                smtp.login(settings.SMTP_USUARIO, settings.SMTP_SENHA)
+            EMAIL_CONEXOES.inc()
+            self._smtp = smtp
+            self._enviadas_na_conexao = 0
+            self._ultimo_uso = time.monotonic()
+        return self._smtp
+
+    def _fechar(self):
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except Exception:
+            pass
+        self._descartar()
+
+    def _descartar(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.close()
+            except Exception:
+                pass
+        self._smtp = None
+
+
+# Um por processo (conexões SMTP não são compartilhadas entre processos)
+despachante_email = DespachanteEmail()
@@ -0,0 +1,203 @@
+"""
+Service de Exportação de Manifestações
+Arquivo: backend/app/services/exportacao_service.py
+
+OBJETIVO:
+Gerar extrações em massa (CSV, JSONL ou Parquet) para a equipe de relatórios
+da CGDF sem carregar o resultado inteiro na memória:
+- Lê apenas as colunas necessárias (projeção, sem hidratar objetos ORM).
+- Usa cursor do lado do servidor ('yield_per' / 'stream_results').
+- Comprime e entrega os bytes aos poucos (gzip progressivo).
+O uso de memória fica constante, seja qual for o tamanho do resultado.
+"""
+
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import select, desc
+from sqlalchemy.orm import Session
+
+from app.models.assunto import Assunto
+from app.models.manifestacao import Manifestacao
+from app.services.manifestacao_service import ManifestacaoService
+
+FORMATOS = {
+    # formato: (extensão do arquivo, media type)
+    "csv": ("csv.gz", "application/gzip"),
+    "jsonl": ("jsonl.gz", "application/gzip"),
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+# Colunas exportadas (projeção). A ordem define o cabeçalho do CSV.
+COLUNAS = [
+    ("id", Manifestacao.id),
+    ("protocolo", Manifestacao.protocolo),
+    ("assunto", Assunto.nome),
+    ("classificacao", Manifestacao.classificacao),
+    ("status", Manifestacao.status),
+    ("anonimo", Manifestacao.anonimo),
+    ("relato", Manifestacao.relato),
+    ("data_criacao", Manifestacao.data_criacao),
+    ("data_atualizacao", Manifestacao.data_atualizacao),
+    ("data_conclusao", Manifestacao.data_conclusao),
+]
+NOMES_COLUNAS = [nome for nome, _ in COLUNAS]
+
+# Linhas buscadas do banco por vez (e escritas por bloco no arquivo)
+TAMANHO_LOTE = 1000
+
+
+def _valor_simples(valor: Any) -> Any:
+    """Converte Enums e datas para tipos aceitos por CSV/JSON/Parquet."""
+    if hasattr(valor, "value"):
+        return valor.value
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    return valor
+
+
+class _BufferDrenavel(io.RawIOBase):
+    """Arquivo em memória que é esvaziado a cada bloco escrito (usado pelo Parquet)."""
+
+    def __init__(self):
+        self._partes: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, dados) -> int:
+        self._partes.append(bytes(dados))
+        return len(dados)
+
+    def drenar(self) -> bytes:
+        dados = b"".join(self._partes)
+        self._partes.clear()
+        return dados
+
+
+class ExportacaoService:
+    """
+    Centraliza a leitura em streaming e a escrita progressiva dos formatos.
+    """
+
+    @staticmethod
+    def validar_formato(formato: str) -> str:
+        formato = (formato or "").lower()
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato inválido: {formato}. Use: {', '.join(FORMATOS)}")
+        if formato == "parquet":
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise ValueError("Exportação Parquet requer o pacote 'pyarrow' instalado.")
+        return formato
+
+    @staticmethod
+    def nome_arquivo(formato: str) -> str:
+        extensao, _ = FORMATOS[formato]
+        return f"manifestacoes-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{extensao}"
+
+    @staticmethod
+    def media_type(formato: str) -> str:
+        return FORMATOS[formato][1]
+
+    # ==========================================
+    # LEITURA EM STREAMING
+    # ==========================================
+    @staticmethod
+    def iterar_lotes(db: Session, filtros: Optional[Dict] = None) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Percorre o resultado em lotes de TAMANHO_LOTE linhas usando cursor no servidor.
+        Cada lote é uma lista de dicionários já com valores simples.
+        """
+        consulta = select(*[coluna for _, coluna in COLUNAS])\
+            .join(Assunto, Manifestacao.assunto_id == Assunto.id)
+        consulta = ManifestacaoService.aplicar_filtros(consulta, **(filtros or {}))
+        consulta = consulta.order_by(desc(Manifestacao.data_criacao))\
+            .execution_options(stream_results=True, yield_per=TAMANHO_LOTE)
+
+        resultado = db.execute(consulta)
+        try:
+            for particao in resultado.partitions():
+                yield [
+                    {nome: _valor_simples(valor) for nome, valor in zip(NOMES_COLUNAS, linha)}
+                    for linha in particao
+                ]
+        finally:
+            resultado.close()
+
+    # ==========================================
+    # ESCRITA PROGRESSIVA
+    # ==========================================
+    @staticmethod
+    def _gerar_csv(lotes: Iterator[List[Dict]]) -> Iterator[bytes]:
+        buffer = io.StringIO()
+        escritor = csv.DictWriter(buffer, fieldnames=NOMES_COLUNAS)
+        escritor.writeheader()
+        for lote in lotes:
+            escritor.writerows(lote)
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate(0)
+        resto = buffer.getvalue()
+        if resto:
+            yield resto.encode("utf-8")
+
+    @staticmethod
+    def _gerar_jsonl(lotes: Iterator[List[Dict]]) -> Iterator[bytes]:
+        for lote in lotes:
+            yield "".join(json.dumps(linha, ensure_ascii=False) + "\n" for linha in lote).encode("utf-8")
+
+    @staticmethod
+    def _comprimir_gzip(blocos: Iterator[bytes]) -> Iterator[bytes]:
+        """Compressão gzip incremental (wbits=31 gera o cabeçalho gzip)."""
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        for bloco in blocos:
+            comprimido = compressor.compress(bloco)
+            if comprimido:
+                yield comprimido
+        yield compressor.flush()
+
+    @staticmethod
+    def _gerar_parquet(lotes: Iterator[List[Dict]]) -> Iterator[bytes]:
+        """Cada lote vira um row group; a compressão gzip é interna ao Parquet."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        esquema = pa.schema([
+            ("id", pa.string()),
+            ("protocolo", pa.string()),
+            ("assunto", pa.string()),
+            ("classificacao", pa.string()),
+            ("status", pa.string()),
+            ("anonimo", pa.bool_()),
+            ("relato", pa.string()),
+            ("data_criacao", pa.string()),
+            ("data_atualizacao", pa.string()),
+            ("data_conclusao", pa.string()),
+        ])
+        destino = _BufferDrenavel()
+        escritor = pq.ParquetWriter(destino, esquema, compression="gzip")
+        try:
+            for lote in lotes:
+                escritor.write_table(pa.Table.from_pylist(lote, schema=esquema))
+                dados = destino.drenar()
+                if dados:
+                    yield dados
+        finally:
+            escritor.close()
+        yield destino.drenar()
+
+    @staticmethod
+    def gerar_arquivo(db: Session, formato: str, filtros: Optional[Dict] = None) -> Iterator[bytes]:
+        """Gera os bytes do arquivo final, bloco a bloco."""
+        lotes = ExportacaoService.iterar_lotes(db, filtros)
+        if formato == "parquet":
+            return ExportacaoService._gerar_parquet(lotes)
+        if formato == "csv":
+            return ExportacaoService._comprimir_gzip(ExportacaoService._gerar_csv(lotes))
+        return ExportacaoService._comprimir_gzip(ExportacaoService._gerar_jsonl(lotes))
@@ -0,0 +1,123 @@
+"""
+Service de Idempotência (persistência das chaves)
+Arquivo: backend/app/services/idempotencia_service.py
+
+Operações síncronas sobre a tabela chaves_idempotencia, chamadas pelo
+middleware (app/middleware/idempotencia.py) numa thread.
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy.exc import IntegrityError
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.chave_idempotencia import ChaveIdempotencia
+
+logger = logging.getLogger(__name__)
+
+# A cada tantas reservas, apaga as chaves vencidas
+LIMPEZA_A_CADA = 1000
+_reservas = 0
+
+
+def _como_dict(linha: ChaveIdempotencia) -> Dict:
+    return {
+        "situacao": linha.situacao,
+        "impressao": linha.impressao,
+        "status_http": linha.status_http,
+        "tipo_conteudo": linha.tipo_conteudo,
+        "corpo": linha.corpo,
+    }
+
+
+class IdempotenciaService:
+
+    @staticmethod
+    def reservar(chave: str) -> Optional[Dict]:
+        """
+        Tenta inserir a chave como 'em_andamento'. None = reservada por esta
+        requisição (executa); senão, o estado atual da chave (repete ou espera).
+        """
+        global _reservas
+        _reservas += 1
+        db = SessionLocal()
+        try:
+            if _reservas % LIMPEZA_A_CADA == 0:
+                IdempotenciaService._limpar_vencidas(db)
+
+            for _ in range(3):
+                agora = datetime.now()
+                db.add(ChaveIdempotencia(
+                    chave=chave,
+                    situacao="em_andamento",
+                    criado_em=agora,
+                    expira_em=agora + timedelta(seconds=settings.IDEMPOTENCIA_EXECUCAO_MAX_S),
+                ))
+                try:
+                    db.commit()
+                    return None
+                except IntegrityError:
+                    db.rollback()
+
+                existente = db.get(ChaveIdempotencia, chave)
+                if existente is None:
+                    continue  # liberada entre o INSERT e a leitura
+                if existente.expira_em >= agora:
+                    return _como_dict(existente)
+                # Vencida (TTL acabou ou o worker caiu no meio): pode ser reservada de novo
+                db.query(ChaveIdempotencia)\
+                    .filter(ChaveIdempotencia.chave == chave, ChaveIdempotencia.expira_em < agora)\
+                    .delete(synchronize_session=False)
+                db.commit()
+            raise RuntimeError(f"Não foi possível reservar a chave de idempotência {chave[:12]}")
+        finally:
+            db.close()
+
+    @staticmethod
+    def obter(chave: str) -> Optional[Dict]:
+        db = SessionLocal()
+        try:
+            linha = db.get(ChaveIdempotencia, chave)
+            return _como_dict(linha) if linha else None
+        finally:
+            db.close()
+
+    @staticmethod
+    def concluir(chave: str, impressao: str, status_http: int, tipo_conteudo: Optional[str], corpo: str):
+        db = SessionLocal()
+        try:
+            agora = datetime.now()
+            db.query(ChaveIdempotencia).filter(ChaveIdempotencia.chave == chave).update({
+                "situacao": "concluida",
+                "impressao": impressao,
+                "status_http": status_http,
+                "tipo_conteudo": tipo_conteudo,
+                "corpo": corpo,
+                "expira_em": agora + timedelta(seconds=settings.IDEMPOTENCIA_TTL_S),
+            }, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    @staticmethod
+    def liberar(chave: str):
+        """Apaga a reserva (falha da requisição original: a repetição executa de novo)."""
+        db = SessionLocal()
+        try:
+            db.query(ChaveIdempotencia).filter(ChaveIdempotencia.chave == chave)\
+                .delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    @staticmethod
+    def _limpar_vencidas(db):
+        apagadas = db.query(ChaveIdempotencia)\
+            .filter(ChaveIdempotencia.expira_em < datetime.now())\
+            .delete(synchronize_session=False)
+        db.commit()
+        if apagadas:
+            logger.info("%d chaves de idempotência vencidas apagadas", apagadas)
@@ -0,0 +1,351 @@
+"""
+Service de Importação do Legado
+Arquivo: backend/app/services/importacao_service.py
+
+OBJETIVO:
+Migrar os registros do sistema de ouvidoria anterior em alta velocidade,
+sem passar por ManifestacaoService.criar_manifestacao linha a linha.
+
+FORMATO DE ENTRADA (JSONL: um objeto por linha / CSV: uma coluna por campo):
+    protocolo            (opcional) número original, preservado se informado
+    sequencia_diaria     (opcional) alocada em massa se ausente
+    data_criacao         (obrigatório) ISO 8601
+    data_atualizacao, data_conclusao, data_expiracao  (opcionais) ISO 8601
+    relato               (obrigatório)
+    assunto              (obrigatório) id ou nome do assunto
+    classificacao, status, anonimo, usuario_email      (opcionais)
+    dados_complementares (opcional) objeto JSON
+    anexos               (opcional) lista de {arquivo_url, tipo_arquivo, tamanho, data_upload}
+    movimentacoes        (opcional) lista de {texto, interno, data_criacao, autor_email}
+No CSV, os campos 'dados_complementares', 'anexos' e 'movimentacoes' vêm como texto JSON.
+"""
+
+import csv
+import hashlib
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+from uuid import uuid4
+
+from sqlalchemy import Date, cast, func
+from sqlalchemy.orm import Session
+
+from app.models.anexo import Anexo
+from app.models.assunto import Assunto
+from app.models.manifestacao import ClassificacaoManifestacao, Manifestacao, StatusManifestacao
+from app.models.movimentacao import Movimentacao
+from app.models.protocolo import Protocolo
+from app.models.usuario import Usuario
+from app.services.auth_service import AuthService
+from app.services.carga_service import CargaService
+from app.services.protocolo_service import CARGA_CONCLUIDA, CARGA_IMPORTANDO, ProtocoloService, avisar_carga
+
+logger = logging.getLogger(__name__)
+
+# Mesmo prazo legal aplicado em ManifestacaoService.criar_manifestacao
+PRAZO_RESPOSTA_DIAS = 30
+
+EMAIL_AUTOR_LEGADO = "legado@participa-df.gov.br"
+CAMPOS_JSON_CSV = ("dados_complementares", "anexos", "movimentacoes")
+
+
+class RegistroInvalido(ValueError):
+    """Registro do legado que não pode ser importado."""
+
+
+def _data(valor: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(valor) if valor else None
+
+
+def _booleano(valor) -> bool:
+    if isinstance(valor, bool):
+        return valor
+    return str(valor or "").strip().lower() in ("1", "true", "sim", "s", "yes")
+
+
+class ImportadorLegado:
+    """
+    Importa um arquivo JSONL/CSV em lotes. Cada lote é uma transação:
+    consultas de apoio em massa (assuntos, usuários, sequências, duplicados)
+    e inserção via COPY/executemany nas quatro tabelas.
+    Um arquivo de checkpoint permite retomar a importação de onde parou.
+    """
+
+    def __init__(self, db: Session, caminho: str, tamanho_lote: int = 2000):
+        self.db = db
+        self.caminho = caminho
+        self.tamanho_lote = tamanho_lote
+        self.caminho_checkpoint = caminho + ".checkpoint.json"
+        self.nome_arquivo = os.path.basename(caminho)
+
+        self.assuntos: Dict[str, str] = {}
+        self.sequencias: Dict = {}  # dia -> última sequência usada
+        self.autor_legado_id: Optional[str] = None
+
+        self.estatisticas = {"linhas_processadas": 0, "importadas": 0, "ignoradas": 0, "linhas_banco": 0}
+
+    # ==========================================
+    # LEITURA E CHECKPOINT
+    # ==========================================
+    def ler_registros(self) -> Iterator[Tuple[int, Dict]]:
+        """Devolve (número da linha, registro) para JSONL ou CSV."""
+        with open(self.caminho, "r", encoding="utf-8", newline="") as arquivo:
+            if self.caminho.lower().endswith(".csv"):
+                for numero, registro in enumerate(csv.DictReader(arquivo), start=1):
+                    for campo in CAMPOS_JSON_CSV:
+                        if registro.get(campo):
+                            registro[campo] = json.loads(registro[campo])
+                    yield numero, registro
+            else:
+                for numero, linha in enumerate(arquivo, start=1):
+                    if linha.strip():
+                        yield numero, json.loads(linha)
+
+    def carregar_checkpoint(self):
+        if os.path.exists(self.caminho_checkpoint):
+            with open(self.caminho_checkpoint, "r", encoding="utf-8") as arquivo:
+                self.estatisticas.update(json.load(arquivo))
+            logger.info("Retomando importação a partir da linha %s", self.estatisticas["linhas_processadas"] + 1)
+
+    def salvar_checkpoint(self):
+        temporario = self.caminho_checkpoint + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as arquivo:
+            json.dump(self.estatisticas, arquivo)
+        os.replace(temporario, self.caminho_checkpoint)
+
+    # ==========================================
+    # CONSULTAS DE APOIO (uma por lote)
+    # ==========================================
+    def _carregar_assuntos(self):
+        for id_, nome in self.db.query(Assunto.id, Assunto.nome).all():
+            self.assuntos[id_] = id_
+            self.assuntos[nome.strip().lower()] = id_
+
+    def _usuarios_por_email(self, emails: set) -> Dict[str, str]:
+        if not emails:
+            return {}
+        return dict(self.db.query(Usuario.email, Usuario.id).filter(Usuario.email.in_(emails)).all())
+
+    def _protocolos_existentes(self, numeros: set) -> set:
+        if not numeros:
+            return set()
+        return {p for (p,) in self.db.query(Manifestacao.protocolo).filter(Manifestacao.protocolo.in_(numeros)).all()}
+
+    def _preparar_sequencias(self, dias: set):
+        """Busca de uma vez a última sequência de cada dia ainda não conhecido."""
+        novos = [dia for dia in dias if dia not in self.sequencias]
+        if not novos:
+            return
+        dia_geracao = cast(Protocolo.data_geracao, Date)
+        maximos = dict(
+            self.db.query(dia_geracao, func.max(Protocolo.sequencia_diaria))
+            .filter(dia_geracao.in_(novos))
+            .group_by(dia_geracao)
+            .all()
+        )
+        for dia in novos:
+            self.sequencias[dia] = maximos.get(dia) or 0
+
+    def _proxima_sequencia(self, dia) -> int:
+        self.sequencias[dia] += 1
+        return self.sequencias[dia]
+
+    # ==========================================
+    # CONVERSÃO DE UM REGISTRO
+    # ==========================================
+    def _converter(self, numero_linha: int, registro: Dict, usuarios: Dict[str, str]) -> Dict[str, List]:
+        """
+        Linhas de um registro (manifestação, protocolo, anexos, movimentações).
+        Só são acrescentadas ao lote depois que o registro inteiro foi convertido:
+        um erro no meio não deixa manifestação sem protocolo nem anexo órfão.
+        """
+        data_criacao = _data(registro.get("data_criacao"))
+        if not data_criacao:
+            raise RegistroInvalido("data_criacao ausente")
+        if not (registro.get("relato") or "").strip():
+            raise RegistroInvalido("relato vazio")
+
+        assunto_id = self.assuntos.get(registro.get("assunto", "")) \
+            or self.assuntos.get(str(registro.get("assunto", "")).strip().lower())
+        if not assunto_id:
+            raise RegistroInvalido(f"assunto desconhecido: {registro.get('assunto')}")
+
+        try:
+            status = StatusManifestacao((registro.get("status") or "pendente").lower())
+            classificacao = ClassificacaoManifestacao((registro.get("classificacao") or "reclamacao").lower())
+        except ValueError as e:
+            raise RegistroInvalido(str(e))
+
+        protocolo = registro.get("protocolo")
+        if not protocolo:
+            # Sufixo determinístico: reimportar a mesma linha gera o mesmo número
+            sufixo = hashlib.sha1(f"{self.nome_arquivo}:{numero_linha}".encode()).hexdigest()[:6].upper()
+            protocolo = ProtocoloService.gerar_numero(data_criacao, sufixo)
+
+        sequencia = registro.get("sequencia_diaria")
+        sequencia = int(sequencia) if sequencia else self._proxima_sequencia(data_criacao.date())
+
+        manifestacao_id = str(uuid4())
+        anonimo = _booleano(registro.get("anonimo"))
+        linhas = {"manifestacoes": [], "protocolos": [], "anexos": [], "movimentacoes": []}
+        linhas["manifestacoes"].append({
+            "id": manifestacao_id,
+            "protocolo": protocolo,
+            "relato": registro["relato"].strip(),
+            "dados_complementares": registro.get("dados_complementares") or None,
+            "classificacao": classificacao,
+            "anonimo": anonimo,
+            "status": status,
+            "data_criacao": data_criacao,
+            "data_atualizacao": _data(registro.get("data_atualizacao")),
+            "data_conclusao": _data(registro.get("data_conclusao")),
+            "assunto_id": assunto_id,
+            "usuario_id": None if anonimo else usuarios.get(registro.get("usuario_email")),
+        })
+        linhas["protocolos"].append({
+            "numero": protocolo,
+            "manifestacao_id": manifestacao_id,
+            "sequencia_diaria": sequencia,
+            "data_geracao": data_criacao,
+            "data_expiracao": _data(registro.get("data_expiracao")) or data_criacao + timedelta(days=PRAZO_RESPOSTA_DIAS),
+        })
+        for anexo in registro.get("anexos") or []:
+            linhas["anexos"].append({
+                "id": str(uuid4()),
+                "manifestacao_id": manifestacao_id,
+                "arquivo_url": anexo["arquivo_url"],
+                "tipo_arquivo": anexo.get("tipo_arquivo") or "application/octet-stream",
+                "tamanho": int(anexo.get("tamanho") or 0),
+                "data_upload": _data(anexo.get("data_upload")) or data_criacao,
+            })
+        for mov in registro.get("movimentacoes") or []:
+            linhas["movimentacoes"].append({
+                "id": str(uuid4()),
+                "manifestacao_id": manifestacao_id,
+                "autor_id": usuarios.get(mov.get("autor_email")) or self.autor_legado_id,
+                "texto": mov["texto"],
+                "interno": _booleano(mov.get("interno")),
+                "data_criacao": _data(mov.get("data_criacao")) or data_criacao,
+            })
+        return linhas
+
+    # ==========================================
+    # LOTE
+    # ==========================================
+    def processar_lote(self, lote: List[Tuple[int, Dict]]):
+        emails = set()
+        for _, registro in lote:
+            if registro.get("usuario_email"):
+                emails.add(registro["usuario_email"])
+            for mov in registro.get("movimentacoes") or []:
+                if mov.get("autor_email"):
+                    emails.add(mov["autor_email"])
+        usuarios = self._usuarios_por_email(emails)
+        existentes = self._protocolos_existentes({r["protocolo"] for _, r in lote if r.get("protocolo")})
+
+        dias = set()
+        for _, registro in lote:
+            try:
+                dias.add(_data(registro.get("data_criacao")).date())
+            except (TypeError, ValueError, AttributeError):
+                pass
+        self._preparar_sequencias(dias)
+
+        linhas = {"manifestacoes": [], "protocolos": [], "anexos": [], "movimentacoes": []}
+        no_lote = set()  # protocolos já convertidos neste lote
+        for numero_linha, registro in lote:
+            if registro.get("protocolo") in existentes:
+                self.estatisticas["ignoradas"] += 1
+                continue
+            try:
+                convertidas = self._converter(numero_linha, registro, usuarios)
+            except (RegistroInvalido, KeyError, TypeError, ValueError) as e:
+                self.estatisticas["ignoradas"] += 1
+                logger.warning("Linha %s ignorada: %s", numero_linha, e)
+                continue
+            protocolo = convertidas["manifestacoes"][0]["protocolo"]
+            if protocolo in no_lote:
+                # Repetido no próprio arquivo: a violação de unicidade abortaria o lote inteiro
+                self.estatisticas["ignoradas"] += 1
+                logger.warning("Linha %s ignorada: protocolo %s repetido no arquivo", numero_linha, protocolo)
+                continue
+            no_lote.add(protocolo)
+            for chave, novas in convertidas.items():
+                linhas[chave].extend(novas)
+            self.estatisticas["importadas"] += 1
+
+        # Protocolos gerados que colidem com um já gravado (reprocessamento após falha)
+        gerados = {m["protocolo"] for m in linhas["manifestacoes"]} - existentes
+        repetidos = self._protocolos_existentes(gerados)
+        if repetidos:
+            self._remover_repetidos(linhas, repetidos)
+
+        try:
+            # Ordem respeita as chaves estrangeiras
+            for modelo, chave in ((Manifestacao, "manifestacoes"), (Protocolo, "protocolos"),
+                                  (Anexo, "anexos"), (Movimentacao, "movimentacoes")):
+                self.estatisticas["linhas_banco"] += CargaService.inserir_em_massa(
+                    self.db, modelo.__table__, linhas[chave]
+                )
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            logger.error("Erro ao gravar lote: %s", e)
+            raise e
+        # Números de dias passados: os workers deixam de confiar no filtro de protocolos
+        avisar_carga(CARGA_IMPORTANDO)
+
+        self.estatisticas["linhas_processadas"] = lote[-1][0]
+        self.salvar_checkpoint()
+
+    def _remover_repetidos(self, linhas: Dict[str, List], repetidos: set):
+        ids = {m["id"] for m in linhas["manifestacoes"] if m["protocolo"] in repetidos}
+        linhas["manifestacoes"] = [m for m in linhas["manifestacoes"] if m["id"] not in ids]
+        for chave in ("protocolos", "anexos", "movimentacoes"):
+            linhas[chave] = [l for l in linhas[chave] if l["manifestacao_id"] not in ids]
+        self.estatisticas["importadas"] -= len(ids)
+        self.estatisticas["ignoradas"] += len(ids)
+
+    # ==========================================
+    # EXECUÇÃO
+    # ==========================================
+    def executar(self) -> Dict:
+        self.carregar_checkpoint()
+        self._carregar_assuntos()
+        self.autor_legado_id = AuthService.obter_usuario_sistema(self.db, EMAIL_AUTOR_LEGADO, "Sistema Legado")
+
+        inicio = time.perf_counter()
+        linhas_banco_inicio = self.estatisticas["linhas_banco"]
+        pular = self.estatisticas["linhas_processadas"]
+
+        lote: List[Tuple[int, Dict]] = []
+        try:
+            for numero_linha, registro in self.ler_registros():
+                if numero_linha <= pular:
+                    continue
+                lote.append((numero_linha, registro))
+                if len(lote) >= self.tamanho_lote:
+                    self.processar_lote(lote)
+                    lote = []
+                    self._registrar_progresso(inicio, linhas_banco_inicio)
+            if lote:
+                self.processar_lote(lote)
+        finally:
+            # Mesmo se parar no meio, os lotes já gravados entram nos filtros
+            avisar_carga(CARGA_CONCLUIDA)
+
+        self._registrar_progresso(inicio, linhas_banco_inicio)
+        return self.estatisticas
+
+    def _registrar_progresso(self, inicio: float, linhas_banco_inicio: int):
+        decorrido = max(time.perf_counter() - inicio, 1e-9)
+        gravadas = self.estatisticas["linhas_banco"] - linhas_banco_inicio
+        self.estatisticas["linhas_por_segundo"] = round(gravadas / decorrido, 1)
+        logger.info(
+            "Linha %s: %s importadas, %s ignoradas, %s linhas/s",
+            self.estatisticas["linhas_processadas"], self.estatisticas["importadas"],
+            self.estatisticas["ignoradas"], self.estatisticas["linhas_por_segundo"],
+        )
@@ -0,0 +1,328 @@
+"""
+Service de Ingestão em Rajada (diário local + gravação em lote)
+Arquivo: backend/app/services/ingestao_service.py
+
+OBJETIVO:
+Em dias de campanha os envios disparam e cada criação direta faz consulta de
+sequência, flush, commit, refresh e leitura do assunto antes de responder.
+Com INGESTAO_MODO=diario a requisição só valida, acrescenta o registro ao
+diário do worker (fsync) e responde 202 com o protocolo; uma thread grava os
+registros acumulados em lotes, numa transação por lote.
+
+COMO FUNCIONA:
+- Diário: arquivos JSONL em INGESTAO_DIRETORIO (diario-<pid>-<id>.jsonl), só
+  acrescentados, com trava exclusiva (flock) enquanto o worker vive. O fsync é
+  agrupado: uma chamada cobre todas as linhas escritas até ali.
+- Gravação: a cada INGESTAO_INTERVALO_S (ou ao juntar INGESTAO_LOTE_MAX) os
+  pendentes vão para o banco em ManifestacaoService.gravar_lote. Banco fora do
+  ar = tenta de novo com espera crescente; registro recusado pelo banco =
+  separado em rejeitados-<pid>.jsonl sem travar os outros.
+- Segmentos: a cada INGESTAO_SEGMENTO_MAX registros o diário troca de arquivo;
+  o arquivo é apagado quando todos os seus registros estão no banco.
+- Recuperação: no início e a cada INGESTAO_RECUPERAR_S, diários sem trava (de
+  um worker que caiu) são regravados. Regravar é seguro: ids já gravados são
+  ignorados. Uma última linha incompleta (queda no meio da escrita) nunca foi
+  confirmada ao cliente e é descartada.
+
+O protocolo só aparece no rastreio depois da gravação do lote (atraso típico
+de INGESTAO_INTERVALO_S).
+"""
+
+import fcntl
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+from uuid import uuid4
+
+from sqlalchemy.exc import InterfaceError, OperationalError
+
+from app.config import settings
+from app.database import SessionLocal
+from app.middleware.metricas import INGESTAO_LOTE, INGESTAO_PENDENTES, INGESTAO_REJEITADAS
+from app.models.assunto import Assunto
+from app.services.cache_service import caches
+from app.services.manifestacao_service import ManifestacaoService
+
+logger = logging.getLogger(__name__)
+
+# Banco indisponível: o lote inteiro volta a ser tentado
+ERROS_TRANSITORIOS = (OperationalError, InterfaceError)
+
+
+class FilaIngestaoCheia(Exception):
+    """Pendentes acima de INGESTAO_FILA_MAX: o cliente deve tentar de novo."""
+
+
+def assunto_existe(assunto_id: str) -> bool:
+    """No modo diário o banco só vê o registro depois: o assunto é validado antes (cache)."""
+    def calcular():
+        db = SessionLocal()
+        try:
+            return [assunto for (assunto,) in db.query(Assunto.id)]
+        finally:
+            db.close()
+
+    return assunto_id in caches["assuntos"].obter("ids", calcular)
+
+
+class _Segmento:
+    """Um arquivo do diário, travado (flock) enquanto estiver aberto."""
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self.arquivo = open(caminho, "ab", buffering=0)
+        fcntl.flock(self.arquivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        self.escritos = 0
+        self.restantes = 0  # escritos e ainda não gravados no banco
+
+    def remover(self):
+        # Apaga antes de soltar a trava: ninguém recupera um arquivo já gravado
+        os.unlink(self.caminho)
+        self.arquivo.close()
+
+
+class DiarioIngestao:
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self._trava_fsync = threading.Lock()
+        self._pendentes: deque = deque()  # (segmento, registro) já sincronizados
+        self._quantidade = 0  # escritos e ainda não gravados (limite da fila)
+        self._segmento: Optional[_Segmento] = None
+        self._abertos: List[_Segmento] = []
+        self._sujos: set = set()  # segmentos com escrita ainda sem fsync
+        self._escritas = 0
+        self._sincronizadas = 0
+        self._acordar = threading.Event()
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.ativo = False
+
+    # ==========================================================================
+    # CICLO DE VIDA (lifespan)
+    # ==========================================================================
+    def iniciar(self):
+        if settings.INGESTAO_MODO != "diario" or self.ativo:
+            return
+        os.makedirs(settings.INGESTAO_DIRETORIO, exist_ok=True)
+        self.recuperar()
+        with self._trava:
+            self._segmento = self._novo_segmento()
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._executar, name="ingestao-gravador", daemon=True)
+        self._thread.start()
+        self.ativo = True
+        logger.info("Ingestão em rajada ativa (diário em %s)", settings.INGESTAO_DIRETORIO)
+
+    def parar(self):
+        """Grava o que estiver pendente e fecha o diário (o que sobrar fica para a recuperação)."""
+        if not self.ativo:
+            return
+        self.ativo = False
+        self._parar.set()
+        self._acordar.set()
+        if self._thread:
+            self._thread.join(timeout=settings.SERVIDOR_DRENAGEM_S)
+            self._thread = None
+        with self._trava:
+            for segmento in self._abertos:
+                if segmento.restantes == 0:
+                    segmento.remover()
+                else:
+                    segmento.arquivo.close()
+            self._abertos = []
+            self._segmento = None
+
+    def _novo_segmento(self) -> _Segmento:
+        nome = f"diario-{os.getpid()}-{uuid4().hex[:8]}.jsonl"
+        segmento = _Segmento(os.path.join(settings.INGESTAO_DIRETORIO, nome))
+        self._abertos.append(segmento)
+        return segmento
+
+    # ==========================================================================
+    # ESCRITA (requisição)
+    # ==========================================================================
+    def enfileirar(self, registro: Dict):
+        """Acrescenta o registro ao diário; ao retornar, ele sobrevive a uma queda."""
+        linha = (json.dumps(registro, ensure_ascii=False) + "\n").encode()
+        with self._trava:
+            if self._quantidade >= settings.INGESTAO_FILA_MAX:
+                raise FilaIngestaoCheia()
+            segmento = self._segmento
+            segmento.arquivo.write(linha)
+            segmento.escritos += 1
+            segmento.restantes += 1
+            self._quantidade += 1
+            self._escritas += 1
+            minha_escrita = self._escritas
+            self._sujos.add(segmento)
+            if segmento.escritos >= settings.INGESTAO_SEGMENTO_MAX:
+                self._segmento = self._novo_segmento()
+
+        self._sincronizar(minha_escrita)
+
+        with self._trava:
+            self._pendentes.append((segmento, registro))
+            quantidade = len(self._pendentes)
+        INGESTAO_PENDENTES.set(self._quantidade)
+        if quantidade >= settings.INGESTAO_LOTE_MAX:
+            self._acordar.set()
+
+    def _sincronizar(self, escrita: int):
+        """fsync agrupado: quem chega enquanto outro sincroniza é coberto por ele."""
+        if not settings.INGESTAO_FSYNC:
+            return
+        with self._trava_fsync:
+            if self._sincronizadas >= escrita:
+                return
+            with self._trava:
+                ate = self._escritas
+                sujos, self._sujos = self._sujos, set()
+            for segmento in sujos:
+                os.fsync(segmento.arquivo.fileno())
+            self._sincronizadas = ate
+
+    # ==========================================================================
+    # GRAVAÇÃO NO BANCO (thread do worker)
+    # ==========================================================================
+    def _executar(self):
+        proxima_recuperacao = time.monotonic() + settings.INGESTAO_RECUPERAR_S
+        while not self._parar.is_set():
+            self._acordar.wait(settings.INGESTAO_INTERVALO_S)
+            self._acordar.clear()
+            self._drenar()
+            if time.monotonic() >= proxima_recuperacao:
+                proxima_recuperacao = time.monotonic() + settings.INGESTAO_RECUPERAR_S
+                try:
+                    self.recuperar()
+                except Exception:
+                    logger.exception("Falha na recuperação de diários de ingestão")
+        self._drenar()
+
+    def _drenar(self):
+        while True:
+            with self._trava:
+                tamanho = min(settings.INGESTAO_LOTE_MAX, len(self._pendentes))
+                lote = [self._pendentes.popleft() for _ in range(tamanho)]
+            if not lote:
+                return
+            if not self._gravar_com_novas_tentativas([registro for _, registro in lote]):
+                # Desligando com o banco fora: os registros continuam no diário
+                return
+            self._concluir(lote)
+
+    def _gravar_com_novas_tentativas(self, registros: List[Dict]) -> bool:
+        tentativa = 0
+        while True:
+            try:
+                self._gravar(registros)
+                return True
+            except ERROS_TRANSITORIOS as e:
+                tentativa += 1
+                if self._parar.is_set() and tentativa > 3:
+                    logger.error(
+                        "Banco indisponível ao desligar: %d registros ficam no diário para recuperação",
+                        len(registros),
+                    )
+                    return False
+                espera = min(30.0, 0.5 * 2 ** tentativa)
+                logger.warning(
+                    "Banco indisponível na gravação em lote (%s); nova tentativa em %.1fs",
+                    type(e).__name__, espera,
+                )
+                time.sleep(espera)
+
+    def _gravar(self, registros: List[Dict]):
+        """Um lote numa transação; se o banco recusar, grava um a um e separa os recusados."""
+        db = SessionLocal()
+        try:
+            try:
+                INGESTAO_LOTE.observe(len(registros))
+                ManifestacaoService.gravar_lote(db, registros)
+                return
+            except ERROS_TRANSITORIOS:
+                raise
+            except Exception as e:
+                logger.warning("Lote de %d registros recusado (%s): gravando um a um", len(registros), e)
+
+            for registro in registros:
+                try:
+                    ManifestacaoService.gravar_lote(db, [registro])
+                except ERROS_TRANSITORIOS:
+                    raise
+                except Exception as e:
+                    self._rejeitar(registro, e)
+        finally:
+            db.close()
+
+    def _rejeitar(self, registro: Dict, erro: Exception):
+        INGESTAO_REJEITADAS.inc()
+        logger.error("Manifestação %s recusada pelo banco: %s", registro.get("protocolo"), erro)
+        caminho = os.path.join(settings.INGESTAO_DIRETORIO, f"rejeitados-{os.getpid()}.jsonl")
+        with open(caminho, "a", encoding="utf-8") as arquivo:
+            arquivo.write(json.dumps({"erro": str(erro), "registro": registro}, ensure_ascii=False) + "\n")
+
+    def _concluir(self, lote):
+        with self._trava:
+            for segmento, _ in lote:
+                segmento.restantes -= 1
+            self._quantidade -= len(lote)
+            gravados = [
+                segmento for segmento in {segmento for segmento, _ in lote}
+                if segmento.restantes == 0 and segmento is not self._segmento
+            ]
+            for segmento in gravados:
+                self._abertos.remove(segmento)
+                segmento.remover()
+        INGESTAO_PENDENTES.set(self._quantidade)
+
+    # ==========================================================================
+    # RECUPERAÇÃO (diários de workers que caíram)
+    # ==========================================================================
+    def recuperar(self) -> int:
+        """Regrava diários sem dono. Retorna quantos registros foram lidos."""
+        total = 0
+        for caminho in sorted(glob.glob(os.path.join(settings.INGESTAO_DIRETORIO, "diario-*.jsonl"))):
+            try:
+                arquivo = open(caminho, "rb")
+            except FileNotFoundError:
+                continue
+            try:
+                try:
+                    fcntl.flock(arquivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue  # de um worker vivo (inclusive deste)
+                try:
+                    if os.stat(caminho).st_ino != os.fstat(arquivo.fileno()).st_ino:
+                        continue
+                except FileNotFoundError:
+                    continue  # outro worker acabou de recuperar
+
+                registros = []
+                for numero, linha in enumerate(arquivo, 1):
+                    try:
+                        registros.append(json.loads(linha))
+                    except ValueError:
+                        logger.warning("Linha %d incompleta em %s (queda durante a escrita): descartada", numero, caminho)
+
+                try:
+                    for inicio in range(0, len(registros), settings.INGESTAO_LOTE_MAX):
+                        self._gravar(registros[inicio:inicio + settings.INGESTAO_LOTE_MAX])
+                except ERROS_TRANSITORIOS as e:
+                    logger.warning("Recuperação de %s adiada (banco indisponível: %s)", caminho, type(e).__name__)
+                    continue
+                os.unlink(caminho)
+                total += len(registros)
+                logger.info("Diário %s recuperado: %d registros", os.path.basename(caminho), len(registros))
+            finally:
+                arquivo.close()
+        return total
+
+
+# Instância única por worker
+diario_ingestao = DiarioIngestao()
@@ -6,13 +6,21 @@ Arquivo: backend/app/services/manifestacao_service.py
 from sqlalchemy.orm import Session, joinedload 
 from sqlalchemy import desc, func, cast, Date
 from uuid import uuid4
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, date
 from typing import List, Dict, Optional
 
+from app.config import settings
+from app.integrations.iza import hash_conteudo
+from app.models.analise_iza import AnaliseIza
 from app.models.manifestacao import Manifestacao
 from app.models.protocolo import Protocolo
 from app.models.anexo import Anexo
+from app.models.assunto import Assunto
 from app.schemas.manifestacao import ManifestacaoCreate
+from app.middleware.metricas import MANIFESTACOES_CRIADAS
+from app.middleware.rastreamento import rastrear
+from app.services.protocolo_service import ProtocoloService, filtro_protocolos
+from app.services.tarefa_service import TarefaService
 import logging
 
 logger = logging.getLogger(__name__)
@@ -27,6 +35,7 @@ class ManifestacaoService:
     # BLOCO 1: CRIAR MANIFESTAÇÃO (POST)
     # ==========================================
     @staticmethod
+    @rastrear()
     def criar_manifestacao(
         db: Session, 
         manifestacao_data: ManifestacaoCreate,
@@ -37,9 +46,8 @@ class ManifestacaoService:
         manifestacao_id = str(uuid4())
         data_hoje = datetime.now()
         
-        data_formatada = data_hoje.strftime("%Y%m%d")
         sufixo = str(uuid4().hex)[:6].upper()
-        protocolo_texto = f"OUVIDORIA-{data_formatada}-{sufixo}"
+        protocolo_texto = ProtocoloService.gerar_numero(data_hoje, sufixo)
         
         data_limite = data_hoje + timedelta(days=30)
 
@@ -84,23 +92,135 @@ class ManifestacaoService:
                 )
                 db.add(novo_anexo)
 
+            # Confirmação ao cidadão e análise na IZA: na mesma transação,
+            # executadas fora da requisição
+            if usuario_id:
+                TarefaService.enfileirar(db, "confirmar_recebimento", {"manifestacao_id": manifestacao_id})
+            if settings.IZA_ATIVA:
+                TarefaService.enfileirar(db, "analisar_iza", {"manifestacao_id": manifestacao_id})
+
             db.commit()
+            filtro_protocolos.adicionar(protocolo_texto)
             db.refresh(nova_manifestacao)
             _ = nova_manifestacao.assunto 
+            MANIFESTACOES_CRIADAS.labels(
+                assunto=nova_manifestacao.assunto.nome if nova_manifestacao.assunto else manifestacao_data.assunto_id
+            ).inc()
             
-            logger.info(f"Manifestação criada com sucesso: {protocolo_texto}")
+            logger.info("Manifestação criada com sucesso: %s", protocolo_texto)
             return nova_manifestacao
 
         except Exception as e:
             db.rollback()
-            logger.error(f"Erro ao criar manifestação: {str(e)}")
+            logger.error("Erro ao criar manifestação: %s", e)
             raise e
 
+    # ==========================================
+    # BLOCO 1B: CRIAÇÃO EM LOTE (INGESTÃO EM RAJADA)
+    # ==========================================
+    @staticmethod
+    def montar_registro(
+        manifestacao_data: ManifestacaoCreate,
+        usuario_id: Optional[str] = None,
+        arquivos_metadata: List[Dict] = []
+    ) -> Dict:
+        """Registro do diário de ingestão: id e protocolo já definidos, serializável em JSON."""
+        data_hoje = datetime.now()
+        sufixo = str(uuid4().hex)[:6].upper()
+        return {
+            "id": str(uuid4()),
+            "protocolo": ProtocoloService.gerar_numero(data_hoje, sufixo),
+            **manifestacao_data.model_dump(mode="json"),
+            "usuario_id": usuario_id,
+            "data_criacao": data_hoje.isoformat(),
+            "anexos": [{"id": str(uuid4()), **arq} for arq in arquivos_metadata],
+        }
+
+    @staticmethod
+    @rastrear()
+    def gravar_lote(db: Session, registros: List[Dict]) -> int:
+        """
+        Grava registros do diário numa única transação. Idempotente: ids já
+        gravados (reprocessamento após queda) são ignorados.
+        """
+        ids = [registro["id"] for registro in registros]
+        existentes = {
+            manifestacao_id for (manifestacao_id,) in
+            db.query(Manifestacao.id).filter(Manifestacao.id.in_(ids))
+        }
+        novos = [registro for registro in registros if registro["id"] not in existentes]
+        if not novos:
+            return 0
+
+        # Uma consulta de sequência por dia do lote (não uma por manifestação)
+        sequencias: Dict[date, int] = {}
+        for registro in novos:
+            data_criacao = datetime.fromisoformat(registro["data_criacao"])
+            dia = data_criacao.date()
+            if dia not in sequencias:
+                sequencias[dia] = db.query(func.max(Protocolo.sequencia_diaria))\
+                    .filter(cast(Protocolo.data_geracao, Date) == dia)\
+                    .scalar() or 0
+            sequencias[dia] += 1
+
+            db.add(Manifestacao(
+                id=registro["id"],
+                protocolo=registro["protocolo"],
+                relato=registro["relato"],
+                assunto_id=registro["assunto_id"],
+                classificacao=registro["classificacao"],
+                dados_complementares=registro["dados_complementares"],
+                anonimo=registro["anonimo"],
+                usuario_id=registro["usuario_id"],
+                status="pendente",
+                data_criacao=data_criacao
+            ))
+            db.add(Protocolo(
+                numero=registro["protocolo"],
+                manifestacao_id=registro["id"],
+                sequencia_diaria=sequencias[dia],
+                data_geracao=data_criacao,
+                data_expiracao=data_criacao + timedelta(days=30)
+            ))
+            for arq in registro["anexos"]:
+                db.add(Anexo(
+                    id=arq["id"],
+                    manifestacao_id=registro["id"],
+                    arquivo_url=arq["caminho"],
+                    tipo_arquivo=arq["tipo"],
+                    tamanho=arq["tamanho"]
+                ))
+            if registro["usuario_id"]:
+                TarefaService.enfileirar(db, "confirmar_recebimento", {"manifestacao_id": registro["id"]})
+            if settings.IZA_ATIVA:
+                TarefaService.enfileirar(db, "analisar_iza", {"manifestacao_id": registro["id"]})
+
+        try:
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        nomes = dict(
+            db.query(Assunto.id, Assunto.nome)
+            .filter(Assunto.id.in_({registro["assunto_id"] for registro in novos}))
+            .all()
+        )
+        for registro in novos:
+            filtro_protocolos.adicionar(registro["protocolo"])
+            MANIFESTACOES_CRIADAS.labels(
+                assunto=nomes.get(registro["assunto_id"], registro["assunto_id"])
+            ).inc()
+        logger.info("Lote de %d manifestações gravado", len(novos))
+        return len(novos)
+
     # ==========================================
     # BLOCO 2: CONSULTA POR PROTOCOLO (GET)
     # ==========================================
     @staticmethod
+    @rastrear()
     def obter_manifestacao(db: Session, protocolo: str) -> Optional[Manifestacao]:
+        # Números impossíveis já foram recusados na rota (ProtocoloService.pode_existir)
         return db.query(Manifestacao)\
             .options(joinedload(Manifestacao.assunto))\
             .options(joinedload(Manifestacao.anexos))\
@@ -108,22 +228,55 @@ class ManifestacaoService:
             .first()
 
     # ==========================================
-    # BLOCO 3: LISTAGEM PAGINADA (GET) - CORRIGIDO
+    # BLOCO 3: FILTROS DA CAIXA DE ENTRADA
     # ==========================================
     @staticmethod
+    def aplicar_filtros(
+        query,
+        usuario_id: Optional[str] = None,
+        status: Optional[str] = None,
+        assunto_id: Optional[str] = None,
+        classificacao: Optional[str] = None,
+        data_inicio: Optional[date] = None,
+        data_fim: Optional[date] = None,
+    ):
+        """
+        Aplica os filtros da listagem. Funciona tanto com db.query() quanto
+        com select(), para que a exportação use exatamente os mesmos critérios.
+        """
+        if usuario_id:
+            query = query.filter(Manifestacao.usuario_id == usuario_id)
+        if status:
+            query = query.filter(Manifestacao.status == status)
+        if assunto_id:
+            query = query.filter(Manifestacao.assunto_id == assunto_id)
+        if classificacao:
+            query = query.filter(Manifestacao.classificacao == classificacao)
+        if data_inicio:
+            query = query.filter(Manifestacao.data_criacao >= data_inicio)
+        if data_fim:
+            # Inclui o dia inteiro de 'data_fim'
+            query = query.filter(Manifestacao.data_criacao < data_fim + timedelta(days=1))
+        return query
+
+    # ==========================================
+    # BLOCO 4: LISTAGEM PAGINADA (GET) - CORRIGIDO
+    # ==========================================
+    @staticmethod
+    @rastrear()
     def listar_manifestacoes(
         db: Session,
         skip: int = 0,
         limit: int = 10,
-        usuario_id: Optional[str] = None # NOVO PARÂMETRO
+        usuario_id: Optional[str] = None, # NOVO PARÂMETRO
+        **filtros
     ) -> tuple[List[Manifestacao], int]:
         
         # Query base
         query = db.query(Manifestacao)
 
-        # SE TIVER ID DE USUÁRIO, FILTRA APENAS AS DELE
-        if usuario_id:
-            query = query.filter(Manifestacao.usuario_id == usuario_id)
+        # SE TIVER ID DE USUÁRIO, FILTRA APENAS AS DELE (+ filtros opcionais do admin)
+        query = ManifestacaoService.aplicar_filtros(query, usuario_id=usuario_id, **filtros)
 
         # Ordenação
         query = query.order_by(desc(Manifestacao.data_criacao))
@@ -138,4 +291,39 @@ class ManifestacaoService:
                      .limit(limit)\
                      .all()
         
-        return lista, total
\ No newline at end of file
+        return lista, total
+    # ==========================================
+    # BLOCO 5: ESTATÍSTICAS DO PAINEL (GET)
+    # ==========================================
+    @staticmethod
+    @rastrear()
+    def estatisticas(db: Session) -> Dict:
+        """Totais por status e por classificação (duas agregações, sem carregar linhas)."""
+        por_status = {
+            getattr(valor, "value", valor): quantidade
+            for valor, quantidade in db.query(Manifestacao.status, func.count(Manifestacao.id))
+            .group_by(Manifestacao.status).all()
+        }
+        por_classificacao = {
+            getattr(valor, "value", valor): quantidade
+            for valor, quantidade in db.query(Manifestacao.classificacao, func.count(Manifestacao.id))
+            .group_by(Manifestacao.classificacao).all()
+        }
+        return {
+            "total": sum(por_status.values()),
+            "por_status": por_status,
+            "por_classificacao": por_classificacao,
+            "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        }
+
+    # ==========================================
+    # BLOCO 6: ANÁLISE DA IZA (GET)
+    # ==========================================
+    @staticmethod
+    def analise_iza(db: Session, manifestacao_id: str) -> Optional[Dict]:
+        """Análise já feita pela tarefa 'analisar_iza' (nunca chama a IZA aqui)."""
+        relato = db.query(Manifestacao.relato).filter(Manifestacao.id == manifestacao_id).scalar()
+        if relato is None:
+            return None
+        analise = db.get(AnaliseIza, hash_conteudo(relato))
+        return analise.resultado if analise else None
@@ -0,0 +1,226 @@
+"""
+Service de Perfil de Memória (tracemalloc)
+Arquivo: backend/app/services/memoria_service.py
+
+OBJETIVO:
+Investigar o crescimento de RSS dos workers (ex.: uploads em criar_manifestacao
+e listagens grandes) sem reiniciar o processo:
+- pico de alocação por rota (medido pelo MemoriaMiddleware);
+- snapshots do tracemalloc sob demanda e comparação entre dois deles,
+  mostrando as linhas de código que mais alocaram.
+
+Modo opt-in (MEMORIA_PERFIL_ATIVO): o tracemalloc deixa as alocações mais lentas.
+
+VÁRIOS WORKERS (servidor.py):
+Cada worker tem os seus picos e snapshots, e cada requisição cai num worker
+qualquer. Toda resposta traz o 'pid' do worker, e o id do snapshot é
+"<pid>-<n>": comparar um snapshot de outro worker é recusado
+(SnapshotDeOutroWorker) em vez de comparar dois snapshots sem relação.
+"""
+
+import os
+import threading
+import tracemalloc
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app.config import settings
+
+# Alocações do próprio tracemalloc não interessam nos relatórios
+_FILTROS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def _rss_bytes() -> Optional[int]:
+    """Memória residente atual do processo (Linux)."""
+    try:
+        with open("/proc/self/statm", "r") as arquivo:
+            return int(arquivo.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class SnapshotDeOutroWorker(Exception):
+    """O snapshot foi tirado em outro processo: só aquele worker consegue compará-lo."""
+
+    def __init__(self, pid: int):
+        super().__init__(pid)
+        self.pid = pid
+
+
+def _numero_snapshot(snapshot_id: str) -> int:
+    """'<pid>-<n>' -> n, se o snapshot for deste worker."""
+    pid, _, numero = snapshot_id.partition("-")
+    if not (pid.isdigit() and numero.isdigit()):
+        raise KeyError(snapshot_id)
+    if int(pid) != os.getpid():
+        raise SnapshotDeOutroWorker(int(pid))
+    return int(numero)
+
+
+def _formatar_estatistica(estatistica) -> Dict:
+    quadro = estatistica.traceback[0]
+    return {
+        "local": f"{quadro.filename}:{quadro.lineno}",
+        "tamanho_kb": round(estatistica.size / 1024, 1),
+        "blocos": estatistica.count,
+    }
+
+
+class MemoriaService:
+
+    _trava = threading.Lock()
+    _snapshots: "OrderedDict[int, Dict]" = OrderedDict()
+    _proximo_id = 1
+
+    # Picos por rota: {"POST /api/manifestacoes/": {...}}
+    _rotas: Dict[str, Dict] = {}
+    _em_andamento = 0
+    _geracao = 0
+
+    # ==========================================
+    # CONTROLE DO TRACEMALLOC
+    # ==========================================
+    @staticmethod
+    def iniciar():
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(settings.MEMORIA_QUADROS)
+
+    @staticmethod
+    def ativo() -> bool:
+        return tracemalloc.is_tracing()
+
+    # ==========================================
+    # PICO POR ROTA (chamado pelo MemoriaMiddleware)
+    # ==========================================
+    @classmethod
+    def inicio_requisicao(cls) -> Dict:
+        """
+        O pico do tracemalloc é global: só vale para a rota se ela rodou
+        sozinha do início ao fim (sem outra requisição começando no meio).
+        """
+        with cls._trava:
+            exclusiva = cls._em_andamento == 0
+            cls._em_andamento += 1
+            cls._geracao += 1
+            if exclusiva:
+                tracemalloc.reset_peak()
+            atual, _ = tracemalloc.get_traced_memory()
+            return {"geracao": cls._geracao, "exclusiva": exclusiva, "inicial": atual}
+
+    @classmethod
+    def fim_requisicao(cls, chave: str, medicao: Dict):
+        with cls._trava:
+            cls._em_andamento -= 1
+            atual, pico = tracemalloc.get_traced_memory()
+            rota = cls._rotas.setdefault(chave, {
+                "requisicoes": 0, "medidas": 0, "pico_max_kb": 0.0, "pico_soma_kb": 0.0, "retido_soma_kb": 0.0,
+            })
+            rota["requisicoes"] += 1
+            rota["retido_soma_kb"] += (atual - medicao["inicial"]) / 1024
+            if medicao["exclusiva"] and cls._geracao == medicao["geracao"]:
+                pico_kb = (pico - medicao["inicial"]) / 1024
+                rota["medidas"] += 1
+                rota["pico_soma_kb"] += pico_kb
+                rota["pico_max_kb"] = max(rota["pico_max_kb"], pico_kb)
+
+    @classmethod
+    def relatorio_rotas(cls) -> Dict:
+        with cls._trava:
+            rotas = {
+                chave: {
+                    "requisicoes": dados["requisicoes"],
+                    "picos_medidos": dados["medidas"],
+                    # Fração das requisições que rodaram sozinhas (as únicas com pico medido)
+                    "picos_medidos_pct": round(100 * dados["medidas"] / dados["requisicoes"], 1),
+                    "pico_max_kb": round(dados["pico_max_kb"], 1),
+                    "pico_medio_kb": round(dados["pico_soma_kb"] / dados["medidas"], 1) if dados["medidas"] else None,
+                    "retido_medio_kb": round(dados["retido_soma_kb"] / dados["requisicoes"], 1),
+                }
+                for chave, dados in cls._rotas.items()
+            }
+        atual, pico = tracemalloc.get_traced_memory()
+        return {
+            "pid": os.getpid(),
+            "aviso": (
+                "O pico só é medido quando a requisição roda sozinha no worker. Sob concorrência, "
+                "rotas com picos_medidos_pct baixo podem ter pico_max_kb subestimado (ou 0): "
+                "veja retido_medio_kb e o rss_kb."
+            ),
+            "rss_kb": (_rss_bytes() or 0) // 1024,
+            "rastreado_kb": atual // 1024,
+            "rastreado_pico_kb": pico // 1024,
+            "rotas": dict(sorted(rotas.items(), key=lambda item: item[1]["pico_max_kb"], reverse=True)),
+        }
+
+    # ==========================================
+    # SNAPSHOTS
+    # ==========================================
+    @classmethod
+    def capturar_snapshot(cls, limite: int = 20) -> Dict:
+        snapshot = tracemalloc.take_snapshot().filter_traces(_FILTROS)
+        with cls._trava:
+            numero = cls._proximo_id
+            cls._proximo_id += 1
+            registro = {"snapshot": snapshot, "data": datetime.now(), "rss_kb": (_rss_bytes() or 0) // 1024}
+            cls._snapshots[numero] = registro
+            # Snapshots ocupam memória: guarda só os mais recentes
+            while len(cls._snapshots) > settings.MEMORIA_MAX_SNAPSHOTS:
+                cls._snapshots.popitem(last=False)
+
+        estatisticas = snapshot.statistics("lineno")
+        return {
+            "id": f"{os.getpid()}-{numero}",
+            "pid": os.getpid(),
+            "data": registro["data"],
+            "rss_kb": registro["rss_kb"],
+            "total_kb": round(sum(e.size for e in estatisticas) / 1024, 1),
+            "top": [_formatar_estatistica(e) for e in estatisticas[:limite]],
+        }
+
+    @classmethod
+    def listar_snapshots(cls) -> Dict:
+        pid = os.getpid()
+        with cls._trava:
+            snapshots = [{"id": f"{pid}-{n}", "data": s["data"], "rss_kb": s["rss_kb"]} for n, s in cls._snapshots.items()]
+        return {"pid": pid, "snapshots": snapshots}
+
+    @classmethod
+    def comparar(cls, snapshot_id: str, base_id: Optional[str] = None, limite: int = 20) -> Dict:
+        """Diferença entre dois snapshots deste worker (padrão: contra o anterior)."""
+        numero = _numero_snapshot(snapshot_id)
+        numero_base = _numero_snapshot(base_id) if base_id is not None else None
+        with cls._trava:
+            if numero not in cls._snapshots:
+                raise KeyError(snapshot_id)
+            if numero_base is None:
+                anteriores = [n for n in cls._snapshots if n < numero]
+                if not anteriores:
+                    raise KeyError("base")
+                numero_base = anteriores[-1]
+            if numero_base not in cls._snapshots:
+                raise KeyError(base_id)
+            atual, base = cls._snapshots[numero], cls._snapshots[numero_base]
+
+        diferencas = atual["snapshot"].compare_to(base["snapshot"], "lineno")
+        pid = os.getpid()
+        return {
+            "pid": pid,
+            "snapshot_id": f"{pid}-{numero}",
+            "base_id": f"{pid}-{numero_base}",
+            "rss_diferenca_kb": atual["rss_kb"] - base["rss_kb"],
+            "total_diferenca_kb": round(sum(d.size_diff for d in diferencas) / 1024, 1),
+            "top": [
+                {
+                    "local": f"{d.traceback[0].filename}:{d.traceback[0].lineno}",
+                    "diferenca_kb": round(d.size_diff / 1024, 1),
+                    "tamanho_kb": round(d.size / 1024, 1),
+                    "blocos_diferenca": d.count_diff,
+                }
+                for d in diferencas[:limite]
+            ],
+        }
@@ -7,15 +7,21 @@ from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import desc, func, or_
 from datetime import datetime, timezone, timedelta 
 
+from app.config import settings
 from app.models.movimentacao import Movimentacao
 from app.models.manifestacao import Manifestacao
 from app.models.usuario import Usuario 
+from app.middleware.metricas import registrar_transicao_status
+from app.middleware.rastreamento import rastrear
+from app.services.cache_service import caches
+from app.services.tarefa_service import TarefaService
 
 FUSO_BRASIL = timezone(timedelta(hours=-3))
 
 class MovimentacaoService:
     
     @staticmethod
+    @rastrear()
     def listar_historico(db: Session, manifestacao_id: str, usuario_eh_admin: bool):
         query = db.query(Movimentacao)\
             .options(joinedload(Movimentacao.autor))\
@@ -27,6 +33,7 @@ class MovimentacaoService:
         return query.order_by(Movimentacao.data_criacao.asc()).all()
 
     @staticmethod
+    @rastrear()
     def criar_movimentacao(db: Session, manifestacao_id: str, usuario_id: str, texto: str, interno: bool = False, novo_status: str = None) -> Movimentacao:
         agora = datetime.now(FUSO_BRASIL)
         nova_mov = Movimentacao(
@@ -39,20 +46,38 @@ class MovimentacaoService:
         )
         db.add(nova_mov)
         
+        transicao = None
+        protocolo = None
         if novo_status:
             manifestacao = db.query(Manifestacao).filter(Manifestacao.id == manifestacao_id).first()
             if manifestacao:
+                transicao = (manifestacao.status, novo_status)
+                protocolo = manifestacao.protocolo
                 manifestacao.status = novo_status
                 manifestacao.data_atualizacao = agora 
                 if novo_status in ['concluida', 'rejeitada']:
                     manifestacao.data_conclusao = agora
                 db.add(manifestacao)
 
+        # Aviso ao cidadão (outbox): gravado junto com a resposta e enviado após a
+        # janela do resumo (respostas seguidas vão num único e-mail)
+        if not interno:
+            TarefaService.enfileirar(
+                db, "notificar_resposta", {"movimentacao_id": nova_mov.id},
+                atraso_s=settings.EMAIL_RESUMO_JANELA_S,
+            )
+
         db.commit()
         db.refresh(nova_mov)
+        if transicao:
+            registrar_transicao_status(*transicao)
+            # Rastreio e painel mostram o status: não podem esperar o ttl
+            caches["rastreio"].invalidar(protocolo)
+            caches["estatisticas"].invalidar()
         return nova_mov
 
     @staticmethod
+    @rastrear()
     def contar_novas_movimentacoes(db: Session, usuario_id: str, is_admin: bool) -> int:
         usuario = db.query(Usuario).filter(Usuario.id == usuario_id).first()
         
@@ -84,6 +109,7 @@ class MovimentacaoService:
         return qtd_movimentacoes + qtd_novas_manifestacoes
 
     @staticmethod
+    @rastrear()
     def listar_notificacoes_detalhadas(db: Session, usuario_id: str, is_admin: bool):
         usuario = db.query(Usuario).filter(Usuario.id == usuario_id).first()
         data_referencia = usuario.ultimo_visto_notificacoes or usuario.ultimo_acesso or usuario.data_criacao
@@ -116,6 +142,7 @@ class MovimentacaoService:
         # B. Busca Novas Manifestações (SÓ ADMIN)
         if is_admin:
             novas_manif = db.query(Manifestacao)\
+                .options(joinedload(Manifestacao.assunto))\
                 .filter(Manifestacao.data_criacao > data_referencia)\
                 .order_by(desc(Manifestacao.data_criacao))\
                 .limit(5).all()
@@ -0,0 +1,195 @@
+"""
+Service de Prazos (SLA)
+Arquivo: backend/app/services/prazo_service.py
+
+OBJETIVO:
+Acompanhar o campo 'data_expiracao' dos protocolos e sinalizar as
+manifestações em aberto que estão perto de vencer ou já venceram.
+Cada sinalização gera uma nota interna (Movimentacao) para os administradores,
+alimentando o contador de notificações do sininho.
+"""
+
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from uuid import uuid4
+
+from sqlalchemy import and_, insert, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.manifestacao import Manifestacao, StatusManifestacao
+from app.models.movimentacao import Movimentacao
+from app.models.protocolo import Protocolo
+from app.services.auth_service import AuthService
+
+logger = logging.getLogger(__name__)
+
+# Horário de Brasília (UTC-3), o mesmo de MovimentacaoService
+FUSO_BRASIL = timezone(timedelta(hours=-3))
+
+SITUACAO_A_VENCER = "a_vencer"
+SITUACAO_VENCIDO = "vencido"
+
+STATUS_EM_ABERTO = [
+    StatusManifestacao.PENDENTE,
+    StatusManifestacao.RECEBIDA,
+    StatusManifestacao.EM_PROCESSAMENTO,
+]
+
+
+class PrazoService:
+    """
+    Regras de negócio da varredura de prazos.
+    Tudo é feito em lotes: uma consulta para buscar, um UPDATE por situação
+    e um INSERT em massa para as notas internas.
+    """
+
+    @staticmethod
+    def buscar_lote(db: Session, agora: datetime, tamanho: int) -> List:
+        """
+        Busca o próximo lote de protocolos que precisam de alerta.
+        Usa o índice (data_expiracao, situacao_prazo) e, no PostgreSQL,
+        'FOR UPDATE SKIP LOCKED' para que vários workers não disputem as mesmas linhas.
+        """
+        limite_alerta = agora + timedelta(days=settings.PRAZO_DIAS_ALERTA)
+
+        consulta = select(
+            Protocolo.numero,
+            Protocolo.manifestacao_id,
+            Protocolo.data_expiracao,
+        ).join(
+            Manifestacao, Protocolo.manifestacao_id == Manifestacao.id
+        ).where(
+            Protocolo.data_expiracao <= limite_alerta,
+            Manifestacao.status.in_(STATUS_EM_ABERTO),
+            or_(
+                Protocolo.situacao_prazo.is_(None),
+                and_(
+                    Protocolo.situacao_prazo == SITUACAO_A_VENCER,
+                    Protocolo.data_expiracao <= agora,
+                ),
+            ),
+        ).order_by(
+            Protocolo.data_expiracao.asc()
+        ).limit(tamanho).with_for_update(skip_locked=True, of=Protocolo)
+
+        return db.execute(consulta).all()
+
+    @staticmethod
+    def processar_lote(db: Session, autor_id: str, agora: datetime, tamanho: int) -> Dict[str, int]:
+        """Sinaliza um lote e grava as notas internas numa única transação curta."""
+        linhas = PrazoService.buscar_lote(db, agora, tamanho)
+        if not linhas:
+            db.rollback()
+            return {SITUACAO_A_VENCER: 0, SITUACAO_VENCIDO: 0}
+
+        por_situacao: Dict[str, List[str]] = {SITUACAO_A_VENCER: [], SITUACAO_VENCIDO: []}
+        notas = []
+        for numero, manifestacao_id, data_expiracao in linhas:
+            # PostgreSQL devolve a coluna com fuso; SQLite, sem fuso (horário de Brasília)
+            if data_expiracao.tzinfo is None:
+                data_expiracao = data_expiracao.replace(tzinfo=FUSO_BRASIL)
+            vencido = data_expiracao <= agora
+            situacao = SITUACAO_VENCIDO if vencido else SITUACAO_A_VENCER
+            por_situacao[situacao].append(numero)
+
+            prazo_formatado = data_expiracao.strftime("%d/%m/%Y")
+            if vencido:
+                texto = f"⏰ Prazo de resposta VENCIDO em {prazo_formatado}."
+            else:
+                texto = f"⏰ Prazo de resposta vence em {prazo_formatado}."
+
+            notas.append({
+                "id": str(uuid4()),
+                "manifestacao_id": manifestacao_id,
+                "autor_id": autor_id,
+                "texto": texto,
+                "interno": True,
+                "data_criacao": agora,
+            })
+
+        try:
+            for situacao, numeros in por_situacao.items():
+                if numeros:
+                    db.execute(
+                        update(Protocolo)
+                        .where(Protocolo.numero.in_(numeros))
+                        .values(situacao_prazo=situacao, data_alerta_prazo=agora)
+                    )
+            db.execute(insert(Movimentacao), notas)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error("Erro ao processar lote de prazos: %s", e)
+            raise e
+
+        return {situacao: len(numeros) for situacao, numeros in por_situacao.items()}
+
+    @staticmethod
+    def processar_prazos(db: Session, agora: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Executa uma varredura completa, lote a lote, até não restar pendências.
+        Retorna a quantidade de protocolos sinalizados por situação.
+        """
+        # Relógio com fuso: data_expiracao é 'timestamp with time zone' e comparar
+        # datetime com e sem fuso levanta TypeError
+        agora = agora or datetime.now(FUSO_BRASIL)
+        if agora.tzinfo is None:
+            agora = agora.replace(tzinfo=FUSO_BRASIL)
+        tamanho = settings.PRAZO_TAMANHO_LOTE
+        autor_id = AuthService.obter_usuario_sistema(db, settings.PRAZO_EMAIL_SISTEMA, "Sistema de Prazos")
+
+        totais = {SITUACAO_A_VENCER: 0, SITUACAO_VENCIDO: 0}
+        while True:
+            resultado = PrazoService.processar_lote(db, autor_id, agora, tamanho)
+            for situacao, qtd in resultado.items():
+                totais[situacao] += qtd
+            if sum(resultado.values()) < tamanho:
+                break
+
+        if any(totais.values()):
+            logger.info(
+                "Prazos sinalizados: %s a vencer, %s vencidos",
+                totais[SITUACAO_A_VENCER], totais[SITUACAO_VENCIDO],
+            )
+        return totais
+
+
+class AgendadorPrazos:
+    """
+    Executa PrazoService.processar_prazos periodicamente numa thread de fundo.
+    Iniciado e encerrado pelo 'lifespan' da aplicação (app/main.py).
+    """
+
+    def __init__(self, intervalo: Optional[int] = None):
+        self.intervalo = intervalo or settings.PRAZO_INTERVALO_SEGUNDOS
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def iniciar(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._executar, name="agendador-prazos", daemon=True)
+        self._thread.start()
+        logger.info("Agendador de prazos iniciado (intervalo de %ss)", self.intervalo)
+
+    def parar(self):
+        self._parar.set()
+        if self._thread:
+            self._thread.join(timeout=10)
+            self._thread = None
+
+    def _executar(self):
+        while not self._parar.is_set():
+            db = SessionLocal()
+            try:
+                PrazoService.processar_prazos(db)
+            except Exception as e:
+                logger.error("Falha na varredura de prazos: %s", e)
+            finally:
+                db.close()
+            self._parar.wait(self.intervalo)
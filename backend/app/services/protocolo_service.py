@@ -0,0 +1,258 @@
+"""
+Service de Protocolos (número, dígito verificador e filtro de existência)
+Arquivo: backend/app/services/protocolo_service.py
+
+OBJETIVO:
+Responder 404 para números de protocolo inválidos ou inexistentes sem ir ao
+banco (erros de digitação e tentativas de enumeração nas rotas públicas).
+
+1. Dígito verificador: números novos têm o formato OUVIDORIA-YYYYMMDD-XXXXXXD,
+   onde D é o Luhn mod 36 de "YYYYMMDDXXXXXX". Detecta qualquer caractere
+   trocado e a maioria das transposições, sem I/O. Números antigos (sem D)
+   continuam aceitos.
+2. Filtro de Bloom por worker com todos os números emitidos: reconstruído no
+   lifespan e a cada PROTOCOLO_FILTRO_RECONSTRUIR_S, e atualizado a cada
+   criação neste worker. "Não está no filtro" só é confiável para números de
+   DIAS ANTERIORES à última reconstrução: os de hoje podem ter sido criados
+   por outro worker, então continuam indo ao banco.
+3. Cargas em massa por script (importar_legado.py, gerar_dados_sinteticos.py)
+   gravam números de dias passados que nenhum filtro conhece. Com
+   CACHE_REDIS_ATIVO, o script publica num stream do Redis 'importando' a
+   cada lote gravado e 'concluida' no fim: o worker deixa de confiar no
+   filtro (tudo vai ao banco) por PROTOCOLO_FILTRO_CARGA_S após cada lote e
+   reconstrói o filtro ao fim da carga. Os sinais são lidos a cada
+   PROTOCOLO_FILTRO_SINAIS_S. Sem Redis, os números importados só entram na
+   próxima reconstrução periódica (ou ao reiniciar os workers).
+"""
+
+import hashlib
+import logging
+import math
+import re
+import threading
+import time
+from datetime import datetime, timedelta, date
+from typing import Optional
+
+from app.config import settings
+from app.database import SessionLocal
+from app.services import cache_service
+from app.middleware.metricas import PROTOCOLOS_REJEITADOS
+from app.models.protocolo import Protocolo
+
+logger = logging.getLogger(__name__)
+
+ALFABETO = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+_FORMATO = re.compile(r"^OUVIDORIA-(\d{8})-([0-9A-F]{6})([0-9A-Z]?)$")
+
+# Transações abertas no início da reconstrução podem gravar números com a data
+# de "ontem" depois da leitura: essa margem os deixa fora da parte confiável
+MARGEM_RECONSTRUCAO = timedelta(minutes=5)
+
+# Sinais dos scripts de carga em massa para os workers
+FLUXO_CARGAS = "protocolos:filtro:cargas"
+CARGA_IMPORTANDO = "importando"
+CARGA_CONCLUIDA = "concluida"
+SINAIS_MAX = 1000
+
+
+def avisar_carga(evento: str):
+    """Chamado pelos scripts de carga: CARGA_IMPORTANDO após cada lote gravado, CARGA_CONCLUIDA no fim."""
+    cliente = cache_service._redis()  # o mesmo Redis do cache coalescido
+    if cliente is None:
+        if evento == CARGA_CONCLUIDA:
+            logger.warning(
+                "Sem CACHE_REDIS_ATIVO: os workers só reconhecem os protocolos carregados na próxima "
+                "reconstrução do filtro (PROTOCOLO_FILTRO_RECONSTRUIR_S) ou ao reiniciar"
+            )
+        return
+    try:
+        cliente.xadd(FLUXO_CARGAS, {"evento": evento}, maxlen=SINAIS_MAX, approximate=True)
+    except Exception as e:
+        logger.warning("Redis indisponível ao avisar a carga de protocolos: %s", type(e).__name__)
+
+
+class ProtocoloService:
+
+    @staticmethod
+    def digito_verificador(corpo: str) -> str:
+        """Luhn mod 36 sobre 'YYYYMMDDXXXXXX'."""
+        soma = 0
+        fator = 2
+        for caractere in reversed(corpo):
+            valor = ALFABETO.index(caractere) * fator
+            soma += valor // 36 + valor % 36
+            fator = 1 if fator == 2 else 2
+        return ALFABETO[(36 - soma % 36) % 36]
+
+    @staticmethod
+    def gerar_numero(data: datetime, sufixo: str) -> str:
+        """OUVIDORIA-YYYYMMDD-XXXXXXD (sufixo: 6 caracteres hexadecimais maiúsculos)."""
+        data_formatada = data.strftime("%Y%m%d")
+        return f"OUVIDORIA-{data_formatada}-{sufixo}{ProtocoloService.digito_verificador(data_formatada + sufixo)}"
+
+    @staticmethod
+    def pode_existir(numero: str) -> bool:
+        """False = com certeza não existe (responder 404 sem consultar o banco)."""
+        dia = None
+        formato = _FORMATO.match(numero)
+        if formato:
+            data_formatada, sufixo, digito = formato.groups()
+            try:
+                dia = datetime.strptime(data_formatada, "%Y%m%d").date()
+            except ValueError:
+                PROTOCOLOS_REJEITADOS.labels(motivo="data").inc()
+                return False
+            if digito and ProtocoloService.digito_verificador(data_formatada + sufixo) != digito:
+                PROTOCOLOS_REJEITADOS.labels(motivo="digito").inc()
+                return False
+
+        # Números fora do padrão OUVIDORIA só surgem por importação (já no filtro)
+        filtro = filtro_protocolos
+        if filtro.confiavel(dia) and not filtro.talvez_contem(numero):
+            PROTOCOLOS_REJEITADOS.labels(motivo="filtro").inc()
+            return False
+        return True
+
+
+class FiltroProtocolos:
+    """Filtro de Bloom (bytearray + hashing duplo sobre blake2b)."""
+
+    def __init__(self, capacidade: int, taxa_falsos_positivos: float):
+        self.total_bits = max(8, int(-capacidade * math.log(taxa_falsos_positivos) / math.log(2) ** 2))
+        self.quantidade_hashes = max(1, round(self.total_bits / capacidade * math.log(2)))
+        self._bits = bytearray()  # alocado na primeira reconstrução
+        self._trava = threading.Lock()
+        self._pendentes: Optional[list] = None  # adições feitas durante uma reconstrução
+        self.pronto = False
+        self.dia_confiavel: Optional[date] = None
+        self.carga_ate = 0.0  # monotonic: carga em massa em andamento, ausência não é confiável
+        self._ultimo_sinal: Optional[bytes] = None
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def confiavel(self, dia: Optional[date]) -> bool:
+        """'Não está no filtro' vale para números deste dia (None = fora do padrão OUVIDORIA)?"""
+        return (
+            self.pronto
+            and time.monotonic() >= self.carga_ate
+            and (dia is None or dia < self.dia_confiavel)
+        )
+
+    def _posicoes(self, numero: str):
+        resumo = hashlib.blake2b(numero.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(resumo[:8], "little")
+        h2 = int.from_bytes(resumo[8:], "little") | 1
+        return [(h1 + i * h2) % self.total_bits for i in range(self.quantidade_hashes)]
+
+    @staticmethod
+    def _marcar(bits: bytearray, posicoes):
+        for posicao in posicoes:
+            bits[posicao >> 3] |= 1 << (posicao & 7)
+
+    def adicionar(self, numero: str):
+        if not self.pronto and self._pendentes is None:
+            return  # filtro desligado ou ainda não construído
+        posicoes = self._posicoes(numero)
+        with self._trava:
+            if self.pronto:
+                self._marcar(self._bits, posicoes)
+            if self._pendentes is not None:
+                self._pendentes.append(posicoes)
+
+    def talvez_contem(self, numero: str) -> bool:
+        bits = self._bits
+        return all(bits[posicao >> 3] & (1 << (posicao & 7)) for posicao in self._posicoes(numero))
+
+    def reconstruir(self):
+        """Lê todos os números do banco num filtro novo e troca pelo atual."""
+        inicio = time.perf_counter()
+        dia_confiavel = (datetime.now() - MARGEM_RECONSTRUCAO).date()
+        with self._trava:
+            self._pendentes = []
+        novo = bytearray(self.total_bits // 8 + 1)
+        quantidade = 0
+        db = SessionLocal()
+        try:
+            for (numero,) in db.query(Protocolo.numero).yield_per(10000):
+                self._marcar(novo, self._posicoes(numero))
+                quantidade += 1
+        except Exception:
+            with self._trava:
+                self._pendentes = None
+            raise
+        finally:
+            db.close()
+
+        with self._trava:
+            for posicoes in self._pendentes:
+                self._marcar(novo, posicoes)
+            self._pendentes = None
+            self._bits = novo
+            self.dia_confiavel = dia_confiavel
+            self.pronto = True
+        logger.info(
+            "Filtro de protocolos reconstruído: %d números em %.0fms (%d KB)",
+            quantidade, (time.perf_counter() - inicio) * 1000, len(novo) // 1024,
+        )
+
+    def ler_sinais(self) -> bool:
+        """Aplica os sinais de carga publicados desde a última leitura; True = reconstruir."""
+        cliente = cache_service._redis()  # o mesmo Redis do cache coalescido
+        if cliente is None:
+            return False
+        if self._ultimo_sinal is None:
+            # Só interessa o que vier depois: o filtro acabou de ser construído
+            ultimo = cliente.xrevrange(FLUXO_CARGAS, count=1)
+            self._ultimo_sinal = ultimo[0][0] if ultimo else b"0-0"
+            return False
+        reconstruir = False
+        for _, eventos in cliente.xread({FLUXO_CARGAS: self._ultimo_sinal}) or []:
+            for id_sinal, campos in eventos:
+                if campos[b"evento"].decode() == CARGA_IMPORTANDO:
+                    self.carga_ate = time.monotonic() + settings.PROTOCOLO_FILTRO_CARGA_S
+                else:
+                    reconstruir = True
+                self._ultimo_sinal = id_sinal
+        return reconstruir
+
+    # Reconstrução periódica e por sinal de carga (mesmo modelo do AgendadorPrazos)
+    def iniciar(self):
+        sinais = settings.CACHE_REDIS_ATIVO
+        if (settings.PROTOCOLO_FILTRO_RECONSTRUIR_S <= 0 and not sinais) or (self._thread and self._thread.is_alive()):
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._executar, name="filtro-protocolos", daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+        if self._thread:
+            self._thread.join(timeout=10)
+            self._thread = None
+
+    def _executar(self):
+        periodo = settings.PROTOCOLO_FILTRO_RECONSTRUIR_S
+        proxima = time.monotonic() + periodo if periodo > 0 else math.inf
+        espera = settings.PROTOCOLO_FILTRO_SINAIS_S if settings.CACHE_REDIS_ATIVO else periodo
+        while not self._parar.wait(espera):
+            try:
+                fim_de_carga = self.ler_sinais()
+            except Exception as e:
+                fim_de_carga = False
+                logger.warning("Redis indisponível ao ler os sinais de carga: %s", type(e).__name__)
+            if not fim_de_carga and time.monotonic() < proxima:
+                continue
+            try:
+                self.reconstruir()
+                proxima = time.monotonic() + periodo if periodo > 0 else math.inf
+                if fim_de_carga:
+                    self.carga_ate = 0.0
+            except Exception as e:
+                logger.error("Falha ao reconstruir o filtro de protocolos: %s", e)
+
+
+# Instância única por worker
+filtro_protocolos = FiltroProtocolos(
+    settings.PROTOCOLO_FILTRO_CAPACIDADE, settings.PROTOCOLO_FILTRO_FALSOS_POSITIVOS
+)
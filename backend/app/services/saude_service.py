@@ -0,0 +1,152 @@
+"""
+Service de Saúde (readiness)
+Arquivo: backend/app/services/saude_service.py
+
+OBJETIVO:
+Dizer ao balanceador se ESTE worker pode receber tráfego agora:
+- banco de dados responde (SELECT 1);
+- Redis responde (opcional, SAUDE_VERIFICAR_REDIS);
+- disco de uploads com espaço livre acima de SAUDE_DISCO_MIN_MB;
+- threadpool (onde rodam as rotas síncronas) abaixo de SAUDE_THREADPOOL_MAX.
+
+Para a sonda não virar carga, banco/Redis/disco são verificados por uma tarefa
+de fundo a cada SAUDE_INTERVALO_S e o endpoint só lê o último resultado.
+As verificações rodam num executor próprio: com o threadpool lotado elas
+continuam sendo atualizadas.
+"""
+
+import asyncio
+import logging
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+import anyio.to_thread
+from sqlalchemy import text
+
+from app.config import settings
+from app.database import engine
+
+logger = logging.getLogger(__name__)
+
+
+def _verificar_banco() -> Dict:
+    with engine.connect() as conexao:
+        conexao.execute(text("SELECT 1"))
+    return {"ok": True}
+
+
+def _verificar_redis() -> Dict:
+    if not settings.SAUDE_VERIFICAR_REDIS:
+        return {"ok": True, "ignorado": True}
+    import redis  # dependência opcional: só carregada se a verificação estiver ligada
+
+    cliente = redis.Redis.from_url(
+        settings.REDIS_URL, socket_timeout=settings.SAUDE_TIMEOUT_S, socket_connect_timeout=settings.SAUDE_TIMEOUT_S
+    )
+    try:
+        cliente.ping()
+    finally:
+        cliente.close()
+    return {"ok": True}
+
+
+def _verificar_disco() -> Dict:
+    uso = shutil.disk_usage(settings.UPLOAD_DIR)
+    livre_mb = uso.free // (1024 * 1024)
+    return {"ok": livre_mb >= settings.SAUDE_DISCO_MIN_MB, "livre_mb": livre_mb}
+
+
+VERIFICACOES = {
+    "banco": _verificar_banco,
+    "redis": _verificar_redis,
+    "disco_uploads": _verificar_disco,
+}
+
+
+class VerificadorProntidao:
+    """Guarda o último resultado das verificações e o atualiza em segundo plano."""
+
+    def __init__(self):
+        self.resultados: Dict[str, Dict] = {}
+        # Marcado pelo lifespan ao fim do aquecimento (app/services/aquecimento_service.py)
+        self.aquecido = False
+        self.atualizado_em: Optional[float] = None
+        self._tarefa: Optional[asyncio.Task] = None
+        self._executor = ThreadPoolExecutor(max_workers=len(VERIFICACOES), thread_name_prefix="prontidao")
+
+    async def _executar_verificacao(self, nome: str, funcao) -> Dict:
+        loop = asyncio.get_running_loop()
+        inicio = time.perf_counter()
+        try:
+            resultado = await asyncio.wait_for(
+                loop.run_in_executor(self._executor, funcao), timeout=settings.SAUDE_TIMEOUT_S
+            )
+        except asyncio.TimeoutError:
+            resultado = {"ok": False, "erro": "timeout"}
+        except Exception as e:
+            resultado = {"ok": False, "erro": type(e).__name__}
+        resultado["duracao_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+        return resultado
+
+    async def atualizar(self):
+        nomes = list(VERIFICACOES)
+        resultados = await asyncio.gather(*(self._executar_verificacao(n, VERIFICACOES[n]) for n in nomes))
+        anteriores = self.resultados
+        self.resultados = dict(zip(nomes, resultados))
+        self.atualizado_em = time.monotonic()
+        for nome, resultado in self.resultados.items():
+            if not resultado["ok"] and anteriores.get(nome, {}).get("ok", True):
+                logger.warning("Verificação de prontidão falhou: %s (%s)", nome, resultado)
+
+    async def _laco(self):
+        while True:
+            try:
+                await self.atualizar()
+            except Exception:
+                logger.exception("Erro ao atualizar as verificações de prontidão")
+            await asyncio.sleep(settings.SAUDE_INTERVALO_S)
+
+    def iniciar(self):
+        """Chamado no lifespan (dentro do event loop)."""
+        if self._tarefa is None:
+            self._tarefa = asyncio.get_running_loop().create_task(self._laco())
+
+    async def parar(self):
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+            self._tarefa = None
+
+    def estado(self) -> Dict:
+        """
+        Resultado em cache + ocupação do threadpool (lida na hora, custo zero).
+        Deve ser chamado dentro do event loop.
+        """
+        limitador = anyio.to_thread.current_default_thread_limiter()
+        ocupacao = limitador.borrowed_tokens / limitador.total_tokens
+        verificacoes = dict(self.resultados)
+        verificacoes["threadpool"] = {
+            "ok": ocupacao < settings.SAUDE_THREADPOOL_MAX,
+            "ocupadas": limitador.borrowed_tokens,
+            "limite": limitador.total_tokens,
+        }
+        verificacoes["aquecimento"] = {"ok": self.aquecido}
+
+        idade = None if self.atualizado_em is None else time.monotonic() - self.atualizado_em
+        # Resultado velho demais = a tarefa de fundo parou: não dá para confiar
+        expirado = idade is None or idade > settings.SAUDE_INTERVALO_S * 3
+        pronto = not expirado and all(v["ok"] for v in verificacoes.values())
+        return {
+            "status": "ready" if pronto else "not_ready",
+            "idade_s": None if idade is None else round(idade, 1),
+            "verificacoes": verificacoes,
+        }
+
+
+# Instância única por worker
+verificador_prontidao = VerificadorProntidao()
@@ -0,0 +1,404 @@
+"""
+Service de Tarefas em Segundo Plano (outbox transacional)
+Arquivo: backend/app/services/tarefa_service.py
+
+OBJETIVO:
+Nenhuma requisição espera por efeito colateral (avisar o cidadão de uma
+resposta, enviar o link de recuperação de senha...). A rota só grava uma
+linha em 'tarefas' na mesma transação da mudança; os processos de
+'python trabalhador_tarefas.py' executam depois.
+
+COMO FUNCIONA:
+- TarefaService.enfileirar(db, tipo, dados): só db.add, quem chama faz o commit.
+- reservar_lote: SELECT ... FOR UPDATE SKIP LOCKED (vários processos sem
+  disputar as mesmas linhas) + UPDATE para 'em_execucao'. Tarefas presas em
+  'em_execucao' além de TAREFAS_EXECUCAO_MAX_S (processo morreu) voltam.
+- Falha: nova tentativa com backoff exponencial e variação aleatória; após
+  TAREFAS_MAX_TENTATIVAS a tarefa fica 'falhou' (consultável, não se perde).
+  FalhaDefinitiva (ex.: a IZA recusou a requisição) vai direto para 'falhou'.
+- Cada tipo tem um manipulador registrado com @manipulador("tipo"), que
+  recebe uma sessão própria e os 'dados' da tarefa. Precisa ser idempotente:
+  se o processo cair depois de executar e antes de concluir, ela roda de novo.
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+from uuid import uuid4
+
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.integrations.iza import IzaRecusou, cliente_iza
+from app.database import SessionLocal
+from app.middleware.metricas import (
+    TAREFAS_ATRASO,
+    TAREFAS_DURACAO,
+    TAREFAS_EXECUTADAS,
+    TAREFAS_FILA,
+    TAREFAS_LATENCIA,
+)
+from app.models.manifestacao import Manifestacao
+from app.models.movimentacao import Movimentacao
+from app.models.tarefa import Tarefa
+from app.models.usuario import Usuario
+from app.services.auth_service import AuthService
+from app.services.email_service import despachante_email
+
+logger = logging.getLogger(__name__)
+
+PENDENTE = "pendente"
+EM_EXECUCAO = "em_execucao"
+CONCLUIDA = "concluida"
+FALHOU = "falhou"
+
+MANIPULADORES: Dict[str, Callable[[Session, Dict], None]] = {}
+
+
+class FalhaDefinitiva(Exception):
+    """Erro que uma nova tentativa não resolve: a tarefa fica 'falhou' na hora."""
+
+
+# Manipuladores de lote: recebem a lista de 'dados' de todas as tarefas do tipo
+# reservadas juntas (ex.: uma requisição à IZA para vários relatos)
+MANIPULADORES_LOTE: Dict[str, Callable[[Session, List[Dict]], None]] = {}
+
+
+def manipulador(tipo: str):
+    """Registra a função que executa as tarefas do tipo 'tipo'."""
+    def registrar(funcao):
+        MANIPULADORES[tipo] = funcao
+        return funcao
+    return registrar
+
+
+def manipulador_lote(tipo: str):
+    """Registra a função que executa, de uma vez, as tarefas do tipo 'tipo' de um lote."""
+    def registrar(funcao):
+        MANIPULADORES_LOTE[tipo] = funcao
+        return funcao
+    return registrar
+
+
+class TarefaService:
+
+    @staticmethod
+    def enfileirar(db: Session, tipo: str, dados: Dict, atraso_s: float = 0) -> Tarefa:
+        """Adiciona a tarefa à transação corrente (sem commit)."""
+        agora = datetime.now()
+        tarefa = Tarefa(
+            id=str(uuid4()),
+            tipo=tipo,
+            dados=dados,
+            situacao=PENDENTE,
+            tentativas=0,
+            disponivel_em=agora + timedelta(seconds=atraso_s),
+            criado_em=agora,
+        )
+        db.add(tarefa)
+        return tarefa
+
+    # ==========================================================================
+    # FILA (processos trabalhadores)
+    # ==========================================================================
+    @staticmethod
+    def _disponiveis(agora: datetime):
+        presas_desde = agora - timedelta(seconds=settings.TAREFAS_EXECUCAO_MAX_S)
+        return or_(
+            and_(Tarefa.situacao == PENDENTE, Tarefa.disponivel_em <= agora),
+            and_(Tarefa.situacao == EM_EXECUCAO, Tarefa.iniciado_em < presas_desde),
+        )
+
+    @staticmethod
+    def reservar_lote(db: Session, executor: str, tamanho: int) -> List[Dict]:
+        """Reserva até 'tamanho' tarefas para este executor (transação curta)."""
+        agora = datetime.now()
+        ids = db.execute(
+            select(Tarefa.id)
+            .where(TarefaService._disponiveis(agora))
+            .order_by(Tarefa.disponivel_em.asc())
+            .limit(tamanho)
+            .with_for_update(skip_locked=True)
+        ).scalars().all()
+        if not ids:
+            db.rollback()
+            return []
+
+        # O WHERE repetido garante a reserva também onde não há SKIP LOCKED (SQLite)
+        reservadas = db.execute(
+            update(Tarefa)
+            .where(Tarefa.id.in_(ids), TarefaService._disponiveis(agora))
+            .values(
+                situacao=EM_EXECUCAO,
+                tentativas=Tarefa.tentativas + 1,
+                iniciado_em=agora,
+                executor=executor,
+            )
+            .returning(Tarefa.id, Tarefa.tipo, Tarefa.dados, Tarefa.tentativas, Tarefa.criado_em)
+        ).all()
+        db.commit()
+        return [linha._asdict() for linha in reservadas]
+
+    @staticmethod
+    def concluir(db: Session, tarefa_id: str):
+        db.execute(
+            update(Tarefa).where(Tarefa.id == tarefa_id)
+            .values(situacao=CONCLUIDA, concluido_em=datetime.now(), ultimo_erro=None)
+        )
+        db.commit()
+
+    @staticmethod
+    def falhar(db: Session, tarefa_id: str, tentativas: int, erro: str, definitiva: bool = False) -> bool:
+        """Agenda nova tentativa com backoff. Retorna False se esgotou as tentativas (ou 'definitiva')."""
+        agora = datetime.now()
+        if definitiva or tentativas >= settings.TAREFAS_MAX_TENTATIVAS:
+            valores = {"situacao": FALHOU, "concluido_em": agora}
+        else:
+            espera = min(settings.TAREFAS_ESPERA_MAX_S, settings.TAREFAS_ESPERA_BASE_S * 2 ** (tentativas - 1))
+            espera *= random.uniform(0.5, 1.0)  # variação: tarefas que falharam juntas não voltam juntas
+            valores = {"situacao": PENDENTE, "disponivel_em": agora + timedelta(seconds=espera)}
+        db.execute(update(Tarefa).where(Tarefa.id == tarefa_id).values(ultimo_erro=erro[:2000], **valores))
+        db.commit()
+        return valores["situacao"] == PENDENTE
+
+    @staticmethod
+    def agrupar(lote: List[Dict]) -> List[List[Dict]]:
+        """Tarefas de tipos com manipulador de lote ficam juntas; as outras, uma a uma."""
+        grupos: Dict[str, List[Dict]] = {}
+        avulsas = []
+        for tarefa in lote:
+            if tarefa["tipo"] in MANIPULADORES_LOTE:
+                grupos.setdefault(tarefa["tipo"], []).append(tarefa)
+            else:
+                avulsas.append([tarefa])
+        return avulsas + list(grupos.values())
+
+    @staticmethod
+    def executar(db: Session, tarefa: Dict):
+        """Executa uma tarefa reservada e registra o resultado."""
+        TarefaService.executar_grupo(db, [tarefa])
+
+    @staticmethod
+    def executar_grupo(db: Session, tarefas: List[Dict]):
+        """Executa tarefas reservadas do mesmo tipo (de agrupar) e registra o resultado."""
+        tipo = tarefas[0]["tipo"]
+        agora = datetime.now()
+        for tarefa in tarefas:
+            if tarefa["tentativas"] == 1:
+                TAREFAS_LATENCIA.labels(tipo=tipo).observe((agora - tarefa["criado_em"]).total_seconds())
+        inicio = time.perf_counter()
+        try:
+            if tipo in MANIPULADORES_LOTE:
+                MANIPULADORES_LOTE[tipo](db, [tarefa["dados"] for tarefa in tarefas])
+            else:
+                funcao = MANIPULADORES.get(tipo)
+                if funcao is None:
+                    raise LookupError(f"Tipo de tarefa sem manipulador: {tipo}")
+                for tarefa in tarefas:
+                    funcao(db, tarefa["dados"])
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            # O grupo falha junto: cada tarefa volta para a fila com o próprio backoff
+            for tarefa in tarefas:
+                vai_repetir = TarefaService.falhar(
+                    db, tarefa["id"], tarefa["tentativas"], f"{type(e).__name__}: {e}",
+                    definitiva=isinstance(e, FalhaDefinitiva),
+                )
+                TAREFAS_EXECUTADAS.labels(tipo=tipo, resultado="nova_tentativa" if vai_repetir else "falhou").inc()
+                logger.warning(
+                    "Tarefa %s (%s) falhou na tentativa %d%s: %s",
+                    tarefa["id"], tipo, tarefa["tentativas"], "" if vai_repetir else " (desistindo)", e,
+                )
+            return
+        finally:
+            TAREFAS_DURACAO.labels(tipo=tipo).observe(time.perf_counter() - inicio)
+
+        for tarefa in tarefas:
+            TarefaService.concluir(db, tarefa["id"])
+            TAREFAS_EXECUTADAS.labels(tipo=tipo, resultado="concluida").inc()
+
+    @staticmethod
+    def estado_fila(db: Session) -> Dict:
+        """Quantidade por situação e atraso (idade da tarefa disponível mais antiga)."""
+        agora = datetime.now()
+        por_situacao = dict(db.query(Tarefa.situacao, func.count(Tarefa.id)).group_by(Tarefa.situacao).all())
+        mais_antiga = db.query(func.min(Tarefa.disponivel_em))\
+            .filter(Tarefa.situacao == PENDENTE, Tarefa.disponivel_em <= agora)\
+            .scalar()
+        atraso = (agora - mais_antiga).total_seconds() if mais_antiga else 0.0
+
+        for situacao in (PENDENTE, EM_EXECUCAO, CONCLUIDA, FALHOU):
+            TAREFAS_FILA.labels(situacao=situacao).set(por_situacao.get(situacao, 0))
+        TAREFAS_ATRASO.set(atraso)
+        return {"por_situacao": por_situacao, "atraso_s": round(atraso, 1)}
+
+    @staticmethod
+    def limpar_concluidas(db: Session) -> int:
+        limite = datetime.now() - timedelta(days=settings.TAREFAS_RETENCAO_DIAS)
+        apagadas = db.execute(
+            delete(Tarefa).where(Tarefa.situacao == CONCLUIDA, Tarefa.concluido_em < limite)
+        ).rowcount
+        db.commit()
+        return apagadas
+
+
+class ExecutorTarefas:
+    """
+    Laço de um executor: reserva um lote, executa, repete; dorme
+    TAREFAS_INTERVALO_S quando a fila está vazia. Usado por cada processo de
+    trabalhador_tarefas.py e, com TAREFAS_NA_API, numa thread da API.
+    """
+
+    # Estado da fila (métricas) e limpeza das concluídas a cada tantos segundos
+    MANUTENCAO_S = 30
+
+    def __init__(self, nome: Optional[str] = None):
+        self.nome = nome or f"{os.uname().nodename}-{os.getpid()}"
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def iniciar(self):
+        """Executa numa thread de fundo (API)."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self.executar, name="executor-tarefas", daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+        if self._thread:
+            self._thread.join(timeout=10)
+            self._thread = None
+
+    def executar(self):
+        logger.info("Executor de tarefas %s iniciado", self.nome)
+        proxima_manutencao = 0.0
+        while not self._parar.is_set():
+            db = SessionLocal()
+            try:
+                if time.monotonic() >= proxima_manutencao:
+                    TarefaService.estado_fila(db)
+                    TarefaService.limpar_concluidas(db)
+                    proxima_manutencao = time.monotonic() + self.MANUTENCAO_S
+
+                lote = TarefaService.reservar_lote(db, self.nome, settings.TAREFAS_LOTE)
+                for grupo in TarefaService.agrupar(lote):
+                    # Encerramento no meio do lote: o restante volta sozinho
+                    # para a fila após TAREFAS_EXECUCAO_MAX_S
+                    if self._parar.is_set():
+                        break
+                    TarefaService.executar_grupo(db, grupo)
+            except Exception as e:
+                lote = []
+                logger.error("Falha no executor de tarefas: %s", e)
+            finally:
+                db.close()
+            if not lote:
+                despachante_email.fechar_ociosa()
+                self._parar.wait(settings.TAREFAS_INTERVALO_S)
+        despachante_email.fechar()
+        cliente_iza.fechar()
+        logger.info("Executor de tarefas %s encerrado", self.nome)
+
+
+# ==============================================================================
+# MANIPULADORES
+# ==============================================================================
+# Enviam por e-mail (app/services/email_service.py). Falha no envio = exceção
+# = nova tentativa da tarefa.
+@manipulador("confirmar_recebimento")
+def confirmar_recebimento(db: Session, dados: Dict):
+    manifestacao = db.get(Manifestacao, dados["manifestacao_id"])
+    if manifestacao is None or manifestacao.usuario is None:
+        return
+    despachante_email.enviar(
+        manifestacao.usuario.email,
+        f"Manifestação {manifestacao.protocolo} recebida",
+        f"Sua manifestação foi registrada com o protocolo {manifestacao.protocolo}.",
+    )
+
+
+def _grupos_de_respostas(respostas: List[Movimentacao]) -> List[List[Movimentacao]]:
+    """
+    Divide as respostas (em ordem) nos resumos: começa outro quando passa
+    EMAIL_RESUMO_JANELA_S sem resposta ou o atual já cobre EMAIL_RESUMO_MAX_S.
+    Só depende das respostas gravadas, então toda tarefa chega aos mesmos grupos.
+    """
+    grupos: List[List[Movimentacao]] = []
+    for resposta in respostas:
+        if grupos:
+            desde_ultima = (resposta.data_criacao - grupos[-1][-1].data_criacao).total_seconds()
+            desde_primeira = (resposta.data_criacao - grupos[-1][0].data_criacao).total_seconds()
+            if desde_ultima < settings.EMAIL_RESUMO_JANELA_S and desde_primeira < settings.EMAIL_RESUMO_MAX_S:
+                grupos[-1].append(resposta)
+                continue
+        grupos.append([resposta])
+    return grupos
+
+
+@manipulador("notificar_resposta")
+def notificar_resposta(db: Session, dados: Dict):
+    movimentacao = db.get(Movimentacao, dados["movimentacao_id"])
+    if movimentacao is None:
+        return
+    manifestacao = db.get(Manifestacao, movimentacao.manifestacao_id)
+    if manifestacao is None or manifestacao.usuario is None:
+        return
+
+    # Respostas que o cidadão dono vê e não escreveu
+    respostas = db.query(Movimentacao)\
+        .filter(
+            Movimentacao.manifestacao_id == manifestacao.id,
+            Movimentacao.interno == False,
+            Movimentacao.autor_id != manifestacao.usuario_id,
+        )\
+        .order_by(Movimentacao.data_criacao.asc(), Movimentacao.id.asc())\
+        .all()
+    grupo = next((g for g in _grupos_de_respostas(respostas) if movimentacao in g), None)
+    # Só a tarefa da última resposta do grupo envia; as anteriores entram no resumo dela
+    if grupo is None or grupo[-1] is not movimentacao:
+        return
+
+    if len(grupo) == 1:
+        assunto = f"Nova resposta na manifestação {manifestacao.protocolo}"
+    else:
+        assunto = f"{len(grupo)} novas respostas na manifestação {manifestacao.protocolo}"
+    partes = [
+        f"[{resposta.data_criacao:%d/%m/%Y %H:%M}]\n{resposta.texto}" for resposta in grupo
+    ]
+    situacao = getattr(manifestacao.status, "value", manifestacao.status)
+    partes.append(f"Situação atual: {situacao.replace('_', ' ')}")
+    despachante_email.enviar(manifestacao.usuario.email, assunto, "\n\n".join(partes))
+
+
+@manipulador("recuperar_senha")
+def recuperar_senha(db: Session, dados: Dict):
+    usuario = db.get(Usuario, dados["usuario_id"])
+    if usuario is None:
+        return
+    # O token é gerado aqui: o link com o segredo nunca fica gravado na tabela
+    despachante_email.enviar(
+        usuario.email,
+        "Recuperação de senha",
+        "Para redefinir sua senha, acesse (válido por 24 horas):\n"
+        + AuthService.link_recuperacao_senha(usuario.email),
+    )
+
+
+@manipulador_lote("analisar_iza")
+def analisar_iza(db: Session, lista_dados: List[Dict]):
+    """Análise dos relatos na IZA: uma chamada para o grupo (o cliente guarda pelo hash)."""
+    ids = [dados["manifestacao_id"] for dados in lista_dados]
+    relatos = [relato for (relato,) in db.query(Manifestacao.relato).filter(Manifestacao.id.in_(ids))]
+    if relatos:
+        try:
+            cliente_iza.analisar(db, relatos)
+        except IzaRecusou as e:
+            raise FalhaDefinitiva(str(e)) from e
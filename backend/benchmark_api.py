@@ -0,0 +1,292 @@
+"""
+Benchmark de latência dos endpoints da API (com verificação de regressão)
+
+Sobe o 'app' FastAPI em processo (TestClient) contra o banco configurado em
+DATABASE_URL, mede p50/p95/p99 e vazão de cada rota e grava o resultado em JSON.
+No modo --comparar, falha (código de saída 1) se alguma rota ficar mais lenta
+que a linha de base além da tolerância.
+
+ATENÇÃO: cria usuários, manifestações e respostas. Use um banco de testes
+(de preferência populado com 'python gerar_dados_sinteticos.py').
+
+Exemplos:
+    python benchmark_api.py --salvar benchmarks/baseline.json
+    python benchmark_api.py --comparar benchmarks/baseline.json --tolerancia 0.20
+    python benchmark_api.py --rotas login,rastrear_protocolo --requisicoes 500 --concorrencia 8
+    python benchmark_api.py --max-consultas 10     # falha com N+1 ou excesso de SQL por rota
+"""
+
+import argparse
+import io
+import json
+import logging
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from uuid import uuid4
+
+# O benchmark mede as rotas, não o limite de taxa: uma rodada faz centenas de
+# logins e consultas do mesmo IP e receberia 429. LIMITE_TAXA_ATIVO=True no
+# ambiente mede com ele ligado.
+os.environ.setdefault("LIMITE_TAXA_ATIVO", "False")
+
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.database import SessionLocal, engine
+from app.main import app
+from app.middleware.consultas_sql import contar_consultas
+from app.models.assunto import Assunto
+from app.models.usuario import Usuario
+from app.services.auth_service import AuthService
+
+# Os logs INFO de cada requisição (app e httpx) distorcem a medição
+logging.getLogger().setLevel(logging.WARNING)
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+SENHA = "Benchmark@123"
+CPF_CIDADAO = "00000000191"
+CPF_ADMIN = "00000000272"
+
+# Regressões menores que isso (em ms) são consideradas ruído
+DIFERENCA_MINIMA_MS = 2.0
+
+
+# ==============================================================================
+# PREPARAÇÃO
+# ==============================================================================
+def garantir_usuario(db, cpf: str, admin: bool) -> Usuario:
+    usuario = db.query(Usuario).filter(Usuario.cpf == cpf).first()
+    if usuario:
+        return usuario
+    usuario = Usuario(
+        id=str(uuid4()),
+        nome=f"Benchmark {'Admin' if admin else 'Cidadão'}",
+        email=f"benchmark.{cpf}@participa-df.gov.br",
+        cpf=cpf,
+        senha_hash=AuthService.gerar_hash_senha(SENHA),
+        admin=admin,
+        ativo=True,
+    )
+    db.add(usuario)
+    db.commit()
+    return usuario
+
+
+class Contexto:
+    """Usuários, tokens e registros usados pelos cenários."""
+
+    def __init__(self, cliente: TestClient):
+        self.cliente = cliente
+        db = SessionLocal()
+        try:
+            garantir_usuario(db, CPF_CIDADAO, admin=False)
+            garantir_usuario(db, CPF_ADMIN, admin=True)
+            assunto = db.query(Assunto).filter(Assunto.ativo == True).first()
+            if not assunto:
+                raise RuntimeError("Nenhum assunto ativo. Rode 'python seed_assuntos.py' antes.")
+            self.assunto_id = assunto.id
+        finally:
+            db.close()
+
+        self.cabecalho_cidadao = self._login(CPF_CIDADAO)
+        self.cabecalho_admin = self._login(CPF_ADMIN)
+
+        # Uma manifestação conhecida para as rotas de consulta
+        manifestacao = self.criar_manifestacao().json()
+        self.manifestacao_id = manifestacao["id"]
+        self.protocolo = manifestacao["protocolo"]
+        for i in range(5):
+            cliente.post(
+                f"/api/movimentacoes/{self.manifestacao_id}",
+                data={"texto": f"Resposta de benchmark {i}"},
+                headers=self.cabecalho_admin if i % 2 == 0 else self.cabecalho_cidadao,
+            )
+        self.anexo = b"\x89PNG\r\n\x1a\n" + os.urandom(100 * 1024)
+
+    def _login(self, cpf: str) -> Dict[str, str]:
+        resposta = self.cliente.post("/api/auth/login", data={"username": cpf, "password": SENHA})
+        resposta.raise_for_status()
+        return {"Authorization": f"Bearer {resposta.json()['access_token']}"}
+
+    def criar_manifestacao(self, com_anexo: bool = False):
+        arquivos = None
+        if com_anexo:
+            arquivos = [("arquivos", ("benchmark.png", io.BytesIO(self.anexo), "image/png"))]
+        return self.cliente.post(
+            "/api/manifestacoes/",
+            data={"relato": "Relato gerado pelo benchmark de latência.", "assunto_id": self.assunto_id},
+            files=arquivos,
+            headers=self.cabecalho_cidadao,
+        )
+
+
+# ==============================================================================
+# CENÁRIOS (uma entrada por rota)
+# ==============================================================================
+def cenarios(ctx: Contexto) -> Dict[str, Callable]:
+    c = ctx.cliente
+    return {
+        "health": lambda: c.get("/health"),
+        "login": lambda: c.post("/api/auth/login", data={"username": CPF_CIDADAO, "password": SENHA}),
+        "listar_assuntos": lambda: c.get("/api/assuntos/"),
+        "criar_manifestacao": lambda: ctx.criar_manifestacao(),
+        "criar_manifestacao_com_anexo": lambda: ctx.criar_manifestacao(com_anexo=True),
+        "listar_manifestacoes": lambda: c.get("/api/manifestacoes/", headers=ctx.cabecalho_cidadao),
+        "listar_todas_admin": lambda: c.get("/api/manifestacoes/admin/todas", headers=ctx.cabecalho_admin),
+        "consultar_manifestacao": lambda: c.get(f"/api/manifestacoes/{ctx.protocolo}"),
+        "rastrear_protocolo": lambda: c.get(f"/api/protocolos/{ctx.protocolo}"),
+        "listar_historico": lambda: c.get(f"/api/movimentacoes/{ctx.manifestacao_id}", headers=ctx.cabecalho_admin),
+        "responder_manifestacao": lambda: c.post(
+            f"/api/movimentacoes/{ctx.manifestacao_id}",
+            data={"texto": "Resposta de benchmark"},
+            headers=ctx.cabecalho_admin,
+        ),
+        "notificacoes_cidadao": lambda: c.get("/api/movimentacoes/notificacoes/novas", headers=ctx.cabecalho_cidadao),
+        "notificacoes_admin": lambda: c.get("/api/movimentacoes/notificacoes/novas", headers=ctx.cabecalho_admin),
+    }
+
+
+# ==============================================================================
+# MEDIÇÃO
+# ==============================================================================
+def percentil(valores_ordenados: List[float], p: float) -> float:
+    """Percentil pelo método do posto mais próximo."""
+    if not valores_ordenados:
+        return 0.0
+    indice = max(0, min(len(valores_ordenados) - 1, int(round(p / 100 * len(valores_ordenados))) - 1))
+    return valores_ordenados[indice]
+
+
+def medir(cenario: Callable, requisicoes: int, concorrencia: int, aquecimento: int) -> Dict:
+    for _ in range(aquecimento):
+        cenario()
+
+    def uma_requisicao(_):
+        inicio = time.perf_counter()
+        resposta = cenario()
+        return (time.perf_counter() - inicio) * 1000, resposta.status_code < 400
+
+    inicio_total = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        resultados = list(executor.map(uma_requisicao, range(requisicoes)))
+    duracao = time.perf_counter() - inicio_total
+
+    latencias = sorted(latencia for latencia, _ in resultados)
+    return {
+        "requisicoes": requisicoes,
+        "erros": sum(1 for _, ok in resultados if not ok),
+        "media_ms": round(sum(latencias) / len(latencias), 3),
+        "p50_ms": round(percentil(latencias, 50), 3),
+        "p95_ms": round(percentil(latencias, 95), 3),
+        "p99_ms": round(percentil(latencias, 99), 3),
+        "rps": round(requisicoes / duracao, 1),
+    }
+
+
+def auditar_consultas(cenario: Callable) -> Dict:
+    """Executa o cenário uma vez (fora da medição) contando os comandos SQL."""
+    with contar_consultas() as registro:
+        cenario()
+    return {
+        "consultas": registro.quantidade,
+        "suspeitas_n1": [f"{vezes}x {formato[:120]}" for formato, vezes in registro.suspeitas_n1()],
+    }
+
+
+def comparar(atual: Dict, base: Dict, tolerancia: float) -> List[str]:
+    """Lista as rotas cujo p50 ou p95 piorou além da tolerância."""
+    regressoes = []
+    for rota, medida in atual["rotas"].items():
+        referencia = base.get("rotas", {}).get(rota)
+        if not referencia:
+            continue
+        for metrica in ("p50_ms", "p95_ms"):
+            limite = referencia[metrica] * (1 + tolerancia)
+            if medida[metrica] > limite and medida[metrica] - referencia[metrica] > DIFERENCA_MINIMA_MS:
+                regressoes.append(
+                    f"{rota}: {metrica} {medida[metrica]:.1f}ms > {referencia[metrica]:.1f}ms (+{tolerancia:.0%})"
+                )
+        if medida["erros"] > referencia.get("erros", 0):
+            regressoes.append(f"{rota}: {medida['erros']} erros (base: {referencia.get('erros', 0)})")
+    return regressoes
+
+
+def executar(args) -> int:
+    # 'with' roda o lifespan (threadpool, aquecimento, filtro de protocolos,
+    # diário de ingestão): mede a aplicação como num worker de verdade
+    with TestClient(app) as cliente:
+        return _executar(cliente, args)
+
+
+def _executar(cliente: TestClient, args) -> int:
+    ctx = Contexto(cliente)
+    todos = cenarios(ctx)
+    selecionados = args.rotas.split(",") if args.rotas else list(todos)
+
+    resultado = {
+        "gerado_em": datetime.now().isoformat(),
+        "ambiente": {
+            "python": platform.python_version(),
+            "banco": engine.dialect.name,
+            "requisicoes": args.requisicoes,
+            "concorrencia": args.concorrencia,
+            "limite_taxa": settings.LIMITE_TAXA_ATIVO,
+        },
+        "rotas": {},
+    }
+    excessos_sql = []
+    print(f"{'rota':32} {'p50':>9} {'p95':>9} {'p99':>9} {'req/s':>9} {'erros':>6} {'sql':>5}")
+    for nome in selecionados:
+        auditoria = auditar_consultas(todos[nome])
+        medida = medir(todos[nome], args.requisicoes, args.concorrencia, args.aquecimento)
+        medida.update(auditoria)
+        resultado["rotas"][nome] = medida
+        print(f"{nome:32} {medida['p50_ms']:9.2f} {medida['p95_ms']:9.2f} "
+              f"{medida['p99_ms']:9.2f} {medida['rps']:9.1f} {medida['erros']:6d} {medida['consultas']:5d}")
+
+        if args.max_consultas is not None:
+            if medida["consultas"] > args.max_consultas:
+                excessos_sql.append(f"{nome}: {medida['consultas']} consultas (máximo {args.max_consultas})")
+            excessos_sql.extend(f"{nome}: possível N+1 ({suspeita})" for suspeita in medida["suspeitas_n1"])
+
+    if args.salvar:
+        os.makedirs(os.path.dirname(args.salvar) or ".", exist_ok=True)
+        with open(args.salvar, "w", encoding="utf-8") as arquivo:
+            json.dump(resultado, arquivo, indent=2)
+        print(f"\nResultado salvo em {args.salvar}")
+
+    if excessos_sql:
+        print("\nCONSULTAS SQL ACIMA DO ESPERADO:")
+        for linha in excessos_sql:
+            print(f"  - {linha}")
+        return 1
+
+    if args.comparar:
+        with open(args.comparar, "r", encoding="utf-8") as arquivo:
+            base = json.load(arquivo)
+        regressoes = comparar(resultado, base, args.tolerancia)
+        if regressoes:
+            print("\nREGRESSÕES DETECTADAS:")
+            for linha in regressoes:
+                print(f"  - {linha}")
+            return 1
+        print(f"\nNenhuma regressão acima de {args.tolerancia:.0%} em relação a {args.comparar}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de latência dos endpoints")
+    parser.add_argument("--requisicoes", type=int, default=200, help="Requisições medidas por rota")
+    parser.add_argument("--concorrencia", type=int, default=4, help="Requisições simultâneas")
+    parser.add_argument("--aquecimento", type=int, default=10, help="Requisições descartadas por rota")
+    parser.add_argument("--rotas", help="Lista separada por vírgulas (padrão: todas)")
+    parser.add_argument("--salvar", help="Grava o resultado em JSON (linha de base)")
+    parser.add_argument("--comparar", help="JSON de linha de base para comparação")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="Piora máxima aceita (0.25 = 25%%)")
+    parser.add_argument("--max-consultas", type=int, help="Falha se uma rota emitir mais SQL que isso ou tiver N+1")
+    sys.exit(executar(parser.parse_args()))
@@ -0,0 +1,148 @@
+"""
+Benchmark e verificação da ingestão em rajada (INGESTAO_MODO)
+
+1. Vazão: envia as mesmas manifestações no modo "direto" e no modo "diario"
+   e compara latência, req/s e, no modo diário, quanto tempo a gravação em
+   lote leva para deixar tudo no banco.
+2. Queda (--queda): um processo filho grava N registros no diário e é morto
+   (SIGKILL) antes da gravação em lote; a recuperação precisa colocar os N no
+   banco exatamente uma vez (o diário é duplicado para simular um
+   reprocessamento) e descartar a última linha incompleta.
+
+ATENÇÃO: cria usuários e manifestações. Use um banco de testes.
+
+Exemplos:
+    python benchmark_ingestao.py --requisicoes 500 --concorrencia 16
+    python benchmark_ingestao.py --queda 200
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.database import SessionLocal
+from app.main import app
+from app.models.assunto import Assunto
+from app.models.manifestacao import Manifestacao
+from app.schemas.manifestacao import ManifestacaoCreate
+from app.services.ingestao_service import diario_ingestao
+from app.services.manifestacao_service import ManifestacaoService
+from benchmark_api import Contexto, medir
+
+logging.getLogger().setLevel(logging.WARNING)
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+# ==============================================================================
+# VAZÃO: DIRETO x DIÁRIO
+# ==============================================================================
+def medir_modo(modo: str, args) -> dict:
+    settings.INGESTAO_MODO = modo
+    with TestClient(app) as cliente:
+        ctx = Contexto(cliente)
+        medida = medir(ctx.criar_manifestacao, args.requisicoes, args.concorrencia, args.aquecimento)
+        inicio = time.perf_counter()
+        # Modo diário: espera a gravação em lote esvaziar a fila
+        while diario_ingestao.ativo and diario_ingestao._quantidade:
+            time.sleep(0.01)
+        medida["ate_o_banco_s"] = round(time.perf_counter() - inicio, 3)
+    return medida
+
+
+def comparar_modos(args) -> int:
+    print(f"{'modo':8} {'p50':>9} {'p95':>9} {'p99':>9} {'req/s':>9} {'erros':>6} {'drenagem':>9}")
+    for modo in ("direto", "diario"):
+        m = medir_modo(modo, args)
+        print(f"{modo:8} {m['p50_ms']:9.2f} {m['p95_ms']:9.2f} {m['p99_ms']:9.2f} "
+              f"{m['rps']:9.1f} {m['erros']:6d} {m['ate_o_banco_s']:8.3f}s")
+    return 0
+
+
+# ==============================================================================
+# QUEDA E RECUPERAÇÃO
+# ==============================================================================
+def filho_gravar_e_morrer(quantidade: int):
+    """Processo filho: grava no diário sem nunca gravar no banco e morre com SIGKILL."""
+    settings.INGESTAO_MODO = "diario"
+    settings.INGESTAO_INTERVALO_S = 3600
+    settings.INGESTAO_LOTE_MAX = quantidade + 1
+    diario_ingestao.iniciar()
+    db = SessionLocal()
+    assunto_id = db.query(Assunto.id).first()[0]
+    db.close()
+    ids = []
+    for i in range(quantidade):
+        dados = ManifestacaoCreate(relato=f"Relato do teste de queda {i}", assunto_id=assunto_id)
+        registro = ManifestacaoService.montar_registro(dados)
+        diario_ingestao.enfileirar(registro)
+        ids.append(registro["id"])
+    # Uma escrita interrompida no meio (nunca confirmada ao cliente)
+    diario_ingestao._segmento.arquivo.write(b'{"id": "incompleto", "relato": "cort')
+    print(json.dumps(ids), flush=True)
+    os.kill(os.getpid(), signal.SIGKILL)
+
+
+def verificar_queda(args) -> int:
+    diretorio = tempfile.mkdtemp(prefix="ingestao-")
+    ambiente = dict(os.environ, INGESTAO_DIRETORIO=diretorio)
+    db = SessionLocal()
+    try:
+        if not db.query(Assunto.id).first():
+            print("Nenhum assunto. Rode 'python seed_assuntos.py' antes.")
+            return 1
+    finally:
+        db.close()
+
+    processo = subprocess.run(
+        [sys.executable, __file__, "--filho", str(args.queda)],
+        env=ambiente, capture_output=True, text=True,
+    )
+    if processo.returncode != -signal.SIGKILL:
+        print(f"Filho terminou com {processo.returncode}:\n{processo.stderr}")
+        return 1
+    ids = json.loads(processo.stdout.strip().splitlines()[-1])
+
+    # Cópia do diário: os mesmos registros lidos duas vezes (ex.: queda depois do commit)
+    (diario,) = os.listdir(diretorio)
+    shutil.copy(os.path.join(diretorio, diario), os.path.join(diretorio, "diario-copia.jsonl"))
+
+    settings.INGESTAO_DIRETORIO = diretorio
+    db = SessionLocal()
+    try:
+        antes = db.query(Manifestacao).filter(Manifestacao.id.in_(ids)).count()
+        lidos = diario_ingestao.recuperar()
+        depois = db.query(Manifestacao).filter(Manifestacao.id.in_(ids)).count()
+    finally:
+        db.close()
+    restantes = os.listdir(diretorio)
+
+    print(f"no banco antes da recuperação: {antes}")
+    print(f"registros lidos: {lidos} (diário + cópia, sem a linha incompleta)")
+    print(f"no banco depois: {depois} de {len(ids)}")
+    print(f"arquivos que sobraram no diário: {restantes or 'nenhum'}")
+    ok = antes == 0 and lidos == 2 * len(ids) and depois == len(ids) and not restantes
+    print("OK" if ok else "FALHOU")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark e teste de queda da ingestão em rajada")
+    parser.add_argument("--requisicoes", type=int, default=300, help="Manifestações enviadas por modo")
+    parser.add_argument("--concorrencia", type=int, default=8, help="Envios simultâneos")
+    parser.add_argument("--aquecimento", type=int, default=5, help="Envios descartados por modo")
+    parser.add_argument("--queda", type=int, metavar="N", help="Verifica a recuperação após SIGKILL com N registros")
+    parser.add_argument("--filho", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.filho:
+        filho_gravar_e_morrer(args.filho)
+    sys.exit(verificar_queda(args) if args.queda else comparar_modos(args))
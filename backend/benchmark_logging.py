@@ -0,0 +1,143 @@
+"""
+Benchmark do custo de log no caminho da requisição
+
+Compara a latência de cada chamada logger.info() feita por várias threads
+(como as do threadpool das rotas) em dois modos:
+- sincrono: RotatingFileHandler direto no logger (a thread espera o disco);
+- fila: o pipeline de app/logging_config.py (QueueHandler + thread de escrita).
+
+Com --atraso-disco-ms, cada gravação em disco fica artificialmente lenta,
+simulando um volume saturado: no modo "fila" a cauda (p99/máx) não deve mudar.
+
+Exemplos:
+    python benchmark_logging.py
+    python benchmark_logging.py --threads 16 --registros 5000 --atraso-disco-ms 2
+"""
+
+import argparse
+import logging
+import os
+import queue
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from logging.handlers import QueueListener, RotatingFileHandler
+from typing import Dict, List
+
+from app.logging_config import (
+    ContextoRequisicaoFilter,
+    QueueHandlerSemBloqueio,
+    criar_formatador,
+    id_requisicao_atual,
+)
+
+
+class DiscoLento(RotatingFileHandler):
+    """RotatingFileHandler que demora 'atraso' segundos em cada gravação."""
+
+    def __init__(self, *args, atraso: float = 0.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.atraso = atraso
+
+    def emit(self, record):
+        if self.atraso:
+            time.sleep(self.atraso)
+        super().emit(record)
+
+
+def percentil(valores_ordenados: List[float], p: float) -> float:
+    """Percentil pelo método do posto mais próximo."""
+    if not valores_ordenados:
+        return 0.0
+    indice = max(0, min(len(valores_ordenados) - 1, int(round(p / 100 * len(valores_ordenados))) - 1))
+    return valores_ordenados[indice]
+
+
+def medir(logger: logging.Logger, threads: int, registros: int) -> Dict:
+    latencias: List[float] = []
+    trava = threading.Lock()
+
+    def trabalhador(numero: int):
+        id_requisicao_atual.set(f"bench-{numero}")
+        locais = []
+        for i in range(registros):
+            inicio = time.perf_counter()
+            logger.info("Manifestação criada com sucesso: %s", i, extra={"usuario": numero})
+            locais.append((time.perf_counter() - inicio) * 1_000_000)
+        with trava:
+            latencias.extend(locais)
+
+    inicio = time.perf_counter()
+    grupo = [threading.Thread(target=trabalhador, args=(n,)) for n in range(threads)]
+    for thread in grupo:
+        thread.start()
+    for thread in grupo:
+        thread.join()
+    duracao = time.perf_counter() - inicio
+
+    latencias.sort()
+    return {
+        "p50_us": round(percentil(latencias, 50), 1),
+        "p99_us": round(percentil(latencias, 99), 1),
+        "p999_us": round(percentil(latencias, 99.9), 1),
+        "max_us": round(latencias[-1], 1),
+        "registros_s": round(len(latencias) / duracao),
+    }
+
+
+def executar(args) -> Dict[str, Dict]:
+    pasta = tempfile.mkdtemp(prefix="bench_log_")
+    resultados = {}
+    try:
+        # Modo síncrono: a thread da requisição grava no arquivo
+        arquivo = DiscoLento(os.path.join(pasta, "sincrono.log"), maxBytes=50 * 1024 * 1024,
+                             backupCount=1, atraso=args.atraso_disco_ms / 1000)
+        arquivo.setFormatter(criar_formatador())
+        arquivo.addFilter(ContextoRequisicaoFilter())
+        logger = logging.getLogger("bench.sincrono")
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        logger.addHandler(arquivo)
+        resultados["sincrono"] = medir(logger, args.threads, args.registros)
+        arquivo.close()
+
+        # Modo fila: mesmo destino, gravado pela thread de fundo
+        arquivo = DiscoLento(os.path.join(pasta, "fila.log"), maxBytes=50 * 1024 * 1024,
+                             backupCount=1, atraso=args.atraso_disco_ms / 1000)
+        arquivo.setFormatter(criar_formatador())
+        fila = queue.Queue(maxsize=args.fila)
+        handler_fila = QueueHandlerSemBloqueio(fila)
+        handler_fila.addFilter(ContextoRequisicaoFilter())
+        listener = QueueListener(fila, arquivo)
+        listener.start()
+        logger = logging.getLogger("bench.fila")
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        logger.addHandler(handler_fila)
+        resultados["fila"] = medir(logger, args.threads, args.registros)
+        resultados["fila"]["descartados"] = QueueHandlerSemBloqueio.descartados
+        listener.stop()
+        arquivo.close()
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latência de logging: síncrono x fila")
+    parser.add_argument("--threads", type=int, default=8, help="Threads gerando logs ao mesmo tempo")
+    parser.add_argument("--registros", type=int, default=2000, help="Registros por thread")
+    parser.add_argument("--atraso-disco-ms", type=float, default=0.0, help="Atraso artificial por gravação")
+    parser.add_argument("--fila", type=int, default=10000, help="Tamanho da fila (LOG_FILA_MAX)")
+    args = parser.parse_args()
+
+    resultados = executar(args)
+    print(f"{'modo':10} {'p50(us)':>10} {'p99(us)':>10} {'p99.9(us)':>10} {'max(us)':>12} {'reg/s':>10}")
+    for modo, medida in resultados.items():
+        print(f"{modo:10} {medida['p50_us']:10.1f} {medida['p99_us']:10.1f} {medida['p999_us']:10.1f} "
+              f"{medida['max_us']:12.1f} {medida['registros_s']:10d}")
+    if resultados["fila"]["descartados"]:
+        print(f"\nFila cheia: {resultados['fila']['descartados']} registros descartados (nenhuma thread bloqueou)")
+    sys.exit(0)
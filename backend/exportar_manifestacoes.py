@@ -0,0 +1,56 @@
+"""
+Script para exportar manifestações em massa (CSV, JSONL ou Parquet)
+Usa os mesmos filtros da caixa de entrada do admin.
+
+Exemplos:
+    python exportar_manifestacoes.py --formato csv --saida manifestacoes.csv.gz
+    python exportar_manifestacoes.py --formato parquet --status pendente --data-inicio 2026-01-01
+"""
+
+import argparse
+import logging
+from datetime import date
+
+from app.database import SessionLocal
+from app.services.exportacao_service import ExportacaoService, FORMATOS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def exportar(args):
+    """
+    Grava o arquivo bloco a bloco, sem montar o resultado inteiro na memória.
+    """
+    formato = ExportacaoService.validar_formato(args.formato)
+    saida = args.saida or ExportacaoService.nome_arquivo(formato)
+    filtros = {
+        "status": args.status,
+        "assunto_id": args.assunto_id,
+        "classificacao": args.classificacao,
+        "data_inicio": args.data_inicio,
+        "data_fim": args.data_fim,
+    }
+
+    db = SessionLocal()
+    try:
+        total_bytes = 0
+        with open(saida, "wb") as arquivo:
+            for bloco in ExportacaoService.gerar_arquivo(db, formato, filtros):
+                arquivo.write(bloco)
+                total_bytes += len(bloco)
+        logger.info(f"Exportação concluída: {saida} ({total_bytes} bytes)")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta manifestações em streaming")
+    parser.add_argument("--formato", choices=list(FORMATOS), default="csv")
+    parser.add_argument("--saida", help="Caminho do arquivo de saída")
+    parser.add_argument("--status")
+    parser.add_argument("--assunto-id")
+    parser.add_argument("--classificacao")
+    parser.add_argument("--data-inicio", type=date.fromisoformat)
+    parser.add_argument("--data-fim", type=date.fromisoformat)
+    exportar(parser.parse_args())
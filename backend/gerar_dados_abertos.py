@@ -0,0 +1,38 @@
+"""
+Script para publicar os dados abertos do dia (execução noturna via cron)
+Gera uma partição imutável por dia fechado desde a última marca d'água.
+
+Exemplos:
+    python gerar_dados_abertos.py
+    python gerar_dados_abertos.py --diretorio /srv/dados_abertos --ate 2026-01-31
+"""
+
+import argparse
+import logging
+from datetime import date
+
+from app.database import SessionLocal
+from app.services.dados_abertos_service import DadosAbertosService
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def gerar_dados_abertos(diretorio=None, ate=None):
+    db = SessionLocal()
+    try:
+        manifesto = DadosAbertosService.atualizar(db, diretorio=diretorio, ate=ate)
+        logger.info(f"Marca d'água atual: {manifesto['marca_dagua']}")
+    except Exception as e:
+        logger.error(f"Erro ao gerar dados abertos: {e}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera as partições diárias de dados abertos")
+    parser.add_argument("--diretorio", help="Pasta de saída (padrão: DADOS_ABERTOS_DIR)")
+    parser.add_argument("--ate", type=date.fromisoformat, help="Último dia a publicar (padrão: ontem)")
+    args = parser.parse_args()
+    gerar_dados_abertos(args.diretorio, args.ate)
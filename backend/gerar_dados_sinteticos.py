@@ -0,0 +1,47 @@
+"""
+Script para gerar uma base sintética grande (testes de carga e de planos)
+A mesma semente sempre produz os mesmos dados. Use em um banco vazio
+(depois de 'python seed_assuntos.py').
+
+Exemplos:
+    python gerar_dados_sinteticos.py --manifestacoes 100000
+    python gerar_dados_sinteticos.py --usuarios 200000 --manifestacoes 2000000 --dias 730 --semente 7
+"""
+
+import argparse
+import logging
+
+from app.database import SessionLocal
+from app.services.dados_sinteticos_service import GeradorDadosSinteticos
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def gerar(args):
+    db = SessionLocal()
+    try:
+        GeradorDadosSinteticos(
+            db,
+            usuarios=args.usuarios,
+            manifestacoes=args.manifestacoes,
+            dias=args.dias,
+            semente=args.semente,
+            tamanho_lote=args.lote,
+        ).executar()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Erro ao gerar dados sintéticos: {e}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera dados sintéticos em massa")
+    parser.add_argument("--usuarios", type=int, default=10_000)
+    parser.add_argument("--manifestacoes", type=int, default=100_000)
+    parser.add_argument("--dias", type=int, default=365, help="Período coberto (até hoje)")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--lote", type=int, default=5_000, help="Manifestações por transação")
+    gerar(parser.parse_args())
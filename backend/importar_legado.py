@@ -0,0 +1,35 @@
+"""
+Script para importar manifestações do sistema de ouvidoria anterior
+Aceita JSONL ou CSV (formato descrito em app/services/importacao_service.py).
+Se for interrompido, basta rodar de novo: retoma a partir do checkpoint.
+
+Exemplos:
+    python importar_legado.py legado.jsonl
+    python importar_legado.py legado.csv --lote 5000
+"""
+
+import argparse
+import logging
+
+from app.database import SessionLocal
+from app.services.importacao_service import ImportadorLegado
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def importar(caminho: str, tamanho_lote: int):
+    db = SessionLocal()
+    try:
+        estatisticas = ImportadorLegado(db, caminho, tamanho_lote).executar()
+        logger.info(f"Importação concluída: {estatisticas}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importa manifestações do legado em massa")
+    parser.add_argument("arquivo", help="Arquivo .jsonl ou .csv")
+    parser.add_argument("--lote", type=int, default=2000, help="Registros por transação")
+    args = parser.parse_args()
+    importar(args.arquivo, args.lote)
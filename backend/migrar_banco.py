@@ -0,0 +1,28 @@
+"""
+Prepara o esquema do banco: cria as tabelas que faltam e aplica as migrações
+pendentes (colunas e índices novos em tabelas existentes, app/migracoes.py).
+
+Rodar a cada atualização, antes de subir a API:
+    python migrar_banco.py
+"""
+
+import logging
+
+from app.database import engine
+from app.migracoes import aplicar_migracoes
+from app.models import Base
+# Importando todos os modelos para registrar as tabelas no Base
+from app.models import manifestacao, protocolo, usuario, assunto, anexo, movimentacao, chave_idempotencia, tarefa, analise_iza  # noqa: F401
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def migrar():
+    Base.metadata.create_all(bind=engine)
+    aplicadas = aplicar_migracoes(engine)
+    logger.info("Esquema atualizado (%d migrações aplicadas agora)", len(aplicadas))
+
+
+if __name__ == "__main__":
+    migrar()
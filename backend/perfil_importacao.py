@@ -0,0 +1,74 @@
+"""
+Perfil do tempo de importação (arranque a frio de um worker)
+
+Roda 'python -X importtime -c "import app.main"' num processo novo e mostra
+os módulos que mais pesam na importação:
+- acumulado: o módulo e tudo o que ele importou;
+- próprio: só o código do módulo (onde vale mexer).
+
+Exemplos:
+    python perfil_importacao.py
+    python perfil_importacao.py --top 40 --modulo app.main --saida importacao.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List
+
+
+def medir(modulo: str) -> List[Dict]:
+    """Importa o módulo num processo novo e devolve as linhas do -X importtime."""
+    processo = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    if processo.returncode != 0:
+        print(processo.stderr[-2000:])
+        sys.exit(processo.returncode)
+
+    # Formato: "import time: self [us] | cumulative | imported package"
+    modulos = []
+    for linha in processo.stderr.splitlines():
+        if not linha.startswith("import time:") or "imported package" in linha:
+            continue
+        proprio, acumulado, nome = linha[len("import time:"):].split("|", 2)
+        modulos.append({
+            "modulo": nome.strip(),
+            "nivel": (len(nome) - len(nome.lstrip())) // 2,
+            "proprio_ms": int(proprio) / 1000,
+            "acumulado_ms": int(acumulado) / 1000,
+        })
+    return modulos
+
+
+def imprimir(titulo: str, modulos: List[Dict], chave: str, top: int):
+    print(f"\n{titulo}")
+    for item in sorted(modulos, key=lambda m: m[chave], reverse=True)[:top]:
+        print(f"  {item[chave]:9.1f}ms  {item['modulo']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tempo de importação por módulo (-X importtime)")
+    parser.add_argument("--modulo", default="app.main", help="Módulo a importar (padrão: app.main)")
+    parser.add_argument("--top", type=int, default=25, help="Quantos módulos listar")
+    parser.add_argument("--saida", help="Grava todas as linhas em JSON")
+    args = parser.parse_args()
+
+    modulos = medir(args.modulo)
+    alvo = next((m for m in modulos if m["modulo"] == args.modulo), None)
+    if alvo:
+        print(f"Importar {args.modulo}: {alvo['acumulado_ms']:.1f}ms")
+
+    imprimir("Maiores por tempo acumulado:", modulos, "acumulado_ms", args.top)
+    imprimir("Maiores por tempo próprio:", modulos, "proprio_ms", args.top)
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(modulos, arquivo, ensure_ascii=False, indent=2)
+        print(f"\nResultado salvo em {args.saida}")
+    sys.exit(0)
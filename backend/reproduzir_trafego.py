@@ -0,0 +1,204 @@
+"""
+Reprodutor de Tráfego Gravado (Planejamento de capacidade)
+
+Lê os arquivos gravados pelo GravadorTrafegoMiddleware (logs/trafego.*.jsonl*, um por worker)
+e reenvia as requisições para uma instância de TESTE, no ritmo original ou
+acelerado (--escala), relatando a distribuição de latência por rota.
+
+Como o gravador não guarda valores, os parâmetros de rota são preenchidos
+com registros criados aqui no início (uma manifestação do cidadão de teste).
+Rotas que alteram cadastros (registrar, editar/excluir assuntos...) são puladas.
+
+Pré-requisito: os usuários de teste precisam existir na instância
+(rodar 'python benchmark_api.py' uma vez no mesmo banco cria os dois).
+
+Exemplos:
+    python reproduzir_trafego.py logs/trafego.*.jsonl --url http://localhost:8000
+    python reproduzir_trafego.py logs/trafego.*.jsonl* --escala 3 --saida replay.json
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import httpx
+
+PARAMETRO_ROTA = re.compile(r"\{(\w+)\}")
+ROTAS_IGNORADAS = {
+    ("POST", "/api/auth/registrar"),
+    ("POST", "/api/auth/redefinir-senha"),
+    ("POST", "/api/assuntos/"),
+    ("PUT", "/api/assuntos/{assunto_id}"),
+    ("DELETE", "/api/assuntos/{assunto_id}"),
+    ("PUT", "/api/auth/atualizar-perfil"),
+}
+
+
+def percentil(valores_ordenados: List[float], p: float) -> float:
+    """Percentil pelo método do posto mais próximo."""
+    if not valores_ordenados:
+        return 0.0
+    indice = max(0, min(len(valores_ordenados) - 1, int(round(p / 100 * len(valores_ordenados))) - 1))
+    return valores_ordenados[indice]
+
+
+def ler_gravacoes(caminhos: List[str]) -> List[Dict]:
+    registros = []
+    for caminho in caminhos:
+        with open(caminho, "r", encoding="utf-8") as arquivo:
+            registros.extend(json.loads(linha) for linha in arquivo if linha.strip())
+    return sorted(registros, key=lambda r: r["ts"])
+
+
+class Reprodutor:
+
+    def __init__(self, url: str, cpf_cidadao: str, cpf_admin: str, senha: str):
+        self.cliente = httpx.Client(base_url=url, timeout=60)
+        self.senha = senha
+        self.cpf_cidadao = cpf_cidadao
+        self.cabecalho_cidadao = self._login(cpf_cidadao)
+        self.cabecalho_admin = self._login(cpf_admin)
+
+        assuntos = self.cliente.get("/api/assuntos/").json()["assuntos"]
+        if not assuntos:
+            raise RuntimeError("A instância de teste não tem assuntos cadastrados.")
+        self.valores = {"assunto_id": assuntos[0]["id"]}
+        manifestacao = self._criar_manifestacao(0).json()
+        self.valores.update({
+            "manifestacao_id": manifestacao["id"],
+            "protocolo": manifestacao["protocolo"],
+            "numero": manifestacao["protocolo"],
+        })
+
+        self.latencias: Dict[str, List[float]] = defaultdict(list)
+        self.erros: Dict[str, int] = defaultdict(int)
+        self.ignoradas = 0
+        self._trava = threading.Lock()
+
+    def _login(self, cpf: str) -> Dict[str, str]:
+        resposta = self.cliente.post("/api/auth/login", data={"username": cpf, "password": self.senha})
+        resposta.raise_for_status()
+        return {"Authorization": f"Bearer {resposta.json()['access_token']}"}
+
+    def _criar_manifestacao(self, bytes_requisicao: int):
+        arquivos = None
+        if bytes_requisicao > 4096:
+            # Reproduz o tamanho do upload original
+            arquivos = [("arquivos", ("replay.bin", os.urandom(bytes_requisicao), "application/octet-stream"))]
+        return self.cliente.post(
+            "/api/manifestacoes/",
+            data={"relato": "Relato gerado pela reprodução de tráfego.", "assunto_id": self.valores["assunto_id"]},
+            files=arquivos,
+            headers=self.cabecalho_cidadao,
+        )
+
+    def _montar_caminho(self, rota: str) -> Optional[str]:
+        faltando = [nome for nome in PARAMETRO_ROTA.findall(rota) if nome not in self.valores]
+        if faltando:
+            return None
+        return PARAMETRO_ROTA.sub(lambda m: self.valores[m.group(1)], rota)
+
+    def enviar(self, registro: Dict):
+        metodo, rota = registro["metodo"], registro["rota"]
+        caminho = self._montar_caminho(rota)
+        if caminho is None or (metodo, rota) in ROTAS_IGNORADAS or rota == "desconhecida":
+            with self._trava:
+                self.ignoradas += 1
+            return
+
+        headers = {}
+        if registro.get("autenticado"):
+            headers = self.cabecalho_admin if "/admin/" in rota else self.cabecalho_cidadao
+        query = {nome: valor for nome, valor in (registro.get("query") or {}).items() if valor is not None}
+
+        inicio = time.perf_counter()
+        try:
+            if metodo == "POST" and rota == "/api/manifestacoes/":
+                resposta = self._criar_manifestacao(registro.get("bytes_requisicao", 0))
+            elif metodo == "POST" and rota == "/api/auth/login":
+                resposta = self.cliente.post(caminho, data={"username": self.cpf_cidadao, "password": self.senha})
+            elif metodo == "POST" and rota.startswith("/api/movimentacoes/{"):
+                resposta = self.cliente.post(caminho, data={"texto": "Resposta reproduzida."}, headers=headers)
+            else:
+                resposta = self.cliente.request(metodo, caminho, params=query, headers=headers)
+            falhou = resposta.status_code >= 500
+        except httpx.HTTPError:
+            falhou = True
+        duracao = (time.perf_counter() - inicio) * 1000
+
+        chave = f"{metodo} {rota}"
+        with self._trava:
+            self.latencias[chave].append(duracao)
+            if falhou:
+                self.erros[chave] += 1
+
+    def reproduzir(self, registros: List[Dict], escala: float, concorrencia: int) -> float:
+        """Agenda cada requisição no instante original dividido pela escala."""
+        if not registros:
+            return 0.0
+        t0 = registros[0]["ts"]
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+            for registro in registros:
+                espera = (registro["ts"] - t0) / escala - (time.perf_counter() - inicio)
+                if espera > 0:
+                    time.sleep(espera)
+                executor.submit(self.enviar, registro)
+        return time.perf_counter() - inicio
+
+    def relatorio(self, duracao: float) -> Dict:
+        rotas = {}
+        for chave, valores in sorted(self.latencias.items()):
+            ordenados = sorted(valores)
+            rotas[chave] = {
+                "requisicoes": len(ordenados),
+                "erros": self.erros.get(chave, 0),
+                "p50_ms": round(percentil(ordenados, 50), 2),
+                "p95_ms": round(percentil(ordenados, 95), 2),
+                "p99_ms": round(percentil(ordenados, 99), 2),
+            }
+        total = sum(r["requisicoes"] for r in rotas.values())
+        return {
+            "duracao_s": round(duracao, 1),
+            "requisicoes": total,
+            "ignoradas": self.ignoradas,
+            "rps": round(total / duracao, 1) if duracao else 0.0,
+            "rotas": rotas,
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reproduz tráfego gravado contra uma instância de teste")
+    parser.add_argument("arquivos", nargs="+", help="Arquivos JSONL do gravador (inclusive os rotacionados)")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--escala", type=float, default=1.0, help="2.0 = duas vezes o ritmo original")
+    parser.add_argument("--concorrencia", type=int, default=64, help="Máximo de requisições simultâneas")
+    parser.add_argument("--cpf-cidadao", default="00000000191")
+    parser.add_argument("--cpf-admin", default="00000000272")
+    parser.add_argument("--senha", default="Benchmark@123")
+    parser.add_argument("--saida", help="Grava o relatório em JSON")
+    args = parser.parse_args()
+
+    reprodutor = Reprodutor(args.url, args.cpf_cidadao, args.cpf_admin, args.senha)
+    gravacoes = ler_gravacoes(args.arquivos)
+    duracao = reprodutor.reproduzir(gravacoes, args.escala, args.concorrencia)
+    relatorio = reprodutor.relatorio(duracao)
+
+    print(f"{'rota':55} {'n':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'erros':>6}")
+    for chave, medida in relatorio["rotas"].items():
+        print(f"{chave:55} {medida['requisicoes']:6d} {medida['p50_ms']:9.2f} "
+              f"{medida['p95_ms']:9.2f} {medida['p99_ms']:9.2f} {medida['erros']:6d}")
+    print(f"\n{relatorio['requisicoes']} requisições em {relatorio['duracao_s']}s "
+          f"({relatorio['rps']} req/s), {relatorio['ignoradas']} ignoradas")
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(relatorio, arquivo, indent=2)
+    sys.exit(0)
@@ -0,0 +1,163 @@
+"""
+Servidor de produção (vários processos)
+
+Sobe N workers do uvicorn sob um processo supervisor:
+- N = SERVIDOR_WORKERS, ou um por CPU disponível (respeitando o limite de CPU
+  do container) quando 0;
+- uvloop e httptools quando instalados (uvicorn[standard]);
+- orçamento de conexões com o banco (DB_CONEXOES_TOTAL) dividido entre os
+  workers: cada um abre no máximo DB_CONEXOES_TOTAL // N (app/database.py);
+- threadpool de cada worker com THREADPOOL_TAMANHO threads (lifespan);
+- ao receber SIGTERM/SIGINT, para de aceitar conexões e espera as requisições
+  em andamento por até SERVIDOR_DRENAGEM_S;
+- cada worker é reciclado após SERVIDOR_MAX_REQUISICOES (+ variação aleatória,
+  para não reiniciarem todos juntos), limitando o crescimento de memória.
+  O supervisor sobe um substituto no lugar. SIGHUP recicla todos, um por vez;
+- métricas do Prometheus em modo multiprocesso: cada worker grava as suas em
+  SERVIDOR_METRICAS_DIR (PROMETHEUS_MULTIPROC_DIR) e o /metrics de qualquer
+  worker responde a soma de todos. Ao repor um worker, o supervisor descarta
+  os gauges do processo encerrado.
+
+Para desenvolvimento continue usando 'python -m app.main' (com reload).
+
+Exemplos:
+    python servidor.py
+    python servidor.py --workers 4 --porta 8080
+    python servidor.py --mostrar-config
+"""
+
+import argparse
+import importlib.util
+import logging
+import math
+import os
+import shutil
+import sys
+import tempfile
+
+
+def cpus_disponiveis() -> int:
+    """CPUs que este processo pode usar (afinidade e cota do cgroup v2)."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max", "r") as arquivo:
+            cota, periodo = arquivo.read().split()
+        if cota != "max":
+            cpus = min(cpus, max(1, math.ceil(int(cota) / int(periodo))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def dimensionar(workers: int) -> dict:
+    """Calcula os recursos de cada worker a partir das configurações."""
+    from app.config import settings
+
+    workers = workers or settings.SERVIDOR_WORKERS or cpus_disponiveis()
+    conexoes = settings.DB_CONEXOES_TOTAL // workers if settings.DB_CONEXOES_TOTAL else None
+    return {
+        "workers": workers,
+        "loop": "uvloop" if importlib.util.find_spec("uvloop") else "asyncio",
+        "http": "httptools" if importlib.util.find_spec("httptools") else "h11",
+        "threadpool": settings.THREADPOOL_TAMANHO,
+        "conexoes_por_worker": conexoes,
+        "max_requisicoes": settings.SERVIDOR_MAX_REQUISICOES or None,
+        "variacao_requisicoes": settings.SERVIDOR_MAX_REQUISICOES_VARIACAO,
+        "drenagem_s": settings.SERVIDOR_DRENAGEM_S,
+    }
+
+
+def preparar_metricas(diretorio: str) -> str:
+    """
+    Pasta do modo multiprocesso do prometheus_client, vazia a cada início
+    (arquivos de uma execução anterior somariam valores antigos).
+    """
+    diretorio = diretorio or os.path.join(tempfile.gettempdir(), f"participa-metricas-{os.getpid()}")
+    shutil.rmtree(diretorio, ignore_errors=True)
+    os.makedirs(diretorio)
+    # Herdada pelos workers: precisa estar definida antes de importarem o prometheus_client
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = diretorio
+    return diretorio
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor de produção com vários workers")
+    parser.add_argument("--host", help="Padrão: SERVIDOR_HOST")
+    parser.add_argument("--porta", type=int, help="Padrão: SERVIDOR_PORTA")
+    parser.add_argument("--workers", type=int, default=0, help="Padrão: SERVIDOR_WORKERS (0 = um por CPU)")
+    parser.add_argument("--mostrar-config", action="store_true", help="Só mostra o dimensionamento e sai")
+    args = parser.parse_args()
+
+    from app.config import settings
+    from app.logging_config import configurar_logging
+
+    configurar_logging()
+    logger = logging.getLogger("servidor")
+
+    dimensao = dimensionar(args.workers)
+    logger.info("Dimensionamento dos workers: %s", dimensao)
+    if args.mostrar_config:
+        sys.exit(0)
+
+    if dimensao["conexoes_por_worker"] == 0:
+        logger.error(
+            "DB_CONEXOES_TOTAL=%d não dá uma conexão para cada um dos %d workers",
+            settings.DB_CONEXOES_TOTAL, dimensao["workers"],
+        )
+        sys.exit(1)
+    if dimensao["conexoes_por_worker"] and dimensao["conexoes_por_worker"] < dimensao["threadpool"]:
+        # Não é erro: threads a mais esperam uma conexão livre (DB_POOL_TIMEOUT_S)
+        logger.warning(
+            "Threadpool (%d) maior que o pool do banco (%d) por worker: rotas síncronas podem esperar conexão",
+            dimensao["threadpool"], dimensao["conexoes_por_worker"],
+        )
+
+    # Os workers leem as configurações do ambiente: app/database.py divide o
+    # orçamento de conexões por este número
+    os.environ["WORKERS"] = str(dimensao["workers"])
+    if settings.METRICAS_ATIVAS:
+        logger.info("Métricas dos workers em %s", preparar_metricas(settings.SERVIDOR_METRICAS_DIR))
+
+    import uvicorn
+    from uvicorn.supervisors import Multiprocess
+
+    class Supervisor(Multiprocess):
+        """Multiprocess que descarta os gauges dos workers que saíram de serviço."""
+
+        def _repor(self, metodo):
+            antes = {processo.pid for processo in self.processes}
+            metodo()
+            if settings.METRICAS_ATIVAS:
+                from prometheus_client import multiprocess
+
+                for pid in antes - {processo.pid for processo in self.processes}:
+                    multiprocess.mark_process_dead(pid)
+
+        def keep_subprocess_alive(self):
+            self._repor(super().keep_subprocess_alive)
+
+        def restart_all(self):
+            self._repor(super().restart_all)
+
+    config = uvicorn.Config(
+        "app.main:app",
+        host=args.host or settings.SERVIDOR_HOST,
+        port=args.porta or settings.SERVIDOR_PORTA,
+        workers=dimensao["workers"],
+        loop=dimensao["loop"],
+        http=dimensao["http"],
+        reload=False,
+        log_config=None,  # os workers usam app/logging_config.py
+        timeout_keep_alive=settings.SERVIDOR_KEEP_ALIVE_S,
+        # IP real do cliente (limite de taxa, logs) quando atrás de proxy confiável
+        proxy_headers=True,
+        forwarded_allow_ips=settings.SERVIDOR_PROXIES_CONFIAVEIS,
+        timeout_graceful_shutdown=dimensao["drenagem_s"],
+        limit_max_requests=dimensao["max_requisicoes"],
+        limit_max_requests_jitter=dimensao["variacao_requisicoes"] if dimensao["max_requisicoes"] else 0,
+    )
+    # Supervisor mesmo com 1 worker: é ele que repõe o worker reciclado
+    Supervisor(config, sockets=[config.bind_socket()]).run()
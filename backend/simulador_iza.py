@@ -0,0 +1,247 @@
+"""
+Simulador local da IZA (servidor + verificação do cliente)
+
+Servidor HTTP que implementa o contrato assumido em app/integrations/iza.py,
+com latência e falhas configuráveis. Com --verificar, sobe o servidor numa
+thread e exercita o cliente contra ele:
+1. Lote e keep-alive: N textos viram ceil(N / IZA_LOTE_MAX) requisições na
+   mesma conexão.
+2. Cache: repetir os textos (com espaços diferentes) não chama a IZA.
+3. Tentativas: 503 passageiros são absorvidos com nova tentativa; um 500
+   persistente esgota as tentativas e conta como falha para o disjuntor.
+4. Compartimento: com a IZA lenta, chamadas além de IZA_SIMULTANEAS_MAX
+   desistem em IZA_ESPERA_VAGA_S em vez de se acumular.
+5. Timeout e disjuntor: a IZA travada abre o disjuntor, as chamadas seguintes
+   falham na hora e, passado IZA_DISJUNTOR_ABERTO_S, uma chamada de teste fecha.
+
+A verificação grava análises na tabela analises_iza. Use um banco de testes.
+
+Exemplos:
+    python simulador_iza.py --porta 8090     # IZA_API_URL=http://localhost:8090
+    python simulador_iza.py --porta 8090 --latencia 2 --falhas 5
+    python simulador_iza.py --verificar
+"""
+
+import argparse
+import json
+import logging
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Comportamento do servidor (alterado pela verificação entre as etapas)
+ESTADO = {"latencia_s": 0.0, "falhas": 0, "status_falha": 503, "requisicoes": 0, "conexoes": 0}
+_trava = threading.Lock()
+
+PALAVRAS_CLASSIFICACAO = {
+    "denuncia": ("denúncia", "irregular", "propina", "fraude"),
+    "elogio": ("parabéns", "obrigad", "excelente", "elogio"),
+    "sugestao": ("sugiro", "sugestão", "poderia", "seria bom"),
+    "reclamacao": ("buraco", "demora", "não funciona", "lixo", "falta"),
+}
+
+
+def analisar_texto(texto: str) -> dict:
+    """Análise fictícia e determinística (o simulador não é a IZA)."""
+    minusculo = texto.lower()
+    classificacao = next(
+        (nome for nome, termos in PALAVRAS_CLASSIFICACAO.items() if any(t in minusculo for t in termos)),
+        "solicitacao",
+    )
+    palavras = sorted({p.strip(".,;:!?") for p in minusculo.split() if len(p) > 5})
+    return {"classificacao": classificacao, "palavras_chave": palavras[:5], "modelo": "simulador"}
+
+
+class ManipuladorIza(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def setup(self):
+        super().setup()
+        with _trava:
+            ESTADO["conexoes"] += 1
+
+    def log_message(self, *args):
+        pass
+
+    def _responder(self, status: int, corpo: dict, headers: dict = None):
+        dados = json.dumps(corpo, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(dados)))
+        for nome, valor in (headers or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        try:
+            self.wfile.write(dados)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # o cliente desistiu (timeout): é o que a verificação provoca
+
+    def do_POST(self):
+        corpo = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        with _trava:
+            ESTADO["requisicoes"] += 1
+            falhar = ESTADO["falhas"] > 0
+            if falhar:
+                ESTADO["falhas"] -= 1
+        if self.path != "/v1/analises":
+            self._responder(404, {"detail": "Rota inexistente"})
+            return
+        if not self.headers.get("X-API-Key"):
+            self._responder(401, {"detail": "Credenciais ausentes"})
+            return
+        if falhar:
+            self._responder(ESTADO["status_falha"], {"detail": "Indisponível"}, {"Retry-After": "0"})
+            return
+        time.sleep(ESTADO["latencia_s"])
+        self._responder(200, {
+            "resultados": [{"id": item["id"], **analisar_texto(item["texto"])} for item in corpo.get("itens", [])]
+        })
+
+
+def iniciar_servidor(porta: int) -> ThreadingHTTPServer:
+    servidor = ThreadingHTTPServer(("127.0.0.1", porta), ManipuladorIza)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, name="simulador-iza", daemon=True).start()
+    return servidor
+
+
+# ==============================================================================
+# VERIFICAÇÃO DO CLIENTE
+# ==============================================================================
+def verificar() -> bool:
+    servidor = iniciar_servidor(0)
+
+    from app.config import settings
+    # Limites pequenos para as etapas rodarem em poucos segundos
+    settings.IZA_API_URL = f"http://127.0.0.1:{servidor.server_address[1]}"
+    settings.IZA_LOTE_MAX = 5
+    settings.IZA_TIMEOUT_S = 0.3
+    settings.IZA_TENTATIVAS = 3
+    settings.IZA_ESPERA_BASE_S = 0.02
+    settings.IZA_SIMULTANEAS_MAX = 2
+    settings.IZA_ESPERA_VAGA_S = 0.1
+    settings.IZA_DISJUNTOR_FALHAS = 2
+    settings.IZA_DISJUNTOR_ABERTO_S = 0.5
+    settings.IZA_VERSAO_CACHE = f"simulador-{time.time()}"  # não reaproveita verificações anteriores
+
+    from app.database import SessionLocal, engine
+    from app.integrations.iza import ClienteIza, Disjuntor, IzaIndisponivel
+    from app.models import Base
+    from app.models.analise_iza import AnaliseIza
+
+    Base.metadata.create_all(bind=engine, tables=[AnaliseIza.__table__])
+    cliente = ClienteIza()
+    db = SessionLocal()
+    resultados = []
+
+    def etapa(nome: str, ok: bool, detalhe: str):
+        resultados.append(ok)
+        print(f"[{'OK' if ok else 'FALHOU'}] {nome}: {detalhe}")
+
+    def zerar(**estado):
+        ESTADO.update({"requisicoes": 0, "conexoes": 0, "latencia_s": 0.0, "falhas": 0, "status_falha": 503, **estado})
+
+    try:
+        # 1. Lote e keep-alive
+        textos = [f"Relato número {i}: buraco na rua {i} sem reparo" for i in range(12)]
+        zerar()
+        analises = cliente.analisar(db, textos)
+        etapa(
+            "lote",
+            len(analises) == 12 and ESTADO["requisicoes"] == 3 and ESTADO["conexoes"] == 1,
+            f"12 textos em {ESTADO['requisicoes']} requisições e {ESTADO['conexoes']} conexão(ões)",
+        )
+
+        # 2. Cache pelo conteúdo
+        zerar()
+        repetidos = cliente.analisar(db, ["  " + texto.replace(" ", "  ") for texto in textos])
+        etapa("cache", repetidos == analises and ESTADO["requisicoes"] == 0,
+              f"{ESTADO['requisicoes']} requisições para textos já analisados")
+
+        # 3. Tentativas
+        zerar(falhas=2)
+        cliente.analisar(db, ["Texto novo para a etapa de tentativas"])
+        etapa("tentativas", ESTADO["requisicoes"] == 3 and cliente.disjuntor.estado == Disjuntor.FECHADO,
+              f"2 respostas 503 absorvidas ({ESTADO['requisicoes']} requisições)")
+
+        # 3b. Erro interno (500) é falha da IZA: tenta de novo e conta para o disjuntor
+        zerar(falhas=settings.IZA_TENTATIVAS, status_falha=500)
+        try:
+            cliente.analisar(db, ["Texto novo para a etapa de erro interno"])
+            falhou = False
+        except IzaIndisponivel:
+            falhou = True
+        etapa("erro interno", falhou and ESTADO["requisicoes"] == settings.IZA_TENTATIVAS
+              and cliente.disjuntor._falhas == 1,
+              f"500 tentado {ESTADO['requisicoes']} vezes e contado como falha")
+
+        # 4. Compartimento: 4 chamadas simultâneas, 2 vagas, IZA respondendo em 0.2s
+        zerar(latencia_s=0.2)
+
+        def chamar(i):
+            sessao = SessionLocal()
+            try:
+                cliente.analisar(sessao, [f"Texto simultâneo {i} {time.time()}"])
+                return "ok"
+            except IzaIndisponivel:
+                return "sem_vaga"
+            finally:
+                sessao.close()
+
+        with ThreadPoolExecutor(4) as executor:
+            saidas = list(executor.map(chamar, range(4)))
+        etapa("compartimento", saidas.count("ok") == 2 and saidas.count("sem_vaga") == 2,
+              f"{saidas.count('ok')} atendidas, {saidas.count('sem_vaga')} desistiram sem esperar a IZA")
+
+        # 5. Timeout e disjuntor
+        zerar(latencia_s=1.0)
+        inicio = time.perf_counter()
+        for i in range(2):
+            try:
+                cliente.analisar(db, [f"Texto com a IZA travada {i}"])
+            except IzaIndisponivel:
+                pass
+        aberto = cliente.disjuntor.estado == Disjuntor.ABERTO
+        inicio_rapida = time.perf_counter()
+        try:
+            cliente.analisar(db, ["Texto com o disjuntor aberto"])
+            rapida = False
+        except IzaIndisponivel:
+            rapida = time.perf_counter() - inicio_rapida < 0.05
+        etapa("timeout e disjuntor", aberto and rapida,
+              f"aberto após {time.perf_counter() - inicio:.2f}s; chamada seguinte falhou na hora")
+
+        zerar()
+        time.sleep(settings.IZA_DISJUNTOR_ABERTO_S)
+        cliente.analisar(db, ["Texto depois da volta da IZA"])
+        etapa("recuperação", cliente.disjuntor.estado == Disjuntor.FECHADO,
+              "chamada de teste bem-sucedida fechou o disjuntor")
+    finally:
+        db.close()
+        cliente.fechar()
+        servidor.shutdown()
+    return all(resultados)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulador local da IZA")
+    parser.add_argument("--porta", type=int, default=8090)
+    parser.add_argument("--latencia", type=float, default=0.0, help="Segundos por requisição")
+    parser.add_argument("--falhas", type=int, default=0, help="Responde 503 às N primeiras requisições")
+    parser.add_argument("--verificar", action="store_true", help="Exercita o cliente contra o simulador e sai")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    if args.verificar:
+        sys.exit(0 if verificar() else 1)
+
+    ESTADO.update(latencia_s=args.latencia, falhas=args.falhas)
+    servidor = iniciar_servidor(args.porta)
+    print(f"Simulador da IZA em http://127.0.0.1:{args.porta} (Ctrl+C encerra)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        servidor.shutdown()
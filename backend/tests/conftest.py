@@ -0,0 +1,103 @@
+"""
+Configuração comum dos testes
+Arquivo: backend/tests/conftest.py
+
+Banco SQLite e pastas temporárias, definidos antes de importar a aplicação
+(app/config.py lê o ambiente na importação). Serviços de fundo que não são
+o assunto dos testes (agendador de prazos, aquecimento, limite de taxa) ficam
+desligados.
+
+Rodar a partir de backend/:
+    python -m pytest -q
+"""
+
+import os
+import sys
+import tempfile
+from uuid import uuid4
+
+PASTA_TESTES = tempfile.mkdtemp(prefix="participa-testes-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{PASTA_TESTES}/testes.db",
+    "DATABASE_ECHO": "False",
+    "DEBUG": "False",
+    "LOG_FILE": "",
+    "PRAZO_AGENDADOR_ATIVO": "False",
+    "AQUECIMENTO_ATIVO": "False",
+    "LIMITE_TAXA_ATIVO": "False",
+    "UPLOAD_DIR": os.path.join(PASTA_TESTES, "uploads"),
+    "INGESTAO_DIRETORIO": os.path.join(PASTA_TESTES, "ingestao"),
+    "DADOS_ABERTOS_DIR": os.path.join(PASTA_TESTES, "dados_abertos"),
+})
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.database import SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Base  # noqa: E402
+from app.models.assunto import Assunto  # noqa: E402
+from app.models.usuario import Usuario  # noqa: E402
+from app.services.auth_service import AuthService  # noqa: E402
+
+SENHA = "senha123!"
+
+
+@pytest.fixture(scope="session")
+def cliente():
+    Base.metadata.create_all(bind=engine)
+    with TestClient(app) as cliente:
+        yield cliente
+
+
+@pytest.fixture
+def db():
+    sessao = SessionLocal()
+    try:
+        yield sessao
+    finally:
+        sessao.close()
+
+
+def criar_usuario(db, admin: bool = False) -> Usuario:
+    cpf = str(uuid4().int)[:11]
+    usuario = Usuario(
+        id=str(uuid4()), nome="Admin" if admin else "Cidadão", email=f"{cpf}@teste.df.gov.br", cpf=cpf,
+        senha_hash=AuthService.gerar_hash_senha(SENHA), admin=admin, ativo=True,
+    )
+    db.add(usuario)
+    db.commit()
+    return usuario
+
+
+def criar_assunto(db) -> str:
+    assunto = Assunto(id=str(uuid4()), nome=f"Assunto {uuid4().hex[:8]}", ativo=True)
+    db.add(assunto)
+    db.commit()
+    return assunto.id
+
+
+def autenticar(cliente, usuario: Usuario) -> dict:
+    resposta = cliente.post("/api/auth/login", data={"username": usuario.cpf, "password": SENHA})
+    return {"Authorization": f"Bearer {resposta.json()['access_token']}"}
+
+
+@pytest.fixture
+def cabecalhos_admin(cliente, db):
+    return autenticar(cliente, criar_usuario(db, admin=True))
+
+
+@pytest.fixture
+def cabecalhos_cidadao(cliente, db):
+    return autenticar(cliente, criar_usuario(db))
+
+
+def enviar_manifestacao(cliente, cabecalhos: dict, assunto_id: str) -> dict:
+    resposta = cliente.post(
+        "/api/manifestacoes/",
+        data={"relato": "Buraco na via há mais de um mês", "assunto_id": assunto_id},
+        headers=cabecalhos,
+    )
+    assert resposta.status_code == 201, resposta.text
+    return resposta.json()
@@ -0,0 +1,21 @@
+"""
+Arranque do worker: importar a API não fala com o banco nem carrega passlib/jose
+"""
+
+import os
+import subprocess
+import sys
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_importar_a_api_nao_acessa_o_banco(tmp_path):
+    # Banco inalcançável: qualquer DDL ou consulta na importação falharia
+    ambiente = {**os.environ, "DATABASE_URL": f"sqlite:///{tmp_path}/nao/existe/banco.db"}
+    saida = subprocess.run(
+        [sys.executable, "-c", "import sys, app.main; print(sorted({'passlib', 'jose'} & set(sys.modules)))"],
+        cwd=BACKEND, env=ambiente, capture_output=True, text=True,
+    )
+
+    assert saida.returncode == 0, saida.stderr
+    assert saida.stdout.strip() == "[]"
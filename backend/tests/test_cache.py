@@ -0,0 +1,93 @@
+"""
+Cache coalescido (app/services/cache_service.py): invalidação entre workers
+pelo stream de invalidações no Redis.
+"""
+
+import fakeredis
+import pytest
+
+from app.config import settings
+from app.services import cache_service
+from app.services.cache_service import CacheCoalescido
+
+
+@pytest.fixture
+def redis_compartilhado(monkeypatch):
+    cliente = fakeredis.FakeRedis()
+    monkeypatch.setattr(settings, "CACHE_REDIS_ATIVO", True)
+    monkeypatch.setattr(settings, "CACHE_INVALIDACAO_INTERVALO_S", 0)
+    monkeypatch.setattr(cache_service, "_redis", lambda: cliente)
+    return cliente
+
+
+def _workers(**config):
+    """Duas instâncias do mesmo cache: o que cada worker tem na memória."""
+    return CacheCoalescido("teste", **config), CacheCoalescido("teste", **config)
+
+
+def test_invalidacao_chega_ao_outro_worker(redis_compartilhado):
+    worker_a, worker_b = _workers(ttl_s=300, obsoleto_s=600)
+    assert worker_a.obter("ids", lambda: ["saude"]) == ["saude"]
+    assert worker_b.obter("ids", lambda: ["saude"]) == ["saude"]
+
+    worker_a.invalidar()
+
+    assert worker_b.obter("ids", lambda: ["saude", "transporte"]) == ["saude", "transporte"]
+
+
+def test_invalidacao_de_uma_chave_preserva_as_outras(redis_compartilhado):
+    worker_a, worker_b = _workers(ttl_s=300)
+    for numero in ("P1", "P2"):
+        worker_b.obter(numero, lambda: "pendente")
+
+    worker_a.invalidar("P1")
+
+    assert worker_b.obter("P1", lambda: "concluida") == "concluida"
+    assert worker_b.obter("P2", lambda: "recalculado") == "pendente"
+
+
+def test_redis_fora_do_ar_nao_impede_a_consulta(monkeypatch):
+    cliente = fakeredis.FakeRedis()
+    cliente.connected = False
+    monkeypatch.setattr(settings, "CACHE_REDIS_ATIVO", True)
+    monkeypatch.setattr(cache_service, "_redis", lambda: cliente)
+
+    cache = CacheCoalescido("teste", ttl_s=300)
+    assert cache.obter("ids", lambda: 1) == 1
+    cache.invalidar()
+    assert cache.obter("ids", lambda: 2) == 2
+
+
+def test_calculo_durante_invalidacao_nao_e_guardado():
+    cache = CacheCoalescido("teste", ttl_s=300)
+
+    def calcular_e_ver_status_mudar():
+        cache.invalidar("P1")  # o status muda enquanto o rastreio é montado
+        return "pendente"
+
+    assert cache.obter("P1", calcular_e_ver_status_mudar) == "pendente"
+    assert cache.obter("P1", lambda: "concluida") == "concluida"
+
+
+def test_calculo_durante_invalidacao_nao_e_publicado_no_redis(redis_compartilhado):
+    worker_a, worker_b = _workers(ttl_s=300)
+
+    def calcular_e_ver_status_mudar():
+        worker_b.invalidar("P1")
+        return "pendente"
+
+    assert worker_a.obter("P1", calcular_e_ver_status_mudar) == "pendente"
+    assert redis_compartilhado.get("cache:teste:P1") is None
+    assert worker_a.obter("P1", lambda: "concluida") == "concluida"
+    assert worker_b.obter("P1", lambda: "recalculado") == "concluida"
+
+
+def test_invalidar_tudo_preserva_as_travas_dos_lideres(redis_compartilhado):
+    worker_a, worker_b = _workers(ttl_s=300)
+    worker_a.obter("ids", lambda: 1)
+    redis_compartilhado.set("cache:teste:P1:trava", "1")
+
+    worker_b.invalidar()
+
+    assert redis_compartilhado.get("cache:teste:ids") is None
+    assert redis_compartilhado.get("cache:teste:P1:trava") == b"1"
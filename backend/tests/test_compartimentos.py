@@ -0,0 +1,34 @@
+"""
+Compartimentos (app/middleware/compartimentos.py): toda rota síncrona em um
+grupo e reserva de threads para o que roda fora deles.
+"""
+
+import inspect
+
+import pytest
+from fastapi.routing import APIRoute
+
+from app.middleware.compartimentos import reserva_threadpool
+from app.routes import assuntos, auth, health, manifestacoes, memoria, metricas, movimentacoes, protocolos
+
+ROTAS = [
+    rota
+    for modulo in (assuntos, auth, health, manifestacoes, memoria, metricas, movimentacoes, protocolos)
+    for rota in modulo.router.routes
+    if isinstance(rota, APIRoute)
+]
+
+
+@pytest.mark.parametrize(
+    "rota", [rota for rota in ROTAS if not inspect.iscoroutinefunction(rota.endpoint)],
+    ids=lambda rota: f"{sorted(rota.methods)[0]} {rota.path}",
+)
+def test_rota_sincrona_tem_compartimento(rota):
+    dependencias = [dependencia.call.__qualname__ for dependencia in rota.dependant.dependencies]
+    assert any(nome.startswith("compartimento.") for nome in dependencias), (
+        f"{rota.path} usa o threadpool fora de qualquer grupo"
+    )
+
+
+def test_grupos_deixam_reserva_no_threadpool():
+    assert reserva_threadpool() > 0
@@ -0,0 +1,72 @@
+"""
+Testes da contagem de SQL (app/middleware/consultas_sql.py) e guarda das
+correções de N+1: uma regressão (relacionamento carregado dentro de um loop)
+faz assert_max_queries falhar.
+"""
+
+import threading
+
+import pytest
+from sqlalchemy import text
+
+from app.database import SessionLocal
+from app.middleware.consultas_sql import ConsultasExcedidas, assert_max_queries, contar_consultas
+from app.routes.protocolos import _calcular_rastreio
+from conftest import criar_assunto, enviar_manifestacao
+
+
+def test_contagem_restrita_ao_contexto_de_quem_chamou():
+    parar = threading.Event()
+
+    def consultar_em_outra_thread():
+        sessao = SessionLocal()
+        try:
+            while not parar.is_set():
+                sessao.execute(text("SELECT 1"))
+        finally:
+            sessao.close()
+
+    vizinha = threading.Thread(target=consultar_em_outra_thread)
+    vizinha.start()
+    try:
+        sessao = SessionLocal()
+        with contar_consultas() as registro:
+            sessao.execute(text("SELECT 2"))
+        sessao.close()
+    finally:
+        parar.set()
+        vizinha.join()
+
+    assert registro.quantidade == 1
+    assert list(registro.formatos) == ["SELECT 2"]
+
+
+def test_assert_max_queries_aponta_n1():
+    sessao = SessionLocal()
+    try:
+        with pytest.raises(ConsultasExcedidas, match="N\\+1"):
+            with assert_max_queries(100):
+                for i in range(5):
+                    sessao.execute(text("SELECT :i"), {"i": i})
+    finally:
+        sessao.close()
+
+
+def test_rastreio_de_protocolo_em_uma_consulta(cliente, db, cabecalhos_cidadao):
+    manifestacao = enviar_manifestacao(cliente, cabecalhos_cidadao, criar_assunto(db))
+
+    # Protocolo + manifestação (status) na mesma consulta (joinedload)
+    with assert_max_queries(1):
+        rastreio = _calcular_rastreio(manifestacao["protocolo"])
+    assert rastreio["status_manifestacao"] == manifestacao["status"]
+
+
+def test_notificacoes_do_admin_sem_n1(cliente, db, cabecalhos_admin, cabecalhos_cidadao):
+    # Assuntos diferentes: sem joinedload, cada um seria uma consulta
+    for _ in range(5):
+        enviar_manifestacao(cliente, cabecalhos_cidadao, criar_assunto(db))
+
+    with assert_max_queries(7) as registro:
+        resposta = cliente.get("/api/movimentacoes/notificacoes/novas", headers=cabecalhos_admin)
+    assert resposta.status_code == 200
+    assert len(resposta.json()["itens"]) == 5, registro.resumo()
@@ -0,0 +1,109 @@
+"""
+Dados abertos (app/services/dados_abertos_service.py): publicação retomável
+e linhas gravadas depois de publicado o dia da sua data_criacao.
+"""
+
+import gzip
+import json
+import os
+from datetime import date, datetime, time, timedelta
+from uuid import uuid4
+
+import pytest
+
+from app.models.manifestacao import Manifestacao
+from app.services.dados_abertos_service import DadosAbertosService
+from conftest import criar_assunto
+
+DIA = date.today() - timedelta(days=5)
+
+
+def _pasta(tmp_path) -> str:
+    """Pasta de publicação que já publicou até a véspera de DIA."""
+    DadosAbertosService.salvar_manifesto(
+        str(tmp_path), {"marca_dagua": (DIA - timedelta(days=1)).isoformat(), "particoes": []}
+    )
+    return str(tmp_path)
+
+
+def _manifestacao(db, assunto_id: str, **datas) -> str:
+    manifestacao = Manifestacao(
+        id=str(uuid4()), protocolo=f"ABERTOS-{uuid4().hex[:12].upper()}", relato="Relato",
+        assunto_id=assunto_id, classificacao="reclamacao", status="pendente", **datas,
+    )
+    db.add(manifestacao)
+    db.commit()
+    return manifestacao.id
+
+
+def _ids(diretorio: str, entradas) -> set:
+    ids = set()
+    for entrada in entradas:
+        with gzip.open(os.path.join(diretorio, entrada["arquivo"]), "rt", encoding="utf-8") as arquivo:
+            ids.update(json.loads(linha)["id"] for linha in arquivo)
+    return ids
+
+
+def test_linha_gravada_atrasada_entra_numa_particao_seguinte(db, tmp_path):
+    diretorio = _pasta(tmp_path)
+    assunto_id = criar_assunto(db)
+    no_prazo = datetime.combine(DIA, time(10))
+    pontual = _manifestacao(db, assunto_id, data_criacao=no_prazo, data_gravacao=no_prazo)
+
+    manifesto = DadosAbertosService.atualizar(db, diretorio, ate=DIA)
+    assert pontual in _ids(diretorio, manifesto["particoes"])
+
+    # Importação/regravação do diário: data de um dia já publicado, gravada agora
+    atrasada = _manifestacao(db, assunto_id, data_criacao=datetime.combine(DIA, time(11)))
+
+    manifesto = DadosAbertosService.atualizar(db, diretorio, ate=date.today())
+    assert atrasada in _ids(diretorio, manifesto["particoes"][1:])
+
+
+def test_queda_depois_de_renomear_a_particao_e_retomada(db, tmp_path, monkeypatch):
+    diretorio = _pasta(tmp_path)
+    _manifestacao(db, criar_assunto(db), data_criacao=datetime.combine(DIA, time(9)))
+
+    # Execução que cai logo após renomear (o manifesto só tem a entrada pendente)
+    manifesto = DadosAbertosService.carregar_manifesto(diretorio)
+    entrada = DadosAbertosService.gerar_particao(db, diretorio, DIA, manifesto)
+    assert DadosAbertosService.carregar_manifesto(diretorio)["pendente"] == entrada
+
+    def sem_regerar(*args, **kwargs):
+        raise AssertionError("partição pendente deveria ser adotada")
+
+    monkeypatch.setattr(DadosAbertosService, "gerar_particao", sem_regerar)
+    manifesto = DadosAbertosService.atualizar(db, diretorio, ate=DIA)
+
+    assert manifesto["particoes"] == [entrada]
+    assert manifesto["marca_dagua"] == DIA.isoformat()
+    assert "pendente" not in DadosAbertosService.carregar_manifesto(diretorio)
+
+
+def test_particao_fora_do_manifesto_e_regerada(db, tmp_path):
+    diretorio = _pasta(tmp_path)
+    _manifestacao(db, criar_assunto(db), data_criacao=datetime.combine(DIA, time(9)))
+    # Arquivo de uma execução que caiu antes mesmo de registrar a pendência
+    DadosAbertosService.gerar_particao(db, diretorio, DIA)
+
+    manifesto = DadosAbertosService.atualizar(db, diretorio, ate=DIA)
+
+    assert [entrada["dia"] for entrada in manifesto["particoes"]] == [DIA.isoformat()]
+    with pytest.raises(FileExistsError):
+        DadosAbertosService.gerar_particao(db, diretorio, DIA)
+
+
+def test_limites_do_dia_no_horario_de_brasilia(db, tmp_path, monkeypatch):
+    janelas = []
+
+    def consulta_vazia(_db, inicio, fim):
+        janelas.append((inicio, fim))
+        return []
+
+    monkeypatch.setattr(DadosAbertosService, "_manifestacoes_do_dia", consulta_vazia)
+    monkeypatch.setattr(DadosAbertosService, "_movimentacoes_do_dia", consulta_vazia)
+    DadosAbertosService.gerar_particao(db, str(tmp_path), DIA)
+
+    for inicio, fim in janelas:
+        assert inicio.utcoffset() == timedelta(hours=-3)
+        assert (inicio.date(), fim - inicio) == (DIA, timedelta(days=1))
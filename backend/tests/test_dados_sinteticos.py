@@ -0,0 +1,23 @@
+"""
+Dados sintéticos (app/services/dados_sinteticos_service.py): nenhuma data
+gerada passa do momento da carga.
+"""
+
+from datetime import datetime, timedelta
+
+from app.services.dados_sinteticos_service import GeradorDadosSinteticos
+
+
+def test_datas_nunca_ficam_no_futuro():
+    agora = datetime(2024, 3, 15, 12, 0)
+    gerador = GeradorDadosSinteticos(db=None, semente=7)
+    gerador.cidadaos, gerador.admins = ["cidadao"], ["admin"]
+
+    for sequencia in range(2000):
+        dia = (agora - timedelta(days=sequencia % 40)).date()
+        gerador._gerar_manifestacao(dia, sequencia + 1, "assunto", agora)
+
+    for linha in gerador.buffers["manifestacoes"]:
+        for campo in ("data_criacao", "data_atualizacao", "data_conclusao"):
+            assert linha[campo] is None or linha[campo] <= agora, (campo, linha[campo])
+    assert all(linha["data_criacao"] <= agora for linha in gerador.buffers["movimentacoes"])
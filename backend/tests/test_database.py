@@ -0,0 +1,32 @@
+"""
+Testes da sessão por requisição (app/database.py): a conexão só é obtida
+(e a espera pelo pool só é medida) quando a rota consulta o banco.
+"""
+
+from sqlalchemy import text
+
+from app.database import get_db
+from app.middleware.metricas import DB_ESPERA_CONEXAO
+
+
+def _esperas_medidas() -> float:
+    (metrica,) = DB_ESPERA_CONEXAO.collect()
+    return next(amostra.value for amostra in metrica.samples if amostra.name.endswith("_count"))
+
+
+def test_sessao_sem_consulta_nao_obtem_conexao(cliente):
+    antes = _esperas_medidas()
+    dependencia = get_db()
+    next(dependencia)
+    dependencia.close()
+    assert _esperas_medidas() == antes
+
+
+def test_espera_medida_na_primeira_consulta(cliente):
+    antes = _esperas_medidas()
+    dependencia = get_db()
+    db = next(dependencia)
+    db.execute(text("SELECT 1"))
+    db.execute(text("SELECT 2"))
+    dependencia.close()
+    assert _esperas_medidas() == antes + 1
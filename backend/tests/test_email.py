@@ -0,0 +1,167 @@
+"""
+Envio de e-mail (app/services/email_service.py) contra um SMTP falso: conexão
+reaproveitada, reconexão quando o servidor derruba a sessão, ritmo de
+EMAIL_POR_SEGUNDO e o agrupamento das respostas num resumo.
+"""
+
+import smtplib
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.config import settings
+from app.models.movimentacao import Movimentacao
+from app.services import email_service
+from app.services.email_service import DespachanteEmail
+from app.services.tarefa_service import _grupos_de_respostas
+
+
+class SmtpFalso:
+    """Substitui smtplib.SMTP: guarda as mensagens e pode falhar sob demanda."""
+
+    conexoes = []
+
+    def __init__(self, host, porta, timeout=None):
+        self.mensagens = []
+        self.falhas = []  # exceções levantadas nos próximos send_message
+        self.fechada = False
+        SmtpFalso.conexoes.append(self)
+
+    def send_message(self, mensagem):
+        if self.falhas:
+            raise self.falhas.pop(0)
+        self.mensagens.append(mensagem)
+
+    def quit(self):
+        self.fechada = True
+
+    def close(self):
+        self.fechada = True
+
+
+@pytest.fixture
+def smtp(monkeypatch):
+    SmtpFalso.conexoes = []
+    monkeypatch.setattr(email_service.smtplib, "SMTP", SmtpFalso)
+    monkeypatch.setattr(settings, "EMAIL_ATIVO", True)
+    monkeypatch.setattr(settings, "SMTP_SSL", False)
+    monkeypatch.setattr(settings, "SMTP_STARTTLS", False)
+    monkeypatch.setattr(settings, "SMTP_USUARIO", "")
+    monkeypatch.setattr(settings, "EMAIL_POR_SEGUNDO", 1000)
+    monkeypatch.setattr(settings, "EMAIL_POR_CONEXAO", 100)
+    monkeypatch.setattr(settings, "EMAIL_CONEXAO_OCIOSA_S", 30)
+    return SmtpFalso
+
+
+def test_conexao_reaproveitada_entre_mensagens(smtp):
+    despachante = DespachanteEmail()
+    for i in range(5):
+        despachante.enviar(f"cidadao{i}@exemplo.com", "Assunto", "Texto")
+
+    assert len(smtp.conexoes) == 1
+    assert [m["To"] for m in smtp.conexoes[0].mensagens] == [f"cidadao{i}@exemplo.com" for i in range(5)]
+
+
+def test_conexao_renovada_apos_email_por_conexao(smtp, monkeypatch):
+    monkeypatch.setattr(settings, "EMAIL_POR_CONEXAO", 2)
+    despachante = DespachanteEmail()
+    for _ in range(5):
+        despachante.enviar("cidadao@exemplo.com", "Assunto", "Texto")
+
+    assert [len(c.mensagens) for c in smtp.conexoes] == [2, 2, 1]
+    assert all(c.fechada for c in smtp.conexoes[:2])
+
+
+@pytest.mark.parametrize("queda", [
+    smtplib.SMTPResponseException(421, b"Service not available, closing channel"),
+    smtplib.SMTPServerDisconnected("Connection unexpectedly closed"),
+])
+def test_reconecta_quando_servidor_derruba_a_sessao(smtp, queda):
+    despachante = DespachanteEmail()
+    despachante.enviar("primeira@exemplo.com", "Assunto", "Texto")
+    smtp.conexoes[0].falhas.append(queda)
+
+    despachante.enviar("segunda@exemplo.com", "Assunto", "Texto")
+
+    assert len(smtp.conexoes) == 2
+    assert smtp.conexoes[0].fechada
+    assert [m["To"] for m in smtp.conexoes[1].mensagens] == ["segunda@exemplo.com"]
+
+    # A nova conexão segue sendo reaproveitada
+    despachante.enviar("terceira@exemplo.com", "Assunto", "Texto")
+    assert len(smtp.conexoes) == 2
+
+
+def test_recusa_da_mensagem_nao_e_reenviada(smtp):
+    despachante = DespachanteEmail()
+    despachante.enviar("primeira@exemplo.com", "Assunto", "Texto")
+    smtp.conexoes[0].falhas.append(smtplib.SMTPRecipientsRefused({"x@exemplo.com": (550, b"no such user")}))
+
+    with pytest.raises(smtplib.SMTPRecipientsRefused):
+        despachante.enviar("x@exemplo.com", "Assunto", "Texto")
+
+    # Descartou a conexão sem tentar de novo; o outbox é quem reagenda
+    assert len(smtp.conexoes) == 1
+    assert smtp.conexoes[0].fechada
+
+
+def test_ritmo_de_email_por_segundo(smtp, monkeypatch):
+    monkeypatch.setattr(settings, "EMAIL_POR_SEGUNDO", 20)
+    despachante = DespachanteEmail()
+
+    inicio = time.monotonic()
+    for _ in range(6):
+        despachante.enviar("cidadao@exemplo.com", "Assunto", "Texto")
+    decorrido = time.monotonic() - inicio
+
+    # A primeira sai na hora, as outras cinco esperam 1/20 s cada
+    assert decorrido >= 5 / 20 - 0.01
+    assert len(smtp.conexoes[0].mensagens) == 6
+
+
+def test_email_desativado_so_registra(smtp, monkeypatch):
+    monkeypatch.setattr(settings, "EMAIL_ATIVO", False)
+    DespachanteEmail().enviar("cidadao@exemplo.com", "Assunto", "Texto")
+
+    assert smtp.conexoes == []
+
+
+# ==============================================================================
+# RESUMO DAS RESPOSTAS
+# ==============================================================================
+def _respostas(*segundos):
+    inicio = datetime(2025, 3, 10, 9, 0, tzinfo=timezone.utc)
+    return [Movimentacao(texto=f"r{s}", data_criacao=inicio + timedelta(seconds=s)) for s in segundos]
+
+
+def _textos(grupos):
+    return [[resposta.texto for resposta in grupo] for grupo in grupos]
+
+
+def test_respostas_dentro_da_janela_viram_um_resumo(monkeypatch):
+    monkeypatch.setattr(settings, "EMAIL_RESUMO_JANELA_S", 300)
+    monkeypatch.setattr(settings, "EMAIL_RESUMO_MAX_S", 3600)
+
+    grupos = _grupos_de_respostas(_respostas(0, 60, 299))
+
+    assert _textos(grupos) == [["r0", "r60", "r299"]]
+
+
+def test_respostas_fora_da_janela_vao_separadas(monkeypatch):
+    monkeypatch.setattr(settings, "EMAIL_RESUMO_JANELA_S", 300)
+    monkeypatch.setattr(settings, "EMAIL_RESUMO_MAX_S", 3600)
+
+    # A janela conta da última resposta do grupo, não da primeira
+    grupos = _grupos_de_respostas(_respostas(0, 200, 400, 700, 1100))
+
+    assert _textos(grupos) == [["r0", "r200", "r400"], ["r700"], ["r1100"]]
+
+
+def test_resumo_nao_passa_de_email_resumo_max_s(monkeypatch):
+    monkeypatch.setattr(settings, "EMAIL_RESUMO_JANELA_S", 300)
+    monkeypatch.setattr(settings, "EMAIL_RESUMO_MAX_S", 600)
+
+    grupos = _grupos_de_respostas(_respostas(0, 250, 500, 750, 1000))
+
+    assert _textos(grupos) == [["r0", "r250", "r500"], ["r750", "r1000"]]
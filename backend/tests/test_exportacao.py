@@ -0,0 +1,75 @@
+"""
+Teste de memória da exportação em streaming (app/services/exportacao_service.py):
+o pico medido pelo tracemalloc não pode crescer com o número de linhas.
+"""
+
+import tracemalloc
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import insert
+
+from app.models.manifestacao import Manifestacao
+from app.services.exportacao_service import TAMANHO_LOTE, ExportacaoService
+from conftest import criar_assunto
+
+N = 2 * TAMANHO_LOTE
+
+
+def _popular(db, quantidade: int) -> str:
+    """Assunto próprio com 'quantidade' manifestações (o filtro isola cada exportação)."""
+    assunto_id = criar_assunto(db)
+    inicio = datetime(2020, 1, 1)
+    db.execute(insert(Manifestacao), [
+        {
+            "id": str(uuid4()),
+            "protocolo": f"EXPORT-{uuid4().hex[:16].upper()}",
+            "relato": f"Relato {i} da exportação " + "x" * 400,
+            "assunto_id": assunto_id,
+            "classificacao": "reclamacao",
+            "status": "pendente",
+            "anonimo": True,
+            "data_criacao": inicio + timedelta(minutes=i),
+        }
+        for i in range(quantidade)
+    ])
+    db.commit()
+    return assunto_id
+
+
+@pytest.fixture(scope="module")
+def assuntos(cliente):
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        yield {N: _popular(db, N), 10 * N: _popular(db, 10 * N)}
+    finally:
+        db.close()
+
+
+def _pico_da_exportacao(db, formato: str, assunto_id: str) -> tuple:
+    db.expire_all()
+    tracemalloc.start()
+    try:
+        total = 0
+        for bloco in ExportacaoService.gerar_arquivo(db, formato, {"assunto_id": assunto_id}):
+            total += len(bloco)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return pico, total
+
+
+@pytest.mark.parametrize("formato", ["csv", "jsonl", "parquet"])
+def test_pico_de_memoria_nao_cresce_com_as_linhas(db, assuntos, formato):
+    if formato == "parquet":
+        pytest.importorskip("pyarrow")
+
+    pico_n, bytes_n = _pico_da_exportacao(db, formato, assuntos[N])
+    pico_10n, bytes_10n = _pico_da_exportacao(db, formato, assuntos[10 * N])
+
+    assert bytes_10n > 5 * bytes_n  # exportou mesmo 10x mais linhas
+    # Memória proporcional às linhas daria ~10x; em streaming só o lote fica em memória
+    assert pico_10n < 1.5 * pico_n, f"pico com {N} linhas: {pico_n} B; com {10 * N}: {pico_10n} B"
@@ -0,0 +1,40 @@
+"""
+Gravador de tráfego (app/middleware/gravador_trafego.py): a requisição só
+enfileira a linha, e cada worker grava no seu arquivo.
+"""
+
+import json
+import os
+
+import anyio
+
+from app.config import settings
+from app.logging_config import QueueHandlerSemBloqueio
+from app.middleware import gravador_trafego
+from app.middleware.gravador_trafego import GravadorTrafegoMiddleware, encerrar_arquivo_trafego, logger_trafego
+
+
+async def _app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+async def _enviar(_mensagem):
+    pass
+
+
+def test_linhas_vao_pela_fila_para_o_arquivo_do_worker(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "GRAVADOR_TRAFEGO_ARQUIVO", str(tmp_path / "trafego.jsonl"))
+    monkeypatch.setattr(gravador_trafego, "_listener", None)
+    gravador = GravadorTrafegoMiddleware(_app, amostragem=1.0)
+    try:
+        assert [type(h) for h in logger_trafego.handlers] == [QueueHandlerSemBloqueio]
+        escopo = {"type": "http", "method": "GET", "headers": [], "query_string": b"skip=10"}
+        anyio.run(gravador, escopo, None, _enviar)
+    finally:
+        encerrar_arquivo_trafego()
+        logger_trafego.handlers.clear()
+
+    caminho = tmp_path / f"trafego.{os.getpid()}.jsonl"
+    registro = json.loads(caminho.read_text(encoding="utf-8"))
+    assert (registro["status"], registro["bytes_resposta"], registro["query"]) == (200, 2, {"skip": 10})
@@ -0,0 +1,41 @@
+"""
+Idempotência (app/middleware/idempotencia.py): a chave pertence ao usuário,
+não ao token.
+"""
+
+from uuid import uuid4
+
+from conftest import autenticar, criar_assunto, criar_usuario
+
+DADOS = {"relato": "Buraco na via há mais de um mês"}
+
+
+def _enviar(cliente, cabecalhos: dict, assunto_id: str, chave: str):
+    return cliente.post(
+        "/api/manifestacoes/",
+        data={**DADOS, "assunto_id": assunto_id},
+        headers={**cabecalhos, "Idempotency-Key": chave},
+    )
+
+
+def test_token_renovado_repete_a_mesma_resposta(cliente, db):
+    usuario, assunto_id, chave = criar_usuario(db), criar_assunto(db), uuid4().hex
+    primeiro_token, token_renovado = autenticar(cliente, usuario), autenticar(cliente, usuario)
+    assert primeiro_token != token_renovado
+
+    original = _enviar(cliente, primeiro_token, assunto_id, chave)
+    repeticao = _enviar(cliente, token_renovado, assunto_id, chave)
+
+    assert original.status_code == 201, original.text
+    assert repeticao.headers.get("idempotent-replayed") == "true"
+    assert repeticao.json()["protocolo"] == original.json()["protocolo"]
+
+
+def test_usuarios_diferentes_nao_colidem(cliente, db):
+    assunto_id, chave = criar_assunto(db), uuid4().hex
+    original = _enviar(cliente, autenticar(cliente, criar_usuario(db)), assunto_id, chave)
+    outro = _enviar(cliente, autenticar(cliente, criar_usuario(db)), assunto_id, chave)
+
+    assert outro.status_code == 201, outro.text
+    assert "idempotent-replayed" not in outro.headers
+    assert outro.json()["protocolo"] != original.json()["protocolo"]
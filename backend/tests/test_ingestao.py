@@ -0,0 +1,113 @@
+"""
+Testes da recuperação do diário de ingestão (app/services/ingestao_service.py):
+o que acontece com os arquivos deixados por um worker que caiu.
+"""
+
+import glob
+import json
+import os
+
+import pytest
+
+from app.config import settings
+from app.models.manifestacao import Manifestacao
+from app.schemas.manifestacao import ManifestacaoCreate
+from app.services.ingestao_service import DiarioIngestao, _Segmento
+from app.services.manifestacao_service import ManifestacaoService
+from conftest import criar_assunto
+
+
+@pytest.fixture
+def diretorio(cliente, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "INGESTAO_DIRETORIO", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def assunto_id(db):
+    return criar_assunto(db)
+
+
+def _registros(assunto_id: str, quantidade: int) -> list:
+    dados = ManifestacaoCreate(relato="Iluminação apagada na quadra", assunto_id=assunto_id)
+    return [ManifestacaoService.montar_registro(dados) for _ in range(quantidade)]
+
+
+def _escrever_diario(diretorio, registros: list, sobra: bytes = b"") -> str:
+    """Diário como um worker que caiu o deixaria (sem trava)."""
+    caminho = os.path.join(diretorio, "diario-99999-abcdef01.jsonl")
+    with open(caminho, "wb") as arquivo:
+        for registro in registros:
+            arquivo.write((json.dumps(registro) + "\n").encode())
+        arquivo.write(sobra)
+    return caminho
+
+
+def _gravadas(db, registros: list) -> int:
+    db.expire_all()
+    return db.query(Manifestacao).filter(Manifestacao.id.in_([r["id"] for r in registros])).count()
+
+
+def test_diario_sem_trava_e_regravado(diretorio, db, assunto_id):
+    registros = _registros(assunto_id, 3)
+    caminho = _escrever_diario(diretorio, registros)
+
+    assert DiarioIngestao().recuperar() == 3
+    assert _gravadas(db, registros) == 3
+    assert not os.path.exists(caminho)
+
+
+def test_ultima_linha_incompleta_e_descartada(diretorio, db, assunto_id):
+    registros = _registros(assunto_id, 2)
+    incompleta = json.dumps(_registros(assunto_id, 1)[0]).encode()[:40]
+    caminho = _escrever_diario(diretorio, registros, sobra=incompleta)
+
+    assert DiarioIngestao().recuperar() == 2
+    assert _gravadas(db, registros) == 2
+    assert not os.path.exists(caminho)
+
+
+def test_regravar_ids_ja_gravados_nao_duplica(diretorio, db, assunto_id):
+    registros = _registros(assunto_id, 2)
+    _escrever_diario(diretorio, registros)
+    DiarioIngestao().recuperar()
+
+    # Queda entre o commit do lote e a remoção do arquivo: o mesmo diário volta
+    novo = _registros(assunto_id, 1)
+    _escrever_diario(diretorio, registros + novo)
+    assert DiarioIngestao().recuperar() == 3
+    assert _gravadas(db, registros + novo) == 3
+    assert not glob.glob(os.path.join(diretorio, "rejeitados-*.jsonl"))
+
+
+def test_registro_recusado_vai_para_rejeitados(diretorio, db, assunto_id):
+    aceito, recusado = _registros(assunto_id, 2)
+    recusado["protocolo"] = aceito["protocolo"]  # viola a unicidade do protocolo
+    _escrever_diario(diretorio, [aceito, recusado])
+
+    DiarioIngestao().recuperar()
+
+    assert _gravadas(db, [aceito]) == 1
+    assert _gravadas(db, [recusado]) == 0
+    (rejeitados,) = glob.glob(os.path.join(diretorio, "rejeitados-*.jsonl"))
+    with open(rejeitados, encoding="utf-8") as arquivo:
+        linhas = [json.loads(linha) for linha in arquivo]
+    assert [linha["registro"]["id"] for linha in linhas] == [recusado["id"]]
+    assert linhas[0]["erro"]
+
+
+def test_diario_travado_por_worker_vivo_e_ignorado(diretorio, db, assunto_id):
+    registros = _registros(assunto_id, 1)
+    # A trava (flock) vale por arquivo aberto: vale também dentro do mesmo processo
+    segmento = _Segmento(os.path.join(diretorio, "diario-1-vivo.jsonl"))
+    segmento.arquivo.write((json.dumps(registros[0]) + "\n").encode())
+    try:
+        assert DiarioIngestao().recuperar() == 0
+        assert os.path.exists(segmento.caminho)
+        assert _gravadas(db, registros) == 0
+    finally:
+        segmento.arquivo.close()
+
+    # Worker "caiu" (trava solta): agora é recuperado
+    assert DiarioIngestao().recuperar() == 1
+    assert _gravadas(db, registros) == 1
@@ -0,0 +1,150 @@
+"""
+Cliente da IZA (app/integrations/iza.py) contra uma IZA falsa
+(httpx.MockTransport): lotes, cache, tentativas, disjuntor e compartimento.
+"""
+
+import threading
+import time
+from uuid import uuid4
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.integrations.iza import ClienteIza, Disjuntor, IzaIndisponivel, IzaRecusou
+from app.services.tarefa_service import FALHOU, TarefaService
+from conftest import criar_assunto, enviar_manifestacao
+
+
+class IzaFalsa:
+    """Responde pelo contrato de _analisar_lote; 'falhas' é a fila de status de erro."""
+
+    def __init__(self):
+        self.requisicoes = []
+        self.falhas = []
+        self.liberar = threading.Event()
+        self.liberar.set()
+
+    def __call__(self, requisicao: httpx.Request) -> httpx.Response:
+        self.requisicoes.append(requisicao)
+        self.liberar.wait(5)
+        if self.falhas:
+            return httpx.Response(self.falhas.pop(0), json={"erro": "falha"})
+        itens = httpx.Response(200, content=requisicao.content).json()["itens"]
+        return httpx.Response(200, json={"resultados": [{"id": i["id"], "tamanho": len(i["texto"])} for i in itens]})
+
+
+@pytest.fixture
+def iza_falsa(cliente, monkeypatch):
+    # 'cliente' (TestClient) cria as tabelas: o cache fica em analises_iza
+    for nome, valor in {"IZA_TENTATIVAS": 3, "IZA_ESPERA_BASE_S": 0, "IZA_LOTE_MAX": 2,
+                        "IZA_DISJUNTOR_FALHAS": 2, "IZA_DISJUNTOR_ABERTO_S": 0.1,
+                        "IZA_SIMULTANEAS_MAX": 1, "IZA_ESPERA_VAGA_S": 0.05}.items():
+        monkeypatch.setattr(settings, nome, valor)
+    return IzaFalsa()
+
+
+@pytest.fixture
+def iza(iza_falsa):
+    cliente_iza = ClienteIza()
+    cliente_iza._http = httpx.Client(base_url="http://iza.teste", transport=httpx.MockTransport(iza_falsa))
+    yield cliente_iza
+    cliente_iza.fechar()
+
+
+def _textos(quantidade: int):
+    return [f"Relato {uuid4().hex} número {i}" for i in range(quantidade)]
+
+
+def test_textos_vao_em_lotes_na_ordem(iza, iza_falsa, db):
+    textos = _textos(5)
+    resultados = iza.analisar(db, textos)
+
+    assert [r["tamanho"] for r in resultados] == [len(texto) for texto in textos]
+    assert len(iza_falsa.requisicoes) == 3  # lotes de IZA_LOTE_MAX = 2
+
+
+def test_texto_ja_analisado_nao_volta_para_a_iza(iza, iza_falsa, db):
+    textos = _textos(3)
+    iza.analisar(db, textos)
+    iza_falsa.requisicoes.clear()
+
+    # Mesmo conteúdo com espaços diferentes: mesmo hash
+    repetidos = [f"  {texto.replace(' ', '   ')} " for texto in textos]
+    assert iza.analisar(db, repetidos + textos[:1])
+    assert iza_falsa.requisicoes == []
+
+
+def test_5xx_passageiro_e_absorvido_por_nova_tentativa(iza, iza_falsa, db):
+    iza_falsa.falhas = [503, 500]
+    assert len(iza.analisar(db, _textos(1))) == 1
+    assert len(iza_falsa.requisicoes) == 3
+    assert iza.disjuntor.estado == Disjuntor.FECHADO
+
+
+def test_4xx_nao_e_repetido(iza, iza_falsa, db):
+    iza_falsa.falhas = [422]
+    with pytest.raises(IzaRecusou):
+        iza.analisar(db, _textos(1))
+    assert len(iza_falsa.requisicoes) == 1
+    assert iza.disjuntor.estado == Disjuntor.FECHADO
+
+
+def test_disjuntor_abre_e_fecha_com_a_chamada_de_teste(iza, iza_falsa, db):
+    iza_falsa.falhas = [500] * 6  # duas chamadas de 3 tentativas
+    for _ in range(2):
+        with pytest.raises(IzaIndisponivel):
+            iza.analisar(db, _textos(1))
+    assert iza.disjuntor.estado == Disjuntor.ABERTO
+
+    # Aberto: falha na hora, sem requisição
+    with pytest.raises(IzaIndisponivel, match="Disjuntor"):
+        iza.analisar(db, _textos(1))
+    assert len(iza_falsa.requisicoes) == 6
+
+    # Passado IZA_DISJUNTOR_ABERTO_S: a chamada de teste que falha reabre...
+    time.sleep(0.12)
+    iza_falsa.falhas = [500] * 3
+    with pytest.raises(IzaIndisponivel):
+        iza.analisar(db, _textos(1))
+    assert iza.disjuntor.estado == Disjuntor.ABERTO
+
+    # ...e a que dá certo fecha
+    time.sleep(0.12)
+    iza.analisar(db, _textos(1))
+    assert iza.disjuntor.estado == Disjuntor.FECHADO
+
+
+def test_compartimento_cheio_desiste_sem_chamar_a_iza(iza, iza_falsa, db):
+    iza_falsa.liberar.clear()
+    ocupante = threading.Thread(target=lambda: iza._analisar_lote({"h": "texto"}))
+    ocupante.start()
+    while not iza_falsa.requisicoes:
+        time.sleep(0.01)
+    try:
+        with pytest.raises(IzaIndisponivel, match="simultâneas"):
+            iza._analisar_lote({"h2": "outro texto"})
+        assert len(iza_falsa.requisicoes) == 1
+    finally:
+        iza_falsa.liberar.set()
+        ocupante.join()
+
+
+def test_tarefa_recusada_pela_iza_falha_sem_nova_tentativa(cliente, db, cabecalhos_cidadao, monkeypatch):
+    from app.services import tarefa_service
+
+    def recusar(_db, _textos):
+        raise IzaRecusou("IZA recusou a requisição (422)")
+
+    monkeypatch.setattr(tarefa_service.cliente_iza, "analisar", recusar)
+    manifestacao = enviar_manifestacao(cliente, cabecalhos_cidadao, criar_assunto(db))
+    tarefa = TarefaService.enfileirar(db, "analisar_iza", {"manifestacao_id": manifestacao["id"]})
+    db.commit()
+
+    TarefaService.executar_grupo(db, [{
+        "id": tarefa.id, "tipo": tarefa.tipo, "dados": tarefa.dados, "tentativas": 1, "criado_em": tarefa.criado_em,
+    }])
+
+    db.refresh(tarefa)
+    assert tarefa.situacao == FALHOU
+    assert tarefa.ultimo_erro.startswith("FalhaDefinitiva")
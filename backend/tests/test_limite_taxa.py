@@ -0,0 +1,124 @@
+"""
+Testes do limite de taxa (app/middleware/limite_taxa.py): backends em memória
+e Redis (fakeredis), 429 com Retry-After, cabeçalhos RateLimit-*, falha aberta
+com o Redis fora do ar e IP do cliente atrás de proxy.
+"""
+
+import time
+
+import fakeredis
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+from app.config import settings
+from app.middleware import limite_taxa
+from app.middleware.limite_taxa import (
+    LimitadorMemoria, LimitadorRedis, cliente_redis, definir_limitador, ip_do_cliente, limitar_taxa,
+)
+
+CAPACIDADE = 3
+
+
+@pytest.fixture
+def app_limitada(monkeypatch):
+    monkeypatch.setattr(settings, "LIMITE_TAXA_ATIVO", True)
+    monkeypatch.setattr(settings, "LIMITE_TAXA_POLITICAS", {"teste": {"capacidade": CAPACIDADE, "por_minuto": 6}})
+    app = FastAPI()
+
+    @app.get("/limitada", dependencies=[Depends(limitar_taxa("teste"))])
+    def limitada():
+        return {"ok": True}
+
+    yield app
+    definir_limitador(None)
+
+
+def _esgotar(cliente: TestClient, **kwargs):
+    respostas = [cliente.get("/limitada", **kwargs) for _ in range(CAPACIDADE + 1)]
+    return respostas[:-1], respostas[-1]
+
+
+@pytest.mark.parametrize("criar_limitador", [
+    LimitadorMemoria,
+    lambda: LimitadorRedis(fakeredis.aioredis.FakeRedis()),
+], ids=["memoria", "redis"])
+def test_balde_esgotado_responde_429(app_limitada, criar_limitador):
+    definir_limitador(criar_limitador())
+    with TestClient(app_limitada) as cliente:
+        aceitas, recusada = _esgotar(cliente)
+
+    assert [r.status_code for r in aceitas] == [200] * CAPACIDADE
+    assert [r.headers["RateLimit-Remaining"] for r in aceitas] == ["2", "1", "0"]
+    assert all(r.headers["RateLimit-Limit"] == str(CAPACIDADE) for r in aceitas)
+    assert aceitas[-1].headers["RateLimit-Reset"] == "30"  # 3 fichas a 6 por minuto
+
+    assert recusada.status_code == 429
+    assert recusada.headers["Retry-After"] == "10"  # uma ficha a 6 por minuto
+    assert recusada.headers["RateLimit-Remaining"] == "0"
+
+
+def test_redis_compartilha_o_balde_entre_workers(app_limitada):
+    servidor = fakeredis.FakeServer()
+    definir_limitador(LimitadorRedis(fakeredis.aioredis.FakeRedis(server=servidor)))
+    with TestClient(app_limitada) as cliente:
+        for _ in range(CAPACIDADE):
+            assert cliente.get("/limitada").status_code == 200
+
+    # Outro worker (outro cliente Redis, mesmo servidor) vê o balde vazio
+    definir_limitador(LimitadorRedis(fakeredis.aioredis.FakeRedis(server=servidor)))
+    with TestClient(app_limitada) as cliente:
+        assert cliente.get("/limitada").status_code == 429
+
+
+def test_redis_fora_do_ar_libera_a_requisicao(app_limitada, caplog):
+    # Porta sem servidor: a conexão é recusada
+    definir_limitador(LimitadorRedis(cliente_redis("redis://127.0.0.1:1/0")))
+    with TestClient(app_limitada) as cliente:
+        inicio = time.perf_counter()
+        respostas = [cliente.get("/limitada") for _ in range(CAPACIDADE + 2)]
+        duracao = time.perf_counter() - inicio
+
+    assert [r.status_code for r in respostas] == [200] * (CAPACIDADE + 2)
+    assert "RateLimit-Limit" not in respostas[0].headers
+    assert "Limite de taxa indisponível" in caplog.text
+    assert duracao < 1  # sem novas tentativas com backoff a cada requisição
+
+
+def test_ip_encaminhado_por_proxy_confiavel_tem_balde_proprio(app_limitada, monkeypatch):
+    monkeypatch.setattr(settings, "SERVIDOR_PROXIES_CONFIAVEIS", "10.0.0.0/8")
+    definir_limitador(LimitadorMemoria())
+    with TestClient(app_limitada, client=("10.0.0.2", 50000)) as cliente:
+        _, recusada = _esgotar(cliente, headers={"X-Forwarded-For": "200.1.1.1"})
+        assert recusada.status_code == 429
+        # Outro cliente atrás do mesmo proxy não divide o balde
+        assert cliente.get("/limitada", headers={"X-Forwarded-For": "200.2.2.2"}).status_code == 200
+
+
+def _requisicao(cliente: str, encaminhado: str = None) -> Request:
+    headers = [(b"x-forwarded-for", encaminhado.encode())] if encaminhado else []
+    return Request({"type": "http", "client": (cliente, 1234), "headers": headers})
+
+
+@pytest.mark.parametrize("cliente, encaminhado, esperado", [
+    ("200.1.1.1", None, "200.1.1.1"),
+    # Conexão direta não escolhe o próprio IP pelo cabeçalho
+    ("200.1.1.1", "9.9.9.9", "200.1.1.1"),
+    ("10.0.0.2", "200.1.1.1", "200.1.1.1"),
+    # Valores à esquerda do primeiro endereço não confiável são forjáveis
+    ("10.0.0.2", "9.9.9.9, 200.1.1.1, 10.0.0.3", "200.1.1.1"),
+    ("10.0.0.2", None, "10.0.0.2"),
+])
+def test_ip_do_cliente(monkeypatch, cliente, encaminhado, esperado):
+    monkeypatch.setattr(settings, "SERVIDOR_PROXIES_CONFIAVEIS", "127.0.0.1, 10.0.0.0/8")
+    assert ip_do_cliente(_requisicao(cliente, encaminhado)) == esperado
+
+
+def test_backend_escolhido_pela_configuracao(monkeypatch):
+    monkeypatch.setattr(limite_taxa, "_limitador", None)
+    monkeypatch.setattr(settings, "LIMITE_TAXA_BACKEND", "memoria")
+    assert isinstance(limite_taxa.obter_limitador(), LimitadorMemoria)
+    monkeypatch.setattr(limite_taxa, "_limitador", None)
+    monkeypatch.setattr(settings, "LIMITE_TAXA_BACKEND", "redis")
+    assert isinstance(limite_taxa.obter_limitador(), LimitadorRedis)
@@ -0,0 +1,62 @@
+"""
+Perfil de memória (app/services/memoria_service.py): snapshots identificados
+pelo worker que os tirou.
+"""
+
+import os
+import tracemalloc
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routes import memoria
+from app.routes.auth import get_current_user
+from app.services.memoria_service import MemoriaService
+
+
+@pytest.fixture
+def cliente():
+    """Só as rotas de memória (montadas em app.main apenas com MEMORIA_PERFIL_ATIVO)."""
+    app = FastAPI()
+    app.include_router(memoria.router)
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(admin=True)
+    ja_ligado = tracemalloc.is_tracing()
+    if not ja_ligado:
+        tracemalloc.start(1)
+    with TestClient(app) as cliente:
+        yield cliente
+    if not ja_ligado:
+        tracemalloc.stop()
+
+
+def test_snapshot_leva_o_pid_e_compara_no_mesmo_worker(cliente):
+    base = cliente.post("/api/memoria/snapshots").json()
+    atual = cliente.post("/api/memoria/snapshots").json()
+    assert base["pid"] == os.getpid()
+    assert base["id"].startswith(f"{os.getpid()}-")
+
+    comparacao = cliente.get(f"/api/memoria/snapshots/{atual['id']}/comparar")
+    assert comparacao.status_code == 200, comparacao.text
+    assert comparacao.json()["base_id"] == base["id"]
+
+
+def test_snapshot_de_outro_worker_responde_409(cliente):
+    numero = cliente.post("/api/memoria/snapshots").json()["id"].split("-")[1]
+
+    resposta = cliente.get(f"/api/memoria/snapshots/{os.getpid() + 1}-{numero}/comparar")
+
+    assert resposta.status_code == 409
+    assert str(os.getpid() + 1) in resposta.json()["detail"]
+
+
+def test_relatorio_mostra_quanto_dos_picos_foi_medido(cliente):
+    medicao = MemoriaService.inicio_requisicao()
+    concorrente = MemoriaService.inicio_requisicao()
+    MemoriaService.fim_requisicao("GET /teste-memoria", medicao)
+    MemoriaService.fim_requisicao("GET /teste-memoria", concorrente)
+
+    relatorio = cliente.get("/api/memoria/rotas").json()
+    assert relatorio["pid"] == os.getpid()
+    assert relatorio["rotas"]["GET /teste-memoria"]["picos_medidos_pct"] == 0.0
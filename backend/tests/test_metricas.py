@@ -0,0 +1,49 @@
+"""
+Métricas com vários workers (modo multiprocesso do prometheus_client)
+"""
+
+import os
+import subprocess
+import sys
+
+from prometheus_client import CollectorRegistry, multiprocess
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Um "worker": atende 3 requisições e fica com 2 em andamento
+WORKER = """
+import os
+from app.middleware.metricas import HTTP_EM_ANDAMENTO, HTTP_REQUISICOES
+HTTP_REQUISICOES.labels("GET", "/api/health", "200").inc(3)
+HTTP_EM_ANDAMENTO.labels("GET").set(2)
+print(os.getpid())
+"""
+
+
+def _rodar_worker(diretorio) -> int:
+    saida = subprocess.run(
+        [sys.executable, "-c", WORKER], cwd=BACKEND, check=True, capture_output=True, text=True,
+        env={**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(diretorio)},
+    )
+    return int(saida.stdout)
+
+
+def _amostras(diretorio) -> dict:
+    registro = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registro, path=str(diretorio))
+    return {
+        amostra.name: amostra.value
+        for metrica in registro.collect() for amostra in metrica.samples
+        if amostra.name in ("http_requisicoes_total", "http_requisicoes_em_andamento")
+    }
+
+
+def test_metricas_somam_os_workers_e_descartam_gauges_dos_encerrados(tmp_path):
+    primeiro = _rodar_worker(tmp_path)
+    _rodar_worker(tmp_path)
+
+    assert _amostras(tmp_path) == {"http_requisicoes_total": 6, "http_requisicoes_em_andamento": 4}
+
+    # O supervisor (servidor.py) faz isto ao repor um worker
+    multiprocess.mark_process_dead(primeiro, path=str(tmp_path))
+    assert _amostras(tmp_path) == {"http_requisicoes_total": 6, "http_requisicoes_em_andamento": 2}
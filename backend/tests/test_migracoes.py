@@ -0,0 +1,33 @@
+"""
+Migrações (app/migracoes.py): bancos criados antes de uma coluna/índice novo
+recebem o DDL pelo 'python migrar_banco.py'.
+"""
+
+from sqlalchemy import create_engine, inspect, text
+
+from app.migracoes import aplicar_migracoes
+from app.models import Base
+
+INDICES_DATAS = {
+    "manifestacoes": {"ix_manifestacoes_data_criacao", "ix_manifestacoes_data_atualizacao"},
+    "movimentacoes": {"ix_movimentacoes_data_criacao"},
+}
+
+
+def _indices(engine, tabela: str) -> set:
+    return {indice["name"] for indice in inspect(engine).get_indexes(tabela)}
+
+
+def test_banco_antigo_recebe_os_indices_das_datas(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/antigo.db")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conexao:
+        for nomes in INDICES_DATAS.values():
+            for nome in nomes:
+                conexao.execute(text(f"DROP INDEX {nome}"))
+
+    aplicar_migracoes(engine)
+
+    for tabela, nomes in INDICES_DATAS.items():
+        assert nomes <= _indices(engine, tabela)
+    assert aplicar_migracoes(engine) == []
@@ -0,0 +1,72 @@
+"""
+Perfilador (app/middleware/perfilador.py): toda requisição lenta é gravada, e
+as pilhas só são amostradas depois de PERFIL_LENTAS_INICIO x PERFIL_LENTAS_MS.
+"""
+
+import time
+
+import anyio
+import pytest
+
+from app.config import settings
+from app.middleware import perfilador
+from app.middleware.perfilador import Amostrador, Coleta, PerfiladorMiddleware
+
+
+async def _rapida(scope, receive, send):
+    pass
+
+
+async def _lenta(scope, receive, send):
+    time.sleep(0.15)  # segura o event loop, como um trecho síncrono numa rota async
+
+
+@pytest.fixture(autouse=True)
+def perfil_lentas(monkeypatch):
+    monkeypatch.setattr(settings, "PERFIL_AMOSTRAGEM", 0.0)
+    monkeypatch.setattr(settings, "PERFIL_TOKEN", None)
+    monkeypatch.setattr(settings, "PERFIL_LENTAS_MS", 100)
+    monkeypatch.setattr(settings, "PERFIL_LENTAS_INICIO", 0.25)
+    monkeypatch.setattr(settings, "PERFIL_INTERVALO_MS", 2.0)
+
+
+@pytest.fixture
+def perfis(monkeypatch):
+    salvos = []
+    monkeypatch.setattr(perfilador, "salvar_perfil", lambda *args: salvos.append(args) or "perfil.folded")
+    return salvos
+
+
+def _enviar(middleware, vezes: int = 1):
+    async def enviar_todas():
+        for _ in range(vezes):
+            await middleware({"type": "http", "method": "GET", "headers": []}, None, None)
+
+    anyio.run(enviar_todas)
+
+
+def test_requisicao_lenta_e_sempre_gravada(perfis):
+    _enviar(PerfiladorMiddleware(_lenta), vezes=3)
+
+    assert len(perfis) == 3
+    assert all(linhas for (_metodo, _rota, _duracao, linhas) in perfis)
+
+
+def test_requisicoes_rapidas_nao_sao_amostradas(perfis):
+    middleware = PerfiladorMiddleware(_rapida)
+    _enviar(middleware, vezes=200)
+
+    assert perfis == []
+    assert middleware.amostrador.coletas == set() and middleware.amostrador.em_espera == {}
+
+
+def test_amostragem_comeca_no_ponto_marcado():
+    amostrador = Amostrador(0.002)
+    coleta = Coleta(None, 0)
+    amostrador.registrar(coleta, time.perf_counter() + 0.05)
+
+    time.sleep(0.02)
+    assert coleta not in amostrador.coletas
+    time.sleep(0.06)
+    assert coleta in amostrador.coletas
+    amostrador.remover(coleta)
@@ -0,0 +1,142 @@
+"""
+Varredura de prazos (app/services/prazo_service.py): protocolos passam de
+'a_vencer' para 'vencido' sem receber a mesma nota duas vezes, e a situação
+do protocolo e a nota interna são gravadas na mesma transação.
+"""
+
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import delete
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.manifestacao import Manifestacao, StatusManifestacao
+from app.models.movimentacao import Movimentacao
+from app.models.protocolo import Protocolo
+from app.services.auth_service import AuthService
+from app.services.prazo_service import (
+    FUSO_BRASIL, SITUACAO_A_VENCER, SITUACAO_VENCIDO, PrazoService,
+)
+from conftest import criar_assunto
+
+# Bem antes dos protocolos dos outros testes (que vencem a partir de hoje)
+AGORA = datetime(2001, 3, 10, 12, 0, tzinfo=FUSO_BRASIL)
+
+
+@pytest.fixture
+def criar_protocolos(cliente, db, monkeypatch):
+    """Cria manifestações em aberto que vencem em AGORA + 'dias' e as apaga no fim."""
+    monkeypatch.setattr(settings, "PRAZO_DIAS_ALERTA", 5)
+    assunto_id = criar_assunto(db)
+    criadas = []
+
+    def criar(*dias) -> list:
+        numeros = []
+        for i, deslocamento in enumerate(dias):
+            manifestacao = Manifestacao(
+                id=str(uuid4()), protocolo=f"PRAZO-{uuid4().hex[:12].upper()}",
+                relato="Relato com prazo", assunto_id=assunto_id,
+                status=StatusManifestacao.PENDENTE, anonimo=True,
+            )
+            db.add(manifestacao)
+            db.flush()
+            db.add(Protocolo(
+                numero=manifestacao.protocolo, manifestacao_id=manifestacao.id, sequencia_diaria=i + 1,
+                data_expiracao=AGORA + timedelta(days=deslocamento),
+            ))
+            criadas.append(manifestacao.id)
+            numeros.append(manifestacao.protocolo)
+        db.commit()
+        return numeros
+
+    yield criar
+
+    db.rollback()
+    db.execute(delete(Movimentacao).where(Movimentacao.manifestacao_id.in_(criadas)))
+    db.execute(delete(Protocolo).where(Protocolo.manifestacao_id.in_(criadas)))
+    db.execute(delete(Manifestacao).where(Manifestacao.id.in_(criadas)))
+    db.commit()
+
+
+def _autor_sistema(db) -> str:
+    return AuthService.obter_usuario_sistema(db, settings.PRAZO_EMAIL_SISTEMA, "Sistema de Prazos")
+
+
+def _situacoes(numeros: list) -> dict:
+    """Lê numa sessão nova: só aparece o que foi confirmado."""
+    sessao = SessionLocal()
+    try:
+        protocolos = sessao.query(Protocolo).filter(Protocolo.numero.in_(numeros)).all()
+        return {p.numero: (p.situacao_prazo, len(p.manifestacao.movimentacoes)) for p in protocolos}
+    finally:
+        sessao.close()
+
+
+def test_lote_passa_de_a_vencer_para_vencido_sem_repetir_notas(criar_protocolos, db, monkeypatch):
+    monkeypatch.setattr(settings, "PRAZO_TAMANHO_LOTE", 2)  # força várias voltas
+    vencidos = criar_protocolos(-3, -1)
+    a_vencer = criar_protocolos(1, 2, 4)
+    fora_do_alerta = criar_protocolos(30)
+
+    totais = PrazoService.processar_prazos(db, AGORA)
+
+    assert totais == {SITUACAO_A_VENCER: 3, SITUACAO_VENCIDO: 2}
+    situacoes = _situacoes(vencidos + a_vencer + fora_do_alerta)
+    assert all(situacoes[n] == (SITUACAO_VENCIDO, 1) for n in vencidos)
+    assert all(situacoes[n] == (SITUACAO_A_VENCER, 1) for n in a_vencer)
+    assert situacoes[fora_do_alerta[0]] == (None, 0)
+
+    # Mesma hora de novo: nada muda, nenhuma nota nova
+    assert PrazoService.processar_prazos(db, AGORA) == {SITUACAO_A_VENCER: 0, SITUACAO_VENCIDO: 0}
+    assert _situacoes(vencidos + a_vencer + fora_do_alerta) == situacoes
+
+    # Três dias depois: os dois primeiros 'a_vencer' vencem (uma nota a mais cada);
+    # os já vencidos não são notados de novo
+    totais = PrazoService.processar_prazos(db, AGORA + timedelta(days=3))
+
+    assert totais == {SITUACAO_A_VENCER: 0, SITUACAO_VENCIDO: 2}
+    situacoes = _situacoes(vencidos + a_vencer)
+    assert all(situacoes[n] == (SITUACAO_VENCIDO, 1) for n in vencidos)
+    assert [situacoes[n] for n in a_vencer] == [
+        (SITUACAO_VENCIDO, 2), (SITUACAO_VENCIDO, 2), (SITUACAO_A_VENCER, 1),
+    ]
+
+
+def test_notas_e_situacao_sao_gravadas_juntas(criar_protocolos, db):
+    numeros = criar_protocolos(-1, 2)
+
+    PrazoService.processar_lote(db, _autor_sistema(db), AGORA, 10)
+
+    # Numa sessão nova, cada protocolo sinalizado já tem a nota e a data do alerta
+    sessao = SessionLocal()
+    try:
+        for protocolo in sessao.query(Protocolo).filter(Protocolo.numero.in_(numeros)):
+            assert protocolo.data_alerta_prazo is not None
+            notas = protocolo.manifestacao.movimentacoes
+            assert len(notas) == 1 and notas[0].interno
+    finally:
+        sessao.close()
+
+
+def test_falha_nas_notas_desfaz_a_sinalizacao(criar_protocolos, db):
+    numeros = criar_protocolos(-1, 2)
+
+    # Sem autor o INSERT das notas falha depois dos UPDATEs dos protocolos
+    with pytest.raises(Exception):
+        PrazoService.processar_lote(db, None, AGORA, 10)
+
+    assert _situacoes(numeros) == {numero: (None, 0) for numero in numeros}
+    sessao = SessionLocal()
+    try:
+        datas = [p.data_alerta_prazo for p in sessao.query(Protocolo).filter(Protocolo.numero.in_(numeros))]
+        assert datas == [None, None]
+    finally:
+        sessao.close()
+
+    # O próximo ciclo sinaliza normalmente
+    PrazoService.processar_lote(db, _autor_sistema(db), AGORA, 10)
+    assert _situacoes(numeros) == {
+        numeros[0]: (SITUACAO_VENCIDO, 1), numeros[1]: (SITUACAO_A_VENCER, 1),
+    }
@@ -0,0 +1,85 @@
+"""
+Testes da rejeição de protocolos impossíveis (ProtocoloService.pode_existir):
+dígito verificador errado responde 404 sem sessão nem consulta ao banco.
+"""
+
+import time
+from datetime import datetime, timedelta
+
+import fakeredis
+import pytest
+
+from app import database
+from app.config import settings
+from app.middleware.consultas_sql import assert_max_queries
+from app.services import cache_service
+from app.services.protocolo_service import (
+    CARGA_CONCLUIDA,
+    CARGA_IMPORTANDO,
+    FiltroProtocolos,
+    ProtocoloService,
+    avisar_carga,
+)
+from conftest import criar_assunto, enviar_manifestacao
+from test_database import _esperas_medidas
+
+
+def _com_digito_errado() -> str:
+    numero = ProtocoloService.gerar_numero(datetime.now(), "ABC123")
+    return numero[:-1] + ("0" if numero[-1] != "0" else "1")
+
+
+@pytest.mark.parametrize("rota", ["/api/manifestacoes/{}", "/api/protocolos/{}"])
+def test_digito_errado_responde_404_sem_ir_ao_banco(cliente, rota, monkeypatch):
+    def sessao_proibida():
+        raise AssertionError("sessão aberta para um protocolo impossível")
+
+    monkeypatch.setattr(database, "SessionLocal", sessao_proibida)  # usada por get_db
+    antes = _esperas_medidas()
+    with assert_max_queries(0):
+        resposta = cliente.get(rota.format(_com_digito_errado()))
+    assert resposta.status_code == 404
+    assert _esperas_medidas() == antes  # nenhuma conexão obtida
+
+
+def test_protocolo_valido_continua_consultavel(cliente, db, cabecalhos_cidadao):
+    manifestacao = enviar_manifestacao(cliente, cabecalhos_cidadao, criar_assunto(db))
+    resposta = cliente.get(f"/api/manifestacoes/{manifestacao['protocolo']}")
+    assert resposta.status_code == 200
+    assert resposta.json()["id"] == manifestacao["id"]
+
+
+
+def _esperar(condicao, limite_s: float = 2.0) -> bool:
+    fim = time.monotonic() + limite_s
+    while time.monotonic() < fim:
+        if condicao():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_carga_em_massa_suspende_o_filtro_e_reconstroi_no_fim(cliente, monkeypatch):
+    redis_compartilhado = fakeredis.FakeRedis()
+    monkeypatch.setattr(settings, "CACHE_REDIS_ATIVO", True)
+    monkeypatch.setattr(settings, "PROTOCOLO_FILTRO_RECONSTRUIR_S", 0)
+    monkeypatch.setattr(settings, "PROTOCOLO_FILTRO_SINAIS_S", 0.01)
+    monkeypatch.setattr(cache_service, "_redis", lambda: redis_compartilhado)
+    filtro = FiltroProtocolos(1000, 0.01)
+    filtro.reconstruir()
+    ontem = filtro.dia_confiavel - timedelta(days=1)
+    filtro.iniciar()
+    try:
+        assert _esperar(lambda: filtro._ultimo_sinal is not None)  # worker novo: só os sinais seguintes
+        assert filtro.confiavel(ontem)
+
+        avisar_carga(CARGA_IMPORTANDO)
+        # Números importados ainda fora do filtro: a ausência deixa de valer, tudo vai ao banco
+        assert _esperar(lambda: not filtro.confiavel(ontem))
+
+        construido = filtro._bits
+        avisar_carga(CARGA_CONCLUIDA)
+        assert _esperar(lambda: filtro.confiavel(ontem))
+        assert filtro._bits is not construido
+    finally:
+        filtro.parar()
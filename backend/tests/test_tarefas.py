@@ -0,0 +1,197 @@
+"""
+Outbox de tarefas (app/services/tarefa_service.py): a tarefa vai junto com a
+transação de quem enfileira, respeita 'disponivel_em', volta com backoff até
+TAREFAS_MAX_TENTATIVAS, é retomada quando fica presa em 'em_execucao' e os
+tipos com manipulador de lote rodam numa chamada só.
+"""
+
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import delete, update
+
+from app.config import settings
+from app.models.manifestacao import Manifestacao
+from app.models.tarefa import Tarefa
+from app.services import tarefa_service
+from app.services.tarefa_service import (
+    CONCLUIDA, EM_EXECUCAO, FALHOU, MANIPULADORES, MANIPULADORES_LOTE, PENDENTE, TarefaService,
+)
+from conftest import criar_assunto
+
+
+@pytest.fixture
+def fila(cliente, db, monkeypatch):
+    """Tabela 'tarefas' vazia (as rotas dos outros testes também enfileiram) e manipuladores de teste."""
+    db.execute(delete(Tarefa))
+    db.commit()
+    executadas = []
+    monkeypatch.setitem(MANIPULADORES, "teste", lambda _db, dados: executadas.append(dados))
+    monkeypatch.setattr(settings, "TAREFAS_MAX_TENTATIVAS", 4)
+    monkeypatch.setattr(settings, "TAREFAS_ESPERA_BASE_S", 5)
+    monkeypatch.setattr(settings, "TAREFAS_ESPERA_MAX_S", 15)
+    monkeypatch.setattr(settings, "TAREFAS_EXECUCAO_MAX_S", 300)
+    yield executadas
+    db.rollback()
+    db.execute(delete(Tarefa))
+    db.commit()
+
+
+def _tarefa(db, tarefa_id: str) -> Tarefa:
+    db.expire_all()
+    return db.get(Tarefa, tarefa_id)
+
+
+def _liberar(db, tarefa_id: str):
+    """Adianta o relógio da tarefa: a espera do backoff já passou."""
+    db.execute(
+        update(Tarefa).where(Tarefa.id == tarefa_id)
+        .values(disponivel_em=datetime.now() - timedelta(seconds=1))
+    )
+    db.commit()
+
+
+def test_tarefa_vai_com_o_commit_de_quem_enfileira(fila, db):
+    assunto_id = criar_assunto(db)
+
+    def manifestacao_com_tarefa():
+        manifestacao = Manifestacao(
+            id=str(uuid4()), protocolo=f"TAREFA-{uuid4().hex[:12].upper()}",
+            relato="Relato", assunto_id=assunto_id, anonimo=True,
+        )
+        db.add(manifestacao)
+        return manifestacao.id, TarefaService.enfileirar(db, "teste", {"manifestacao_id": manifestacao.id}).id
+
+    # Desfeita: nem a manifestação nem a tarefa ficam
+    manifestacao_id, tarefa_id = manifestacao_com_tarefa()
+    db.rollback()
+    assert db.get(Manifestacao, manifestacao_id) is None
+    assert db.get(Tarefa, tarefa_id) is None
+    assert TarefaService.reservar_lote(db, "executor-1", 10) == []
+
+    # Confirmada: as duas
+    manifestacao_id, tarefa_id = manifestacao_com_tarefa()
+    db.commit()
+    lote = TarefaService.reservar_lote(db, "executor-1", 10)
+    assert [(t["id"], t["dados"]) for t in lote] == [(tarefa_id, {"manifestacao_id": manifestacao_id})]
+
+    TarefaService.executar_grupo(db, lote)
+    assert fila == [{"manifestacao_id": manifestacao_id}]
+    assert _tarefa(db, tarefa_id).situacao == CONCLUIDA
+
+
+def test_tarefa_com_atraso_so_sai_depois_de_disponivel_em(fila, db):
+    tarefa_id = TarefaService.enfileirar(db, "teste", {}, atraso_s=60).id
+    db.commit()
+
+    assert TarefaService.reservar_lote(db, "executor-1", 10) == []
+    assert _tarefa(db, tarefa_id).situacao == PENDENTE
+
+    _liberar(db, tarefa_id)
+    assert [t["id"] for t in TarefaService.reservar_lote(db, "executor-1", 10)] == [tarefa_id]
+
+
+def test_backoff_cresce_ate_desistir(fila, db, monkeypatch):
+    monkeypatch.setattr(tarefa_service.random, "uniform", lambda a, b: 1.0)  # sem variação
+
+    def quebrada(_db, _dados):
+        raise RuntimeError("servidor fora")
+
+    monkeypatch.setitem(MANIPULADORES, "teste", quebrada)
+    tarefa_id = TarefaService.enfileirar(db, "teste", {}).id
+    db.commit()
+
+    esperas = []
+    for tentativa in range(1, 4):
+        lote = TarefaService.reservar_lote(db, "executor-1", 10)
+        assert [(t["id"], t["tentativas"]) for t in lote] == [(tarefa_id, tentativa)]
+        antes = datetime.now()
+        TarefaService.executar_grupo(db, lote)
+
+        tarefa = _tarefa(db, tarefa_id)
+        assert tarefa.situacao == PENDENTE
+        assert tarefa.ultimo_erro == "RuntimeError: servidor fora"
+        # Ainda esperando o backoff: não volta na próxima reserva
+        assert TarefaService.reservar_lote(db, "executor-1", 10) == []
+        esperas.append(round((tarefa.disponivel_em - antes).total_seconds()))
+        _liberar(db, tarefa_id)
+
+    # 5, 10, 20 limitado a TAREFAS_ESPERA_MAX_S
+    assert esperas == [5, 10, 15]
+
+    # Quarta tentativa = TAREFAS_MAX_TENTATIVAS: fica 'falhou' e sai da fila
+    TarefaService.executar_grupo(db, TarefaService.reservar_lote(db, "executor-1", 10))
+    tarefa = _tarefa(db, tarefa_id)
+    assert (tarefa.situacao, tarefa.tentativas) == (FALHOU, 4)
+    assert tarefa.concluido_em is not None
+    _liberar(db, tarefa_id)
+    assert TarefaService.reservar_lote(db, "executor-1", 10) == []
+
+
+def test_variacao_do_backoff_fica_entre_metade_e_o_total(fila, db):
+    tarefa_id = TarefaService.enfileirar(db, "teste", {}).id
+    db.commit()
+
+    for _ in range(20):
+        antes = datetime.now()
+        assert TarefaService.falhar(db, tarefa_id, 2, "erro")
+        espera = (_tarefa(db, tarefa_id).disponivel_em - antes).total_seconds()
+        assert 5 - 0.1 <= espera <= 10 + 0.1
+
+
+def test_tarefa_presa_em_execucao_e_retomada(fila, db):
+    tarefa_id = TarefaService.enfileirar(db, "teste", {}).id
+    db.commit()
+    assert len(TarefaService.reservar_lote(db, "executor-morto", 10)) == 1
+
+    # Dentro de TAREFAS_EXECUCAO_MAX_S ninguém mais pega
+    assert TarefaService.reservar_lote(db, "executor-2", 10) == []
+
+    db.execute(
+        update(Tarefa).where(Tarefa.id == tarefa_id)
+        .values(iniciado_em=datetime.now() - timedelta(seconds=settings.TAREFAS_EXECUCAO_MAX_S + 1))
+    )
+    db.commit()
+
+    lote = TarefaService.reservar_lote(db, "executor-2", 10)
+    assert [(t["id"], t["tentativas"]) for t in lote] == [(tarefa_id, 2)]
+    tarefa = _tarefa(db, tarefa_id)
+    assert (tarefa.situacao, tarefa.executor) == (EM_EXECUCAO, "executor-2")
+
+    TarefaService.executar_grupo(db, lote)
+    assert _tarefa(db, tarefa_id).situacao == CONCLUIDA
+
+
+def test_manipulador_de_lote_recebe_o_grupo_numa_chamada(fila, db, monkeypatch):
+    chamadas = []
+    monkeypatch.setitem(MANIPULADORES_LOTE, "teste_lote", lambda _db, lista: chamadas.append(lista))
+    ids_lote = [TarefaService.enfileirar(db, "teste_lote", {"n": n}).id for n in range(3)]
+    avulsas = [TarefaService.enfileirar(db, "teste", {"n": n}).id for n in range(2)]
+    db.commit()
+
+    grupos = TarefaService.agrupar(TarefaService.reservar_lote(db, "executor-1", 10))
+
+    assert sorted(len(grupo) for grupo in grupos) == [1, 1, 3]
+    for grupo in grupos:
+        TarefaService.executar_grupo(db, grupo)
+    assert len(chamadas) == 1
+    assert sorted(dados["n"] for dados in chamadas[0]) == [0, 1, 2]
+    assert sorted(dados["n"] for dados in fila) == [0, 1]
+    assert {_tarefa(db, i).situacao for i in ids_lote + avulsas} == {CONCLUIDA}
+
+
+def test_falha_no_manipulador_de_lote_devolve_o_grupo_todo(fila, db, monkeypatch):
+    def quebrada(_db, _lista):
+        raise RuntimeError("serviço fora")
+
+    monkeypatch.setitem(MANIPULADORES_LOTE, "teste_lote", quebrada)
+    ids = [TarefaService.enfileirar(db, "teste_lote", {"n": n}).id for n in range(3)]
+    db.commit()
+
+    (grupo,) = TarefaService.agrupar(TarefaService.reservar_lote(db, "executor-1", 10))
+    TarefaService.executar_grupo(db, grupo)
+
+    tarefas = [_tarefa(db, i) for i in ids]
+    assert {(t.situacao, t.tentativas) for t in tarefas} == {(PENDENTE, 1)}
+    assert all(t.disponivel_em > datetime.now() for t in tarefas)
@@ -0,0 +1,105 @@
+"""
+Trabalhador de tarefas em segundo plano (outbox)
+
+Executa as tarefas gravadas pelas rotas na tabela 'tarefas' (avisos ao
+cidadão, link de recuperação de senha...), fora dos processos da API:
+- TAREFAS_PROCESSOS processos, cada um reservando lotes de TAREFAS_LOTE com
+  FOR UPDATE SKIP LOCKED (no PostgreSQL nunca disputam a mesma tarefa);
+- falhas voltam para a fila com backoff exponencial; após
+  TAREFAS_MAX_TENTATIVAS a tarefa fica 'falhou';
+- SIGTERM/SIGINT: cada processo termina a tarefa em andamento e sai;
+- com TAREFAS_METRICAS_PORTA, o processo n expõe /metrics em porta + n
+  (tamanho da fila, atraso, duração e resultado por tipo).
+
+Exemplos:
+    python trabalhador_tarefas.py
+    python trabalhador_tarefas.py --processos 4
+    python trabalhador_tarefas.py --estado
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import signal
+import sys
+
+
+def _registrar_modelos():
+    """Todos os modelos registrados (os relacionamentos se referem uns aos outros)."""
+    from app.models import manifestacao, protocolo, usuario, assunto, anexo, movimentacao, tarefa  # noqa: F401
+
+
+def _processo(numero: int):
+    """Corpo de cada processo trabalhador."""
+    from app.config import settings
+    from app.logging_config import configurar_logging
+    from app.services.tarefa_service import ExecutorTarefas
+
+    _registrar_modelos()
+
+    configurar_logging()
+    if settings.TAREFAS_METRICAS_PORTA:
+        from prometheus_client import start_http_server
+        start_http_server(settings.TAREFAS_METRICAS_PORTA + numero)
+
+    executor = ExecutorTarefas()
+    for sinal in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sinal, lambda *_: executor.parar())
+    executor.executar()
+
+
+def mostrar_estado():
+    from app.database import SessionLocal
+    from app.services.tarefa_service import TarefaService
+
+    _registrar_modelos()
+
+    db = SessionLocal()
+    try:
+        print(json.dumps(TarefaService.estado_fila(db), ensure_ascii=False, indent=2))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Executa as tarefas em segundo plano (outbox)")
+    parser.add_argument("--processos", type=int, default=0, help="Padrão: TAREFAS_PROCESSOS")
+    parser.add_argument("--estado", action="store_true", help="Só mostra a fila (por situação e atraso) e sai")
+    args = parser.parse_args()
+
+    if args.estado:
+        mostrar_estado()
+        sys.exit(0)
+
+    from app.config import settings
+    from app.database import engine
+    from app.models import Base
+    from app.models.tarefa import Tarefa
+    from app.logging_config import configurar_logging
+
+    configurar_logging()
+    logger = logging.getLogger("trabalhador_tarefas")
+    Base.metadata.create_all(bind=engine, tables=[Tarefa.__table__])
+
+    quantidade = args.processos or settings.TAREFAS_PROCESSOS
+    # 'spawn': cada processo abre as próprias conexões (nada herdado do pai)
+    contexto = multiprocessing.get_context("spawn")
+    processos = [
+        contexto.Process(target=_processo, args=(numero,), name=f"tarefas-{numero}")
+        for numero in range(quantidade)
+    ]
+    for processo in processos:
+        processo.start()
+    logger.info("Trabalhador de tarefas com %d processos", quantidade)
+
+    def encerrar(*_):
+        for processo in processos:
+            if processo.is_alive():
+                processo.terminate()  # SIGTERM: terminam a tarefa atual e saem
+
+    signal.signal(signal.SIGTERM, encerrar)
+    signal.signal(signal.SIGINT, encerrar)
+    for processo in processos:
+        processo.join()
+    logger.info("Trabalhador de tarefas encerrado")